@@ -4,6 +4,11 @@ ACF/PACF Chart Visualization Utilities
 
 This module provides functions to create professional ACF/PACF charts in Excel
 using openpyxl, enhancing the interpretability of time series analysis results.
+
+Chart values come only from the report's AnalysisResultStore
+(report_generator/analysis_results.py); sheets without published results get
+no chart. Worksheet cells are never parsed back into ACF/PACF or forecast
+values.
 """
 
 import math
@@ -18,7 +23,7 @@ import numpy as np
 import math
 
 
-def add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type="daily"):
+def add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type="daily", analysis=None):
     """
     Add an ACF/PACF line chart to an Excel worksheet.
     
@@ -27,80 +32,24 @@ def add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type="dail
         data_start_row: First row of data (after headers)
         data_end_row: Last row of data
         sheet_type: Type of sheet (daily, weekly, monthly, etc.)
+        analysis: The sheet's SheetAnalysis from the AnalysisResultStore; the
+            chart shows the ACF/PACF of the whole series.
     
     Returns:
-        Chart object that was added to the worksheet
+        Chart object that was added to the worksheet, or None without results
     """
-    
-    # Find ACF and PACF columns - headers are in row 3 based on diagnostic analysis
-    headers = [cell.value for cell in worksheet[3]]  # Headers are in row 3
-    
-    # Filter for ACF/PACF columns (exclude significance columns for charting)
-    # FIXED: Ensure ACF detection excludes PACF columns by checking PACF is NOT present
-    acf_cols = [(i+1, h) for i, h in enumerate(headers) if h and '_ACF_Lag_' in str(h) and '_PACF_Lag_' not in str(h) and '_Significant' not in str(h)]
-    pacf_cols = [(i+1, h) for i, h in enumerate(headers) if h and '_PACF_Lag_' in str(h) and '_Significant' not in str(h)]
-    
-    print(f"[CHART] Found {len(acf_cols)} ACF columns and {len(pacf_cols)} PACF columns in {worksheet.title}")
-    if acf_cols:
-        print(f"[CHART] ACF columns: {[h for _, h in acf_cols[:3]]}")
-    if pacf_cols:
-        print(f"[CHART] PACF columns: {[h for _, h in pacf_cols[:3]]}")
-    
-    if not acf_cols and not pacf_cols:
-        print(f"[WARNING] No ACF/PACF columns found in {worksheet.title}")
+    if analysis is None or analysis.correlation is None:
+        print(f"[WARNING] No ACF/PACF results for {worksheet.title}")
         return None
+    acf_by_lag = analysis.correlation.series_acf()
+    pacf_by_lag = analysis.correlation.series_pacf()
+    n_observations = max(analysis.correlation.n_observations, 10)  # Minimum 10 for safety
     
-    # Dynamically find the row containing actual ACF/PACF numeric values
-    # ACF/PACF values are global statistics and only appear in one specific row
-    sample_row = None
-    
-    # Search for the row with numeric ACF/PACF values
-    test_col = acf_cols[0][0] if acf_cols else pacf_cols[0][0]
-    for row_num in range(4, min(15, worksheet.max_row + 1)):  # Check rows 4-14
-        test_value = worksheet.cell(row=row_num, column=test_col).value
-        if isinstance(test_value, (int, float)):
-            sample_row = row_num
-            break
-    
-    if sample_row is None:
-        print(f"[WARNING] No numeric ACF/PACF values found in {worksheet.title}")
-        return None
-    
-    print(f"[CHART] Found ACF/PACF data in row {sample_row}")
-    
-    # Extract ACF/PACF values and lag numbers
-    acf_data = []
-    pacf_data = []
-    lag_numbers = []
-    
-    # Process ACF columns
-    for col_idx, header in acf_cols:
-        lag_part = str(header).split('_Lag_')[1]
-        if lag_part.isdigit():
-            lag_num = int(lag_part)
-            acf_value = worksheet.cell(row=sample_row, column=col_idx).value
-            print(f"[CHART] ACF Lag {lag_num}: {acf_value} (type: {type(acf_value).__name__})")
-            if isinstance(acf_value, (int, float)):
-                lag_numbers.append(lag_num)
-                acf_data.append((lag_num, acf_value))
-    
-    # Process PACF columns
-    for col_idx, header in pacf_cols:
-        lag_part = str(header).split('_Lag_')[1]
-        if lag_part.isdigit():
-            lag_num = int(lag_part)
-            pacf_value = worksheet.cell(row=sample_row, column=col_idx).value
-            print(f"[CHART] PACF Lag {lag_num}: {pacf_value} (type: {type(pacf_value).__name__})")
-            if isinstance(pacf_value, (int, float)):
-                if lag_num not in lag_numbers:
-                    lag_numbers.append(lag_num)
-                pacf_data.append((lag_num, pacf_value))
-    
-    if not acf_data and not pacf_data:
+    if not acf_by_lag and not pacf_by_lag:
         print(f"[WARNING] No valid ACF/PACF values found in {worksheet.title}")
         return None
     
-    print(f"[CHART] Found {len(acf_data)} ACF values and {len(pacf_data)} PACF values")
+    print(f"[CHART] Found {len(acf_by_lag)} ACF values and {len(pacf_by_lag)} PACF values")
     
     # Create line chart
     chart = LineChart()
@@ -116,13 +65,9 @@ def add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type="dail
     chart.y_axis.scaling.max = 1.0
     
     # Sort and organize data by lag
-    all_lags = sorted(set(lag_numbers))
+    all_lags = sorted(set(acf_by_lag) | set(pacf_by_lag))
     print(f"[CHART] Processing lags: {all_lags}")
     
-    # Create organized data structure
-    acf_by_lag = {lag: val for lag, val in acf_data}
-    pacf_by_lag = {lag: val for lag, val in pacf_data}
-    
     # Create temporary data area for chart (below main data)
     chart_data_start_row = data_end_row + 5
     
@@ -132,7 +77,6 @@ def add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type="dail
     worksheet.cell(row=chart_data_start_row - 1, column=3, value="PACF")
     
     # Calculate confidence intervals for statistical significance
-    n_observations = max(data_end_row - data_start_row + 1, 10)  # Minimum 10 for safety
     confidence_level = 1.96 / math.sqrt(n_observations)  # 95% confidence interval
     
     # Write headers including confidence intervals
@@ -161,11 +105,11 @@ def add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type="dail
     x_axis_data = Reference(worksheet, min_col=1, min_row=chart_data_start_row, max_row=chart_data_end_row)
     
     chart_series = []
-    if acf_data:
+    if acf_by_lag:
         acf_values = Reference(worksheet, min_col=2, min_row=chart_data_start_row - 1, max_row=chart_data_end_row)
         chart_series.append(('ACF', acf_values, "4F81BD"))  # Blue
     
-    if pacf_data:
+    if pacf_by_lag:
         pacf_values = Reference(worksheet, min_col=3, min_row=chart_data_start_row - 1, max_row=chart_data_end_row)
         chart_series.append(('PACF', pacf_values, "C0504D"))  # Red
     
@@ -234,7 +178,7 @@ def add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type="dail
     return chart
 
 
-def add_arima_forecast_chart(worksheet, data_start_row, data_end_row, sheet_type="daily"):
+def add_arima_forecast_chart(worksheet, data_start_row, data_end_row, sheet_type="daily", analysis=None):
     """
     Add an ARIMA forecast chart to an Excel worksheet if forecast columns exist.
     
@@ -243,31 +187,19 @@ def add_arima_forecast_chart(worksheet, data_start_row, data_end_row, sheet_type
         data_start_row: First row of data (after headers)
         data_end_row: Last row of data
         sheet_type: Type of sheet (daily, weekly, monthly, etc.)
+        analysis: The sheet's SheetAnalysis from the AnalysisResultStore
     
     Returns:
         Chart object that was added to the worksheet, or None if no forecast data
     """
     
-    # Find Total_Files and forecast columns
-    headers = [cell.value for cell in worksheet[1]]
-    total_files_col = None
-    forecast_col = None
-    
-    for i, header in enumerate(headers):
-        if str(header) == 'Total_Files':
-            total_files_col = i + 1
-        elif str(header) == 'Total_Files_Forecast':
-            forecast_col = i + 1
-    
-    if not total_files_col or not forecast_col:
+    forecast = analysis.forecast if analysis is not None else None
+    if forecast is None or not forecast.has_forecast:
         print(f"No ARIMA forecast data found in {worksheet.title}")
         return None
-    
-    # Check if forecast column contains numeric data (not error messages)
-    sample_forecast = worksheet.cell(row=data_start_row, column=forecast_col).value
-    if not isinstance(sample_forecast, (int, float)):
-        print(f"ARIMA forecast contains non-numeric data in {worksheet.title}: {sample_forecast}")
-        return None
+    total_files_col = analysis.column(forecast.value_col)
+    forecast_col = analysis.column(f'{forecast.value_col}_Forecast')
+    header_row, last_data_row = analysis.header_row, analysis.last_row
     
     # Create line chart for ARIMA forecast
     chart = LineChart()
@@ -281,11 +213,11 @@ def add_arima_forecast_chart(worksheet, data_start_row, data_end_row, sheet_type
     chart.x_axis.title = "Time Period"
     
     # Add historical data series
-    historical_data = Reference(worksheet, min_col=total_files_col, min_row=1, max_row=data_end_row)
+    historical_data = Reference(worksheet, min_col=total_files_col, min_row=header_row, max_row=last_data_row)
     chart.add_data(historical_data, titles_from_data=True)
     
     # Add forecast data series
-    forecast_data = Reference(worksheet, min_col=forecast_col, min_row=1, max_row=data_end_row)
+    forecast_data = Reference(worksheet, min_col=forecast_col, min_row=header_row, max_row=last_data_row)
     chart.add_data(forecast_data, titles_from_data=True)
     
     # Position chart to the right of ACF/PACF chart
@@ -330,7 +262,24 @@ def add_chart_summary_info(worksheet, data_end_row, sheet_type, total_lags, comp
     print(f"[SUCCESS] Added summary panel to {worksheet.title}")
 
 
-def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=None):
+def _summarize_correlations(analysis):
+    """
+    Summary statistics of a sheet's published ACF/PACF results.
+    
+    Returns:
+        (data rows, ACF lags, PACF lags, max |ACF|, max |PACF|), the maxima
+        over the whole series
+    """
+    correlation = analysis.correlation
+    if correlation is None:
+        return analysis.n_rows, 0, 0, 0, 0
+    acf_values = correlation.series_acf().values()
+    pacf_values = correlation.series_pacf().values()
+    return (analysis.n_rows, len(correlation.acf), len(correlation.pacf),
+            max(map(abs, acf_values), default=0), max(map(abs, pacf_values), default=0))
+
+
+def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, results, target_position=None):
     """
     Create a comprehensive dashboard sheet with ACF/PACF analysis summary,
     cross-sheet navigation, statistical interpretation, and mini-charts.
@@ -338,6 +287,8 @@ def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=N
     Args:
         workbook: openpyxl workbook object
         acf_pacf_sheets: List of sheet names containing ACF/PACF data
+        results: AnalysisResultStore the sheets published their results to;
+            sheets missing from it are left out of the summary and charts
         target_position: Optional position index for sheet placement
     
     Returns:
@@ -399,52 +350,14 @@ def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=N
     # Analyze each ACF/PACF sheet and populate summary
     for sheet_name in acf_pacf_sheets:
         if sheet_name in workbook.sheetnames:
-            source_sheet = workbook[sheet_name]
+            analysis = results.get(sheet_name)
+            if analysis is None:
+                print(f"[WARNING] No published results for {sheet_name}; left out of the dashboard")
+                continue
             
-            # Extract summary statistics from the sheet
+            # Extract summary statistics from the published results
             try:
-                # Find headers in row 3
-                headers_row = [cell.value for cell in source_sheet[3]]
-                acf_cols = [h for h in headers_row if h and '_ACF_Lag_' in str(h) and '_Significant' not in str(h)]
-                pacf_cols = [h for h in headers_row if h and '_PACF_Lag_' in str(h) and '_Significant' not in str(h)]
-                
-                # Count data rows (excluding headers)
-                data_rows = 0
-                for row in range(4, source_sheet.max_row + 1):
-                    if source_sheet.cell(row=row, column=1).value:
-                        data_rows += 1
-                
-                # Find maximum absolute ACF/PACF values
-                max_acf = 0
-                max_pacf = 0
-                
-                # Dynamic detection of data row (same logic as chart creation)
-                sample_row = None
-                if acf_cols:
-                    test_col = None
-                    for col_idx, header in enumerate(headers_row, 1):
-                        if header == acf_cols[0]:
-                            test_col = col_idx
-                            break
-                    
-                    if test_col:
-                        for row_num in range(4, min(15, source_sheet.max_row + 1)):
-                            test_value = source_sheet.cell(row=row_num, column=test_col).value
-                            if isinstance(test_value, (int, float)):
-                                sample_row = row_num
-                                break
-                
-                if sample_row:
-                    # Extract ACF/PACF values from the data row
-                    for col_idx, header in enumerate(headers_row, 1):
-                        if header in acf_cols:
-                            value = source_sheet.cell(row=sample_row, column=col_idx).value
-                            if isinstance(value, (int, float)):
-                                max_acf = max(max_acf, abs(value))
-                        elif header in pacf_cols:
-                            value = source_sheet.cell(row=sample_row, column=col_idx).value
-                            if isinstance(value, (int, float)):
-                                max_pacf = max(max_pacf, abs(value))
+                data_rows, acf_lags, pacf_lags, max_acf, max_pacf = _summarize_correlations(analysis)
                 
                 # Calculate confidence level (95% CI)
                 confidence_level = f"±{1.96/math.sqrt(max(data_rows, 1)):.3f}" if data_rows > 0 else "N/A"
@@ -456,8 +369,8 @@ def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=N
                 row_data = [
                     time_scale,  # Text
                     data_rows,   # Number
-                    len(acf_cols),   # Number
-                    len(pacf_cols),  # Number
+                    acf_lags,    # Number
+                    pacf_lags,   # Number
                     max_acf if max_acf > 0 else 0.0,  # Number
                     max_pacf if max_pacf > 0 else 0.0,  # Number
                     confidence_level,  # Text (contains ± symbol)
@@ -523,12 +436,12 @@ def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=N
     chart_col = 1
     charts_per_row = 2
     chart_row_start = current_row
+    published_charts = []
     
     for i, sheet_name in enumerate(acf_pacf_sheets):
-        if sheet_name in workbook.sheetnames:
+        analysis = results.get(sheet_name)
+        if sheet_name in workbook.sheetnames and analysis is not None:
             try:
-                source_sheet = workbook[sheet_name]
-                
                 # Create a small line chart showing ACF/PACF patterns
                 mini_chart = LineChart()
                 mini_chart.title = sheet_name.replace(" (ACF_PACF)", "")
@@ -536,47 +449,11 @@ def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=N
                 mini_chart.width = 7  # Smaller width
                 mini_chart.height = 5  # Smaller height
                 
-                # Find ACF/PACF data range in source sheet
-                headers_row = [cell.value for cell in source_sheet[3]]
-                acf_cols = [h for h in headers_row if h and '_ACF_Lag_' in str(h) and '_Significant' not in str(h)]
-                
-                if acf_cols:
-                    # Find data row
-                    data_row = None
-                    for row_num in range(4, min(15, source_sheet.max_row + 1)):
-                        test_col = None
-                        for col_idx, header in enumerate(headers_row, 1):
-                            if header == acf_cols[0]:
-                                test_col = col_idx
-                                break
-                        if test_col:
-                            test_value = source_sheet.cell(row=row_num, column=test_col).value
-                            if isinstance(test_value, (int, float)):
-                                data_row = row_num
-                                break
-                    
-                    if data_row:
-                        # Add ACF data series
-                        acf_start_col = None
-                        acf_end_col = None
-                        for col_idx, header in enumerate(headers_row, 1):
-                            if header in acf_cols:
-                                if acf_start_col is None:
-                                    acf_start_col = col_idx
-                                acf_end_col = col_idx
-                        
-                        if acf_start_col and acf_end_col:
-                            # Create data reference for ACF values
-                            acf_data = Reference(source_sheet, 
-                                               min_col=acf_start_col, max_col=acf_end_col,
-                                               min_row=data_row, max_row=data_row)
-                            mini_chart.add_data(acf_data, titles_from_data=False)
-                            
-                            # Position chart
-                            chart_position = f"{get_column_letter(chart_col * 4 - 3)}{chart_row_start + 1}"
-                            dashboard.add_chart(mini_chart, chart_position)
-                            
-                            print(f"[CHART] Added mini-chart for {sheet_name} at {chart_position}")
+                # Plotted from the chart data table written after the navigation section
+                correlation = analysis.correlation
+                if correlation is not None and (correlation.series_acf() or correlation.series_pacf()):
+                    chart_position = f"{get_column_letter(chart_col * 4 - 3)}{chart_row_start + 1}"
+                    published_charts.append((mini_chart, chart_position, sheet_name, correlation))
                 
                 # Update positioning for next chart
                 chart_col += 1
@@ -609,6 +486,41 @@ def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=N
                 nav_col = 1
                 current_row += 1
     
+    # === CHART DATA SECTION ===
+    # Whole-series ACF/PACF by lag of the published results, plotted by the mini-charts
+    if published_charts:
+        current_row += 3
+        dashboard.cell(row=current_row, column=1, value="Chart Data")
+        dashboard.cell(row=current_row, column=1).font = header_font
+        dashboard.cell(row=current_row, column=1).fill = header_fill
+        dashboard.merge_cells(f'A{current_row}:H{current_row}')
+        current_row += 1
+        
+        for mini_chart, chart_position, sheet_name, correlation in published_charts:
+            acf_by_lag = correlation.series_acf()
+            pacf_by_lag = correlation.series_pacf()
+            lags = sorted(set(acf_by_lag) | set(pacf_by_lag))
+            
+            header_row = current_row
+            for col, header in enumerate(["Time Scale", "Lag", "ACF", "PACF"], 1):
+                cell = dashboard.cell(row=header_row, column=col, value=header)
+                cell.font = subheader_font
+                cell.fill = summary_fill
+                cell.border = thin_border
+            for lag in lags:
+                current_row += 1
+                dashboard.cell(row=current_row, column=1, value=sheet_name.replace(" (ACF_PACF)", "").replace(" Counts", ""))
+                dashboard.cell(row=current_row, column=2, value=lag)
+                dashboard.cell(row=current_row, column=3, value=acf_by_lag.get(lag))
+                dashboard.cell(row=current_row, column=4, value=pacf_by_lag.get(lag))
+            
+            mini_chart.add_data(Reference(dashboard, min_col=3, max_col=4, min_row=header_row, max_row=current_row),
+                                titles_from_data=True)
+            mini_chart.set_categories(Reference(dashboard, min_col=2, min_row=header_row + 1, max_row=current_row))
+            dashboard.add_chart(mini_chart, chart_position)
+            print(f"[CHART] Added mini-chart for {sheet_name} at {chart_position}")
+            current_row += 2
+    
     # Auto-adjust column widths
     for col in range(1, 9):
         column_letter = get_column_letter(col)
@@ -622,12 +534,14 @@ def create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheets, target_position=N
     return dashboard
 
 
-def enhance_acf_pacf_visualization(workbook):
+def enhance_acf_pacf_visualization(workbook, results):
     """
     Enhance ACF/PACF sheets with professional charts and create dashboard.
     
     Args:
         workbook: openpyxl workbook object
+        results: AnalysisResultStore with the sheets' ACF/PACF and forecast
+            results; sheets missing from it get no charts
     
     Returns:
         List of enhanced sheet names
@@ -674,15 +588,14 @@ def enhance_acf_pacf_visualization(workbook):
             data_start_row = 2  # After headers
             data_end_row = worksheet.max_row
             
-            # Count ACF/PACF columns - headers are in row 3 (consistent with chart generation)
-            headers = [cell.value for cell in worksheet[3]]  # Headers are in row 3
-            acf_cols = [h for h in headers if h and '_ACF_Lag_' in str(h) and '_Significant' not in str(h)]
-            pacf_cols = [h for h in headers if h and '_PACF_Lag_' in str(h) and '_Significant' not in str(h)]
-            total_lags = len(set([h.split('_Lag_')[1] for h in acf_cols + pacf_cols if '_Lag_' in str(h)]))
-            
-            print(f"Found {len(acf_cols)} ACF columns and {len(pacf_cols)} PACF columns")
-            if acf_cols or pacf_cols:
-                print(f"Sample ACF/PACF columns: {(acf_cols + pacf_cols)[:3]}")
+            analysis = results.get(sheet_name)
+            if analysis is None:
+                print(f"[WARNING] No published results for {sheet_name}; skipping its charts")
+                continue
+            correlation = analysis.correlation
+            total_lags = len(correlation.lags) if correlation is not None else 0
+            computed_lags = len(correlation.series_acf()) if correlation is not None else 0
+            print(f"Found {total_lags} ACF/PACF lags in the published results")
             
             # Check for existing charts to prevent duplication
             existing_chart_count = len(worksheet._charts) if hasattr(worksheet, '_charts') else 0
@@ -692,13 +605,12 @@ def enhance_acf_pacf_visualization(workbook):
                 continue
             
             # Add ACF/PACF chart (only if no existing charts)
-            chart = add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type)
+            chart = add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type, analysis=analysis)
             if chart:
                 # Add ARIMA forecast chart
-                arima_chart = add_arima_forecast_chart(worksheet, data_start_row, data_end_row, sheet_type)
+                arima_chart = add_arima_forecast_chart(worksheet, data_start_row, data_end_row, sheet_type, analysis=analysis)
                 
                 # Add summary info
-                computed_lags = len(acf_cols)  # Approximate
                 add_chart_summary_info(worksheet, data_end_row, sheet_type, total_lags, computed_lags)
                 enhanced_sheets.append(sheet_name)
     
@@ -712,7 +624,7 @@ def enhance_acf_pacf_visualization(workbook):
                 last_acf_pacf_position = max(last_acf_pacf_position, position)
         
         target_position = last_acf_pacf_position + 1
-        create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheet_names, target_position)
+        create_acf_pacf_dashboard_sheet(workbook, acf_pacf_sheet_names, results, target_position)
     
     print(f"[OK] Enhanced {len(enhanced_sheets)} sheets with ACF/PACF visualizations")
     return enhanced_sheets
@@ -774,7 +686,7 @@ def _get_forecast_horizon(sheet_type):
     return horizons.get(sheet_type, 14)
 
 
-def enhance_arima_forecast_visualization(workbook):
+def enhance_arima_forecast_visualization(workbook, results):
     """Add ARIMA forecast charts to sheets with forecast data.
     
     This function looks for sheets with Total_Files and Total_Files_Forecast columns,
@@ -783,6 +695,8 @@ def enhance_arima_forecast_visualization(workbook):
     
     Args:
         workbook: The openpyxl workbook to enhance
+        results: AnalysisResultStore; sheets are charted from their published
+            forecast results and column layout
         
     Returns:
         List of sheet names that were enhanced with ARIMA charts
@@ -829,35 +743,25 @@ def enhance_arima_forecast_visualization(workbook):
             print(f"[ARIMA] Skipping sheet '{sheet_name}' - ARIMA charts only added to ACF_PACF sheets")
             continue
             
-        # FIXED: Headers are in row 3, not row 1
-        headers = [str(cell.value or '') for cell in ws[3]]
-        print(f"[ARIMA] Checking sheet '{sheet_name}' for forecast columns...")
-        
-        total_files_col, forecast_col, forecast_lower_col, forecast_upper_col = None, None, None, None
-        
-        # Find required columns with more flexible matching
-        for i, header in enumerate(headers, 1):
-            if header and 'Total_Files' == header.strip():
-                total_files_col = i
-                print(f"[ARIMA] Found Total_Files column at position {i}")
-            elif header and 'Total_Files_Forecast' in header:
-                forecast_col = i
-                print(f"[ARIMA] Found Total_Files_Forecast column at position {i}")
-            elif header and 'Total_Files_Forecast_Lower' in header:
-                forecast_lower_col = i
-                print(f"[ARIMA] Found Total_Files_Forecast_Lower column at position {i}")
-            elif header and 'Total_Files_Forecast_Upper' in header:
-                forecast_upper_col = i
-                print(f"[ARIMA] Found Total_Files_Forecast_Upper column at position {i}")
+        analysis = results.get(sheet_name)
+        forecast = analysis.forecast if analysis is not None else None
+        if forecast is None:
+            print(f"[ARIMA] No forecast results for '{sheet_name}'")
+            continue
+        forecast_name = f'{forecast.value_col}_Forecast'
+        total_files_col = analysis.column(forecast.value_col)
+        forecast_col = analysis.column(forecast_name)
+        forecast_lower_col = analysis.column(f'{forecast_name}_Lower')
+        forecast_upper_col = analysis.column(f'{forecast_name}_Upper')
+        header_row, last_data_row = analysis.header_row, analysis.last_row
+        numeric_forecast = forecast.has_forecast
+        first_forecast = forecast.forecast[0] if forecast.forecast is not None and len(forecast.forecast) else forecast.message
+        quality, model_order = forecast.quality, forecast.model_order
         
         # Proceed only if both main columns are found
         if total_files_col and forecast_col:
-            # FIXED: Data starts at row 4 (after headers in row 3)
-            data_start_row = 4
             # Check if the forecast data is numeric
-            first_forecast = ws.cell(row=data_start_row, column=forecast_col).value
-            
-            if isinstance(first_forecast, (int, float)):
+            if numeric_forecast:
                 print(f"[ARIMA] Adding ARIMA forecast chart to: {sheet_name}")
                 
                 # Create chart with proven logic
@@ -870,17 +774,16 @@ def enhance_arima_forecast_visualization(workbook):
                 chart.x_axis.title = "Time"
                 
                 # Define data series for historical and forecast values
-                # FIXED: Use correct row numbers for headers and data
-                historical_data = Reference(ws, min_col=total_files_col, min_row=3, max_row=ws.max_row)
-                forecast_data = Reference(ws, min_col=forecast_col, min_row=3, max_row=ws.max_row)
+                historical_data = Reference(ws, min_col=total_files_col, min_row=header_row, max_row=last_data_row)
+                forecast_data = Reference(ws, min_col=forecast_col, min_row=header_row, max_row=last_data_row)
                 
                 chart.add_data(historical_data, titles_from_data=True)
                 chart.add_data(forecast_data, titles_from_data=True)
                 
                 # Add confidence intervals if available
                 if forecast_lower_col and forecast_upper_col:
-                    lower_ci_data = Reference(ws, min_col=forecast_lower_col, min_row=3, max_row=ws.max_row)
-                    upper_ci_data = Reference(ws, min_col=forecast_upper_col, min_row=3, max_row=ws.max_row)
+                    lower_ci_data = Reference(ws, min_col=forecast_lower_col, min_row=header_row, max_row=last_data_row)
+                    upper_ci_data = Reference(ws, min_col=forecast_upper_col, min_row=header_row, max_row=last_data_row)
                     chart.add_data(lower_ci_data, titles_from_data=True)
                     chart.add_data(upper_ci_data, titles_from_data=True)
                 
@@ -910,20 +813,9 @@ def enhance_arima_forecast_visualization(workbook):
                 enhanced_sheets.append(sheet_name)
                 
                 # Add forecast summary information below the chart
-                forecast_quality_col = next((i for i, h in enumerate(headers, 1) if h and 'Forecast_Quality' in h), None)
-                forecast_model_col = next((i for i, h in enumerate(headers, 1) if h and 'Forecast_Model' in h), None)
-                
-                if forecast_quality_col and forecast_model_col:
-                    quality = ws.cell(row=data_start_row, column=forecast_quality_col).value
-                    model = ws.cell(row=data_start_row, column=forecast_model_col).value
-                    if model and 'ARIMA' in model:
-                        # Extract model order (p,d,q) from string like 'ARIMA(2,1,2)'
-                        import re
-                        model_match = re.search(r'ARIMA\((\d+),(\d+),(\d+)\)', model)
-                        if model_match:
-                            p, d, q = map(int, model_match.groups())
-                            sheet_type = _detect_sheet_type(sheet_name)
-                            add_forecast_summary_info(ws, ws.max_row + 20, sheet_type, quality, (p,d,q))
+                if model_order:
+                    sheet_type = _detect_sheet_type(sheet_name)
+                    add_forecast_summary_info(ws, ws.max_row + 20, sheet_type, quality, model_order)
             else:
                 print(f"[ARIMA] Skipping {sheet_name}: Forecast data is not numeric ('{first_forecast}')")
     
@@ -6,11 +6,16 @@ the AR Data Analysis scripts to eliminate code duplication and ensure consistenc
 """
 
 import datetime
+import functools
+import threading
+from collections.abc import Mapping
 import yaml
 from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from arima_search import get_arima_search
+
 # Import statsmodels for ACF/PACF analysis and ARIMA forecasting
 try:
     from statsmodels.tsa.stattools import acf, pacf, adfuller
@@ -27,9 +32,45 @@ except ImportError:
 # CONFIGURATION LOADING
 # ==============================================================================
 
+CONFIG_PATH = Path(__file__).parent / "config.yaml"
+
+
+def _parse_schedule_time(value) -> datetime.time:
+    """Accepts a datetime.time or an 'HH:MM[:SS]' string."""
+    if isinstance(value, datetime.time):
+        return value
+    return datetime.time.fromisoformat(str(value))
+
+
+def _is_normalized_schedule_entry(entry) -> bool:
+    return (isinstance(entry, tuple) and len(entry) == 3
+            and isinstance(entry[0], datetime.time) and isinstance(entry[1], datetime.time))
+
+
+def _normalize_schedule(schedule: list) -> list[tuple[datetime.time, datetime.time, str]]:
+    """
+    Normalizes activity schedule entries to (start, end, activity) tuples.
+
+    config.yaml stores entries as ["HH:MM", "HH:MM", "Activity"] lists; dicts
+    with start/end/activity keys are accepted as well. _load_config normalizes
+    the configured schedule once, so an already normalized schedule is
+    returned as-is.
+    """
+    if schedule and all(_is_normalized_schedule_entry(entry) for entry in schedule):
+        return schedule
+    normalized = []
+    for entry in schedule or []:
+        if isinstance(entry, dict):
+            start, end, activity = entry["start"], entry["end"], entry["activity"]
+        else:
+            start, end, activity = entry
+        normalized.append((_parse_schedule_time(start), _parse_schedule_time(end), activity))
+    return normalized
+
+
 def _load_config():
     """Loads and parses the config.yaml file, converting date strings to objects."""
-    config_path = Path(__file__).parent / "config.yaml"
+    config_path = CONFIG_PATH
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found at: {config_path}")
 
@@ -54,16 +95,50 @@ def _load_config():
             for date_str, info in config['non_collection_days'].items()
         }
 
+    # Parse the activity schedule times once instead of on every enrichment call
+    if 'activity_schedule' in config:
+        config['activity_schedule'] = _normalize_schedule(config['activity_schedule'])
+
     return config
 
+def _config_mtime_ns():
+    """Returns the modification time of config.yaml, or None if it is missing."""
+    try:
+        return CONFIG_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+
 # Load configuration once when the module is imported
 CONFIG = {}
+_CONFIG_MTIME_NS = _config_mtime_ns()
 try:
     CONFIG = _load_config()
 except (FileNotFoundError, yaml.YAMLError, TypeError) as e:
     print(f"[ERROR] Critical Error: Could not load or parse config.yaml. Details: {e}")
     # Allow module to load but dependent functions will fail gracefully.
 
+
+def reload_config_if_changed() -> bool:
+    """
+    Reloads CONFIG in place when config.yaml has been modified since it was loaded.
+
+    Returns:
+        bool: True if the configuration was reloaded.
+    """
+    global _CONFIG_MTIME_NS
+    mtime_ns = _config_mtime_ns()
+    if mtime_ns is None or mtime_ns == _CONFIG_MTIME_NS:
+        return False
+    try:
+        new_config = _load_config()
+    except (FileNotFoundError, yaml.YAMLError, TypeError) as e:
+        print(f"[ERROR] Could not reload config.yaml, keeping previous configuration. Details: {e}")
+        return False
+    CONFIG.clear()
+    CONFIG.update(new_config)
+    _CONFIG_MTIME_NS = mtime_ns
+    return True
+
 # ==============================================================================
 # CONFIGURATION DATA ACCESSORS
 # ==============================================================================
@@ -163,62 +238,172 @@ def precompute_collection_days(school_calendar: dict, non_collection_days: dict)
         A dictionary mapping each valid collection `datetime.date` to a dictionary
         of its properties, such as `School_Year` and `Collection_Period`.
     """
-    collection_day_map = {}
-    
-    # First pass: identify all collection days by period
-    for school_year, config in school_calendar.items():
-        periods = config["periods"]
-        
-        for period_name, (start_date, end_date) in periods.items():
-            current = start_date
-            while current <= end_date:
-                # Weekdays only
-                if current.weekday() < 5:
-                    # Check if the day is in non-collection
-                    ncd = non_collection_days.get(current)
-                    if ncd:
-                        if ncd["type"] == "Non-Collection":
-                            # Skip non-collection
-                            current += datetime.timedelta(days=1)
-                            continue
-                        elif ncd["type"] == "Partial":
-                            # Partial days are included
-                            pass
-                    # Add to map
-                    collection_day_map[current] = {
-                        "School_Year": school_year,
-                        "Period": period_name
-                    }
-                current += datetime.timedelta(days=1)
-    
-    # Second pass: add day numbering
-    # Sort all collection days chronologically
-    sorted_days = sorted(collection_day_map.keys())
-    
-    # Track day numbers by period and school year
-    period_day_counters = {}
-    sy_day_counters = {}
-    
-    for day in sorted_days:
-        info = collection_day_map[day]
-        school_year = info["School_Year"]
-        period = info["Period"]
-        
-        # Initialize counters if needed
-        if period not in period_day_counters:
-            period_day_counters[period] = 0
-        if school_year not in sy_day_counters:
-            sy_day_counters[school_year] = 0
-            
-        # Increment counters
-        period_day_counters[period] += 1
-        sy_day_counters[school_year] += 1
-        
-        # Add day numbers to the map
-        collection_day_map[day]["day_in_period"] = period_day_counters[period]
-        collection_day_map[day]["day_in_sycollection"] = sy_day_counters[school_year]
-    
-    return collection_day_map
+    return CollectionCalendar.build(school_calendar, non_collection_days).to_day_map()
+
+
+# ==============================================================================
+# COLLECTION CALENDAR INDEX
+# ==============================================================================
+
+class CollectionCalendar(Mapping):
+    """
+    Array-backed index of all valid data collection days.
+
+    Collection days are stored as a sorted datetime64[D] array with parallel
+    arrays for school year, period and day numbers. Lookups use a date ->
+    position dict (O(1)) for single dates and searchsorted (O(log n)) for
+    arrays of dates.
+
+    The calendar is a read-only Mapping of datetime.date to the same per-day
+    dictionaries precompute_collection_days returns, so it can be passed
+    anywhere a collection_day_map is expected.
+    """
+
+    def __init__(self, dates, school_years, periods, day_in_period, day_in_sycollection):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.school_years = np.asarray(school_years, dtype=object)
+        self.periods = np.asarray(periods, dtype=object)
+        self.day_in_period = np.asarray(day_in_period, dtype=np.int64)
+        self.day_in_sycollection = np.asarray(day_in_sycollection, dtype=np.int64)
+        self._positions = {day: i for i, day in enumerate(self.dates.tolist())}
+        self._iso_dates = None
+
+    @classmethod
+    def build(cls, school_calendar: dict, non_collection_days: dict) -> "CollectionCalendar":
+        """
+        Builds the calendar from the school calendar configuration.
+
+        Collection days are the weekdays inside each configured period, minus
+        days marked "Non-Collection" in non_collection_days (Partial days are
+        kept). Day numbers count collection days chronologically within each
+        period and each school year.
+        """
+        excluded = np.array(
+            [day for day, ncd in non_collection_days.items() if ncd and ncd["type"] == "Non-Collection"],
+            dtype='datetime64[D]'
+        )
+
+        date_chunks, year_chunks, period_chunks = [], [], []
+        for school_year, config in school_calendar.items():
+            for period_name, (start_date, end_date) in config["periods"].items():
+                days = np.arange(start_date, end_date + datetime.timedelta(days=1), dtype='datetime64[D]')
+                # 1970-01-01 was a Thursday (weekday 3)
+                weekdays = (days.astype(np.int64) + 3) % 7
+                days = days[(weekdays < 5) & ~np.isin(days, excluded)]
+                date_chunks.append(days)
+                year_chunks.append(np.full(len(days), school_year, dtype=object))
+                period_chunks.append(np.full(len(days), period_name, dtype=object))
+
+        if not date_chunks:
+            return cls([], [], [], [], [])
+
+        dates = np.concatenate(date_chunks)
+        school_years = np.concatenate(year_chunks)
+        periods = np.concatenate(period_chunks)
+
+        # A date listed in overlapping periods keeps its last assignment
+        reversed_dates = dates[::-1]
+        unique_dates, first_in_reversed = np.unique(reversed_dates, return_index=True)
+        keep = len(dates) - 1 - first_in_reversed
+        school_years, periods = school_years[keep], periods[keep]
+
+        frame = pd.DataFrame({'School_Year': school_years, 'Period': periods})
+        day_in_period = frame.groupby('Period', sort=False).cumcount().to_numpy() + 1
+        day_in_sycollection = frame.groupby('School_Year', sort=False).cumcount().to_numpy() + 1
+
+        return cls(unique_dates, school_years, periods, day_in_period, day_in_sycollection)
+
+    # --- Mapping interface (compatible with precompute_collection_days) ---
+
+    def __getitem__(self, date_obj):
+        i = self._positions[date_obj]
+        return {
+            "School_Year": self.school_years[i],
+            "Period": self.periods[i],
+            "day_in_period": int(self.day_in_period[i]),
+            "day_in_sycollection": int(self.day_in_sycollection[i])
+        }
+
+    def __contains__(self, date_obj):
+        return date_obj in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def to_day_map(self) -> dict[datetime.date, dict]:
+        """Returns the calendar as the dict-of-dicts built by precompute_collection_days."""
+        return {day: self[day] for day in self._positions}
+
+    @property
+    def iso_dates(self) -> np.ndarray:
+        """All collection days as 'YYYY-MM-DD' strings, in chronological order."""
+        if self._iso_dates is None:
+            self._iso_dates = np.datetime_as_string(self.dates, unit='D').astype(object)
+        return self._iso_dates
+
+    # --- Single-date lookups ---
+
+    def is_collection_day(self, date_obj: datetime.date) -> bool:
+        return date_obj in self._positions
+
+    def get_period_for_date(self, date_obj: datetime.date) -> str | None:
+        i = self._positions.get(date_obj)
+        return None if i is None else self.periods[i]
+
+    def get_school_year_for_date(self, date_obj: datetime.date) -> str | None:
+        i = self._positions.get(date_obj)
+        return None if i is None else self.school_years[i]
+
+    # --- Vectorized lookups ---
+
+    def _locate(self, dates) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (positions, found) for an array-like of dates."""
+        days = np.asarray(pd.to_datetime(dates).values, dtype='datetime64[D]')
+        if not len(self.dates):
+            return np.zeros(len(days), dtype=np.int64), np.zeros(len(days), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.dates, days), len(self.dates) - 1)
+        return positions, self.dates[positions] == days
+
+    def _take(self, values, dates) -> np.ndarray:
+        positions, found = self._locate(dates)
+        result = np.full(len(found), None, dtype=object)
+        result[found] = values[positions[found]]
+        return result
+
+    def are_collection_days(self, dates) -> np.ndarray:
+        """Vectorized is_collection_day: boolean array, one entry per date."""
+        return self._locate(dates)[1]
+
+    def get_periods_for_dates(self, dates) -> np.ndarray:
+        """Vectorized get_period_for_date: object array with None for non-collection days."""
+        return self._take(self.periods, dates)
+
+    def get_school_years_for_dates(self, dates) -> np.ndarray:
+        """Vectorized get_school_year_for_date: object array with None for non-collection days."""
+        return self._take(self.school_years, dates)
+
+
+_COLLECTION_CALENDAR_LOCK = threading.Lock()
+_COLLECTION_CALENDAR_CACHE = {'mtime_ns': None, 'calendar': None}
+
+
+def get_collection_calendar() -> CollectionCalendar:
+    """
+    Returns the CollectionCalendar for the current config.yaml.
+
+    The calendar is built once and shared; it is rebuilt (and CONFIG
+    reloaded) only when config.yaml's modification time changes.
+    """
+    with _COLLECTION_CALENDAR_LOCK:
+        reload_config_if_changed()
+        cache = _COLLECTION_CALENDAR_CACHE
+        if cache['calendar'] is None or cache['mtime_ns'] != _CONFIG_MTIME_NS:
+            cache['calendar'] = CollectionCalendar.build(get_school_calendar(), get_non_collection_days())
+            cache['mtime_ns'] = _CONFIG_MTIME_NS
+        return cache['calendar']
 
 
 def seconds_to_iso_duration(seconds: int | float) -> str:
@@ -306,17 +491,54 @@ def get_contextual_info(
     info['is_collection_day'] = file_date in collection_day_map
     
     # --- Audio Properties (MP3 files only) ---
-    if audio_props:
-        info['Duration_Seconds'] = round(audio_props['duration'], 2)
-        info['Duration_ISO'] = seconds_to_iso_duration(audio_props['duration'])
-        info['Duration_HMS'] = seconds_to_hms(audio_props['duration'])
-        info['File_Size_MB'] = round(audio_props['file_size'] / (1024 * 1024), 3)
-        info['Bitrate_kbps'] = audio_props['bitrate']
-        info['Channels'] = audio_props['channels']
-        info['Outlier_Status'] = audio_props.get('is_outlier', False)
+    info.update(_audio_info(audio_props, is_outlier))
+
+    # --- Calendar, Day Number & Day Type Info ---
+    info.update(_classify_calendar_day(file_date, calendar, non_collection_days, collection_day_map))
+
+    # --- Activity Schedule Info ---
+    info['Scheduled_Activity'] = "N/A"
+    if info['Day_Type'] in ["Non-Collection", "Non-Collection (Virtual)"]:
+        info['Scheduled_Activity'] = "No Collection"
+    elif info['Day_Type'] == "Partial" and file_time >= datetime.time(12, 0):
+        info['Scheduled_Activity'] = "Afternoon (No Collection on Partial Day)"
     else:
-        # For JPG files, just set outlier status
-        info['Outlier_Status'] = is_outlier
+        for start, end, activity in _normalize_schedule(schedule):
+            if start <= file_time < end:
+                info['Scheduled_Activity'] = activity
+                break
+            
+    return info
+
+
+def _audio_info(audio_props: dict | None, is_outlier: bool) -> dict:
+    """Audio property fields of an MP3 file, or just the outlier flag for a JPG."""
+    if not audio_props:
+        return {'Outlier_Status': is_outlier}
+    return {
+        'Duration_Seconds': round(audio_props['duration'], 2),
+        'Duration_ISO': seconds_to_iso_duration(audio_props['duration']),
+        'Duration_HMS': seconds_to_hms(audio_props['duration']),
+        'File_Size_MB': round(audio_props['file_size'] / (1024 * 1024), 3),
+        'Bitrate_kbps': audio_props['bitrate'],
+        'Channels': audio_props['channels'],
+        'Outlier_Status': audio_props.get('is_outlier', False)
+    }
+
+
+def _classify_calendar_day(
+    file_date: datetime.date,
+    calendar: dict,
+    non_collection_days: dict,
+    collection_day_map: dict
+) -> dict:
+    """
+    Derives the date-only calendar fields used by get_contextual_info.
+
+    Returns a dictionary with School_Year, Collection_Period,
+    Day_Number_in_Period, Day_Number_in_SYCollection, Day_Type and Day_Event.
+    """
+    info = {}
 
     # --- School Calendar & Period Info ---
     info['School_Year'] = "N/A"
@@ -361,21 +583,293 @@ def get_contextual_info(
             info['Day_Type'] = "Full"
             info['Day_Event'] = "Regular School Day"
 
-    # --- Activity Schedule Info ---
-    info['Scheduled_Activity'] = "N/A"
-    if info['Day_Type'] in ["Non-Collection", "Non-Collection (Virtual)"]:
-        info['Scheduled_Activity'] = "No Collection"
-    elif info['Day_Type'] == "Partial" and file_time >= datetime.time(12, 0):
-        info['Scheduled_Activity'] = "Afternoon (No Collection on Partial Day)"
-    else:
-        for act in schedule:
-            if act["start"] <= file_time < act["end"]:
-                info['Scheduled_Activity'] = act["activity"]
-                break
-            
     return info
 
 
+# ==============================================================================
+# BATCH (VECTORIZED) CONTEXTUAL ENRICHMENT
+# ==============================================================================
+
+# Date-only columns looked up per calendar day by get_contextual_info_batch
+_DAY_LOOKUP_COLUMNS = [
+    'School_Year', 'Collection_Period', 'Day_Number_in_Period',
+    'Day_Number_in_SYCollection', 'Day_Type', 'Day_Event'
+]
+
+_NO_COLLECTION_DAY_TYPES = ["Non-Collection", "Non-Collection (Virtual)"]
+
+
+def _build_day_lookup_table(
+    calendar: dict,
+    non_collection_days: dict,
+    collection_day_map: dict
+) -> tuple[np.datetime64 | None, dict[str, np.ndarray]]:
+    """
+    Precomputes the date-only contextual fields for every day in the calendar.
+
+    Returns:
+        (first_day, columns): first_day is the datetime64[D] of position 0 and
+        columns maps each field (plus 'is_collection_day') to an array with
+        one entry per consecutive day. first_day is None for an empty calendar.
+    """
+    bounds = [
+        d for details in calendar.values()
+        for d in (details.get("start_date"), details.get("end_date")) if d
+    ]
+    if collection_day_map:
+        bounds.extend((min(collection_day_map), max(collection_day_map)))
+    if not bounds:
+        return None, {}
+
+    first_day, last_day = min(bounds), max(bounds)
+    days = [first_day + datetime.timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+    rows = [_classify_calendar_day(day, calendar, non_collection_days, collection_day_map) for day in days]
+
+    columns = {col: np.array([row[col] for row in rows], dtype=object) for col in _DAY_LOOKUP_COLUMNS}
+    columns['is_collection_day'] = np.array([day in collection_day_map for day in days], dtype=bool)
+    return np.datetime64(first_day, 'D'), columns
+
+
+def build_calendar_day_frame(
+    calendar: dict,
+    non_collection_days: dict,
+    collection_day_map: dict
+) -> pd.DataFrame:
+    """
+    Returns one row per calendar day with the date-only contextual fields.
+
+    Covers every day from the first school year start to the last school year
+    end, with the same values get_contextual_info assigns to files from that
+    day: ISO_Date, Day_of_Week, is_collection_day, School_Year,
+    Collection_Period, Day_Number_in_Period, Day_Number_in_SYCollection,
+    Day_Type and Day_Event.
+    """
+    first_day, lookup = _build_day_lookup_table(calendar, non_collection_days, collection_day_map)
+    if first_day is None:
+        return pd.DataFrame(columns=['ISO_Date', 'Day_of_Week', 'is_collection_day'] + _DAY_LOOKUP_COLUMNS)
+
+    days = pd.DatetimeIndex(first_day + np.arange(len(lookup['Day_Type'])))
+    frame = pd.DataFrame({
+        'ISO_Date': days.strftime('%Y-%m-%d'),
+        'Day_of_Week': days.strftime('%A'),
+        'is_collection_day': lookup['is_collection_day']
+    })
+    for column in _DAY_LOOKUP_COLUMNS:
+        frame[column] = lookup[column]
+    return frame
+
+
+def _build_schedule_segments(schedule: list) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Splits the activity schedule into elementary segments for searchsorted.
+
+    Every start/end time becomes a boundary (in seconds since midnight), and
+    each segment [b_i, b_i+1) is labelled with the first activity that covers
+    it, which reproduces the first-match scan of get_contextual_info even for
+    overlapping or unsorted schedules.
+
+    Returns:
+        (boundaries, labels): sorted float boundaries and len(boundaries) - 1
+        activity labels ("N/A" for gaps).
+    """
+    entries = [
+        (_time_to_seconds(start), _time_to_seconds(end), activity)
+        for start, end, activity in _normalize_schedule(schedule)
+    ]
+    boundaries = np.unique([t for start, end, _ in entries for t in (start, end)]).astype(float)
+
+    labels = np.full(max(len(boundaries) - 1, 0), "N/A", dtype=object)
+    for i, seg_start in enumerate(boundaries[:-1]):
+        for start, end, activity in entries:
+            if start <= seg_start < end:
+                labels[i] = activity
+                break
+    return boundaries, labels
+
+
+@functools.lru_cache(maxsize=1)
+def _iso_time_labels() -> np.ndarray:
+    """Returns the 'HH:MM:SS' label of every second of the day, indexed by second."""
+    return np.array(
+        [f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in range(24 * 3600)], dtype=object
+    )
+
+
+def _time_to_seconds(value: datetime.time) -> float:
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+
+
+def get_contextual_info_batch(
+    timestamps,
+    calendar: dict,
+    non_collection_days: dict,
+    schedule: list,
+    collection_day_map: dict,
+    is_outlier=False
+) -> pd.DataFrame:
+    """
+    Vectorized counterpart of get_contextual_info for many timestamps at once.
+
+    The calendar is expanded once into a date-indexed lookup table (one row
+    per day, built with the same rules as get_contextual_info), every
+    timestamp is mapped to its row by integer day offset, and the activity
+    schedule is resolved with searchsorted over its time boundaries. String
+    columns are formatted once per unique date/time and broadcast back.
+
+    Args:
+        timestamps: Array-like of datetimes (datetime objects, strings,
+                    datetime64 or a DatetimeIndex/Series). Missing values
+                    (NaT/None) produce rows of None.
+        calendar: The school calendar configuration.
+        non_collection_days: The dictionary of holidays and non-collection days.
+        schedule: The daily activity schedule.
+        collection_day_map: The precomputed map of valid collection days.
+        is_outlier: A single flag or an array-like of flags, one per timestamp.
+
+    Returns:
+        DataFrame with one row per input timestamp (in input order) and the
+        timestamp-derived columns of get_contextual_info: ISO_Date, ISO_Time,
+        ISO_Week, ISO_Year, ISO_YearWeek, ISO_Month, Day_of_Week, Time_of_Day,
+        is_collection_day, Outlier_Status, School_Year, Collection_Period,
+        Day_Number_in_Period, Day_Number_in_SYCollection, Day_Type, Day_Event
+        and Scheduled_Activity. Audio properties are not included.
+    """
+    ts = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    if ts.tz is not None:
+        ts = ts.tz_localize(None)
+    valid = ~np.asarray(ts.isna())
+    outlier_flags = np.broadcast_to(np.asarray(is_outlier, dtype=bool), (len(ts),))[valid]
+    ts = ts[valid]
+    n = len(ts)
+
+    result = {}
+
+    # --- Basic Time & Context Info (formatted once per unique day/second) ---
+    days = ts.normalize()
+    day_codes, unique_days = pd.factorize(days)
+    iso_weeks = unique_days.isocalendar().week.to_numpy(dtype=np.int64)
+    unique_years = unique_days.year.to_numpy()
+    result['ISO_Date'] = np.asarray(unique_days.strftime('%Y-%m-%d'), dtype=object)[day_codes]
+
+    seconds = np.asarray((ts - days).total_seconds(), dtype=float)
+    result['ISO_Time'] = _iso_time_labels()[np.floor(seconds).astype(np.int64)]
+
+    result['ISO_Week'] = iso_weeks[day_codes]
+    result['ISO_Year'] = unique_years[day_codes]
+    result['ISO_YearWeek'] = np.array(
+        [f"{year}-W{week:02d}" for year, week in zip(unique_years, iso_weeks)], dtype=object
+    )[day_codes]
+    result['ISO_Month'] = unique_days.month.to_numpy()[day_codes]
+    result['Day_of_Week'] = np.asarray(unique_days.strftime('%A'), dtype=object)[day_codes]
+    result['Time_of_Day'] = np.where(seconds < 12 * 3600, "Morning", "Afternoon").astype(object)
+
+    # --- Calendar lookups by day offset ---
+    first_day, lookup = _build_day_lookup_table(calendar, non_collection_days, collection_day_map)
+    if first_day is not None:
+        offsets = (days.values.astype('datetime64[D]') - first_day).astype(np.int64)
+        in_range = (offsets >= 0) & (offsets < len(lookup['Day_Type']))
+        positions = np.where(in_range, offsets, 0)
+    else:
+        in_range = np.zeros(n, dtype=bool)
+        positions = np.zeros(n, dtype=np.int64)
+
+    def _lookup(column, default):
+        if first_day is None:
+            return np.full(n, default, dtype=object)
+        return np.where(in_range, lookup[column][positions], default)
+
+    result['is_collection_day'] = _lookup('is_collection_day', False).astype(bool)
+    result['Outlier_Status'] = outlier_flags
+    result['School_Year'] = _lookup('School_Year', "N/A")
+    result['Collection_Period'] = _lookup('Collection_Period', "N/A")
+    result['Day_Number_in_Period'] = _lookup('Day_Number_in_Period', "N/A")
+    result['Day_Number_in_SYCollection'] = _lookup('Day_Number_in_SYCollection', "N/A")
+    result['Day_Type'] = _lookup('Day_Type', "Non-Collection")
+    result['Day_Event'] = _lookup('Day_Event', "Outside Collection Period")
+
+    # --- Activity Schedule Info (searchsorted over segment boundaries) ---
+    boundaries, labels = _build_schedule_segments(schedule)
+    activity = np.full(n, "N/A", dtype=object)
+    if len(labels):
+        segment = np.searchsorted(boundaries, seconds, side='right') - 1
+        in_schedule = (segment >= 0) & (segment < len(labels))
+        activity[in_schedule] = labels[segment[in_schedule]]
+
+    day_type = result['Day_Type']
+    no_collection = np.isin(day_type, _NO_COLLECTION_DAY_TYPES)
+    partial_afternoon = (day_type == "Partial") & (seconds >= 12 * 3600)
+    activity[no_collection] = "No Collection"
+    activity[partial_afternoon & ~no_collection] = "Afternoon (No Collection on Partial Day)"
+    result['Scheduled_Activity'] = activity
+
+    df = pd.DataFrame(result, index=np.flatnonzero(valid))
+    if not valid.all():
+        # Missing timestamps become rows of None, as get_contextual_info returns None
+        df = df.astype(object).reindex(range(len(valid)))
+        df = df.where(df.notna(), None)
+    return df
+
+
+# Batch columns that precede the audio fields in a get_contextual_info dict
+_LEADING_CONTEXT_COLUMNS = [
+    'ISO_Date', 'ISO_Time', 'ISO_Week', 'ISO_Year', 'ISO_YearWeek', 'ISO_Month',
+    'Day_of_Week', 'Time_of_Day', 'is_collection_day'
+]
+_TRAILING_CONTEXT_COLUMNS = _DAY_LOOKUP_COLUMNS + ['Scheduled_Activity']
+
+
+def get_contextual_info_records(
+    timestamps,
+    calendar: dict,
+    non_collection_days: dict,
+    schedule: list,
+    collection_day_map: dict,
+    audio_props=None,
+    is_outlier=False
+) -> list:
+    """
+    Batch equivalent of calling get_contextual_info once per timestamp.
+
+    The calendar and schedule fields come from one get_contextual_info_batch
+    call; the result is converted back to the dicts get_contextual_info
+    returns (same keys, key order and plain Python values), so the taggers
+    can enrich a whole batch of files at once and write identical tags.
+
+    Args:
+        timestamps: Sequence of datetimes; None gives a None record.
+        calendar, non_collection_days, schedule, collection_day_map:
+            As for get_contextual_info.
+        audio_props: Optional sequence with one audio property dict (or None)
+            per timestamp, as get_contextual_info's audio_props.
+        is_outlier: A single flag or a sequence with one flag per timestamp.
+
+    Returns:
+        list: One contextual info dict (or None) per timestamp, in order.
+    """
+    timestamps = list(timestamps)
+    n = len(timestamps)
+    if n == 0:
+        return []
+    outlier_flags = list(np.broadcast_to(np.asarray(is_outlier, dtype=bool), (n,)).tolist())
+    audio_props = list(audio_props) if audio_props is not None else [None] * n
+    frame = get_contextual_info_batch(
+        [ts if ts else None for ts in timestamps], calendar, non_collection_days,
+        schedule, collection_day_map, is_outlier=outlier_flags
+    )
+    columns = {column: frame[column].tolist() for column in _LEADING_CONTEXT_COLUMNS + _TRAILING_CONTEXT_COLUMNS}
+
+    records = []
+    for i, timestamp in enumerate(timestamps):
+        if not timestamp:
+            records.append(None)
+            continue
+        info = {column: columns[column][i] for column in _LEADING_CONTEXT_COLUMNS}
+        info.update(_audio_info(audio_props[i], outlier_flags[i]))
+        info.update((column, columns[column][i]) for column in _TRAILING_CONTEXT_COLUMNS)
+        records.append(info)
+    return records
+
+
 def is_collection_day(date_obj: datetime.date, collection_day_map: dict) -> bool:
     """Determines if a given date is a collection day based on the precomputed map."""
     return date_obj in collection_day_map
@@ -385,6 +879,95 @@ def is_collection_day(date_obj: datetime.date, collection_day_map: dict) -> bool
 # ACF/PACF TIME SERIES ANALYSIS
 # ==============================================================================
 
+def _durbin_levinson(autocorrelations: np.ndarray) -> np.ndarray:
+    """
+    Partial autocorrelations from autocorrelations by the Durbin-Levinson
+    recursion, for many series at once.
+
+    Args:
+        autocorrelations: (n_series, nlags + 1) array with lag 0 in column 0.
+
+    Returns:
+        (n_series, nlags + 1) array of PACF values, 1.0 at lag 0. With biased
+        autocovariances this equals statsmodels' pacf(method='ywm').
+    """
+    n_series, width = autocorrelations.shape
+    pacf_vals = np.ones((n_series, width))
+    phi = np.zeros((n_series, width))
+    variance = np.ones(n_series)
+    for k in range(1, width):
+        # phi holds the order k-1 Yule-Walker coefficients in columns 1..k-1
+        reflection = (
+            autocorrelations[:, k]
+            - np.einsum('ij,ij->i', phi[:, 1:k], autocorrelations[:, k - 1:0:-1])
+        ) / variance
+        phi[:, 1:k] = phi[:, 1:k] - reflection[:, None] * phi[:, k - 1:0:-1]
+        phi[:, k] = reflection
+        variance = variance * (1.0 - reflection ** 2)
+        pacf_vals[:, k] = reflection
+    return pacf_vals
+
+
+def expanding_acf_pacf(values, nlags: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ACF and PACF of every expanding prefix of a series in one pass.
+
+    Row i describes values[:i+1] and matches statsmodels'
+    acf(values[:i+1], nlags) and pacf(values[:i+1], nlags, method='ywm'):
+    biased autocovariances (divided by the prefix length) about the prefix mean.
+
+    The lagged cross-products, prefix sums and running means are accumulated
+    once with cumulative sums, so the cost is O(n * nlags) rather than a
+    statsmodels call per row. Values are shifted by the series mean first,
+    which leaves the autocovariances unchanged and keeps the sums small.
+
+    Args:
+        values: 1-D numeric sequence.
+        nlags: Highest lag to compute.
+
+    Returns:
+        (acf, pacf): two (n, nlags + 1) float arrays. Entries for lags the
+        prefix is too short for, and rows of constant prefixes, are NaN.
+    """
+    x = np.asarray(values, dtype=float)
+    n = len(x)
+    acf_vals = np.full((n, nlags + 1), np.nan)
+    if n == 0:
+        return acf_vals, acf_vals.copy()
+    x = x - x.mean()
+
+    lengths = np.arange(1, n + 1, dtype=float)
+    # prefix[m] = sum of x[:m]
+    prefix = np.concatenate(([0.0], np.cumsum(x)))
+    means = prefix[1:] / lengths
+
+    autocovariances = np.full((n, nlags + 1), np.nan)
+    for k in range(min(nlags, n - 1) + 1):
+        rows = np.arange(k, n)
+        m = rows + 1
+        # sum over t < m - k of x[t] * x[t + k]
+        cross = np.cumsum(x[:n - k] * x[k:])
+        head = prefix[m - k]                   # sum of x[t] for t < m - k
+        tail = prefix[m] - prefix[k]           # sum of x[t + k] for t < m - k
+        mean = means[rows]
+        autocovariances[rows, k] = (cross - mean * (head + tail) + (m - k) * mean ** 2) / m
+
+    # Constant prefixes have no autocorrelation
+    constant = np.minimum.accumulate(x) == np.maximum.accumulate(x)
+    variance = autocovariances[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acf_vals = autocovariances / variance[:, None]
+    acf_vals[constant] = np.nan
+
+    pacf_vals = np.full_like(acf_vals, np.nan)
+    valid = ~constant
+    if valid.any():
+        # Lags beyond a row's length are NaN; fill them so the recursion runs and mask afterwards
+        pacf_vals[valid] = _durbin_levinson(np.nan_to_num(acf_vals[valid]))
+        pacf_vals[np.isnan(acf_vals)] = np.nan
+    return acf_vals, pacf_vals
+
+
 def add_acf_pacf_analysis(
     df: pd.DataFrame,
     value_col: str = "Total_Files",
@@ -394,14 +977,17 @@ def add_acf_pacf_analysis(
     """
     Calculates and adds ACF and PACF statistics to a time series DataFrame.
     Returns a new DataFrame containing ONLY the new analysis columns.
-    """
-    if not STATSMODELS_AVAILABLE:
-        return pd.DataFrame(index=df.index)
 
+    Row i holds the statistics of the expanding window up to and including
+    row i, computed for all rows at once by expanding_acf_pacf().
+    """
     if value_col not in df.columns:
         return pd.DataFrame(index=df.index)
 
-    series_data = df[value_col].fillna(0)
+    try:
+        series_data = np.asarray(df[value_col].fillna(0), dtype=float)
+    except (TypeError, ValueError):
+        return pd.DataFrame(index=df.index)
     
     lag_config = {
         'daily': [1, 7, 14],
@@ -413,70 +999,39 @@ def add_acf_pacf_analysis(
     key_lags = lag_config.get(sheet_type, [1, 7, 14])
     max_lag = max(key_lags)
 
-    # Create a new DataFrame for the results
-    result_df = pd.DataFrame(index=df.index)
+    acf_vals, pacf_vals = expanding_acf_pacf(series_data, max_lag)
+
+    # The minimum number of observations required to calculate PACF for a given number of lags (nlags) is 2 * nlags,
+    # so each row only reports the lags its window supports
+    n_obs = np.arange(1, len(series_data) + 1)
+    row_nlags = np.minimum(max_lag, n_obs // 2 - 1)
+    row_nlags[n_obs < 4] = 0
+    confidence = 1.96 / np.sqrt(n_obs)
 
-    # Initialize columns with NaN - FIXED: Use consistent underscore pattern
-    new_col_names = []
+    # Build result columns as arrays - FIXED: Use consistent underscore pattern
+    columns = {}
     for lag in key_lags:
         acf_col = f"{value_col}_ACF_Lag_{lag}"  # FIXED: Added underscore before lag
         pacf_col = f"{value_col}_PACF_Lag_{lag}"  # FIXED: Added underscore before lag
-        result_df[acf_col] = np.nan
-        result_df[pacf_col] = np.nan
-        new_col_names.extend([acf_col, pacf_col])
+        available = (lag <= row_nlags) & ~np.isnan(acf_vals[:, lag])
+        acf_lag = np.where(available, acf_vals[:, lag], np.nan)
+        pacf_lag = np.where(available, pacf_vals[:, lag], np.nan)
+        columns[acf_col] = acf_lag
+        columns[pacf_col] = pacf_lag
         if include_confidence:
-            sig_acf_col = f'{acf_col}_Significant'
-            sig_pacf_col = f'{pacf_col}_Significant'
-            result_df[sig_acf_col] = pd.NA
-            result_df[sig_pacf_col] = pd.NA
-            new_col_names.extend([sig_acf_col, sig_pacf_col])
-
-    # The minimum number of observations required to calculate PACF for a given number of lags (nlags) is 2 * nlags.
-    # We will dynamically adjust the number of lags based on the available data points for each row.
-    for i in range(1, len(df)):
-        expanding_series = series_data.iloc[:i+1]
-        n_obs = len(expanding_series)
-
-        if n_obs < 4 or expanding_series.nunique() <= 1:
-            continue
+            columns[f'{acf_col}_Significant'] = pd.array(
+                np.abs(acf_lag) > confidence, dtype='boolean'
+            )
+            columns[f'{pacf_col}_Significant'] = pd.array(
+                np.abs(pacf_lag) > confidence, dtype='boolean'
+            )
+            columns[f'{acf_col}_Significant'][~available] = pd.NA
+            columns[f'{pacf_col}_Significant'][~available] = pd.NA
 
-        try:
-            # Dynamically determine the max number of lags we can calculate
-            # PACF calculation requires at least 2*nlags observations
-            current_nlags = min(max_lag, (n_obs // 2) - 1)
-
-            if current_nlags <= 0:
-                continue
-
-            acf_vals = acf(expanding_series, nlags=current_nlags, fft=True)
-            pacf_vals = pacf(expanding_series, nlags=current_nlags, method='ywm')
-            confidence = 1.96 / np.sqrt(n_obs)
-
-            for lag in key_lags:
-                if lag < len(acf_vals):
-                    acf_col = f"{value_col}_ACF_Lag_{lag}"
-                    pacf_col = f"{value_col}_PACF_Lag_{lag}"
-                    result_df.loc[result_df.index[i], acf_col] = acf_vals[lag]
-                    result_df.loc[result_df.index[i], pacf_col] = pacf_vals[lag]
-                    if include_confidence:
-                        sig_acf_col = f'{acf_col}_Significant'
-                        sig_pacf_col = f'{pacf_col}_Significant'
-                        result_df.loc[result_df.index[i], sig_acf_col] = np.abs(acf_vals[lag]) > confidence
-                        result_df.loc[result_df.index[i], sig_pacf_col] = np.abs(pacf_vals[lag]) > confidence
-        except Exception:
-            continue
+    result_df = pd.DataFrame(columns, index=df.index)
 
     # Drop columns that are all NaN, which can happen if analysis fails on all rows
     result_df.dropna(axis=1, how='all', inplace=True)
-            
-    if include_confidence:
-        for lag in key_lags:
-            sig_acf_col = f"{value_col}_ACF_Lag_{lag}_Significant"  # FIXED: Added underscore before lag
-            sig_pacf_col = f"{value_col}_PACF_Lag_{lag}_Significant"  # FIXED: Added underscore before lag
-            if sig_acf_col in result_df.columns:
-                result_df[sig_acf_col] = result_df[sig_acf_col].astype('boolean')
-            if sig_pacf_col in result_df.columns:
-                result_df[sig_pacf_col] = result_df[sig_pacf_col].astype('boolean')
 
     return result_df
 
@@ -780,7 +1335,11 @@ def _determine_differencing_order(series: pd.Series, max_d: int = 2) -> int:
 
 def _find_best_arima_model(series: pd.Series, max_p: int, max_q: int, d: int):
     """
-    Find the best ARIMA model using grid search with AIC criterion.
+    Find the best ARIMA model by AIC using the shared order search.
+    
+    Candidate orders are fitted in worker processes and the winning order and
+    parameters are memoized per series (see arima_search), so an unchanged
+    series is rebuilt from stored parameters instead of being searched again.
     
     Args:
         series (pd.Series): Time series data
@@ -791,38 +1350,23 @@ def _find_best_arima_model(series: pd.Series, max_p: int, max_q: int, d: int):
     Returns:
         tuple: (best_model, best_order, best_aic) or (None, None, None) if failed
     """
-    best_aic = float('inf')
-    best_model = None
-    best_order = None
-    
-    # Grid search over p and q
-    for p in range(0, max_p + 1):
-        for q in range(0, max_q + 1):
-            try:
-                # Skip (0,0,0) model
-                if p == 0 and d == 0 and q == 0:
-                    continue
-                    
-                model = ARIMA(series, order=(p, d, q))
-                fitted_model = model.fit()
-                
-                if fitted_model.aic < best_aic:
-                    best_aic = fitted_model.aic
-                    best_model = fitted_model
-                    best_order = (p, d, q)
-                    
-            except Exception:
-                continue  # Skip problematic model configurations
-    
-    # Fallback to simple model if grid search failed
-    if best_model is None:
+    best = get_arima_search().find_best_order(series, max_p, max_q, d)
+    if best is not None:
+        best_order, best_aic, params = best
         try:
-            model = ARIMA(series, order=(1, 1, 0))
-            best_model = model.fit()
-            best_order = (1, 1, 0)
-            best_aic = best_model.aic
+            best_model = ARIMA(series, order=best_order).smooth(params)
+            return best_model, best_order, best_model.aic
         except Exception:
-            return None, None, None
+            pass
+    
+    # Fallback to simple model if the search failed
+    try:
+        model = ARIMA(series, order=(1, 1, 0))
+        best_model = model.fit()
+        best_order = (1, 1, 0)
+        best_aic = best_model.aic
+    except Exception:
+        return None, None, None
     
     return best_model, best_order, best_aic
 
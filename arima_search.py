@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+ARIMA Order Search for ARDataAnalysis Project
+
+This module chooses the (p, d, q) order of the forecast models built by
+ar_utils.generate_arima_forecast():
+
+- Candidate orders are fitted in a process pool, since each fit is pure
+  Python/NumPy work that holds the GIL.
+- By default every order of the (max_p + 1) * (max_q + 1) grid is fitted.
+  stepwise=True uses the stepwise search (Hyndman-Khandakar,
+  without the seasonal part) instead: it starts from a few small models and
+  only moves to neighbouring orders that lower the AIC. It fits fewer models
+  but is a heuristic and can settle on an order with a higher AIC than the
+  grid's best.
+- The chosen order and its fitted parameters are memoized under a hash of
+  the series values and search settings. With a cache_dir the memo is kept
+  in arima_orders.json there, so a sheet whose series has not changed since
+  the last report rebuilds its model from the stored parameters without
+  fitting anything.
+
+Usage:
+    from arima_search import configure_arima_search, get_arima_search
+
+    configure_arima_search(cache_dir='.aggregation_cache')   # once per run
+    order, aic, params = get_arima_search().find_best_order(series, max_p=3, max_q=3, d=1)
+    model = ARIMA(series, order=order).smooth(params)
+"""
+
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from statsmodels.tsa.arima.model import ARIMA
+except ImportError:
+    ARIMA = None
+
+# Bump when the search or the stored entry layout changes
+ARIMA_SEARCH_VERSION = 1
+ARIMA_CACHE_FILENAME = 'arima_orders.json'
+DEFAULT_MAX_WORKERS = 4
+
+
+def _fit_candidate(values, order):
+    """
+    Fits one candidate order; runs in a worker process.
+
+    Returns:
+        tuple: (order, aic, params) or (order, None, None) if the fit failed.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fitted = ARIMA(values, order=order).fit()
+        if not np.isfinite(fitted.aic):
+            return order, None, None
+        return order, float(fitted.aic), [float(value) for value in fitted.params]
+    except Exception:
+        return order, None, None
+
+
+def series_key(values, max_p, max_q, d, stepwise):
+    """Returns the memo key of a search: SHA-256 of the values and search settings."""
+    digest = hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(json.dumps([ARIMA_SEARCH_VERSION, max_p, max_q, d, bool(stepwise)]).encode('ascii'))
+    return digest.hexdigest()
+
+
+class ArimaOrderSearch:
+    """
+    Finds the lowest-AIC ARIMA order for a series, fitting candidates in
+    parallel and remembering the answer per series.
+    """
+
+    def __init__(self, max_workers=None, cache_dir=None, stepwise=False):
+        """
+        Args:
+            max_workers (int, optional): Worker processes for candidate fits.
+                1 fits in-process. Defaults to DEFAULT_MAX_WORKERS (at most the CPU count).
+            cache_dir (str or Path, optional): Directory for the memo file;
+                without it results are only remembered for this process.
+            stepwise (bool): Stepwise search instead of the full grid; faster,
+                but may not find the lowest-AIC order.
+        """
+        self.max_workers = max_workers or min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1)
+        self.cache_path = Path(cache_dir) / ARIMA_CACHE_FILENAME if cache_dir else None
+        self.stepwise = stepwise
+        self.stats = {'memo_hits': 0, 'searches': 0, 'fits': 0}
+        self._memo = self._load_memo()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _load_memo(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ARIMA] Ignoring unreadable order cache {self.cache_path}: {e}")
+            return {}
+
+    def _save_memo(self):
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+            with open(temporary, 'w') as f:
+                json.dump(self._memo, f)
+            os.replace(temporary, self.cache_path)
+        except OSError as e:
+            print(f"[ARIMA] Could not save order cache {self.cache_path}: {e}")
+
+    def find_best_order(self, series, max_p, max_q, d):
+        """
+        Returns the lowest-AIC order for a series.
+
+        Args:
+            series: Cleaned time series (pandas Series or 1-D array).
+            max_p (int): Maximum AR order.
+            max_q (int): Maximum MA order.
+            d (int): Differencing order.
+
+        Returns:
+            tuple: (order, aic, params), or None if no candidate could be fitted.
+                   Rebuild the model with ARIMA(series, order=order).smooth(params).
+        """
+        values = np.asarray(series, dtype=np.float64)
+        key = series_key(values, max_p, max_q, d, self.stepwise)
+        with self._lock:
+            entry = self._memo.get(key)
+            if entry is not None:
+                self.stats['memo_hits'] += 1
+                return tuple(entry['order']), entry['aic'], entry['params']
+
+            self.stats['searches'] += 1
+            if self.stepwise:
+                best = self._stepwise_search(values, max_p, max_q, d)
+            else:
+                best = self._best(self._fit_batch(values, [
+                    (p, d, q) for p in range(max_p + 1) for q in range(max_q + 1)
+                    if not (p == 0 and d == 0 and q == 0)
+                ]))
+            if best is None:
+                return None
+
+            order, aic, params = best
+            self._memo[key] = {'order': list(order), 'aic': aic, 'params': params}
+            self._save_memo()
+            return order, aic, params
+
+    def _stepwise_search(self, values, max_p, max_q, d):
+        """Moves from the best starting model to better neighbouring orders until none improves."""
+        def allowed(p, q):
+            # (0, 0, 0) is skipped, as in the grid search
+            return 0 <= p <= max_p and 0 <= q <= max_q and not (p == 0 and d == 0 and q == 0)
+
+        tried = {}
+        candidates = [(min(2, max_p), d, min(2, max_q)), (0, d, 0), (min(1, max_p), d, 0), (0, d, min(1, max_q))]
+        best = None
+        while True:
+            batch = [order for order in dict.fromkeys(candidates)
+                     if order not in tried and allowed(order[0], order[2])]
+            if not batch:
+                return best
+            for result in self._fit_batch(values, batch):
+                tried[result[0]] = result
+            step_best = self._best(tried.values())
+            if step_best is None or (best is not None and step_best[0] == best[0]):
+                return step_best
+            best = step_best
+            p, _, q = best[0]
+            candidates = [(p + dp, d, q + dq) for dp in (-1, 0, 1) for dq in (-1, 0, 1) if dp or dq]
+
+    @staticmethod
+    def _best(results):
+        """Lowest AIC; ties go to the lowest (p, q), as in the sequential grid search."""
+        fitted = [result for result in results if result[1] is not None]
+        if not fitted:
+            return None
+        return min(fitted, key=lambda result: (result[1], result[0]))
+
+    def _fit_batch(self, values, orders):
+        """Fits a batch of candidate orders, in parallel when there is more than one."""
+        self.stats['fits'] += len(orders)
+        if self.max_workers > 1 and len(orders) > 1:
+            try:
+                executor = self._get_executor()
+                return list(executor.map(_fit_candidate, [values] * len(orders), orders))
+            except (BrokenProcessPool, OSError) as e:
+                print(f"[ARIMA] Process pool unavailable, fitting in-process: {e}")
+                self.max_workers = 1
+                self.close()
+        return [_fit_candidate(values, order) for order in orders]
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn, not fork: the report process has MongoDB client threads running
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def close(self):
+        """Shuts down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def print_summary(self):
+        """Prints how many searches were answered from the memo."""
+        if self.stats['memo_hits'] or self.stats['searches']:
+            print(f"[ARIMA] {self.stats['memo_hits']} order(s) reused, {self.stats['searches']} searched "
+                  f"with {self.stats['fits']} candidate fit(s)")
+
+
+_default_search = None
+
+
+def configure_arima_search(max_workers=None, cache_dir=None, stepwise=False):
+    """Replaces the process-wide search used by ar_utils; returns it."""
+    global _default_search
+    if _default_search is not None:
+        _default_search.close()
+    _default_search = ArimaOrderSearch(max_workers=max_workers, cache_dir=cache_dir, stepwise=stepwise)
+    return _default_search
+
+
+def get_arima_search():
+    """Returns the process-wide search, creating an in-memory one on first use."""
+    if _default_search is None:
+        configure_arima_search()
+    return _default_search
+
+
+@atexit.register
+def _shutdown_default_search():
+    if _default_search is not None:
+        _default_search.close()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Calendar Days Collection for ARDataAnalysis Project
+
+This module materializes the school calendar into the MongoDB `calendar_days`
+collection, with one document per date:
+
+    {
+        "_id": "2021-09-14",              # ISO_Date, same key as daily pipelines
+        "date": datetime(2021, 9, 14),
+        "Day_of_Week": "Tuesday",
+        "is_collection_day": True,
+        "School_Year": "2021-2022",
+        "Collection_Period": "SY 21-22 P1",
+        "Day_Number_in_Period": 2,
+        "Day_Number_in_SYCollection": 2,
+        "Day_Type": "Full",
+        "Day_Event": "Regular School Day",
+        "calendar_version": "<hash of the calendar contents>"
+    }
+
+Daily pipelines join against it with $unionWith to produce zero rows for days
+without files (see pipelines.utils.create_calendar_zero_fill_stages), and
+other tools can query it directly.
+
+Usage:
+    from calendar_days import materialize_calendar_days, ensure_calendar_days
+
+    materialize_calendar_days(db)   # after ingest (populate_db.py)
+    ensure_calendar_days(db)        # before reporting; rebuilds if stale
+"""
+
+import datetime
+import hashlib
+import json
+
+from pymongo import ReplaceOne
+
+from ar_utils import (
+    get_school_calendar,
+    get_non_collection_days,
+    get_collection_calendar,
+    build_calendar_day_frame
+)
+from pipelines.utils import CALENDAR_DAYS_COLLECTION
+
+
+def build_calendar_day_documents():
+    """
+    Builds the calendar_days documents from the current config.yaml.
+
+    Returns:
+        list: One document per calendar day, in date order, each stamped
+              with the same calendar_version hash.
+    """
+    frame = build_calendar_day_frame(
+        get_school_calendar(), get_non_collection_days(), get_collection_calendar()
+    )
+
+    documents = []
+    for row in frame.to_dict('records'):
+        doc = {'_id': row.pop('ISO_Date')}
+        doc['date'] = datetime.datetime.fromisoformat(doc['_id'])
+        for key, value in row.items():
+            # Convert NumPy scalars so documents are BSON-encodable
+            doc[key] = value.item() if hasattr(value, 'item') else value
+        documents.append(doc)
+
+    digest = hashlib.sha1(json.dumps(documents, default=str, sort_keys=True).encode('utf-8')).hexdigest()
+    for doc in documents:
+        doc['calendar_version'] = digest
+    return documents
+
+
+def materialize_calendar_days(db, documents=None):
+    """
+    Writes the calendar_days collection, replacing any previous contents.
+
+    Existing documents are replaced by _id and dates that are no longer part
+    of the calendar are removed, so readers never see an empty collection.
+
+    Returns:
+        int: Number of calendar day documents written.
+    """
+    if documents is None:
+        documents = build_calendar_day_documents()
+    collection = db[CALENDAR_DAYS_COLLECTION]
+
+    if documents:
+        collection.bulk_write(
+            [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in documents],
+            ordered=False
+        )
+    collection.delete_many({'_id': {'$nin': [doc['_id'] for doc in documents]}})
+    return len(documents)
+
+
+def ensure_calendar_days(db):
+    """
+    Materializes calendar_days if it is missing or was built from an older
+    config.yaml.
+
+    Returns:
+        bool: True if the collection was (re)built, False if it was current.
+    """
+    documents = build_calendar_day_documents()
+    collection = db[CALENDAR_DAYS_COLLECTION]
+
+    current_version = documents[0]['calendar_version'] if documents else None
+    stored = collection.find_one({}, {'calendar_version': 1})
+    stored_version = stored.get('calendar_version') if stored else None
+    if stored_version == current_version and collection.count_documents({}) == len(documents):
+        return False
+
+    count = materialize_calendar_days(db, documents)
+    print(f"[CALENDAR] Materialized {count} days into '{CALENDAR_DAYS_COLLECTION}'")
+    return True
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Daily Rollups Collection for ARDataAnalysis Project
+
+This module maintains the MongoDB `daily_rollups` collection: per-day record
+counts and sizes, split by every field the time-series pipelines filter or
+group on (pipelines.utils.DAILY_ROLLUP_DIMENSIONS):
+
+    {
+        "_id": {"ISO_Date": "2021-09-14", "file_type": "JPG", ...},
+        "ISO_Date": "2021-09-14",
+        "file_type": "JPG",
+        "is_collection_day": True,
+        "Outlier_Status": False,
+        "School_Year": "2021-2022",
+        "Collection_Period": "SY 21-22 P1",
+        "ISO_Week": 37,
+        "File_Count": 112,
+        "File_Size_MB": 318.254
+    }
+
+A dimension missing from the source records is missing from the rollup too,
+so filters and $group keys behave exactly as they do on media_records. The
+daily, weekly, biweekly, monthly and period pipelines have variants
+(pipelines.ROLLUP_PIPELINES) that read these few hundred documents instead
+of every media record.
+
+populate_db.py keeps the collection current by applying the changes of each
+insert, upsert and delete batch. rebuild_daily_rollups() recomputes it from
+scratch on the server.
+
+Usage:
+    from daily_rollups import accumulate_rollup_deltas, apply_rollup_deltas, ensure_daily_rollups
+
+    deltas = {}
+    accumulate_rollup_deltas(deltas, inserted_docs)
+    accumulate_rollup_deltas(deltas, deleted_docs, sign=-1)
+    apply_rollup_deltas(db, deltas)   # after the media_records write
+    ensure_daily_rollups(db)          # before reporting; rebuilds if out of sync
+"""
+
+from pymongo import UpdateOne
+
+from pipelines.utils import (
+    DAILY_ROLLUPS_COLLECTION,
+    DAILY_ROLLUP_DIMENSIONS,
+    DAILY_ROLLUP_COUNT_FIELD,
+    DAILY_ROLLUP_SIZE_FIELD
+)
+
+# Projection that reads everything a rollup needs from a media record
+ROLLUP_SOURCE_PROJECTION = {field: 1 for field in DAILY_ROLLUP_DIMENSIONS + (DAILY_ROLLUP_SIZE_FIELD,)}
+
+
+def rollup_id(doc):
+    """Returns the daily_rollups _id for a media record: its dimension values in a fixed order."""
+    return {field: doc[field] for field in DAILY_ROLLUP_DIMENSIONS if field in doc}
+
+
+def accumulate_rollup_deltas(deltas, documents, sign=1):
+    """
+    Adds the rollup changes caused by inserting (sign=1) or deleting (sign=-1)
+    media records to `deltas`.
+
+    Args:
+        deltas (dict): Accumulated changes, updated in place.
+        documents (iterable): Media records (at least ROLLUP_SOURCE_PROJECTION).
+        sign (int): 1 for records written, -1 for records removed.
+
+    Returns:
+        dict: `deltas`
+    """
+    for doc in documents:
+        key_doc = rollup_id(doc)
+        # Keep True and 1 apart, as MongoDB does
+        key = tuple((field, type(value).__name__, value) for field, value in key_doc.items())
+        entry = deltas.get(key)
+        if entry is None:
+            entry = deltas[key] = [key_doc, 0, 0.0]
+        entry[1] += sign
+        size = doc.get(DAILY_ROLLUP_SIZE_FIELD)
+        # $sum ignores non-numeric values
+        if isinstance(size, (int, float)) and not isinstance(size, bool):
+            entry[2] += sign * size
+    return deltas
+
+
+def apply_rollup_deltas(db, deltas):
+    """
+    Applies accumulated changes to the daily_rollups collection.
+
+    Rollups whose count drops to zero are removed.
+
+    Returns:
+        int: Number of rollup documents touched.
+    """
+    operations = [
+        UpdateOne(
+            {"_id": key_doc},
+            {
+                "$inc": {DAILY_ROLLUP_COUNT_FIELD: count, DAILY_ROLLUP_SIZE_FIELD: size},
+                "$setOnInsert": key_doc
+            },
+            upsert=True
+        )
+        for key_doc, count, size in deltas.values()
+        if count or size
+    ]
+    if not operations:
+        return 0
+    collection = db[DAILY_ROLLUPS_COLLECTION]
+    collection.bulk_write(operations, ordered=False)
+    collection.delete_many({DAILY_ROLLUP_COUNT_FIELD: {"$lte": 0}})
+    return len(operations)
+
+
+def rebuild_daily_rollups(db, source_collection='media_records'):
+    """
+    Recomputes daily_rollups from media_records with a server-side $group,
+    replacing the collection atomically ($out).
+
+    Returns:
+        int: Number of rollup documents written.
+    """
+    db[source_collection].aggregate([
+        {
+            "$group": {
+                "_id": {field: f"${field}" for field in DAILY_ROLLUP_DIMENSIONS},
+                DAILY_ROLLUP_COUNT_FIELD: {"$sum": 1},
+                DAILY_ROLLUP_SIZE_FIELD: {"$sum": f"${DAILY_ROLLUP_SIZE_FIELD}"}
+            }
+        },
+        {
+            # A dimension missing from the _id stays missing here
+            "$project": {
+                "_id": 1,
+                **{field: f"$_id.{field}" for field in DAILY_ROLLUP_DIMENSIONS},
+                DAILY_ROLLUP_COUNT_FIELD: 1,
+                DAILY_ROLLUP_SIZE_FIELD: 1
+            }
+        },
+        {"$out": DAILY_ROLLUPS_COLLECTION}
+    ], allowDiskUse=True)
+    return db[DAILY_ROLLUPS_COLLECTION].count_documents({})
+
+
+def daily_rollups_in_sync(db, source_collection='media_records'):
+    """
+    True if the rollups account for exactly the records in media_records.
+
+    This is a count check: it catches missed inserts and deletes, not
+    in-place edits of dimension fields made outside populate_db.py (run
+    rebuild_daily_rollups() after those).
+    """
+    totals = list(db[DAILY_ROLLUPS_COLLECTION].aggregate([
+        {"$group": {"_id": None, "records": {"$sum": f"${DAILY_ROLLUP_COUNT_FIELD}"}}}
+    ]))
+    rolled_up = totals[0]["records"] if totals else 0
+    return rolled_up == db[source_collection].count_documents({})
+
+
+def ensure_daily_rollups(db, source_collection='media_records'):
+    """
+    Rebuilds daily_rollups if it is missing or out of sync with media_records.
+
+    Returns:
+        bool: True if the collection was rebuilt, False if it was current.
+    """
+    if daily_rollups_in_sync(db, source_collection):
+        return False
+    count = rebuild_daily_rollups(db, source_collection)
+    print(f"[ROLLUPS] Rebuilt {count} documents in '{DAILY_ROLLUPS_COLLECTION}'")
+    return True
@@ -8,12 +8,16 @@ from openpyxl import load_workbook
 from openpyxl.chart import LineChart, Reference
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
-import os
 
-def create_dashboard_summary(wb):
+def create_dashboard_summary(wb, results):
     """
     Create a comprehensive ACF/PACF dashboard with comparative analysis
     across all time scales.
+    
+    Args:
+        wb: openpyxl workbook
+        results: AnalysisResultStore with the ACF/PACF results of the
+            pipeline sheets
     """
     print("[DEBUG] Starting create_dashboard_summary function...")
     try:
@@ -74,9 +78,9 @@ def create_dashboard_summary(wb):
         
         print("[DEBUG] Dashboard sheet prepared, extracting ACF/PACF data...")
         
-        # Extract ACF/PACF data from all sheets
+        # Extract ACF/PACF data from the published results
         try:
-            acf_pacf_data = extract_acf_pacf_from_sheets(wb)
+            acf_pacf_data = extract_acf_pacf_from_results(results)
             print(f"[DEBUG] Extracted data for {len(acf_pacf_data)} time scales: {list(acf_pacf_data.keys())}")
         except Exception as e:
             print(f"[ERROR] Failed to extract ACF/PACF data: {e}")
@@ -152,57 +156,20 @@ def create_dashboard_summary(wb):
         except:
             print("[ERROR] Could not even add error message to dashboard sheet")
 
-def extract_acf_pacf_from_sheets(wb):
-    """Extract ACF/PACF values from all relevant sheets."""
+def extract_acf_pacf_from_results(results):
+    """
+    Whole-series ACF/PACF values by time scale from an AnalysisResultStore,
+    keyed 'ACF_Lag1', 'PACF_Lag1', ... as the summary table expects.
+    """
     acf_pacf_data = {}
-    
-    # Define sheets to analyze (including Daily sheet that was previously omitted)
-    target_sheets = [
-        'Daily Counts (ACF_PACF)',
-        'Weekly Counts (ACF_PACF)', 
-        'Biweekly Counts (ACF_PACF)',
-        'Monthly Counts (ACF_PACF)',
-        'Period Counts (ACF_PACF)'
-    ]
-    
-    for sheet_name in target_sheets:
-        if sheet_name not in wb.sheetnames:
-            continue
-            
-        ws = wb[sheet_name]
-        
-        # Convert sheet to DataFrame for easier processing
-        data = []
-        headers = []
-        
-        # Get headers from first row
-        for cell in ws[1]:
-            if cell.value:
-                headers.append(cell.value)
-        
-        # Get first data row (assuming global statistics)
-        if ws.max_row > 1:
-            first_data_row = []
-            for cell in ws[2]:
-                first_data_row.append(cell.value)
-            
-            # Create dictionary of ACF/PACF values
-            sheet_data = {}
-            for i, header in enumerate(headers):
-                if i < len(first_data_row) and ('ACF_' in str(header) or 'PACF_' in str(header)):
-                    value = first_data_row[i]
-                    # Include both numeric values and meaningful placeholders
-                    if isinstance(value, (int, float)):
-                        sheet_data[header] = value
-                    elif isinstance(value, str) and value.strip():
-                        # Include non-empty string placeholders for dashboard display
-                        sheet_data[header] = value
-            
-            if sheet_data:
-                # Determine time scale
-                time_scale = determine_time_scale(sheet_name)
-                acf_pacf_data[time_scale] = sheet_data
-    
+    for analysis in results.correlations():
+        sheet_data = {}
+        for lag, value in analysis.correlation.series_acf().items():
+            sheet_data[f'ACF_Lag{lag}'] = value
+        for lag, value in analysis.correlation.series_pacf().items():
+            sheet_data[f'PACF_Lag{lag}'] = value
+        if sheet_data:
+            acf_pacf_data[determine_time_scale(analysis.sheet_name)] = sheet_data
     return acf_pacf_data
 
 def determine_time_scale(sheet_name):
@@ -299,8 +266,8 @@ def create_summary_table(ws, acf_pacf_data):
         ws.cell(row, 3, pacf_lag1 if isinstance(pacf_lag1, (int, float)) else pacf_lag1)
         
         # Strongest ACF (handle both numeric and string values)
-        acf_values = {k: v for k, v in data.items() if 'ACF_' in k and isinstance(v, (int, float))}
-        acf_strings = {k: v for k, v in data.items() if 'ACF_' in k and isinstance(v, str)}
+        acf_values = {k: v for k, v in data.items() if 'ACF_' in k and 'PACF_' not in k and isinstance(v, (int, float))}
+        acf_strings = {k: v for k, v in data.items() if 'ACF_' in k and 'PACF_' not in k and isinstance(v, str)}
         
         if acf_values:
             strongest_acf = max(acf_values.items(), key=lambda x: abs(x[1]))
@@ -475,16 +442,3 @@ def style_dashboard(ws):
             cell.border = thin_border
             if row > 9:  # Data rows
                 cell.alignment = Alignment(horizontal='center')
-
-if __name__ == "__main__":
-    # Test with latest report
-    import glob
-    
-    # Find the most recent report
-    reports = glob.glob("d:/ARDataAnalysis/*Report*.xlsx")
-    if reports:
-        latest_report = max(reports, key=os.path.getctime)
-        print(f"Creating dashboard for: {latest_report}")
-        create_dashboard_summary(latest_report)
-    else:
-        print("No Excel reports found to create dashboard for.")
@@ -5,6 +5,10 @@ Unified Database Connection Utility for ARDataAnalysis Project
 This module provides a single source of truth for MongoDB database connections
 across all scripts in the ARDataAnalysis project.
 
+All connections share one pooled MongoClient per process (see
+get_shared_client), so repeated get_db_connection()/get_collection() calls do
+not open new clients.
+
 Usage:
     from db_utils import get_db_connection
     
@@ -12,8 +16,11 @@ Usage:
     collection = db.media_records
 """
 
+import os
+import atexit
+import threading
 import pymongo
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 import sys
 from typing import Optional
 
@@ -23,28 +30,187 @@ DEFAULT_PORT = 27017
 DEFAULT_DATABASE_NAME = 'ARDataAnalysis'  # Correct database name with actual data
 DEFAULT_COLLECTION_NAME = 'media_records'
 
-def _get_db_client(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout_ms: int = 5000) -> MongoClient:
-    """Establishes and tests a MongoDB client connection."""
+# Connection pool sizing, overridable per process via environment variables
+DEFAULT_MAX_POOL_SIZE = int(os.environ.get('AR_MONGO_MAX_POOL_SIZE', 50))
+DEFAULT_MIN_POOL_SIZE = int(os.environ.get('AR_MONGO_MIN_POOL_SIZE', 0))
+
+
+class _PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events for one shared client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checkout_failures = 0
+
+    def _increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def connection_created(self, event):
+        self._increment('connections_created')
+
+    def connection_closed(self, event):
+        self._increment('connections_closed')
+
+    def connection_checked_out(self, event):
+        self._increment('checkouts')
+
+    def connection_checked_in(self, event):
+        self._increment('checkins')
+
+    def connection_check_out_failed(self, event):
+        self._increment('checkout_failures')
+
+    # Remaining pool events are not tracked
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+
+# Process-wide registry of shared clients: {(host, port, max, min, pid): entry}
+_CLIENT_REGISTRY = {}
+_CLIENT_REGISTRY_LOCK = threading.Lock()
+
+
+def _get_registry_entry(host, port, timeout_ms, max_pool_size, min_pool_size):
+    """Returns (creating if needed) the registry entry for a shared client."""
+    max_pool_size = DEFAULT_MAX_POOL_SIZE if max_pool_size is None else max_pool_size
+    min_pool_size = DEFAULT_MIN_POOL_SIZE if min_pool_size is None else min_pool_size
+    key = (host, port, max_pool_size, min_pool_size, os.getpid())
+
+    with _CLIENT_REGISTRY_LOCK:
+        entry = _CLIENT_REGISTRY.get(key)
+        if entry is None:
+            listener = _PoolStatsListener()
+            client = MongoClient(
+                host=host,
+                port=port,
+                serverSelectionTimeoutMS=timeout_ms,
+                maxPoolSize=max_pool_size,
+                minPoolSize=min_pool_size,
+                connect=False,
+                event_listeners=[listener]
+            )
+            entry = {'client': client, 'listener': listener, 'verified': False, 'requests': 0}
+            _CLIENT_REGISTRY[key] = entry
+        entry['requests'] += 1
+        return entry
+
+
+def get_shared_client(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    timeout_ms: int = 5000,
+    max_pool_size: Optional[int] = None,
+    min_pool_size: Optional[int] = None
+) -> MongoClient:
+    """
+    Returns the process-wide MongoClient for host/port and pool size.
+
+    The client is created lazily (no connection until first use) and reused
+    by every later call, so a run pays connection setup and server selection
+    once. Clients are keyed by process id as MongoClient is not fork-safe.
+    timeout_ms only applies when the client is first created.
+    """
+    return _get_registry_entry(host, port, timeout_ms, max_pool_size, min_pool_size)['client']
+
+
+def _get_db_client(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    timeout_ms: int = 5000,
+    max_pool_size: Optional[int] = None
+) -> MongoClient:
+    """Returns the shared client, testing the connection on its first use."""
+    entry = _get_registry_entry(host, port, timeout_ms, max_pool_size, None)
+    if entry['verified']:
+        return entry['client']
     try:
-        client = MongoClient(host=host, port=port, serverSelectionTimeoutMS=timeout_ms)
-        client.admin.command('ping')
-        return client
+        entry['client'].admin.command('ping')
+        entry['verified'] = True
+        return entry['client']
     except (pymongo.errors.ServerSelectionTimeoutError, pymongo.errors.ConnectionFailure) as e:
         error_msg = f"[ERROR] Failed to connect to MongoDB at {host}:{port}: {e}"
         print(error_msg, file=sys.stderr)
         raise ConnectionError(error_msg) from e
 
+
+def get_pool_stats() -> list:
+    """
+    Returns connection pool statistics for every shared client in this process.
+
+    Each entry has host, port, max_pool_size, requests (number of times the
+    client was handed out), connections_created, connections_closed,
+    open_connections, checkouts, checked_out and checkout_failures.
+    """
+    stats = []
+    with _CLIENT_REGISTRY_LOCK:
+        for (host, port, max_pool_size, _min, pid), entry in _CLIENT_REGISTRY.items():
+            if pid != os.getpid():
+                continue
+            listener = entry['listener']
+            stats.append({
+                'host': host,
+                'port': port,
+                'max_pool_size': max_pool_size,
+                'requests': entry['requests'],
+                'connections_created': listener.connections_created,
+                'connections_closed': listener.connections_closed,
+                'open_connections': listener.connections_created - listener.connections_closed,
+                'checkouts': listener.checkouts,
+                'checked_out': listener.checkouts - listener.checkins,
+                'checkout_failures': listener.checkout_failures
+            })
+    return stats
+
+
+def print_pool_stats():
+    """Prints a one-line summary per shared client."""
+    for stat in get_pool_stats():
+        print(f"[POOL] {stat['host']}:{stat['port']} - {stat['requests']} requests, "
+              f"{stat['connections_created']} connections opened ({stat['open_connections']} open, "
+              f"max {stat['max_pool_size']}), {stat['checkouts']} checkouts, "
+              f"{stat['checkout_failures']} failures")
+
+
+@atexit.register
+def close_shared_clients():
+    """Closes every shared client created by this process."""
+    with _CLIENT_REGISTRY_LOCK:
+        for key in list(_CLIENT_REGISTRY):
+            if key[-1] == os.getpid():
+                _CLIENT_REGISTRY.pop(key)['client'].close()
+
+
 def get_db_connection(
     host: str = DEFAULT_HOST,
     port: int = DEFAULT_PORT, 
     db_name: str = DEFAULT_DATABASE_NAME,
-    timeout_ms: int = 5000
+    timeout_ms: int = 5000,
+    ensure_indexes: bool = False,
+    max_pool_size: Optional[int] = None
 ) -> pymongo.database.Database:
-    """Gets a MongoDB database object using a centralized client."""
+    """
+    Gets a MongoDB database object from the shared, pooled client.
+
+    With ensure_indexes=True the media_records indexes declared in
+    index_manager.py are created if missing.
+    """
     try:
-        client = _get_db_client(host=host, port=port, timeout_ms=timeout_ms)
+        client = _get_db_client(host=host, port=port, timeout_ms=timeout_ms, max_pool_size=max_pool_size)
         database = client[db_name]
         print(f"[OK] Connected to MongoDB: {host}:{port}/{db_name}")
+        if ensure_indexes:
+            # Imported here because index_manager's CLI imports db_utils
+            from index_manager import ensure_media_indexes
+            ensure_media_indexes(database[DEFAULT_COLLECTION_NAME])
         return database
     except Exception as e:
         error_msg = f"[ERROR] Unexpected error getting database {db_name}: {e}"
@@ -68,6 +234,8 @@ def verify_database_connection(db_name: str = DEFAULT_DATABASE_NAME) -> bool:
         document_count = collection.count_documents({})
         if document_count > 0:
             print(f"[OK] DB verification successful: {db_name}.{DEFAULT_COLLECTION_NAME} has {document_count:,} documents")
+            from index_manager import verify_media_indexes
+            verify_media_indexes(collection)
             return True
         else:
             print(f"[INFO] DB {db_name}.{DEFAULT_COLLECTION_NAME} exists but is empty.")
@@ -78,7 +246,6 @@ def verify_database_connection(db_name: str = DEFAULT_DATABASE_NAME) -> bool:
 
 def list_available_databases() -> list:
     """Lists all available databases on the server."""
-    client = None
     try:
         client = _get_db_client()
         databases = client.list_database_names()
@@ -98,9 +265,6 @@ def list_available_databases() -> list:
     except Exception as e:
         print(f"[ERROR] Failed to list databases: {e}")
         return []
-    finally:
-        if client:
-            client.close()
 
 if __name__ == "__main__":
     """
@@ -124,4 +288,8 @@ if __name__ == "__main__":
     print("\n3. Listing available databases...")
     list_available_databases()
     
+    # Shared client pool statistics
+    print("\n4. Connection pool statistics...")
+    print_pool_stats()
+    
     print("\n=== Test Complete ===")
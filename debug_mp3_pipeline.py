@@ -7,7 +7,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from pymongo import MongoClient
+from db_utils import get_db_connection
 from pipelines.mp3_analysis import MP3_DURATION_BY_PERIOD
 import pandas as pd
 
@@ -15,8 +15,7 @@ def debug_mp3_pipeline():
     """Debug the MP3 period pipeline to see what data it returns"""
     try:
         # Connect to MongoDB
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['ARDataAnalysis']
+        db = get_db_connection(db_name='ARDataAnalysis')
         collection = db['AudioRecordings']
         
         print("=== MP3 PERIOD PIPELINE DEBUG ===")
@@ -12,7 +12,7 @@ import os
 import pandas as pd
 from datetime import datetime, timedelta
 import yaml
-from pymongo import MongoClient
+from db_utils import get_db_connection
 
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -181,8 +181,7 @@ def test_zero_fill_pipeline():
     
     try:
         # Connect to database
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['ar_data_analysis']
+        db = get_db_connection(db_name='ar_data_analysis')
         
         # Create and test the zero-fill pipeline
         zero_fill_pipeline = create_zero_filled_pipeline()
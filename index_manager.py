@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Index Management for ARDataAnalysis Project
+
+Every aggregation pipeline in pipelines/ starts with a $match on some of
+School_Year, file_type, is_collection_day and Outlier_Status and then groups
+on ISO_Date (or Collection_Period). This module declares the compound indexes
+on media_records that serve those stages, creates them, verifies them before a
+report runs and reports how often each one is used via $indexStats.
+
+Index key order follows the equality-sort-range rule: equality fields
+(is_collection_day, Outlier_Status) first, then the $in/$ne fields
+(file_type, School_Year), then the grouping key.
+
+Usage:
+    from index_manager import ensure_media_indexes, verify_media_indexes
+
+    ensure_media_indexes(db['media_records'])
+    missing = verify_media_indexes(db['media_records'])
+
+    python index_manager.py            # create indexes and print usage
+"""
+
+import sys
+
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+# Index declarations for the media_records collection: {name: key spec}
+MEDIA_RECORDS_INDEXES = {
+    # Base filter (PipelineFilterUtils.get_base_filter) + daily $group
+    'base_filter_by_date': [
+        ('file_type', ASCENDING), ('School_Year', ASCENDING), ('ISO_Date', ASCENDING)
+    ],
+    # Research dataset filter (PipelineFilterUtils.get_both_filters) + daily $group
+    'research_filter_by_date': [
+        ('is_collection_day', ASCENDING), ('Outlier_Status', ASCENDING),
+        ('file_type', ASCENDING), ('School_Year', ASCENDING), ('ISO_Date', ASCENDING)
+    ],
+    # Period and school-year level pipelines
+    'school_year_by_period': [
+        ('School_Year', ASCENDING), ('Collection_Period', ASCENDING), ('file_type', ASCENDING)
+    ],
+    # Date range lookups and date-sorted reads (raw data, dashboards)
+    'iso_date': [('ISO_Date', ASCENDING)],
+    # Incremental ingest upserts and deletes key on file_path
+    'file_path': [('file_path', ASCENDING)],
+    # Disk aggregation cache fingerprints read the newest _creation_timestamp
+    'creation_timestamp': [('_creation_timestamp', DESCENDING)],
+}
+
+
+def _index_models(index_specs):
+    return [IndexModel(keys, name=name) for name, keys in index_specs.items()]
+
+
+def _existing_index_keys(collection):
+    """Returns {index name: [(field, direction), ...]} for the collection."""
+    return {
+        name: list(info['key'])
+        for name, info in collection.index_information().items()
+    }
+
+
+def ensure_media_indexes(collection, index_specs=None):
+    """
+    Creates any declared index that does not exist yet.
+
+    An existing index with the same name but different keys is dropped and
+    recreated. Creating an index that already exists is a no-op on the server.
+
+    Args:
+        collection: The media_records pymongo Collection.
+        index_specs: Optional {name: key spec}; defaults to MEDIA_RECORDS_INDEXES.
+
+    Returns:
+        list: Names of the indexes that were created.
+    """
+    index_specs = index_specs or MEDIA_RECORDS_INDEXES
+    existing = _existing_index_keys(collection)
+
+    to_create = {}
+    for name, keys in index_specs.items():
+        if name in existing and existing[name] != list(keys):
+            print(f"[INDEX] Index '{name}' has outdated keys {existing[name]}; recreating")
+            collection.drop_index(name)
+            to_create[name] = keys
+        elif name not in existing:
+            to_create[name] = keys
+
+    if to_create:
+        collection.create_indexes(_index_models(to_create))
+        print(f"[INDEX] Created {len(to_create)} index(es) on '{collection.name}': {', '.join(to_create)}")
+    return list(to_create)
+
+
+def verify_media_indexes(collection, index_specs=None, create_missing=False):
+    """
+    Checks that every declared index exists with the declared keys.
+
+    Args:
+        collection: The media_records pymongo Collection.
+        index_specs: Optional {name: key spec}; defaults to MEDIA_RECORDS_INDEXES.
+        create_missing: If True, missing or outdated indexes are created.
+
+    Returns:
+        list: Names of indexes that were missing or outdated (before any
+              creation).
+    """
+    index_specs = index_specs or MEDIA_RECORDS_INDEXES
+    existing = _existing_index_keys(collection)
+    missing = [
+        name for name, keys in index_specs.items()
+        if existing.get(name) != list(keys)
+    ]
+
+    if missing:
+        print(f"[INDEX] Missing or outdated indexes on '{collection.name}': {', '.join(missing)}")
+        if create_missing:
+            ensure_media_indexes(collection, {name: index_specs[name] for name in missing})
+    return missing
+
+
+def get_index_usage(collection):
+    """
+    Returns per-index usage counters from $indexStats.
+
+    Returns:
+        list: [{'name', 'key', 'ops', 'since'}, ...] sorted by ops descending.
+              Empty if the server does not allow $indexStats.
+    """
+    try:
+        stats = list(collection.aggregate([{'$indexStats': {}}]))
+    except OperationFailure as e:
+        print(f"[WARNING] $indexStats unavailable on '{collection.name}': {e}")
+        return []
+
+    usage = [
+        {
+            'name': entry['name'],
+            'key': dict(entry.get('key', {})),
+            'ops': int(entry.get('accesses', {}).get('ops', 0)),
+            'since': entry.get('accesses', {}).get('since')
+        }
+        for entry in stats
+    ]
+    return sorted(usage, key=lambda entry: entry['ops'], reverse=True)
+
+
+def print_index_usage(collection):
+    """Prints a usage table for every index on the collection."""
+    usage = get_index_usage(collection)
+    if not usage:
+        return
+    print(f"[INDEX] Index usage on '{collection.name}':")
+    for entry in usage:
+        since = entry['since'].strftime('%Y-%m-%d %H:%M') if entry['since'] else 'n/a'
+        print(f"  - {entry['name']:<28} {entry['ops']:>10,} ops since {since}")
+
+
+if __name__ == "__main__":
+    from db_utils import get_db_connection, DEFAULT_COLLECTION_NAME
+
+    try:
+        db = get_db_connection()
+    except ConnectionError:
+        sys.exit(1)
+
+    media_records = db[DEFAULT_COLLECTION_NAME]
+    ensure_media_indexes(media_records)
+    print_index_usage(media_records)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Shared Media File Scanner for ARDataAnalysis Project
+
+This module provides a single-pass directory walker used by every script that
+needs to discover media files (populate_db.py, tag_jpg_files.py and
+tag_mp3_files.py). Each directory tree is traversed exactly once with
+os.scandir and files are classified by their lowercase suffix, instead of
+re-walking the tree once per glob pattern.
+
+Usage:
+    from media_scanner import scan_media_files
+
+    files = scan_media_files(['21_22 Photos', '21_22 Audio'])
+    jpg_files, mp3_files = files['JPG'], files['MP3']
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Lowercase suffixes recognised for each media type
+MEDIA_SUFFIXES = {
+    'JPG': ('.jpg', '.jpeg'),
+    'MP3': ('.mp3',),
+}
+
+
+def _build_suffix_lookup(suffix_groups):
+    """Inverts {group: suffixes} into {suffix: group} for O(1) classification."""
+    return {
+        suffix.lower(): group
+        for group, suffixes in suffix_groups.items()
+        for suffix in suffixes
+    }
+
+
+def _scan_tree(root, suffix_lookup):
+    """
+    Walks a single directory tree once and classifies every file it finds.
+
+    Symlinked directories are not followed to avoid walking the same tree
+    twice. Unreadable directories are reported and skipped.
+
+    Returns:
+        dict: {group: [Path, ...]} for the files found under root
+    """
+    found = {group: [] for group in set(suffix_lookup.values())}
+    pending = [root]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file():
+                            group = suffix_lookup.get(os.path.splitext(entry.name)[1].lower())
+                            if group is not None:
+                                found[group].append(Path(entry.path))
+                    except OSError as e:
+                        print(f"  Warning: Could not inspect {entry.path}: {e}")
+        except OSError as e:
+            print(f"  Warning: Could not read directory {current}: {e}")
+    return found
+
+
+def _split_top_level(root, suffix_lookup, found):
+    """
+    Classifies the files directly inside root and returns its subdirectories,
+    so each subdirectory can be walked independently.
+    """
+    subdirs = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    group = suffix_lookup.get(os.path.splitext(entry.name)[1].lower())
+                    if group is not None:
+                        found[group].append(Path(entry.path))
+    except OSError as e:
+        print(f"  Warning: Could not read directory {root}: {e}")
+    return subdirs
+
+
+def scan_media_files(roots, suffix_groups=None, threads=1):
+    """
+    Finds media files under one or more root directories in a single traversal.
+
+    Args:
+        roots: A directory path or an iterable of directory paths to scan.
+        suffix_groups: Optional {group: suffixes} mapping. Defaults to
+                       MEDIA_SUFFIXES (JPG and MP3).
+        threads: Number of threads to use. When greater than 1, every
+                 top-level directory under each root is walked in its own
+                 thread.
+
+    Returns:
+        dict: {group: sorted list of Path objects}, with one key per group
+              in suffix_groups (empty lists when nothing matched).
+    """
+    if isinstance(roots, (str, os.PathLike)):
+        roots = [roots]
+    suffix_groups = suffix_groups or MEDIA_SUFFIXES
+    suffix_lookup = _build_suffix_lookup(suffix_groups)
+    found = {group: [] for group in suffix_groups}
+
+    roots = [str(root) for root in roots]
+    if threads <= 1:
+        subtrees = roots
+    else:
+        subtrees = []
+        for root in roots:
+            subtrees.extend(_split_top_level(root, suffix_lookup, found))
+
+    if threads > 1 and len(subtrees) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(lambda tree: _scan_tree(tree, suffix_lookup), subtrees))
+    else:
+        results = [_scan_tree(tree, suffix_lookup) for tree in subtrees]
+
+    for result in results:
+        for group, paths in result.items():
+            found[group].extend(paths)
+
+    # Sets guard against overlapping roots; sorting keeps downstream order stable
+    return {group: sorted(set(paths)) for group, paths in found.items()}
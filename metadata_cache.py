@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Persistent Metadata Extraction Cache for ARDataAnalysis Project
+
+Parsing EXIF and ID3 headers is the slowest part of re-running
+populate_db.py, tag_jpg_files.py and tag_mp3_files.py. This module keeps the
+parsed header data in a local SQLite file keyed by the resolved file path and
+validated against the file's size and modification time, so files whose bytes
+have not changed are read from the cache instead of being re-parsed.
+
+Cached payloads:
+- 'jpg': the piexif dictionary and the decoded UserComment JSON
+- 'mp3': the TXXX frames and the mutagen info fields (length, bitrate, channels)
+
+Usage:
+    from metadata_cache import MetadataCache, read_jpg_exif, read_mp3_header
+
+    cache = MetadataCache()
+    header = read_mp3_header(file_path, cache)
+"""
+
+import os
+import json
+import pickle
+import sqlite3
+from pathlib import Path
+
+import mutagen
+import piexif
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / ".metadata_cache.sqlite"
+
+# Bump when the structure of a cached payload changes
+CACHE_SCHEMA_VERSION = 1
+
+
+class MetadataCache:
+    """
+    SQLite-backed cache of parsed media headers.
+
+    The connection is opened lazily and re-opened after a fork, so a single
+    instance can be passed to process pool workers.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        self.db_path = str(db_path)
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        return state
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path, timeout=30)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                " path TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " payload BLOB NOT NULL,"
+                " PRIMARY KEY (path, kind))"
+            )
+        return self._conn
+
+    @staticmethod
+    def _file_key(file_path):
+        stat = os.stat(file_path)
+        return str(Path(file_path).resolve()), stat.st_size, stat.st_mtime_ns
+
+    def get(self, file_path, kind):
+        """Returns the cached payload for an unchanged file, or None on a miss."""
+        try:
+            path, size, mtime_ns = self._file_key(file_path)
+            row = self._connection().execute(
+                "SELECT size, mtime_ns, version, payload FROM metadata WHERE path = ? AND kind = ?",
+                (path, kind)
+            ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            print(f"[WARNING] Metadata cache lookup failed for {Path(file_path).name}: {e}")
+            row = None
+
+        if row is None or row[0] != size or row[1] != mtime_ns or row[2] != CACHE_SCHEMA_VERSION:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(row[3])
+
+    def put(self, file_path, kind, payload):
+        """Stores a payload for the file's current size and modification time."""
+        try:
+            path, size, mtime_ns = self._file_key(file_path)
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata (path, kind, size, mtime_ns, version, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (path, kind, size, mtime_ns, CACHE_SCHEMA_VERSION,
+                 pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+            )
+            conn.commit()
+        except (OSError, sqlite3.Error) as e:
+            print(f"[WARNING] Metadata cache write failed for {Path(file_path).name}: {e}")
+
+    def stats(self):
+        """Returns hit/miss counters for this process."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) if total else 0.0
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._pid = None
+
+
+# ==============================================================================
+# CACHED HEADER READERS
+# ==============================================================================
+
+def decode_user_comment(exif_dict):
+    """
+    Decodes the JSON tag payload stored in the EXIF UserComment field.
+
+    Returns the decoded dictionary, or None if the field is missing or invalid.
+    """
+    user_comment_bytes = exif_dict.get('Exif', {}).get(piexif.ExifIFD.UserComment, b'')
+
+    # UserComment has an 8-byte encoding prefix we need to strip
+    if user_comment_bytes.startswith(b'UNICODE\x00'):
+        user_comment_bytes = user_comment_bytes[8:]
+
+    try:
+        return json.loads(user_comment_bytes.decode('utf-16-le'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+
+
+def read_jpg_exif(file_path, cache=None):
+    """
+    Returns {'exif': piexif dict, 'user_comment': decoded JSON or None} for a JPG.
+
+    Consults the cache first; piexif errors propagate to the caller.
+    """
+    if cache is not None:
+        cached = cache.get(file_path, 'jpg')
+        if cached is not None:
+            return cached
+
+    exif_dict = piexif.load(str(file_path))
+    header = {
+        'exif': exif_dict,
+        'user_comment': decode_user_comment(exif_dict)
+    }
+    if cache is not None:
+        cache.put(file_path, 'jpg', header)
+    return header
+
+
+def read_mp3_header(file_path, cache=None):
+    """
+    Returns the ID3 TXXX frames and audio info fields of an MP3.
+
+    The result has the form {'loaded': bool, 'has_tags': bool,
+    'txxx': {desc: text}, 'info': {'length', 'bitrate', 'channels'}}.
+    Consults the cache first; mutagen errors propagate to the caller.
+    """
+    if cache is not None:
+        cached = cache.get(file_path, 'mp3')
+        if cached is not None:
+            return cached
+
+    audio = mutagen.File(file_path)
+    header = {'loaded': audio is not None, 'has_tags': False, 'txxx': {}, 'info': {}}
+    if audio is not None:
+        if audio.tags:
+            header['has_tags'] = True
+            for key in audio.tags.keys():
+                if key.startswith('TXXX:'):
+                    # TXXX tags are stored as a list, we take the first item
+                    header['txxx'][key.split(':', 1)[1]] = audio.tags[key].text[0]
+        info = getattr(audio, 'info', None)
+        for field in ('length', 'bitrate', 'channels'):
+            if info is not None and hasattr(info, field):
+                header['info'][field] = getattr(info, field)
+
+    if cache is not None:
+        cache.put(file_path, 'mp3', header)
+    return header
@@ -26,6 +26,7 @@ from .file_analysis import FILE_PIPELINES
 from .dashboard_data import DASHBOARD_PIPELINES
 from .mp3_analysis import MP3_PIPELINES
 from .time_series import TIME_SERIES_PIPELINES
+from .utils import create_rollup_pipeline
 
 # Consolidate all pipeline dictionaries into a single registry
 PIPELINES = {}
@@ -41,5 +42,31 @@ PIPELINES.update(DASHBOARD_PIPELINES)
 PIPELINES.update(MP3_PIPELINES)
 PIPELINES.update(TIME_SERIES_PIPELINES)
 
+# Time-series pipelines that can be answered from the daily_rollups collection
+# (per-day totals maintained by populate_db.py) instead of media_records.
+# Keyed by the original pipeline name; run against DAILY_ROLLUPS_COLLECTION.
+ROLLUP_PIPELINE_NAMES = (
+    "DAILY_COUNTS_ALL",
+    "DAILY_COUNTS_ALL_WITH_ZEROES",
+    "DAILY_COUNTS_COLLECTION_ONLY",
+    "WEEKLY_COUNTS",
+    "WEEKLY_COUNTS_WITH_ZEROES",
+    "BIWEEKLY_COUNTS",
+    "MONTHLY_COUNTS_WITH_ZEROES",
+    "PERIOD_COUNTS_WITH_ZEROES"
+)
+ROLLUP_PIPELINES = {name: create_rollup_pipeline(PIPELINES[name]) for name in ROLLUP_PIPELINE_NAMES}
+
+# Time-series pipelines whose results must have a row for every bucket of the
+# collection calendar, by granularity; report_generator.time_axis adds the
+# zero rows the aggregation itself does not produce. The zero-filled daily
+# pipelines get their zero rows from calendar_days inside MongoDB instead.
+TIME_AXIS_GRANULARITIES = {
+    "WEEKLY_COUNTS_WITH_ZEROES": "weekly",
+    "BIWEEKLY_COUNTS": "biweekly",
+    "MONTHLY_COUNTS_WITH_ZEROES": "monthly",
+    "PERIOD_COUNTS_WITH_ZEROES": "period"
+}
+
 # Export the main registry
-__all__ = ['PIPELINES']
+__all__ = ['PIPELINES', 'ROLLUP_PIPELINES', 'TIME_AXIS_GRANULARITIES']
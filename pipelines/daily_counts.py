@@ -10,7 +10,7 @@ Key Pipelines:
 - DAILY_COUNTS_COLLECTION_ONLY: Daily counts filtered to collection days only
 """
 
-from .utils import PipelineFilterUtils, create_pipeline_with_filters
+from .utils import PipelineFilterUtils, create_pipeline_with_filters, create_calendar_zero_fill_stages
 
 # Define the core aggregation stages used by all daily count pipelines
 # These stages handle grouping by date, calculating totals, and sorting
@@ -32,6 +32,16 @@ DAILY_COUNTS_CORE_STAGES = [
     {"$sort": {"_id": 1}}
 ]
 
+DAILY_COUNT_FIELDS = ["Total_Files", "MP3_Files", "JPG_Files", "Total_Size_MB"]
+
+# Same output as DAILY_COUNTS_CORE_STAGES, plus a zero row for every collection
+# day without files, joined from the calendar_days collection inside MongoDB
+DAILY_COUNTS_ZERO_FILLED_STAGES = (
+    DAILY_COUNTS_CORE_STAGES[:1]
+    + create_calendar_zero_fill_stages(DAILY_COUNT_FIELDS)
+    + DAILY_COUNTS_CORE_STAGES[1:]
+)
+
 # =============================================================================
 # 1. DAILY_COUNTS_ALL
 # =============================================================================
@@ -49,7 +59,9 @@ DAILY_COUNTS_ALL = create_pipeline_with_filters(DAILY_COUNTS_CORE_STAGES)
 # It's essential for proper time series analysis where missing days need to be represented
 # with zero counts rather than being omitted entirely. The 'has_files' column will be
 # FALSE for collection days with no files, which is critical for ACF/PACF analysis.
-DAILY_COUNTS_ALL_WITH_ZEROES = create_pipeline_with_filters(DAILY_COUNTS_CORE_STAGES)
+# Zero rows come from the calendar_days collection ($unionWith), so no pandas
+# merge is needed after the aggregation.
+DAILY_COUNTS_ALL_WITH_ZEROES = create_pipeline_with_filters(DAILY_COUNTS_ZERO_FILLED_STAGES)
 
 # =============================================================================
 # 3. DAILY_COUNTS_COLLECTION_ONLY
@@ -57,7 +69,7 @@ DAILY_COUNTS_ALL_WITH_ZEROES = create_pipeline_with_filters(DAILY_COUNTS_CORE_ST
 # Daily counts filtered to only include collection days (excludes holidays, breaks, etc.)
 # This pipeline is used for analysis that should focus only on actual school collection days.
 DAILY_COUNTS_COLLECTION_ONLY = create_pipeline_with_filters(
-    DAILY_COUNTS_CORE_STAGES,
+    DAILY_COUNTS_ZERO_FILLED_STAGES,
     [PipelineFilterUtils.get_both_filters()]
 )
 
@@ -5,6 +5,10 @@ This module provides utility functions for pipeline definitions to ensure
 consistent filtering and data processing across the system.
 """
 
+# Collection materialized by populate_db.py with one document per calendar day
+CALENDAR_DAYS_COLLECTION = "calendar_days"
+
+
 class PipelineFilterUtils:
     """
     Utility class for pipeline filters to ensure consistency across the system.
@@ -119,3 +123,161 @@ def create_pipeline_with_filters(base_stages, filters=None):
         filters = [PipelineFilterUtils.get_base_filter()]
     
     return filters + base_stages
+
+
+def create_calendar_zero_fill_stages(sum_fields, calendar_match=None):
+    """
+    Creates stages that zero-fill a daily aggregation inside MongoDB.
+
+    Append these after a $group keyed on ISO_Date. Every matching day from the
+    calendar_days collection is unioned in as a zero row, the rows are
+    re-grouped by date, and only calendar days are kept. This mirrors the
+    left merge against all collection days that the report previously did in
+    pandas.
+
+    Args:
+        sum_fields (list): Fields produced by the preceding $group that should
+            be summed (zero on days without files).
+        calendar_match (dict, optional): Filter on calendar_days documents.
+            Defaults to collection days only.
+
+    Returns:
+        list: MongoDB pipeline stages
+    """
+    if calendar_match is None:
+        calendar_match = {"is_collection_day": True}
+
+    zero_row = {field: {"$literal": 0} for field in sum_fields}
+    return [
+        {
+            "$unionWith": {
+                "coll": CALENDAR_DAYS_COLLECTION,
+                "pipeline": [
+                    {"$match": calendar_match},
+                    {"$project": {"_id": 1, **zero_row, "_in_calendar": {"$literal": True}}}
+                ]
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id",
+                **{field: {"$sum": f"${field}"} for field in sum_fields},
+                "_in_calendar": {"$max": "$_in_calendar"}
+            }
+        },
+        {"$match": {"_in_calendar": True}},
+        {"$project": {"_in_calendar": 0}}
+    ]
+
+
+# Collection maintained by populate_db.py with per-day totals (see daily_rollups.py)
+DAILY_ROLLUPS_COLLECTION = "daily_rollups"
+
+# media_records fields a daily rollup document is keyed on. Everything the
+# coarser time-series pipelines filter or group on is one of these.
+DAILY_ROLLUP_DIMENSIONS = (
+    "ISO_Date",
+    "file_type",
+    "is_collection_day",
+    "Outlier_Status",
+    "School_Year",
+    "Collection_Period",
+    "ISO_Week"
+)
+
+# Per-rollup measures: number of records and their summed File_Size_MB
+DAILY_ROLLUP_COUNT_FIELD = "File_Count"
+DAILY_ROLLUP_SIZE_FIELD = "File_Size_MB"
+
+# Accumulators that give the same result over rollup documents as over the
+# raw records they summarize (besides the $sum rewrites below)
+_ROLLUP_SAFE_ACCUMULATORS = {"$min", "$max", "$first", "$last", "$addToSet"}
+
+
+def _field_references(expression):
+    """Returns the top-level field names referenced by "$field" paths in an expression."""
+    if isinstance(expression, str):
+        if expression.startswith("$") and not expression.startswith("$$"):
+            return {expression[1:].split(".")[0]}
+        return set()
+    if isinstance(expression, dict):
+        if "$literal" in expression:
+            return set()
+        return set().union(*(_field_references(value) for value in expression.values()))
+    if isinstance(expression, list):
+        return set().union(*(_field_references(value) for value in expression))
+    return set()
+
+
+def _rollup_accumulator(name, accumulator):
+    """Rewrites one $group accumulator to run over daily rollup documents."""
+    (operator, argument), = accumulator.items()
+    count = f"${DAILY_ROLLUP_COUNT_FIELD}"
+
+    if operator == "$sum":
+        # {"$sum": 1} counts records; each rollup stands for File_Count records
+        if argument == 1:
+            return {"$sum": count}
+        # {"$sum": {"$cond": [<test>, 1, 0]}} counts matching records
+        condition = argument.get("$cond") if isinstance(argument, dict) else None
+        if isinstance(condition, list) and len(condition) == 3 and condition[1:] == [1, 0]:
+            return {"$sum": {"$cond": [condition[0], count, 0]}}
+        if argument == f"${DAILY_ROLLUP_SIZE_FIELD}":
+            return accumulator
+    elif operator in _ROLLUP_SAFE_ACCUMULATORS:
+        return accumulator
+
+    raise ValueError(f"Accumulator '{name}' ({operator}) cannot be computed from daily rollups")
+
+
+def create_rollup_pipeline(pipeline):
+    """
+    Creates the variant of a pipeline that reads the daily_rollups collection.
+
+    Stages up to the first $group may only read rollup dimensions; the record
+    counts in that $group are rewritten to sum File_Count. Later stages work
+    on grouped documents and are kept as they are, so the variant returns the
+    same documents as the original pipeline run on media_records.
+
+    Args:
+        pipeline (list): Pipeline written against media_records.
+
+    Returns:
+        list: Pipeline to run against DAILY_ROLLUPS_COLLECTION.
+
+    Raises:
+        ValueError: If the pipeline reads fields or uses accumulators that the
+            rollup documents cannot answer.
+    """
+    available = set(DAILY_ROLLUP_DIMENSIONS) | {DAILY_ROLLUP_SIZE_FIELD}
+    rollup_pipeline = []
+    for index, stage in enumerate(pipeline):
+        (name, spec), = stage.items()
+        if name == "$group":
+            missing = _field_references(spec["_id"]) - available
+            accumulators = {}
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                missing |= _field_references(accumulator) - available
+                accumulators[field] = _rollup_accumulator(field, accumulator)
+            if missing:
+                raise ValueError(f"Fields not in daily rollups: {sorted(missing)}")
+            return rollup_pipeline + [{"$group": {"_id": spec["_id"], **accumulators}}] + pipeline[index + 1:]
+
+        if name == "$match":
+            missing = set(spec) - available - {"$and", "$or", "$nor", "$expr"}
+            missing |= _field_references(spec.get("$expr")) - available
+            for key in ("$and", "$or", "$nor"):
+                for clause in spec.get(key, []):
+                    missing |= set(clause) - available
+        elif name in ("$addFields", "$set"):
+            missing = _field_references(spec) - available
+            available |= set(spec)
+        else:
+            raise ValueError(f"Stage {name} before the first $group cannot run on daily rollups")
+        if missing:
+            raise ValueError(f"Fields not in daily rollups: {sorted(missing)}")
+        rollup_pipeline.append(stage)
+
+    raise ValueError("Pipeline has no $group stage to run on daily rollups")
@@ -1,21 +1,22 @@
 import os
 import argparse
 import datetime
+import hashlib
 import json
 import time
 
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
 import mutagen
 import piexif
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo import MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError, ConnectionFailure
 
 # Import shared utilities
 from ar_utils import (
-    get_school_calendar,
-    get_non_collection_days,
-    precompute_collection_days,
+    get_collection_calendar,
     is_collection_day
 )
 
@@ -23,8 +24,23 @@ print("[DEBUG] Script starting - imports completed...")
 
 # Import unified database connection utility
 from db_utils import get_db_connection
+from media_scanner import scan_media_files
+from calendar_days import materialize_calendar_days
+from daily_rollups import (
+    ROLLUP_SOURCE_PROJECTION, accumulate_rollup_deltas, apply_rollup_deltas, ensure_daily_rollups
+)
+from pipelines.utils import DAILY_ROLLUPS_COLLECTION
+from metadata_cache import MetadataCache, DEFAULT_CACHE_PATH, read_jpg_exif, read_mp3_header
+
+# Streaming ingest defaults: documents are flushed to MongoDB in bounded
+# batches so memory stays flat regardless of archive size
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CHECKPOINT_EVERY = 1000
+
+# Field holding the per-document content fingerprint used by incremental runs
+FINGERPRINT_FIELD = '_fingerprint'
 
-def find_media_files(root_dir):
+def find_media_files(root_dir, scan_threads=1):
     """Finds all JPG and MP3 files in media directories only."""
     print(f"Scanning for media files in: {root_dir}")
     
@@ -34,37 +50,28 @@ def find_media_files(root_dir):
         '21_22 Audio', '22_23 Audio'     # Audio directories
     ]
     
-    jpg_files_set = set()
-    mp3_files_set = set()
-    
+    media_paths = []
     for media_dir in media_dirs:
         media_path = Path(root_dir) / media_dir
         if media_path.exists() and media_path.is_dir():
             print(f"  Scanning {media_dir}...")
-            
-            # Search for JPG files (both cases)
-            jpg_files_set.update(media_path.rglob('*.jpg'))
-            jpg_files_set.update(media_path.rglob('*.JPG'))
-            jpg_files_set.update(media_path.rglob('*.jpeg'))
-            jpg_files_set.update(media_path.rglob('*.JPEG'))
-            
-            # Search for MP3 files (both cases)
-            mp3_files_set.update(media_path.rglob('*.mp3'))
-            mp3_files_set.update(media_path.rglob('*.MP3'))
+            media_paths.append(media_path)
         else:
             print(f"  Warning: {media_dir} not found, skipping...")
     
-    jpg_files = sorted(list(jpg_files_set))
-    mp3_files = sorted(list(mp3_files_set))
+    # One traversal per directory tree, classified by lowercase suffix
+    found = scan_media_files(media_paths, threads=scan_threads)
+    jpg_files = found['JPG']
+    mp3_files = found['MP3']
     
     print(f"Found {len(jpg_files)} JPG files and {len(mp3_files)} MP3 files.")
     return jpg_files, mp3_files
 
-def extract_mp3_metadata(file_path, collection_day_map=None):
+def extract_mp3_metadata(file_path, collection_day_map=None, cache=None):
     """Extracts all relevant metadata from an MP3 file into a dictionary."""
     try:
-        audio = mutagen.File(file_path)
-        if not audio or not audio.tags:
+        header = read_mp3_header(file_path, cache)
+        if not header['loaded'] or not header['has_tags']:
             return None
 
         # Initialize a dictionary to hold our structured data
@@ -76,42 +83,38 @@ def extract_mp3_metadata(file_path, collection_day_map=None):
         }
 
         # Extract all TXXX (custom) tags
-        for key in audio.tags:
-            if key.startswith('TXXX:'):
-                # TXXX tags are stored as a list, we take the first item
-                tag_name = key.split(':', 1)[1]
-                value = audio.tags[key].text[0]
-                
-                # Convert numeric-like strings to actual numbers
-                try:
-                    if '.' in value:
-                        value = float(value)
-                    else:
-                        value = int(value)
-                except (ValueError, TypeError):
-                    pass # Keep as string if conversion fails
-                
-                # Convert boolean-like strings to actual booleans
-                if isinstance(value, str):
-                    if value.lower() == 'true':
-                        value = True
-                    elif value.lower() == 'false':
-                        value = False
-
-                doc[tag_name] = value
+        for tag_name, value in header['txxx'].items():
+            # Convert numeric-like strings to actual numbers
+            try:
+                if '.' in value:
+                    value = float(value)
+                else:
+                    value = int(value)
+            except (ValueError, TypeError):
+                pass # Keep as string if conversion fails
+            
+            # Convert boolean-like strings to actual booleans
+            if isinstance(value, str):
+                if value.lower() == 'true':
+                    value = True
+                elif value.lower() == 'false':
+                    value = False
+
+            doc[tag_name] = value
 
         # Extract MP3 file properties
         doc["File_Size_MB"] = round(file_path.stat().st_size / (1024 * 1024), 3)
         
-        if hasattr(audio.info, 'length'):
-            doc["Duration_Seconds"] = round(audio.info.length, 1)
+        info = header['info']
+        if 'length' in info:
+            doc["Duration_Seconds"] = round(info['length'], 1)
         
-        if hasattr(audio.info, 'bitrate'):
+        if 'bitrate' in info:
             # Convert to kbps for readability
-            doc["Bitrate_kbps"] = round(audio.info.bitrate / 1000)
+            doc["Bitrate_kbps"] = round(info['bitrate'] / 1000)
             
-        if hasattr(audio.info, 'channels'):
-            doc["Channels"] = audio.info.channels
+        if 'channels' in info:
+            doc["Channels"] = info['channels']
             
         # Add is_collection_day field if we can determine it
         if collection_day_map is not None and "ISO_Date" in doc:
@@ -130,26 +133,18 @@ def extract_mp3_metadata(file_path, collection_day_map=None):
         print(f"Error processing MP3 {file_path.name}: {e}")
         return None
 
-def extract_jpg_metadata(file_path, collection_day_map=None):
+def extract_jpg_metadata(file_path, collection_day_map=None, cache=None):
     """Extracts all relevant metadata from a JPG file into a dictionary."""
     try:
-        exif_dict = piexif.load(str(file_path))
+        header = read_jpg_exif(file_path, cache)
+        exif_dict = header['exif']
 
         # The JSON data is stored in the UserComment field
-        user_comment_bytes = exif_dict.get('Exif', {}).get(piexif.ExifIFD.UserComment, b'')
-        
-        # UserComment has an 8-byte encoding prefix we need to strip
-        if user_comment_bytes.startswith(b'UNICODE\x00'):
-            user_comment_bytes = user_comment_bytes[8:]
-        
-        # Decode from UTF-16LE and load the JSON
-        try:
-            json_str = user_comment_bytes.decode('utf-16-le')
-            doc = json.loads(json_str)
-        except (UnicodeDecodeError, json.JSONDecodeError):
+        if header['user_comment'] is None:
             # If UserComment is not valid, we can't get the contextual data
             print(f"Warning: Could not decode UserComment for {file_path.name}. Skipping.")
             return None
+        doc = dict(header['user_comment'])
 
         # Add file system and core EXIF info to the document
         doc["file_name"] = file_path.name
@@ -189,6 +184,156 @@ def extract_jpg_metadata(file_path, collection_day_map=None):
         return None
 
 
+def extract_media_metadata(file_path, collection_day_map=None, cache=None):
+    """Dispatches a media file to the matching extractor based on its suffix."""
+    suffix = file_path.suffix.lower()
+    if suffix in ['.jpg', '.jpeg']:
+        return extract_jpg_metadata(file_path, collection_day_map, cache)
+    elif suffix == '.mp3':
+        return extract_mp3_metadata(file_path, collection_day_map, cache)
+    return None
+
+
+def iter_extracted_documents(files, collection_day_map=None, workers=1, window_size=1024, cache=None):
+    """
+    Yields (file_path, document) pairs in the same order as `files`.
+
+    With workers > 1 the extraction runs in a process pool; results are still
+    returned in input order so the inserted documents are deterministic.
+    Files are submitted in windows of `window_size` so that completed-but-
+    unconsumed results never pile up in memory.
+    A document of None means extraction failed for that file.
+    """
+    if workers <= 1:
+        for file in files:
+            print(f"[DEBUG] Reading metadata from: {file.name}")
+            yield file, extract_media_metadata(file, collection_day_map, cache)
+        return
+
+    window_size = max(window_size, workers)
+    # Larger chunks amortize the pickling overhead of the collection day map
+    chunksize = max(1, min(64, window_size // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(files), window_size):
+            window = files[start:start + window_size]
+            results = executor.map(
+                extract_media_metadata, window, repeat(collection_day_map), repeat(cache),
+                chunksize=chunksize
+            )
+            for file, doc in zip(window, results):
+                yield file, doc
+
+
+def _failed_indexes(bulk_error):
+    """Returns the positions of the operations a BulkWriteError reports as failed."""
+    return {error['index'] for error in bulk_error.details.get('writeErrors', [])}
+
+
+def insert_document_batch(collection, batch):
+    """
+    Inserts a batch of documents with an unordered insert_many and adds them
+    to the daily rollups.
+
+    Returns the number of documents actually written. A failure on some
+    documents does not abort the rest of the batch.
+    """
+    if not batch:
+        return 0
+    failed = set()
+    try:
+        result = collection.insert_many(batch, ordered=False)
+        inserted = len(result.inserted_ids)
+    except BulkWriteError as e:
+        inserted = e.details.get('nInserted', 0)
+        failed = _failed_indexes(e)
+        print(f"[WARNING] Batch insert partially failed: {len(failed)} write errors")
+    written = (doc for index, doc in enumerate(batch) if index not in failed)
+    apply_rollup_deltas(collection.database, accumulate_rollup_deltas({}, written))
+    return inserted
+
+
+def compute_file_fingerprint(file_path, include_hash=False):
+    """
+    Builds the content fingerprint stored alongside each media record.
+
+    The path, size and modification time are enough to detect changes in
+    practice; a SHA-256 of the file contents can be added for stricter checks.
+    """
+    stat = file_path.stat()
+    fingerprint = {
+        "path": str(file_path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
+    if include_hash:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+def load_existing_fingerprints(collection):
+    """Returns a {file_path: fingerprint} map of every record already in the collection."""
+    cursor = collection.find({}, {"file_path": 1, FINGERPRINT_FIELD: 1, "_id": 0})
+    return {doc["file_path"]: doc.get(FINGERPRINT_FIELD) for doc in cursor if "file_path" in doc}
+
+
+def upsert_document_batch(collection, batch):
+    """
+    Upserts a batch of documents keyed on file_path with an unordered bulk_write.
+    The daily rollups lose the replaced records and gain the new ones.
+
+    Returns the number of documents inserted or replaced.
+    """
+    if not batch:
+        return 0
+    # ReplaceOne replaces the first match, which is the first record find() returns
+    previous = {}
+    cursor = collection.find(
+        {"file_path": {"$in": [doc["file_path"] for doc in batch]}},
+        {**ROLLUP_SOURCE_PROJECTION, "file_path": 1, "_id": 0}
+    )
+    for old_doc in cursor:
+        previous.setdefault(old_doc["file_path"], old_doc)
+
+    operations = [ReplaceOne({"file_path": doc["file_path"]}, doc, upsert=True) for doc in batch]
+    failed = set()
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        written_count = result.upserted_count + result.modified_count
+    except BulkWriteError as e:
+        details = e.details
+        failed = _failed_indexes(e)
+        print(f"[WARNING] Batch upsert partially failed: {len(failed)} write errors")
+        written_count = details.get('nUpserted', 0) + details.get('nModified', 0)
+
+    written = [doc for index, doc in enumerate(batch) if index not in failed]
+    deltas = accumulate_rollup_deltas({}, written)
+    accumulate_rollup_deltas(
+        deltas, (previous[doc["file_path"]] for doc in written if doc["file_path"] in previous), sign=-1
+    )
+    apply_rollup_deltas(collection.database, deltas)
+    return written_count
+
+
+def delete_vanished_records(collection, stale_paths, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Deletes records whose source files no longer exist and removes them from
+    the daily rollups. Returns the number deleted.
+    """
+    stale_paths = sorted(stale_paths)
+    deleted_count = 0
+    for start in range(0, len(stale_paths), batch_size):
+        chunk = stale_paths[start:start + batch_size]
+        query = {"file_path": {"$in": chunk}}
+        deltas = accumulate_rollup_deltas({}, collection.find(query, {**ROLLUP_SOURCE_PROJECTION, "_id": 0}), sign=-1)
+        deleted_count += collection.delete_many(query).deleted_count
+        apply_rollup_deltas(collection.database, deltas)
+    return deleted_count
+
+
 def main():
     """Main function to drive the database population."""
     print("[DEBUG] Starting DB population...")
@@ -207,8 +352,52 @@ def main():
         required=True, 
         help='The directory where MongoDB should store its data files.\nExample: D:\\ARDataAnalysis\\db'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of worker processes for metadata extraction.\nDefaults to 1 (serial extraction).'
+    )
+    parser.add_argument(
+        '--scan_threads',
+        type=int,
+        default=1,
+        help='Number of threads for the directory scan (one walk per top-level\nsubdirectory). Defaults to 1.'
+    )
+    parser.add_argument(
+        '--batch_size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Number of documents per insert_many batch.\nDefaults to {DEFAULT_BATCH_SIZE}.'
+    )
+    parser.add_argument(
+        '--checkpoint_every',
+        type=int,
+        default=DEFAULT_CHECKPOINT_EVERY,
+        help=f'Print a progress checkpoint every N files.\nDefaults to {DEFAULT_CHECKPOINT_EVERY}.'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only re-parse new or changed files, upsert them and delete records\nfor files that no longer exist, instead of rebuilding the collection.'
+    )
+    parser.add_argument(
+        '--metadata_cache',
+        default=str(DEFAULT_CACHE_PATH),
+        help='SQLite file used to cache parsed EXIF/ID3 headers between runs.'
+    )
+    parser.add_argument(
+        '--no_cache',
+        action='store_true',
+        help='Disable the metadata cache and re-parse every file header.'
+    )
+    parser.add_argument(
+        '--hash',
+        action='store_true',
+        help='Include a SHA-256 of the file contents in each fingerprint.'
+    )
     args = parser.parse_args()
-    print(f"[DEBUG] Arguments parsed: source_dir={args.source_dir}, db_path={args.db_path}")
+    print(f"[DEBUG] Arguments parsed: source_dir={args.source_dir}, db_path={args.db_path}, workers={args.workers}")
 
     # Determine the source directory
     if args.source_dir:
@@ -221,69 +410,150 @@ def main():
     
     # Precompute collection days for tagging
     print("Precomputing collection days from school calendar...")
-    school_calendar = get_school_calendar()
-    non_collection_days = get_non_collection_days()
-    collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
+    collection_day_map = get_collection_calendar()
     print(f"Identified {len(collection_day_map)} valid collection days across all school periods.")
 
     # --- Connect to DB ---
     print("[DEBUG] Connecting to database...")
-    db = get_db_connection()
+    db = get_db_connection(ensure_indexes=True)
     if db is None:
         print("[ERROR] Database connection failed - exiting")
         return # Exit if connection fails
     print("[DEBUG] Database connection successful")
 
-    # --- Clear existing data ---
     collection_name = 'media_records'
-    print(f"\nClearing existing data from collection: '{collection_name}'...")
-    db[collection_name].delete_many({})
-    print("Collection cleared.")
+    collection = db[collection_name]
+    existing_fingerprints = {}
+    if args.incremental:
+        # --- Load fingerprints of what is already stored ---
+        existing_fingerprints = load_existing_fingerprints(collection)
+        print(f"\nIncremental mode: {len(existing_fingerprints)} existing records in '{collection_name}'")
+    else:
+        # --- Clear existing data ---
+        print(f"\nClearing existing data from collection: '{collection_name}'...")
+        collection.delete_many({})
+        db[DAILY_ROLLUPS_COLLECTION].delete_many({})
+        print("Collection cleared.")
 
     # --- Process Files ---
     print("[DEBUG] Scanning for media files...")
-    jpg_files, mp3_files = find_media_files(source_dir)
+    jpg_files, mp3_files = find_media_files(source_dir, scan_threads=args.scan_threads)
     all_files = jpg_files + mp3_files
     print(f"[DEBUG] Processing {len(jpg_files)} JPG and {len(mp3_files)} MP3 files (total: {len(all_files)})")
     
     if len(all_files) == 0:
         print("[WARNING] No media files found - check source directory!")
         return
-    
-    documents_to_insert = []
+
+    # --- Fingerprint files and skip unchanged ones ---
+    fingerprints = {}
+    files_to_process = []
+    unchanged_count = 0
+    # Still on disk, so their existing records must not be treated as vanished
+    current_paths = set()
+    for file in all_files:
+        try:
+            fingerprint = compute_file_fingerprint(file, include_hash=args.hash)
+        except OSError as e:
+            print(f"[WARNING] Could not stat {file.name}: {e}")
+            files_to_process.append(file)
+            current_paths.add(str(file.resolve()))
+            continue
+        fingerprints[file] = fingerprint
+        if existing_fingerprints.get(fingerprint["path"]) == fingerprint:
+            unchanged_count += 1
+        else:
+            files_to_process.append(file)
+
+    current_paths.update(fp["path"] for fp in fingerprints.values())
+    stale_paths = set(existing_fingerprints) - current_paths
+    if args.incremental:
+        print(f"[DEBUG] {unchanged_count} unchanged, {len(files_to_process)} new or changed, "
+              f"{len(stale_paths)} vanished")
+
+    write_batch = upsert_document_batch if args.incremental else insert_document_batch
+    batch_size = max(1, args.batch_size)
+    checkpoint_every = max(1, args.checkpoint_every)
+    batch = []
+    inserted_count = 0
     processed_count = 0
     error_count = 0
 
-    for file in all_files:
-        print(f"[DEBUG] Reading metadata from: {file.name}")
-        doc = None
-        if file.suffix.lower() in ['.jpg', '.jpeg']:
-            doc = extract_jpg_metadata(file, collection_day_map)
-        elif file.suffix.lower() == '.mp3':
-            doc = extract_mp3_metadata(file, collection_day_map)
+    metadata_cache = None if args.no_cache else MetadataCache(args.metadata_cache)
+    if metadata_cache is not None:
+        print(f"[DEBUG] Using metadata cache: {metadata_cache.db_path}")
+
+    workers = max(1, args.workers)
+    print(f"[DEBUG] Extracting metadata with {workers} worker(s), inserting in batches of {batch_size}...")
+    extraction_start = time.perf_counter()
 
+    for files_seen, (file, doc) in enumerate(
+        iter_extracted_documents(files_to_process, collection_day_map, workers, cache=metadata_cache),
+        start=1
+    ):
         if doc:
-            documents_to_insert.append(doc)
+            if file in fingerprints:
+                doc[FINGERPRINT_FIELD] = fingerprints[file]
+            batch.append(doc)
             processed_count += 1
         else:
             print(f"[WARNING] Skipped file: {file.name} (metadata extraction failed)")
             error_count += 1
-    
-    # --- Insert into MongoDB ---
-    print(f"\n[DEBUG] Ready to insert {len(documents_to_insert)} documents into DB")
-    if documents_to_insert:
-        print(f"[DEBUG] Inserting {len(documents_to_insert)} documents into MongoDB...")
-        db[collection_name].insert_many(documents_to_insert)
-        print("[DEBUG] Database insertion complete!")
-    else:
+
+        if len(batch) >= batch_size:
+            inserted_count += write_batch(collection, batch)
+            batch = []
+
+        if files_seen % checkpoint_every == 0:
+            elapsed = time.perf_counter() - extraction_start
+            rate = files_seen / elapsed if elapsed > 0 else 0.0
+            print(f"[CHECKPOINT] {files_seen}/{len(files_to_process)} files, "
+                  f"{inserted_count} inserted, {error_count} errors ({rate:.1f} files/sec)")
+
+    # --- Flush the final partial batch ---
+    inserted_count += write_batch(collection, batch)
+    batch = []
+    if metadata_cache is not None:
+        if workers == 1:
+            cache_stats = metadata_cache.stats()
+            print(f"[DEBUG] Metadata cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        metadata_cache.close()
+
+    # --- Remove records for files that have vanished ---
+    deleted_count = 0
+    if args.incremental and stale_paths:
+        deleted_count = delete_vanished_records(collection, stale_paths, batch_size)
+        print(f"[DEBUG] Deleted {deleted_count} records for vanished files")
+
+    extraction_elapsed = time.perf_counter() - extraction_start
+    files_per_second = len(files_to_process) / extraction_elapsed if extraction_elapsed > 0 else 0.0
+    print(f"[DEBUG] Ingest took {extraction_elapsed:.2f}s ({files_per_second:.1f} files/sec)")
+    print(f"[DEBUG] Database insertion complete: {inserted_count} documents inserted")
+
+    if processed_count == 0 and not args.incremental:
         print("[ERROR] No valid documents found to insert - check metadata extraction!")
         raise RuntimeError("No documents parsed -- check metadata extraction.")
 
+    # --- Materialize the calendar used for server-side zero-filling ---
+    calendar_day_count = materialize_calendar_days(db)
+    print(f"[DEBUG] Materialized {calendar_day_count} calendar days")
+
+    # --- Check the incrementally maintained daily rollups ---
+    if ensure_daily_rollups(db):
+        print("[WARNING] daily_rollups was out of sync with media_records and has been rebuilt")
+    else:
+        print(f"[DEBUG] daily_rollups in sync ({db[DAILY_ROLLUPS_COLLECTION].count_documents({})} documents)")
+
     # --- Summary ---
     print("\n==================== SUMMARY ====================")
     print(f"Total files scanned: {len(all_files)}")
     print(f"Successfully processed and prepared for DB: {processed_count}")
+    print(f"Documents inserted into DB: {inserted_count}")
+    if args.incremental:
+        print(f"Unchanged files (skipped): {unchanged_count}")
+        print(f"Records deleted for vanished files: {deleted_count}")
     print(f"Files with errors (skipped): {error_count}")
+    print(f"Ingest throughput: {files_per_second:.1f} files/sec ({workers} worker(s))")
     print("==============================================")
 
 
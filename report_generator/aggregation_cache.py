@@ -0,0 +1,350 @@
+"""
+Aggregation Result Cache
+========================
+
+One cache of aggregation results shared by the dashboard and every sheet
+creator in a report run, so a pipeline that feeds several sheets runs once.
+
+Entries are keyed on a SHA-256 of the canonical JSON form of the full
+pipeline (base filter included) and the collection name, so the key does not
+depend on which creator asked or what the result was labelled. Dict key order
+is kept rather than sorted: it is significant to MongoDB ($sort keys,
+compound _id documents, $project field order).
+
+Cached DataFrames never leave the cache. Every hit returns a fresh copy, with
+list and dict cells copied too, so a sheet that adds columns (ACF/PACF, totals)
+or edits cells cannot change what the next sheet gets.
+
+DiskAggregationCache adds a second tier that survives between runs: results
+are written as Parquet files keyed on the pipeline key and a fingerprint of
+every collection the pipeline reads (document count, collStats size and the
+newest _creation_timestamp when that field is indexed). Hashing every
+document with the server's dbHash command catches in-place edits the cheap
+fingerprint misses, but reads the whole collection; it is opt-in
+(use_db_hash). Re-running the report against unchanged data reads every
+result from disk and only asks MongoDB for the fingerprints. Parquet support
+needs pyarrow; without it the disk tier is disabled.
+
+Usage:
+    cache = AggregationCache(disk_cache=DiskAggregationCache(db, '.aggregation_cache'))
+    df = cache.fetch(full_pipeline, 'media_records', lambda: run(full_pipeline), label='DAILY_COUNTS_ALL')
+    cache.print_summary()
+"""
+
+import copy
+import datetime
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+from bson import json_util
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Bump when the on-disk layout of cached results changes
+DISK_CACHE_VERSION = 1
+
+# Lossless JSON for cells Parquet cannot hold as-is (lists, dicts, mixed types)
+_CELL_JSON_OPTIONS = json_util.JSONOptions(json_mode=json_util.JSONMode.CANONICAL, tz_aware=False)
+_JSON_COLUMNS_METADATA_KEY = b'ar_json_columns'
+
+
+def _encode_value(value):
+    """JSON encoding for the non-JSON values that can appear in a pipeline."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return {"$date": value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    # ObjectId, Decimal128, Regex, ...
+    return {"$" + type(value).__name__: str(value)}
+
+
+def pipeline_cache_key(pipeline, collection_name='media_records'):
+    """
+    Returns the deterministic cache key of a pipeline run on a collection.
+
+    Args:
+        pipeline (list): Full aggregation pipeline, including any base filter.
+        collection_name (str): Collection the pipeline runs on.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    canonical = json.dumps(
+        [collection_name, pipeline], default=_encode_value, separators=(',', ':'), ensure_ascii=True
+    )
+    return hashlib.sha256(canonical.encode('ascii')).hexdigest()
+
+
+def _detached_copy(frame):
+    """Copies a DataFrame including the lists and dicts held in object columns."""
+    frame = frame.copy(deep=True)
+    for position, dtype in enumerate(frame.dtypes):
+        if dtype != object:
+            continue
+        values = frame.iloc[:, position]
+        if any(isinstance(value, (list, dict)) for value in values):
+            frame.isetitem(position, [copy.deepcopy(value) for value in values])
+    return frame
+
+
+def referenced_collections(pipeline, collection_name):
+    """Returns the collections a pipeline reads: its own plus $unionWith/$lookup sources."""
+    names = {collection_name}
+
+    def visit(value):
+        if isinstance(value, dict):
+            for operator in ('$unionWith', '$lookup'):
+                spec = value.get(operator)
+                if isinstance(spec, str):
+                    names.add(spec)
+                elif isinstance(spec, dict):
+                    names.add(spec.get('coll') or spec.get('from'))
+            for item in value.values():
+                visit(item)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item)
+
+    visit(pipeline)
+    names.discard(None)
+    return sorted(names)
+
+
+class DiskAggregationCache:
+    """
+    Parquet files of aggregation results that stay valid while the
+    collections they were computed from are unchanged.
+    """
+
+    def __init__(self, db, cache_dir, use_db_hash=False):
+        """
+        Args:
+            db: MongoDB database connection (used for fingerprints only)
+            cache_dir (str or Path): Directory holding the Parquet files.
+            use_db_hash (bool): Add the server's dbHash of each collection to
+                its fingerprint. Detects edits that keep count and size, at
+                the cost of reading every document on every run.
+        """
+        self.db = db
+        self.cache_dir = Path(cache_dir)
+        self.use_db_hash = use_db_hash
+        # Fingerprints are taken once per run; the data does not change mid-report
+        self._fingerprints = {}
+        self._fingerprint_lock = threading.Lock()
+
+    def collection_fingerprint(self, collection_name):
+        """
+        Cheap summary of a collection's contents.
+
+        Returns:
+            dict: Document count, collStats size, newest _creation_timestamp
+                  (when indexed) and, with use_db_hash, the dbHash md5.
+        """
+        with self._fingerprint_lock:
+            if collection_name not in self._fingerprints:
+                self._fingerprints[collection_name] = self._take_fingerprint(collection_name)
+            return self._fingerprints[collection_name]
+
+    def _take_fingerprint(self, collection_name):
+        collection = self.db[collection_name]
+        fingerprint = {'count': collection.estimated_document_count()}
+        try:
+            fingerprint['size'] = self.db.command('collStats', collection_name).get('size')
+        except Exception as e:
+            print(f"[DISK_CACHE] Could not read collStats of '{collection_name}': {e}")
+        # Only read the newest document through an index; a sort without one scans the collection
+        if _has_index_on(collection, '_creation_timestamp'):
+            newest = list(collection.find({}, {'_creation_timestamp': 1}).sort('_creation_timestamp', -1).limit(1))
+            fingerprint['newest'] = str(newest[0].get('_creation_timestamp')) if newest else None
+        if self.use_db_hash:
+            try:
+                fingerprint['md5'] = self.db.command('dbHash', collections=[collection_name])['collections'].get(collection_name)
+            except Exception as e:
+                print(f"[DISK_CACHE] dbHash is not available for '{collection_name}': {e}")
+        return fingerprint
+
+    def _path(self, key, pipeline, collection_name):
+        fingerprints = {name: self.collection_fingerprint(name)
+                        for name in referenced_collections(pipeline, collection_name)}
+        data_key = hashlib.sha256(
+            json.dumps([DISK_CACHE_VERSION, fingerprints], sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        return self.cache_dir / f"{key}-{data_key[:16]}.parquet"
+
+    def load(self, key, pipeline, collection_name):
+        """Returns the cached DataFrame for the current data, or None."""
+        path = self._path(key, pipeline, collection_name)
+        if not path.exists():
+            return None
+        try:
+            return _read_parquet(path)
+        except Exception as e:
+            print(f"[DISK_CACHE] Ignoring unreadable cache file {path.name}: {e}")
+            return None
+
+    def store(self, key, pipeline, collection_name, frame):
+        """
+        Writes a result for the current data, replacing entries computed from
+        older data. Results that would not read back identically are skipped.
+
+        Returns:
+            bool: True if the result was written.
+        """
+        if frame.empty or not isinstance(frame.index, pd.RangeIndex) or frame.index.start != 0 \
+                or not all(isinstance(column, str) for column in frame.columns) or frame.columns.has_duplicates:
+            return False
+
+        path = self._path(key, pipeline, collection_name)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            _write_parquet(frame, temporary)
+            pd.testing.assert_frame_equal(_read_parquet(temporary), frame, check_exact=True)
+        except Exception:
+            temporary.unlink(missing_ok=True)
+            return False
+
+        for stale in self.cache_dir.glob(f"{key}-*.parquet"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        os.replace(temporary, path)
+        return True
+
+
+def _has_index_on(collection, field):
+    """True if an index of the collection starts with the given field."""
+    try:
+        return any(info['key'][0][0] == field for info in collection.index_information().values())
+    except Exception:
+        return False
+
+
+def _needs_json(values):
+    """True if an object column holds anything besides strings and missing values."""
+    return any(value is not None and not isinstance(value, str) for value in values)
+
+
+def _write_parquet(frame, path):
+    frame = frame.copy(deep=False)
+    json_columns = []
+    for position, dtype in enumerate(frame.dtypes):
+        values = frame.iloc[:, position]
+        if dtype == object and _needs_json(values):
+            frame.isetitem(position, pd.Series(
+                [None if value is None else json_util.dumps(value, json_options=_CELL_JSON_OPTIONS)
+                 for value in values],
+                dtype=object
+            ))
+            json_columns.append(frame.columns[position])
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_JSON_COLUMNS_METADATA_KEY] = json.dumps(json_columns).encode('utf-8')
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def _read_parquet(path):
+    table = pq.read_table(path)
+    json_columns = json.loads((table.schema.metadata or {}).get(_JSON_COLUMNS_METADATA_KEY, b'[]'))
+    frame = table.to_pandas()
+    for column in json_columns:
+        frame[column] = pd.Series(
+            [None if value is None else json_util.loads(value, json_options=_CELL_JSON_OPTIONS)
+             for value in frame[column].astype(object)],
+            dtype=object
+        )
+    return frame
+
+
+class AggregationCache:
+    """
+    Report-run cache of aggregation results, keyed on pipeline content,
+    optionally backed by a DiskAggregationCache.
+
+    Safe to share between threads: different pipelines run concurrently,
+    while a second request for a pipeline that is still running waits for
+    that result instead of running it again.
+    """
+
+    def __init__(self, disk_cache=None):
+        self._frames = {}
+        self.disk_cache = disk_cache
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def __len__(self):
+        return len(self._frames)
+
+    def fetch(self, pipeline, collection_name, run, label=None):
+        """
+        Returns the cached result of a pipeline, running it on a miss.
+
+        Args:
+            pipeline (list): Full aggregation pipeline, including any base filter.
+            collection_name (str): Collection the pipeline runs on.
+            run (callable): Returns the result DataFrame; called only on a miss.
+                If it raises, nothing is cached and the exception propagates.
+            label (str, optional): Name used in log messages.
+
+        Returns:
+            pandas.DataFrame: A copy the caller is free to modify.
+        """
+        key = pipeline_cache_key(pipeline, collection_name)
+        label = label or key[:12]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            cached = self._frames.get(key)
+            if cached is not None:
+                self._count('hits')
+                print(f"[CACHE HIT] Reusing aggregation result for {label}")
+                return _detached_copy(cached)
+
+            if self.disk_cache is not None:
+                cached = self.disk_cache.load(key, pipeline, collection_name)
+                if cached is not None:
+                    self._count('disk_hits')
+                    print(f"[CACHE HIT] Loaded aggregation result for {label} from disk")
+                    self._frames[key] = cached
+                    return _detached_copy(cached)
+
+            self._count('misses')
+            print(f"[CACHE MISS] Running aggregation for {label}")
+            result = run()
+            if isinstance(result, pd.DataFrame):
+                self._frames[key] = _detached_copy(result)
+                if self.disk_cache is not None and self.disk_cache.store(key, pipeline, collection_name, result):
+                    self._count('disk_writes')
+            return result
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def clear(self):
+        """Drops every cached result (statistics are kept)."""
+        self._frames.clear()
+
+    def print_summary(self):
+        """Prints the hit/miss counts for the run."""
+        lookups = self.stats['hits'] + self.stats['disk_hits'] + self.stats['misses']
+        if not lookups:
+            return
+        summary = (f"[CACHE] {self.stats['hits']} hit(s), {self.stats['misses']} miss(es) "
+                   f"over {lookups} aggregation request(s); {len(self._frames)} result(s) cached")
+        if self.disk_cache is not None:
+            summary += (f"; disk: {self.stats['disk_hits']} hit(s), {self.stats['disk_writes']} written "
+                        f"to {self.disk_cache.cache_dir}")
+        print(summary)
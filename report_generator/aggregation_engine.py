@@ -0,0 +1,1088 @@
+"""
+In-Process Aggregation Engine
+=============================
+
+This module evaluates MongoDB aggregation pipelines against a pandas
+DataFrame instead of the server. It implements the subset of the aggregation
+language used by the pipelines/ package ($match, $group, $project,
+$addFields, $sort, $facet, $unionWith and the expression operators they
+use), vectorized over NumPy arrays.
+
+Documents are represented as DataFrame rows. Embedded documents produced by a
+$group with a compound _id are flattened into dotted columns ("_id.Year"),
+and converted back to nested dicts by frame_to_documents(). Missing fields
+and nulls are both stored as None/NaN; the frame's "null_fields" attribute
+lists the columns whose None values are real nulls (accumulator and operator
+results), everywhere else a None is a missing field and is left out of the
+result documents, as MongoDB does.
+
+Anything outside the supported subset raises UnsupportedPipelineError so the
+caller can fall back to running the pipeline on MongoDB.
+"""
+
+import datetime
+import decimal
+import operator
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+class UnsupportedPipelineError(Exception):
+    """Raised when a pipeline uses a stage or operator the engine does not implement."""
+
+
+class AggregationEngineError(Exception):
+    """Raised where MongoDB would fail the aggregation (e.g. division by zero)."""
+
+
+# BSON comparison order of the value types the engine handles
+_RANK_NULL, _RANK_NUMBER, _RANK_STRING, _RANK_OBJECT, _RANK_ARRAY, _RANK_BOOL, _RANK_DATE = range(7)
+
+_COMPARISON_OPS = {
+    '$eq': operator.eq, '$ne': operator.ne,
+    '$gt': operator.gt, '$gte': operator.ge,
+    '$lt': operator.lt, '$lte': operator.le
+}
+
+# Type rank of object arrays whose non-null values share one type (by infer_dtype)
+_UNIFORM_RANKS = {
+    'empty': _RANK_NULL, 'string': _RANK_STRING, 'boolean': _RANK_BOOL,
+    'integer': _RANK_NUMBER, 'floating': _RANK_NUMBER, 'mixed-integer-float': _RANK_NUMBER,
+    'decimal': _RANK_NUMBER
+}
+
+# MongoDB $dateToString specifiers that strftime understands unchanged
+_DATE_FORMAT_SPECIFIERS = set('YmdHMSj%')
+
+
+# =============================================================================
+# Value helpers
+# =============================================================================
+
+def _is_missing(value):
+    if value is None or value is pd.NA or value is pd.NaT:
+        return True
+    return isinstance(value, (float, np.floating)) and np.isnan(value)
+
+
+def _scalar_rank(value):
+    if _is_missing(value):
+        return _RANK_NULL
+    if isinstance(value, (bool, np.bool_)):
+        return _RANK_BOOL
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return _RANK_NUMBER
+    if isinstance(value, str):
+        return _RANK_STRING
+    if isinstance(value, dict):
+        return _RANK_OBJECT
+    if isinstance(value, (list, tuple)):
+        return _RANK_ARRAY
+    if isinstance(value, (datetime.datetime, datetime.date, np.datetime64)):
+        return _RANK_DATE
+    raise UnsupportedPipelineError(f"Unsupported value type: {type(value).__name__}")
+
+
+def _type_ranks(values):
+    """Returns the BSON type rank of each element."""
+    kind = values.dtype.kind
+    if kind in 'iu':
+        return np.full(len(values), _RANK_NUMBER)
+    if kind == 'f':
+        return np.where(np.isnan(values), _RANK_NULL, _RANK_NUMBER)
+    if kind == 'b':
+        return np.full(len(values), _RANK_BOOL)
+    if kind == 'M':
+        return np.where(np.isnat(values), _RANK_NULL, _RANK_DATE)
+    rank = _UNIFORM_RANKS.get(pd.api.types.infer_dtype(values, skipna=True))
+    if rank is not None:
+        return np.where(pd.isna(values), _RANK_NULL, rank)
+    return np.fromiter((_scalar_rank(v) for v in values), dtype=np.int64, count=len(values))
+
+
+def _column_values(series):
+    """
+    Returns a column as a NumPy array: numeric, bool and datetime columns
+    as-is, everything else as an object array with None for missing values.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = np.asarray(series.cat.categories, dtype=object)
+        codes = series.cat.codes.to_numpy()
+        values = categories.take(codes) if len(categories) else np.full(len(codes), None, dtype=object)
+        values[codes < 0] = None
+        return values
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufMO':
+        return series.to_numpy()
+    return series.to_numpy(dtype=object, na_value=None)
+
+
+def _broadcast(value, n):
+    """Turns a scalar expression result into an array of length n."""
+    if isinstance(value, np.ndarray):
+        return value
+    if _is_missing(value):
+        return np.full(n, None, dtype=object)
+    if isinstance(value, (bool, np.bool_)):
+        return np.full(n, bool(value))
+    if isinstance(value, (int, np.integer)):
+        return np.full(n, int(value), dtype=np.int64)
+    if isinstance(value, (float, np.floating)):
+        return np.full(n, float(value))
+    if isinstance(value, (datetime.datetime, np.datetime64)):
+        return np.full(n, np.datetime64(value, 'ns'))
+    values = np.empty(n, dtype=object)
+    values.fill(value)
+    return values
+
+
+def _numeric(values):
+    """Numeric view of values; non-numeric elements (including bools) become NaN."""
+    if not isinstance(values, np.ndarray):
+        if isinstance(values, (bool, np.bool_)) or not isinstance(values, (int, float, np.number)):
+            return np.nan
+        return values
+    kind = values.dtype.kind
+    if kind in 'iuf':
+        return values
+    if kind == 'b':
+        return np.full(len(values), np.nan)
+    if kind != 'O':
+        raise UnsupportedPipelineError(f"Arithmetic on {values.dtype} values is not supported")
+    rank = _UNIFORM_RANKS.get(pd.api.types.infer_dtype(values, skipna=True))
+    if rank == _RANK_NUMBER:
+        return values.astype(float)
+    if rank is not None:
+        return np.full(len(values), np.nan)
+    return np.fromiter(
+        (v if isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_)) else np.nan
+         for v in values),
+        dtype=float, count=len(values)
+    )
+
+
+def _is_integer(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in 'iu'
+    return isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_))
+
+
+def _truthy(value):
+    """MongoDB truthiness: null, missing, false and 0 are false."""
+    if not isinstance(value, np.ndarray):
+        return not (_is_missing(value) or value is False or (_scalar_rank(value) == _RANK_NUMBER and value == 0))
+    kind = value.dtype.kind
+    if kind == 'b':
+        return value
+    if kind in 'iuf':
+        return (value != 0) & ~np.isnan(value.astype(float))
+    if kind == 'M':
+        return ~np.isnat(value)
+    rank = _UNIFORM_RANKS.get(pd.api.types.infer_dtype(value, skipna=True))
+    if rank in (_RANK_NULL, _RANK_STRING):
+        return ~pd.isna(value)
+    if rank is not None:
+        return _truthy(_numeric(value) if rank == _RANK_NUMBER else np.where(pd.isna(value), False, value).astype(bool))
+    return np.fromiter((_truthy(v) for v in value), dtype=bool, count=len(value))
+
+
+def _where(condition, if_true, if_false, n):
+    """np.where that never coerces mixed types to strings."""
+    if not isinstance(condition, np.ndarray):
+        return if_true if condition else if_false
+    a, b = _broadcast(if_true, n), _broadcast(if_false, n)
+    if a.dtype != b.dtype and not (a.dtype.kind in 'iuf' and b.dtype.kind in 'iuf'):
+        a, b = a.astype(object), b.astype(object)
+    return np.where(condition, a, b)
+
+
+def _to_python(value):
+    """Converts a NumPy scalar to the Python value pymongo would return."""
+    if _is_missing(value):
+        return None
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value).to_pydatetime()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _ranks(values):
+    return _type_ranks(values) if isinstance(values, np.ndarray) else _scalar_rank(values)
+
+
+def _compare(op, left, right, n):
+    """Aggregation comparison ($eq, $gt, ...) using BSON type order."""
+    compare = _COMPARISON_OPS[op]
+    left_ranks, right_ranks = _ranks(left), _ranks(right)
+    if not isinstance(left, np.ndarray) and not isinstance(right, np.ndarray):
+        if left_ranks != right_ranks or left_ranks == _RANK_NULL:
+            return compare(left_ranks, right_ranks)
+        return compare(left, right)
+
+    # Values of different types compare by type order; same-typed values by value
+    result = np.broadcast_to(compare(left_ranks, right_ranks), (n,)).copy()
+    same = np.flatnonzero(np.broadcast_to((left_ranks == right_ranks) & (left_ranks != _RANK_NULL), (n,)))
+    if same.size:
+        lv = left[same] if isinstance(left, np.ndarray) else left
+        rv = right[same] if isinstance(right, np.ndarray) else right
+        try:
+            result[same] = compare(lv, rv)
+        except TypeError:
+            lv, rv = _broadcast(lv, same.size), _broadcast(rv, same.size)
+            result[same] = np.fromiter((compare(a, b) for a, b in zip(lv, rv)), dtype=bool, count=same.size)
+    return result
+
+
+def _map_distinct(values, function):
+    """
+    Applies function to the distinct values of an array and maps the results
+    back; date and string conversions see a few hundred distinct dates
+    rather than one value per document.
+    """
+    codes, uniques = pd.factorize(values)
+    converted = _broadcast(function(np.asarray(uniques)), len(uniques))
+    if (codes < 0).any():
+        converted = np.append(converted.astype(object), None)
+    return converted.take(codes)
+
+
+# =============================================================================
+# Field access
+# =============================================================================
+
+def _field_values(frame, path):
+    """Values of a field path ("ISO_Date", "_id.Year") for every row."""
+    n = len(frame)
+    if path in frame.columns:
+        return _column_values(frame[path])
+
+    prefix = path + '.'
+    subfields = [c for c in frame.columns if c.startswith(prefix)]
+    if subfields:
+        columns = [_column_values(frame[c]) for c in subfields]
+        names = [c[len(prefix):] for c in subfields]
+        values = np.empty(n, dtype=object)
+        for i, row in enumerate(zip(*columns)):
+            values[i] = _unflatten(names, [_to_python(v) for v in row], omit_missing=True)
+        return values
+
+    root, _, rest = path.partition('.')
+    if rest and root in frame.columns:
+        values = np.empty(n, dtype=object)
+        for i, value in enumerate(_column_values(frame[root])):
+            for part in rest.split('.'):
+                value = value.get(part) if isinstance(value, dict) else None
+            values[i] = value
+        return values
+
+    return np.full(n, None, dtype=object)
+
+
+def _unflatten(names, values, omit_missing=False):
+    document = {}
+    for name, value in zip(names, values):
+        if omit_missing and value is None:
+            continue
+        target = document
+        *parents, leaf = name.split('.')
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return document
+
+
+def _null_fields(frame):
+    return frame.attrs.get('null_fields', frozenset())
+
+
+def _with_null_fields(frame, fields):
+    frame.attrs['null_fields'] = frozenset(c for c in fields if c in frame.columns)
+    return frame
+
+
+def frame_to_documents(frame):
+    """Converts an engine frame back into a list of documents."""
+    columns = list(frame.columns)
+    arrays = [_column_values(frame[c]) for c in columns]
+    # Columns whose None values are nulls rather than missing fields
+    keep = [c == '_id' or c in _null_fields(frame) for c in columns]
+    documents = []
+    for row in zip(*arrays):
+        document = {}
+        for column, value, keep_null in zip(columns, row, keep):
+            value = _to_python(value)
+            if value is None and not keep_null:
+                continue
+            target = document
+            *parents, leaf = column.split('.')
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+        documents.append(document)
+    return documents
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+def _args(raw):
+    return raw if isinstance(raw, list) else [raw]
+
+
+def evaluate_expression(expression, frame):
+    """
+    Evaluates an aggregation expression over every row of the frame.
+
+    Returns:
+        A NumPy array with one value per row, or a scalar for constant
+        expressions.
+    """
+    if isinstance(expression, str):
+        if expression.startswith('$$'):
+            raise UnsupportedPipelineError(f"Variables are not supported: {expression}")
+        if expression.startswith('$'):
+            return _field_values(frame, expression[1:])
+        return expression
+    if isinstance(expression, list):
+        values = [evaluate_expression(e, frame) for e in expression]
+        if any(isinstance(v, np.ndarray) for v in values):
+            raise UnsupportedPipelineError("Array expressions over fields are not supported")
+        return values
+    if isinstance(expression, dict):
+        if len(expression) == 1:
+            (name, argument), = expression.items()
+            if name.startswith('$'):
+                handler = _EXPRESSION_OPERATORS.get(name)
+                if handler is None:
+                    raise UnsupportedPipelineError(f"Unsupported expression operator: {name}")
+                return handler(argument, frame)
+        raise UnsupportedPipelineError("Object expressions are only supported as $group keys")
+    return expression
+
+
+def _op_literal(argument, frame):
+    return argument
+
+
+def _categorical_equals(frame, field, value):
+    """Fast equality of a categorical column with a string, or None if not applicable."""
+    column = frame[field] if field in frame.columns else None
+    if column is None or not isinstance(column.dtype, pd.CategoricalDtype) or not isinstance(value, str):
+        return None
+    return column.eq(value).to_numpy(dtype=bool, na_value=False)
+
+
+def _op_comparison(name):
+    def handler(argument, frame):
+        arguments = _args(argument)
+        if name in ('$eq', '$ne'):
+            for path, value in (arguments, arguments[::-1]):
+                if _is_field_path(path):
+                    equals = _categorical_equals(frame, path[1:], value)
+                    if equals is not None:
+                        return equals if name == '$eq' else ~equals
+        left, right = (evaluate_expression(a, frame) for a in arguments)
+        return _compare(name, left, right, len(frame))
+    return handler
+
+
+def _op_and(argument, frame):
+    result = True
+    for a in _args(argument):
+        result = result & _truthy(evaluate_expression(a, frame))
+    return result
+
+
+def _op_or(argument, frame):
+    result = False
+    for a in _args(argument):
+        result = result | _truthy(evaluate_expression(a, frame))
+    return result
+
+
+def _op_not(argument, frame):
+    value = _truthy(evaluate_expression(_args(argument)[0], frame))
+    return ~value if isinstance(value, np.ndarray) else not value
+
+
+def _op_in(argument, frame):
+    value, array = (evaluate_expression(a, frame) for a in argument)
+    if not isinstance(array, list):
+        raise UnsupportedPipelineError("$in is only supported with a literal array")
+    if not isinstance(value, np.ndarray):
+        return any(not _compare('$ne', value, item, 1) for item in array)
+    result = np.zeros(len(value), dtype=bool)
+    for item in array:
+        result |= _compare('$eq', value, item, len(value))
+    return result
+
+
+def _op_cond(argument, frame):
+    if isinstance(argument, dict):
+        condition, if_true, if_false = argument['if'], argument['then'], argument['else']
+    else:
+        condition, if_true, if_false = argument
+    test = _truthy(evaluate_expression(condition, frame))
+    if not isinstance(test, np.ndarray):
+        return evaluate_expression(if_true if test else if_false, frame)
+    return _where(test, evaluate_expression(if_true, frame), evaluate_expression(if_false, frame), len(frame))
+
+
+def _op_switch(argument, frame):
+    if 'default' not in argument:
+        raise UnsupportedPipelineError("$switch without a default is not supported")
+    result = evaluate_expression(argument['default'], frame)
+    for branch in reversed(argument['branches']):
+        test = _truthy(evaluate_expression(branch['case'], frame))
+        result = _where(test, evaluate_expression(branch['then'], frame), result, len(frame))
+    return result
+
+
+def _op_if_null(argument, frame):
+    arguments = _args(argument)
+    result = evaluate_expression(arguments[-1], frame)
+    for a in reversed(arguments[:-1]):
+        value = evaluate_expression(a, frame)
+        if isinstance(value, np.ndarray):
+            result = _where(_type_ranks(value) != _RANK_NULL, value, result, len(frame))
+        elif not _is_missing(value):
+            result = value
+    return result
+
+
+def _arithmetic(name, function):
+    def handler(argument, frame):
+        values = [evaluate_expression(a, frame) for a in _args(argument)]
+        integral = all(_is_integer(v) for v in values)
+        numbers = [_numeric(v) for v in values]
+        if name == '$divide':
+            divisor = numbers[1]
+            if np.any(np.asarray(divisor) == 0):
+                raise AggregationEngineError("can't $divide by zero")
+            integral = False
+        result = numbers[0]
+        for number in numbers[1:]:
+            result = function(result, number)
+        if integral:
+            return result
+        return result.astype(float) if isinstance(result, np.ndarray) else result
+    return handler
+
+
+def _op_floor(argument, frame):
+    value = evaluate_expression(_args(argument)[0], frame)
+    return value if _is_integer(value) else np.floor(_numeric(value))
+
+
+def _round_double(value, places):
+    # MongoDB rounds a double through a 15-digit Decimal128, half to even
+    if _is_missing(value):
+        return np.nan
+    quantum = decimal.Decimal(1).scaleb(-places)
+    return float(decimal.Decimal(f"{value:.15g}").quantize(quantum, rounding=decimal.ROUND_HALF_EVEN))
+
+
+def _op_round(argument, frame):
+    arguments = _args(argument)
+    value = evaluate_expression(arguments[0], frame)
+    places = evaluate_expression(arguments[1], frame) if len(arguments) > 1 else 0
+    if _is_integer(value) and places >= 0:
+        return value
+    numbers = _numeric(value)
+    if not isinstance(numbers, np.ndarray):
+        return _round_double(numbers, places)
+    return np.fromiter((_round_double(v, places) for v in numbers), dtype=float, count=len(numbers))
+
+
+def _op_size(argument, frame):
+    value = evaluate_expression(_args(argument)[0], frame)
+    values = value if isinstance(value, np.ndarray) else np.array([value], dtype=object)
+    if any(not isinstance(v, (list, tuple)) for v in values):
+        raise AggregationEngineError("The argument to $size must be an array")
+    sizes = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+    return sizes if isinstance(value, np.ndarray) else int(sizes[0])
+
+
+def _string_scalar(value):
+    if _is_missing(value):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    if isinstance(value, (datetime.datetime, np.datetime64, pd.Timestamp)):
+        timestamp = pd.Timestamp(value)
+        return timestamp.strftime('%Y-%m-%dT%H:%M:%S.') + f"{timestamp.microsecond // 1000:03d}Z"
+    if isinstance(value, str):
+        return value
+    raise UnsupportedPipelineError(f"$toString of {type(value).__name__} is not supported")
+
+
+def _op_to_string(argument, frame):
+    value = evaluate_expression(_args(argument)[0], frame)
+    if not isinstance(value, np.ndarray):
+        return _string_scalar(value)
+    if value.dtype.kind in 'iu':
+        return _map_distinct(value, lambda uniques: uniques.astype(str).astype(object))
+    if value.dtype.kind == 'M':
+        value = value.astype(object)
+    return _map_distinct(value, lambda uniques: np.array([_string_scalar(v) for v in uniques], dtype=object))
+
+
+def _op_concat(argument, frame):
+    values = [evaluate_expression(a, frame) for a in _args(argument)]
+    if not any(isinstance(v, np.ndarray) for v in values):
+        return None if any(_is_missing(v) for v in values) else ''.join(values)
+    result = None
+    for value in values:
+        part = pd.Series(_broadcast(value, len(frame)), dtype='string')
+        result = part if result is None else result + part
+    return result.to_numpy(dtype=object, na_value=None)
+
+
+def _to_datetimes(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'M':
+            return value
+        if value.dtype.kind != 'O' or _UNIFORM_RANKS.get(pd.api.types.infer_dtype(value, skipna=True)) not in (
+                _RANK_NULL, _RANK_STRING):
+            raise UnsupportedPipelineError("Only string values can be converted to dates")
+        codes, uniques = pd.factorize(value)
+        dates = pd.to_datetime(pd.Series(np.asarray(uniques), dtype=object), format='ISO8601')
+        dates = np.append(dates.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))
+        return dates.take(codes)
+    return None if _is_missing(value) else pd.Timestamp(value).to_datetime64()
+
+
+def _op_to_date(argument, frame):
+    return _to_datetimes(evaluate_expression(_args(argument)[0], frame))
+
+
+def _op_date_from_string(argument, frame):
+    if set(argument) - {'dateString', 'format'} or argument.get('format', '%Y-%m-%d') != '%Y-%m-%d':
+        raise UnsupportedPipelineError("$dateFromString is only supported with an ISO date format")
+    return _to_datetimes(evaluate_expression(argument['dateString'], frame))
+
+
+def _date_argument(argument, frame):
+    if isinstance(argument, dict) and 'date' in argument:
+        if set(argument) != {'date'}:
+            raise UnsupportedPipelineError("Date operators with a timezone are not supported")
+        argument = argument['date']
+    return _to_datetimes(evaluate_expression(_args(argument)[0], frame))
+
+
+def _date_part(attribute):
+    def handler(argument, frame):
+        value = _date_argument(argument, frame)
+        if not isinstance(value, np.ndarray):
+            return None if value is None else getattr(pd.Timestamp(value), attribute)
+        parts = getattr(pd.DatetimeIndex(value), attribute).to_numpy()
+        if np.isnat(value).any():
+            return np.where(np.isnat(value), None, parts.astype(object))
+        return parts.astype(np.int64)
+    return handler
+
+
+def _op_date_to_string(argument, frame):
+    if set(argument) - {'format', 'date'}:
+        raise UnsupportedPipelineError("$dateToString is only supported with format and date")
+    date_format = argument.get('format', '%Y-%m-%dT%H:%M:%S.%LZ')
+    if set(re.findall(r'%(.)', date_format)) - _DATE_FORMAT_SPECIFIERS:
+        raise UnsupportedPipelineError(f"Unsupported $dateToString format: {date_format}")
+    value = _date_argument(argument['date'], frame)
+    if not isinstance(value, np.ndarray):
+        return None if value is None else pd.Timestamp(value).strftime(date_format)
+    return _map_distinct(
+        value, lambda uniques: pd.Series(uniques).dt.strftime(date_format).to_numpy(dtype=object, na_value=None)
+    )
+
+
+_EXPRESSION_OPERATORS = {
+    '$literal': _op_literal,
+    '$and': _op_and,
+    '$or': _op_or,
+    '$not': _op_not,
+    '$in': _op_in,
+    '$cond': _op_cond,
+    '$switch': _op_switch,
+    '$ifNull': _op_if_null,
+    '$add': _arithmetic('$add', operator.add),
+    '$subtract': _arithmetic('$subtract', operator.sub),
+    '$multiply': _arithmetic('$multiply', operator.mul),
+    '$divide': _arithmetic('$divide', operator.truediv),
+    '$floor': _op_floor,
+    '$round': _op_round,
+    '$size': _op_size,
+    '$toString': _op_to_string,
+    '$concat': _op_concat,
+    '$toDate': _op_to_date,
+    '$dateFromString': _op_date_from_string,
+    '$dateToString': _op_date_to_string,
+    '$year': _date_part('year'),
+    '$month': _date_part('month'),
+    '$dayOfMonth': _date_part('day'),
+    **{name: _op_comparison(name) for name in _COMPARISON_OPS},
+}
+
+
+# =============================================================================
+# $match queries
+# =============================================================================
+
+def _query_equals(frame, field, value):
+    equals = _categorical_equals(frame, field, value)
+    if equals is not None:
+        return equals
+    values = _field_values(frame, field)
+    if isinstance(value, (list, dict)):
+        raise UnsupportedPipelineError("Array and document equality in $match is not supported")
+    if _is_missing(value):
+        return _type_ranks(values) == _RANK_NULL
+    return _compare('$eq', values, value, len(frame))
+
+
+def _query_field(frame, field, condition):
+    n = len(frame)
+    if not (isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition)):
+        return _query_equals(frame, field, condition)
+
+    mask = np.ones(n, dtype=bool)
+    for name, argument in condition.items():
+        if name == '$eq':
+            mask &= _query_equals(frame, field, argument)
+        elif name == '$ne':
+            mask &= ~_query_equals(frame, field, argument)
+        elif name in ('$in', '$nin'):
+            matches = np.zeros(n, dtype=bool)
+            for item in argument:
+                matches |= _query_equals(frame, field, item)
+            mask &= matches if name == '$in' else ~matches
+        elif name in ('$gt', '$gte', '$lt', '$lte'):
+            values = _field_values(frame, field)
+            # Query comparisons only match values of the same BSON type
+            same_type = _type_ranks(values) == _scalar_rank(argument)
+            mask &= same_type & _compare(name, values, argument, n)
+        elif name == '$exists':
+            present = _type_ranks(_field_values(frame, field)) != _RANK_NULL
+            mask &= present if argument else ~present
+        else:
+            raise UnsupportedPipelineError(f"Unsupported query operator: {name}")
+    return mask
+
+
+def query_mask(frame, query):
+    """Boolean mask of the rows matching a $match query."""
+    mask = np.ones(len(frame), dtype=bool)
+    for key, condition in query.items():
+        if key == '$and':
+            for sub_query in condition:
+                mask &= query_mask(frame, sub_query)
+        elif key in ('$or', '$nor'):
+            matches = np.zeros(len(frame), dtype=bool)
+            for sub_query in condition:
+                matches |= query_mask(frame, sub_query)
+            mask &= matches if key == '$or' else ~matches
+        elif key == '$expr':
+            mask &= _broadcast(_truthy(evaluate_expression(condition, frame)), len(frame)).astype(bool)
+        elif key.startswith('$'):
+            raise UnsupportedPipelineError(f"Unsupported query operator: {key}")
+        else:
+            mask &= _query_field(frame, key, condition)
+    return mask
+
+
+# =============================================================================
+# $group accumulators
+# =============================================================================
+
+def _group_ids(keys, n):
+    """
+    Returns (group id per row, first row of each group, number of groups).
+
+    Group ids are numbered in order of first appearance.
+    """
+    ids = None
+    for key in keys:
+        try:
+            codes, uniques = pd.factorize(key, use_na_sentinel=False)
+        except TypeError:
+            raise UnsupportedPipelineError("Grouping on array or document values is not supported")
+        ids = codes if ids is None else pd.factorize(ids * len(uniques) + codes)[0]
+    n_groups = int(ids.max()) + 1
+    # A row starts a new group when its id exceeds every id before it
+    running_max = np.maximum.accumulate(ids)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = running_max[1:] > running_max[:-1]
+    return ids, np.flatnonzero(starts), n_groups
+
+
+def _group_sums(numbers, ids, n_groups):
+    # pandas sums groups with Kahan compensation, close to MongoDB's
+    # double-double summation; a plain bincount drifts in the last digits
+    return pd.Series(numbers).groupby(ids).sum().reindex(range(n_groups), fill_value=0).to_numpy()
+
+
+def _acc_sum(values, ids, n_groups):
+    counts = np.bincount(ids, minlength=n_groups)
+    if not isinstance(values, np.ndarray):
+        number = _numeric(values)
+        if _is_missing(number):
+            return np.zeros(n_groups, dtype=np.int64)
+        return counts * number
+    numbers = _numeric(values)
+    if numbers.dtype.kind in 'iu':
+        return np.bincount(ids, weights=numbers, minlength=n_groups).round().astype(np.int64)
+    return _group_sums(np.nan_to_num(numbers, nan=0.0), ids, n_groups)
+
+
+def _acc_avg(values, ids, n_groups):
+    numbers = _numeric(_broadcast(values, len(ids))).astype(float)
+    valid = ~np.isnan(numbers)
+    sums = _group_sums(np.where(valid, numbers, 0.0), ids, n_groups)
+    counts = np.bincount(ids, weights=valid, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _acc_extreme(method):
+    def accumulate(values, ids, n_groups):
+        values = _broadcast(values, len(ids))
+        present = _type_ranks(values) != _RANK_NULL
+        values, ids = values[present], ids[present]
+        if values.dtype.kind in 'iufb':
+            return pd.Series(values).groupby(ids).agg(method).reindex(range(n_groups)).to_numpy()
+        # Strings and other objects: take the extreme of their sorted codes
+        try:
+            codes, uniques = pd.factorize(values, sort=True)
+        except TypeError:
+            raise UnsupportedPipelineError(f"${method} over mixed value types is not supported")
+        extremes = pd.Series(codes).groupby(ids).agg(method).reindex(range(n_groups), fill_value=-1).to_numpy()
+        return np.append(np.asarray(uniques, dtype=object), None).take(extremes)
+    return accumulate
+
+
+def _grouped_lists(values, ids, n_groups, unique):
+    values = _broadcast(values, len(ids))
+    present = _type_ranks(values) != _RANK_NULL
+    values, ids = values[present], ids[present]
+    order = np.argsort(ids, kind='stable')
+    bounds = np.cumsum(np.bincount(ids, minlength=n_groups))[:-1]
+    result = np.empty(n_groups, dtype=object)
+    for i, chunk in enumerate(np.split(values[order], bounds)):
+        result[i] = (pd.unique(chunk) if unique else chunk).tolist()
+    return result
+
+
+_ACCUMULATORS = {
+    '$sum': _acc_sum,
+    '$avg': _acc_avg,
+    '$min': _acc_extreme('min'),
+    '$max': _acc_extreme('max'),
+    '$push': lambda values, ids, n_groups: _grouped_lists(values, ids, n_groups, unique=False),
+    '$addToSet': lambda values, ids, n_groups: _grouped_lists(values, ids, n_groups, unique=True),
+}
+
+
+# =============================================================================
+# Stages
+# =============================================================================
+
+def _stage_match(frame, query, context):
+    mask = query_mask(frame, query)
+    if mask.all():
+        return frame
+    return frame.take(np.flatnonzero(mask)).reset_index(drop=True)
+
+
+def _group_key(expression, frame):
+    # Categorical fields are factorized from their codes, not as object arrays
+    if _is_field_path(expression) and isinstance(frame.get(expression[1:], None), pd.Series):
+        column = frame[expression[1:]]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.array
+    return _broadcast(evaluate_expression(expression, frame), len(frame))
+
+
+def _stage_group(frame, spec, context):
+    key_spec = spec['_id']
+    if isinstance(key_spec, dict) and not (len(key_spec) == 1 and next(iter(key_spec)).startswith('$')):
+        key_names = [f"_id.{name}" for name in key_spec]
+        key_expressions = list(key_spec.values())
+    else:
+        key_names, key_expressions = ['_id'], [key_spec]
+
+    accumulators = {}
+    for field, accumulator in spec.items():
+        if field == '_id':
+            continue
+        (name, argument), = accumulator.items()
+        if name not in _ACCUMULATORS and name not in ('$first', '$last'):
+            raise UnsupportedPipelineError(f"Unsupported accumulator: {name}")
+        accumulators[field] = (name, argument)
+
+    n = len(frame)
+    if n == 0:
+        return _with_null_fields(pd.DataFrame(columns=key_names + list(accumulators)), accumulators)
+
+    keys = [_group_key(e, frame) for e in key_expressions]
+    ids, first_rows, n_groups = _group_ids(keys, n)
+
+    output = {name: _column_values(pd.Series(key[first_rows])) for name, key in zip(key_names, keys)}
+    for field, (name, argument) in accumulators.items():
+        values = evaluate_expression(argument, frame)
+        if name == '$first':
+            output[field] = _broadcast(values, n)[first_rows]
+        elif name == '$last':
+            last_rows = np.zeros(n_groups, dtype=np.int64)
+            np.maximum.at(last_rows, ids, np.arange(n))
+            output[field] = _broadcast(values, n)[last_rows]
+        else:
+            output[field] = _ACCUMULATORS[name](values, ids, n_groups)
+    # Accumulators always produce the field; a missing compound key part is omitted
+    return _with_null_fields(pd.DataFrame(output), accumulators)
+
+
+def _field_columns(frame, field):
+    """Columns that hold a field: the field itself or its flattened subfields."""
+    prefix = field + '.'
+    return [c for c in frame.columns if c == field or c.startswith(prefix)]
+
+
+def _stage_add_fields(frame, spec, context):
+    n = len(frame)
+    # All expressions see the input document, not each other's results
+    values = {field: _computed_value(expression, frame) for field, expression in spec.items()}
+    null_fields = (set(_null_fields(frame)) - set(spec)) | _null_results(spec)
+    frame = frame.copy()
+    for field, value in values.items():
+        frame = frame.drop(columns=[c for c in _field_columns(frame, field) if c != field])
+        frame[field] = _broadcast(value, n)
+    return _with_null_fields(frame, null_fields)
+
+
+def _is_field_path(expression):
+    return isinstance(expression, str) and expression.startswith('$') and not expression.startswith('$$')
+
+
+def _null_results(spec):
+    """Computed fields whose None values are nulls: anything but a plain field path."""
+    return {field for field, expression in spec.items() if not _is_field_path(expression)}
+
+
+def _computed_value(expression, frame):
+    if isinstance(expression, dict) and not (len(expression) == 1 and next(iter(expression)).startswith('$')):
+        raise UnsupportedPipelineError("Computed embedded documents are not supported")
+    return evaluate_expression(expression, frame)
+
+
+def _is_inclusion_flag(value):
+    return isinstance(value, (bool, int, float)) and not isinstance(value, str)
+
+
+def _stage_project(frame, spec, context):
+    n = len(frame)
+    spec = dict(spec)
+    id_spec = spec.pop('_id', True)
+
+    if spec and all(_is_inclusion_flag(v) and not v for v in spec.values()):
+        excluded = list(spec)
+        if _is_inclusion_flag(id_spec) and not id_spec:
+            excluded.append('_id')
+        elif not _is_inclusion_flag(id_spec):
+            raise UnsupportedPipelineError("Computed _id in an exclusion projection is not supported")
+        return frame.drop(columns=[c for field in excluded for c in _field_columns(frame, field)])
+
+    included = {field for field, v in spec.items() if _is_inclusion_flag(v)}
+    if any(not v for field, v in spec.items() if field in included):
+        raise UnsupportedPipelineError("Mixing inclusion and exclusion in $project is not supported")
+    computed_spec = {field: v for field, v in spec.items() if field not in included}
+    computed = {field: _computed_value(v, frame) for field, v in computed_spec.items()}
+
+    output = {}
+    if not _is_inclusion_flag(id_spec):
+        output['_id'] = _broadcast(_computed_value(id_spec, frame), n)
+    elif id_spec:
+        for column in _field_columns(frame, '_id'):
+            output[column] = frame[column].to_numpy()
+    # Included fields keep their document order; computed fields follow
+    for column in frame.columns:
+        if column.split('.')[0] in included and column.split('.')[0] != '_id':
+            output[column] = frame[column].to_numpy()
+    for field, value in computed.items():
+        output[field] = _broadcast(value, n)
+    null_fields = {c for c in _null_fields(frame) if c.split('.')[0] in included} | _null_results(computed_spec)
+    return _with_null_fields(pd.DataFrame(output, index=range(n)), null_fields)
+
+
+def _stage_sort(frame, spec, context):
+    order = np.arange(len(frame))
+    for field, direction in reversed(list(spec.items())):
+        for column in reversed(_field_columns(frame, field)):
+            values = _column_values(frame[column])[order]
+            ranks = _type_ranks(values)
+            descending = direction == -1
+            if values.dtype.kind in 'iufbM':
+                numbers = values.astype('int64' if values.dtype.kind == 'M' else float)
+                numbers = np.nan_to_num(numbers, nan=0.0) if numbers.dtype.kind == 'f' else numbers
+                sort_order = np.lexsort((-numbers, -ranks) if descending else (numbers, ranks))
+            else:
+                keyed = [(rank, v if rank != _RANK_NULL else 0) for rank, v in zip(ranks, values)]
+                try:
+                    sort_order = np.array(sorted(range(len(keyed)), key=keyed.__getitem__, reverse=descending),
+                                          dtype=np.int64)
+                except TypeError:
+                    raise UnsupportedPipelineError(f"Cannot sort on mixed values in '{column}'")
+            order = order[sort_order]
+    return frame.take(order).reset_index(drop=True)
+
+
+def _stage_facet(frame, spec, context):
+    output = {}
+    for name, sub_pipeline in spec.items():
+        documents = np.empty(1, dtype=object)
+        documents[0] = frame_to_documents(run_stages(frame, sub_pipeline, context))
+        output[name] = documents
+    return _with_null_fields(pd.DataFrame(output), ())
+
+
+def _stage_union_with(frame, spec, context):
+    if isinstance(spec, str):
+        spec = {'coll': spec}
+    loader = context.get('collection_loader')
+    if loader is None:
+        raise UnsupportedPipelineError("$unionWith needs a collection loader")
+    other = run_stages(loader(spec['coll']), spec.get('pipeline', []), context)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        combined = pd.concat([frame, other], ignore_index=True)
+    return _with_null_fields(combined, _null_fields(frame) | _null_fields(other))
+
+
+def _stage_limit(frame, limit, context):
+    return frame.iloc[:limit].reset_index(drop=True)
+
+
+def _stage_skip(frame, skip, context):
+    return frame.iloc[skip:].reset_index(drop=True)
+
+
+_STAGES = {
+    '$match': _stage_match,
+    '$group': _stage_group,
+    '$addFields': _stage_add_fields,
+    '$set': _stage_add_fields,
+    '$project': _stage_project,
+    '$sort': _stage_sort,
+    '$facet': _stage_facet,
+    '$unionWith': _stage_union_with,
+    '$limit': _stage_limit,
+    '$skip': _stage_skip,
+}
+
+
+def run_stages(frame, pipeline, context):
+    """Runs pipeline stages over a frame and returns the resulting frame."""
+    for stage in pipeline:
+        if len(stage) != 1:
+            raise UnsupportedPipelineError(f"Malformed stage: {stage}")
+        (name, spec), = stage.items()
+        handler = _STAGES.get(name)
+        if handler is None:
+            raise UnsupportedPipelineError(f"Unsupported stage: {name}")
+        null_fields = _null_fields(frame)
+        frame = handler(frame, spec, context)
+        if 'null_fields' not in frame.attrs:
+            _with_null_fields(frame, null_fields)
+    return frame
+
+
+def aggregate(frame, pipeline, collection_loader=None):
+    """
+    Evaluates an aggregation pipeline against a DataFrame of documents.
+
+    Args:
+        frame (pandas.DataFrame): One row per source document.
+        pipeline (list): MongoDB aggregation pipeline.
+        collection_loader (callable, optional): Returns the frame of another
+            collection by name, for $unionWith.
+
+    Returns:
+        list: Result documents, as collection.aggregate() would return them.
+
+    Raises:
+        UnsupportedPipelineError: The pipeline uses something the engine does
+            not implement; run it on MongoDB instead.
+    """
+    context = {'collection_loader': collection_loader}
+    # Stages may hand back their input and record null fields in attrs; a
+    # shallow copy keeps that off the caller's (possibly shared) frame
+    return frame_to_documents(run_stages(frame.copy(deep=False), pipeline, context))
+
+
+def source_fields(pipeline):
+    """
+    Returns the fields of the source collection a pipeline reads.
+
+    Only stages before the first reshaping stage ($group, $project) read the
+    source documents; fields created by $addFields along the way are not
+    source fields. $facet sub-pipelines are followed.
+    """
+    fields, created = set(), set()
+
+    def reference(path):
+        root = path.split('.')[0]
+        if root not in created:
+            fields.add(root)
+
+    def walk(expression):
+        if isinstance(expression, str) and expression.startswith('$') and not expression.startswith('$$'):
+            reference(expression[1:])
+        elif isinstance(expression, dict):
+            for value in expression.values():
+                walk(value)
+        elif isinstance(expression, list):
+            for value in expression:
+                walk(value)
+
+    def walk_query(query):
+        for key, condition in query.items():
+            if key in ('$and', '$or', '$nor'):
+                for sub_query in condition:
+                    walk_query(sub_query)
+            elif key == '$expr':
+                walk(condition)
+            elif not key.startswith('$'):
+                reference(key)
+
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == '$match':
+            walk_query(spec)
+        elif name in ('$addFields', '$set'):
+            for value in spec.values():
+                walk(value)
+            created.update(spec)
+        elif name == '$sort':
+            for field in spec:
+                reference(field)
+        elif name in ('$group', '$project'):
+            walk(spec)
+            if name == '$project':
+                for field, value in spec.items():
+                    if field != '_id' and _is_inclusion_flag(value) and value:
+                        reference(field)
+            break
+        elif name == '$facet':
+            for sub_pipeline in spec.values():
+                fields.update(f for f in source_fields(sub_pipeline) if f not in created)
+            break
+    return fields
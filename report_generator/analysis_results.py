@@ -0,0 +1,240 @@
+"""
+Analysis Result Store
+=====================
+
+ACF/PACF and ARIMA forecast results of the pipeline sheets, kept in memory as
+typed records keyed by sheet name and time scale. The pipeline sheet creator
+publishes each sheet's results when it builds the sheet; the ACF/PACF charts,
+the ARIMA forecast charts and the ACF/PACF dashboards read them from here
+instead of parsing header strings and scanning worksheet rows.
+
+Results are columnar: one float array per ACF lag, PACF lag and forecast
+series, aligned with the sheet's data rows. Row i of an ACF/PACF array is the
+expanding window up to row i (NaN where the window is too short for the lag),
+as add_acf_pacf_analysis() computes it, so the last row describes the whole
+series.
+
+Each record also keeps the sheet's column order and header row, which chart
+builders need for cell references.
+
+Usage:
+    store = AnalysisResultStore()
+    store.publish('Weekly Counts (ACF_PACF)', 'weekly', df)
+    analysis = store.get('Weekly Counts (ACF_PACF)')
+    analysis.correlation.series_acf()     # {1: -0.21, 4: 0.05, 8: 0.11}
+    store.for_time_scale('weekly')
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Significance bound of a correlation at 95% confidence, times 1/sqrt(n)
+CONFIDENCE_Z = 1.96
+
+
+def _float_column(values) -> np.ndarray:
+    """Returns a column as a float array, NaN for missing or non-numeric values."""
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+
+
+def _first_value(values) -> Optional[str]:
+    """First non-missing value of a column, as text."""
+    present = pd.Series(values).dropna()
+    return str(present.iloc[0]) if len(present) else None
+
+
+@dataclass
+class CorrelationResult:
+    """ACF and PACF of one series: one array per lag over the expanding windows."""
+    value_col: str
+    acf: Dict[int, np.ndarray]
+    pacf: Dict[int, np.ndarray]
+
+    @property
+    def n_observations(self) -> int:
+        columns = list(self.acf.values()) + list(self.pacf.values())
+        return len(columns[0]) if columns else 0
+
+    @property
+    def lags(self) -> List[int]:
+        """Every lag with an ACF or PACF column, ascending."""
+        return sorted(set(self.acf) | set(self.pacf))
+
+    @staticmethod
+    def _series_values(columns) -> Dict[int, float]:
+        return {lag: float(values[-1]) for lag, values in sorted(columns.items())
+                if len(values) and not np.isnan(values[-1])}
+
+    def series_acf(self) -> Dict[int, float]:
+        """ACF of the whole series by lag, for the lags it is long enough for."""
+        return self._series_values(self.acf)
+
+    def series_pacf(self) -> Dict[int, float]:
+        """PACF of the whole series by lag, for the lags it is long enough for."""
+        return self._series_values(self.pacf)
+
+    def confidence_bound(self, minimum_observations=1) -> float:
+        """Half-width of the 95% band around zero for the whole series."""
+        return CONFIDENCE_Z / math.sqrt(max(self.n_observations, minimum_observations, 1))
+
+    @classmethod
+    def from_frame(cls, df, value_col='Total_Files'):
+        """
+        Collects the {value_col}_ACF_Lag_{n} and {value_col}_PACF_Lag_{n} columns
+        written by add_acf_pacf_analysis(). Returns None if there are none.
+        """
+        pattern = re.compile(rf'^{re.escape(value_col)}_(ACF|PACF)_Lag_(\d+)$')
+        acf, pacf = {}, {}
+        for column in df.columns:
+            match = pattern.match(str(column))
+            if match:
+                target = acf if match.group(1) == 'ACF' else pacf
+                target[int(match.group(2))] = _float_column(df[column])
+        if not acf and not pacf:
+            return None
+        return cls(value_col=value_col, acf=acf, pacf=pacf)
+
+
+@dataclass
+class ForecastResult:
+    """ARIMA forecast of one series, aligned with the sheet's data rows."""
+    value_col: str
+    actual: np.ndarray
+    forecast: Optional[np.ndarray] = None
+    lower: Optional[np.ndarray] = None
+    upper: Optional[np.ndarray] = None
+    quality: Optional[str] = None
+    message: Optional[str] = None
+    model: Optional[str] = None
+
+    @property
+    def has_forecast(self) -> bool:
+        """Whether the forecast produced numbers, rather than only an error message."""
+        return self.forecast is not None and len(self.forecast) > 0 and not np.isnan(self.forecast[0])
+
+    @property
+    def has_interval(self) -> bool:
+        return self.lower is not None and self.upper is not None
+
+    @property
+    def model_order(self) -> Optional[Tuple[int, int, int]]:
+        """(p, d, q) of an ARIMA model, None for fallback models such as 'Mean'."""
+        match = re.search(r'\((\d+),\s*(\d+),\s*(\d+)\)', self.model or '')
+        return tuple(int(part) for part in match.groups()) if match else None
+
+    @classmethod
+    def from_frame(cls, df, value_col='Total_Files'):
+        """
+        Collects the forecast columns written by add_arima_forecast_columns().
+        Returns None if the frame was not forecast.
+        """
+        forecast_col = f'{value_col}_Forecast'
+        if value_col not in df.columns or (forecast_col not in df.columns and 'Forecast_Quality' not in df.columns):
+            return None
+
+        def optional_column(name):
+            return _float_column(df[name]) if name in df.columns else None
+
+        def optional_text(name):
+            return _first_value(df[name]) if name in df.columns else None
+
+        return cls(
+            value_col=value_col,
+            actual=_float_column(df[value_col]),
+            forecast=optional_column(forecast_col),
+            lower=optional_column(f'{forecast_col}_Lower'),
+            upper=optional_column(f'{forecast_col}_Upper'),
+            quality=optional_text('Forecast_Quality'),
+            message=optional_text('Forecast_Message'),
+            model=optional_text('Forecast_Model')
+        )
+
+
+@dataclass
+class SheetAnalysis:
+    """Analysis results of one sheet and the layout of the sheet's data."""
+    sheet_name: str
+    time_scale: str
+    columns: Tuple[str, ...]
+    n_rows: int
+    header_row: int = 3
+    correlation: Optional[CorrelationResult] = None
+    forecast: Optional[ForecastResult] = None
+
+    @property
+    def first_row(self) -> int:
+        return self.header_row + 1
+
+    @property
+    def last_row(self) -> int:
+        return self.header_row + self.n_rows
+
+    def column(self, name) -> Optional[int]:
+        """1-based sheet column of a DataFrame column, None if it was not written."""
+        try:
+            return self.columns.index(name) + 1
+        except ValueError:
+            return None
+
+
+class AnalysisResultStore:
+    """
+    In-memory analysis results of a report run, by sheet name in the order the
+    sheets were published.
+    """
+
+    def __init__(self):
+        self._sheets: Dict[str, SheetAnalysis] = {}
+
+    def __len__(self):
+        return len(self._sheets)
+
+    def __contains__(self, sheet_name):
+        return sheet_name in self._sheets
+
+    def __iter__(self) -> Iterator[SheetAnalysis]:
+        return iter(list(self._sheets.values()))
+
+    def publish(self, sheet_name, time_scale, df, value_col='Total_Files', header_row=3):
+        """
+        Records the ACF/PACF and forecast results of a sheet from the DataFrame
+        written to it, one sheet row per DataFrame row below header_row.
+        Replaces earlier results for the sheet.
+
+        Returns:
+            SheetAnalysis: The published record
+        """
+        analysis = SheetAnalysis(
+            sheet_name=sheet_name,
+            time_scale=time_scale,
+            columns=tuple(str(column) for column in df.columns),
+            n_rows=len(df),
+            header_row=header_row,
+            correlation=CorrelationResult.from_frame(df, value_col),
+            forecast=ForecastResult.from_frame(df, value_col)
+        )
+        self._sheets[sheet_name] = analysis
+        return analysis
+
+    def get(self, sheet_name) -> Optional[SheetAnalysis]:
+        return self._sheets.get(sheet_name)
+
+    def for_time_scale(self, time_scale) -> List[SheetAnalysis]:
+        """Every sheet published for a time scale ('daily', 'weekly', ...)."""
+        return [analysis for analysis in self._sheets.values() if analysis.time_scale == time_scale]
+
+    def correlations(self) -> List[SheetAnalysis]:
+        """Sheets with ACF/PACF results."""
+        return [analysis for analysis in self._sheets.values() if analysis.correlation is not None]
+
+    def forecasts(self) -> List[SheetAnalysis]:
+        """Sheets with forecast results."""
+        return [analysis for analysis in self._sheets.values() if analysis.forecast is not None]
+
+    def clear(self):
+        self._sheets.clear()
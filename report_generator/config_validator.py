@@ -68,6 +68,7 @@ class ConfigurationValidator:
         self._validate_pipelines()
         self._validate_dependencies()
         self._validate_forecast_options()
+        self._validate_execution_options()
         self._validate_pipeline_modules()
         self._validate_consistency()
         
@@ -221,6 +222,19 @@ class ConfigurationValidator:
                 "Forecast options: No target metrics specified"
             )
     
+    def _validate_execution_options(self):
+        """Validate report execution options."""
+        if 'execution_options' not in self.config:
+            return
+        
+        max_concurrent = self.config['execution_options'].get('max_concurrent_pipelines')
+        if max_concurrent is not None and (
+            not isinstance(max_concurrent, int) or isinstance(max_concurrent, bool) or max_concurrent < 1
+        ):
+            self.validation_errors.append(
+                f"Execution options: 'max_concurrent_pipelines' must be a positive integer, got {max_concurrent!r}"
+            )
+    
     def _validate_pipeline_modules(self):
         """Validate pipeline module configurations."""
         if 'pipeline_modules' not in self.config:
@@ -24,6 +24,7 @@ from .sheet_creators.pipeline import PipelineSheetCreator
 from .sheet_creators.specialized import SpecializedSheetCreator
 from .dashboard import DashboardCreator
 from .raw_data import RawDataCreator
+from .analysis_results import AnalysisResultStore
 
 # External modules (conditional imports)
 try:
@@ -67,6 +68,9 @@ class ConsolidatedSheetFactory:
         self.specialized_creator = SpecializedSheetCreator(db, formatter)
         self.dashboard_creator = DashboardCreator(db, formatter)
         self.raw_data_creator = RawDataCreator(db, formatter)
+        # Pipeline sheets publish their ACF/PACF and forecast results here for the charts and dashboards
+        self.analysis_results = AnalysisResultStore()
+        self.pipeline_creator.analysis_results = self.analysis_results
         
         print("[FACTORY] Consolidated Sheet Factory initialized")
     
@@ -327,7 +331,7 @@ class ConsolidatedSheetFactory:
                 return False
             
             # Delegate to external module
-            create_dashboard_summary(workbook)
+            create_dashboard_summary(workbook, results=self.analysis_results)
             print("[SUCCESS] ACF/PACF Dashboard sheet created via external module")
             return True
             
@@ -349,7 +353,7 @@ class ConsolidatedSheetFactory:
                 dashboard_sheets = [name for name in workbook.sheetnames 
                                   if 'Dashboard' in name or 'Summary' in name]
                 if dashboard_sheets:
-                    enhance_acf_pacf_visualization(workbook)
+                    enhance_acf_pacf_visualization(workbook, results=self.analysis_results)
                     print("[SUCCESS] ACF/PACF chart enhancements added")
                     results["ACF_PACF_Charts"] = True
                 else:
@@ -364,7 +368,7 @@ class ConsolidatedSheetFactory:
         # ARIMA forecast chart enhancements
         try:
             if enhance_arima_forecast_visualization:
-                enhanced_sheets = enhance_arima_forecast_visualization(workbook)
+                enhanced_sheets = enhance_arima_forecast_visualization(workbook, results=self.analysis_results)
                 if enhanced_sheets:
                     print(f"[SUCCESS] ARIMA forecast charts added to {len(enhanced_sheets)} sheets")
                     results["ARIMA_Charts"] = True
@@ -16,7 +16,7 @@ from pathlib import Path
 from pipelines import PIPELINES  # Now using modular pipelines/ package
 from ar_utils import (
     add_acf_pacf_analysis, infer_sheet_type, reorder_with_acf_pacf,
-    get_school_calendar, get_non_collection_days, add_arima_forecast_columns,
+    add_arima_forecast_columns,
     reorder_with_forecast_columns
 )
 # Import chart modules conditionally to avoid import errors
@@ -31,8 +31,15 @@ try:
 except ImportError:
     create_dashboard_summary = None
 
-from .formatters import ExcelFormatter
+from calendar_days import ensure_calendar_days
+from daily_rollups import ensure_daily_rollups
+from arima_search import configure_arima_search
+from index_manager import verify_media_indexes, print_index_usage
+from .formatters import ExcelFormatter, frame_column_widths
 from .dashboard import DashboardCreator
+from .fact_table import ReportFactTable
+from .analysis_results import AnalysisResultStore
+from .aggregation_cache import AggregationCache, DiskAggregationCache, PYARROW_AVAILABLE
 from .raw_data import RawDataCreator
 
 class ReportGenerator:
@@ -44,7 +51,10 @@ class ReportGenerator:
     specialized modules while maintaining the overall report generation workflow.
     """
     
-    def __init__(self, db, root_dir, output_dir=None):
+    def __init__(self, db, root_dir, output_dir=None, use_fact_table=False, verify_fact_table=False,
+                 use_daily_rollups=True, use_disk_cache=True, cache_dir=None, disk_cache_db_hash=False,
+                 max_concurrent_pipelines=None, stream_raw_data=False, raw_data_backend='openpyxl',
+                 stepwise_arima=False):
         """
         Initialize the report generator.
         
@@ -52,6 +62,30 @@ class ReportGenerator:
             db: MongoDB database connection
             root_dir (str): Root directory for the project
             output_dir (str, optional): Output directory for reports. Defaults to root_dir.
+            use_fact_table (bool): Answer supported aggregations in-process from a
+                single scan of media_records instead of one MongoDB query each.
+                Off by default until the engine has been checked against mongod
+                (tests/test_fact_table_engine.py).
+            verify_fact_table (bool): Also run those aggregations on MongoDB and
+                report any result that differs.
+            use_daily_rollups (bool): Build the daily/weekly/monthly/period count
+                sheets from the daily_rollups collection.
+            use_disk_cache (bool): Reuse aggregation results saved by earlier runs
+                while the collections they read are unchanged (needs pyarrow), and
+                ARIMA orders fitted for series that have not changed.
+            cache_dir (str, optional): Directory for saved aggregation results and
+                ARIMA orders. Defaults to .aggregation_cache under root_dir.
+            disk_cache_db_hash (bool): Also check saved results against the
+                server's dbHash of each collection, which reads every document.
+            max_concurrent_pipelines (int, optional): How many sheet aggregations
+                may run at once. Defaults to execution_options in report_config.json.
+            stream_raw_data (bool): Write the Raw Data sheet to a separate
+                write-only workbook next to the report, in constant memory.
+            raw_data_backend (str): Writer for that workbook: 'openpyxl', or
+                'xlsxwriter' for faster exports (needs xlsxwriter).
+            stepwise_arima (bool): Choose forecast ARIMA orders with the stepwise
+                search instead of the full grid; faster, but may pick a
+                different (higher-AIC) model.
         """
         self.db = db
         self.root_dir = root_dir
@@ -62,7 +96,47 @@ class ReportGenerator:
         # Initialize specialized modules
         self.formatter = ExcelFormatter()
         self.dashboard_creator = DashboardCreator(self.db, self.formatter)
-        self.raw_data_creator = RawDataCreator(self.db, self.formatter)
+        self.fact_table = ReportFactTable(self.db, verify=verify_fact_table) if use_fact_table else None
+        self.dashboard_creator.fact_table = self.fact_table
+        # One aggregation cache for the whole run, shared by the dashboard and sheet creators
+        disk_cache = None
+        cache_dir = cache_dir or Path(root_dir) / '.aggregation_cache'
+        if use_disk_cache and PYARROW_AVAILABLE:
+            disk_cache = DiskAggregationCache(self.db, cache_dir, use_db_hash=disk_cache_db_hash)
+        elif use_disk_cache:
+            print("[WARNING] pyarrow is not installed; aggregation results will not be cached on disk")
+        self.aggregation_cache = AggregationCache(disk_cache=disk_cache)
+        self.max_concurrent_pipelines = max_concurrent_pipelines
+        # Forecast sheets reuse ARIMA orders fitted for the same series in earlier runs
+        self.arima_search = configure_arima_search(
+            cache_dir=cache_dir if use_disk_cache else None, stepwise=stepwise_arima
+        )
+        self.dashboard_creator.aggregation_cache = self.aggregation_cache
+        self.raw_data_creator = RawDataCreator(self.db, self.formatter, raw_data_backend=raw_data_backend)
+        self.stream_raw_data = stream_raw_data
+        # ACF/PACF and forecast results published by the pipeline sheets for the charts and dashboards
+        self.analysis_results = AnalysisResultStore()
+        
+        # Zero-filled daily pipelines join against calendar_days; rebuild it if stale
+        try:
+            ensure_calendar_days(self.db)
+        except Exception as e:
+            print(f"[WARNING] Could not verify the calendar_days collection: {e}")
+        
+        # Time-series sheets read per-day totals; rebuild them if out of sync
+        self.use_daily_rollups = use_daily_rollups
+        if use_daily_rollups:
+            try:
+                ensure_daily_rollups(self.db)
+            except Exception as e:
+                print(f"[WARNING] Could not verify the daily_rollups collection; using media_records: {e}")
+                self.use_daily_rollups = False
+        
+        # Every pipeline filters media_records; make sure its indexes exist
+        try:
+            verify_media_indexes(self.db['media_records'], create_missing=True)
+        except Exception as e:
+            print(f"[WARNING] Could not verify media_records indexes: {e}")
     
     def _get_school_year(self, date):
         """
@@ -149,148 +223,6 @@ class ReportGenerator:
             traceback.print_exc()
             return pd.DataFrame()
     
-    def _zero_fill_daily_counts(self, df):
-        """
-        Post-processes daily counts DataFrame to include zero entries for all collection days.
-        Uses the actual school calendar logic from ar_utils.py for accurate zero-filling.
-        
-        Args:
-            df (pandas.DataFrame): Daily counts DataFrame
-            
-        Returns:
-            pandas.DataFrame: DataFrame with zero-filled collection days
-        """
-        if df.empty:
-            return df
-        
-        try:
-            # Get the school calendar and non-collection days
-            school_calendar = get_school_calendar()
-            non_collection_days = get_non_collection_days()
-            
-            # Use the correct precompute_collection_days function
-            from ar_utils import precompute_collection_days
-            collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
-            
-            # Get all collection days as a list
-            all_collection_days = list(collection_day_map.keys())
-            
-            # Convert to DataFrame for merging
-            all_days_df = pd.DataFrame({'_id': all_collection_days})
-            all_days_df['_id'] = pd.to_datetime(all_days_df['_id']).dt.strftime('%Y-%m-%d')
-            
-            # Merge with existing data
-            df['_id'] = pd.to_datetime(df['_id']).dt.strftime('%Y-%m-%d')
-            merged_df = all_days_df.merge(df, on='_id', how='left')
-            
-            # Fill missing values with zeros
-            numeric_columns = ['Total_Files', 'MP3_Files', 'JPG_Files', 'Total_Size_MB']
-            for col in numeric_columns:
-                if col in merged_df.columns:
-                    merged_df[col] = merged_df[col].fillna(0)
-            
-            # Add has_files column
-            merged_df['has_files'] = merged_df['Total_Files'] > 0
-            
-            # Sort by date
-            merged_df = merged_df.sort_values('_id')
-            
-            print(f"[ZERO-FILL] Added {len(all_collection_days) - len(df)} zero-fill days to daily counts")
-            print(f"[ZERO-FILL] Total days: {len(merged_df)} (was {len(df)})")
-            print(f"[ZERO-FILL] Days with files: {merged_df['has_files'].sum()}")
-            print(f"[ZERO-FILL] Days without files: {(~merged_df['has_files']).sum()}")
-            
-            return merged_df
-            
-        except Exception as e:
-            print(f"[WARNING] Zero-fill failed: {e}. Returning original DataFrame.")
-            import traceback
-            traceback.print_exc()
-            return df
-    
-    def _fill_missing_collection_days(self, df, pipeline_name):
-        """
-        Fill in missing collection days with zero counts for complete time series.
-        This is critical for ACF/PACF/ARIMA analysis which requires continuous time series.
-        
-        FIXED: Now includes ALL collection days from the official school year start date
-        to resolve left-aligned row issues and ensure consistent totals.
-        
-        Args:
-            df (pandas.DataFrame): DataFrame to fill
-            pipeline_name (str): Name of the pipeline being processed
-            
-        Returns:
-            pandas.DataFrame: DataFrame with filled missing days
-        """
-        if not ('DAILY' in pipeline_name.upper() and 
-                ('WITH_ZEROES' in pipeline_name.upper() or 'COLLECTION_ONLY' in pipeline_name.upper())):
-            return df
-        
-        try:
-            from ar_utils import get_school_calendar, get_non_collection_days, precompute_collection_days
-            import pandas as pd
-            
-            school_calendar = get_school_calendar()
-            non_collection_days = get_non_collection_days()
-            collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
-            
-            # CRITICAL FIX: Ensure ALL collection days are included in zero-fill
-            # This resolves the left-aligned row issue by including early September dates
-            all_collection_days = []
-            for date_obj, info in collection_day_map.items():
-                all_collection_days.append({'_id': date_obj.strftime('%Y-%m-%d')})
-            
-            all_days_df = pd.DataFrame(all_collection_days)
-            
-            # DEBUG: Log the date range being used
-            if all_collection_days:
-                min_date = min(day['_id'] for day in all_collection_days)
-                max_date = max(day['_id'] for day in all_collection_days)
-                print(f"[ZERO_FILL] Including all collection days from {min_date} to {max_date}")
-                print(f"[ZERO_FILL] Total collection days: {len(all_collection_days)}")
-            
-            # Merge with existing data, keeping actual data and filling missing with zeros
-            merged_df = pd.merge(all_days_df, df, on='_id', how='left').fillna(0)
-            
-            # Ensure correct data types after merge
-            for col in ['Total_Files', 'MP3_Files', 'JPG_Files']:
-                if col in merged_df.columns:
-                    merged_df[col] = merged_df[col].astype(int)
-            if 'Total_Size_MB' in merged_df.columns:
-                 merged_df['Total_Size_MB'] = merged_df['Total_Size_MB'].astype(float)
-
-            # CRITICAL FIX: Sort by date to ensure proper chronological order
-            # This ensures early September dates appear in the correct position
-            final_df = merged_df.sort_values('_id').reset_index(drop=True)
-            
-            # DEBUG: Log early September inclusion
-            early_sept_dates = [
-                "2021-09-13", "2021-09-14", "2021-09-15", "2021-09-16", "2021-09-17",
-                "2021-09-20", "2021-09-21", "2021-09-22", "2021-09-23", "2021-09-24", "2021-09-27"
-            ]
-            
-            early_sept_count = 0
-            for date_str in early_sept_dates:
-                if date_str in final_df['_id'].values:
-                    row = final_df[final_df['_id'] == date_str]
-                    if not row.empty:
-                        count = row.iloc[0]['Total_Files'] if 'Total_Files' in row.columns else 0
-                        early_sept_count += count
-            
-            if early_sept_count > 0:
-                print(f"[ZERO_FILL] Early September files included: {early_sept_count}")
-                print(f"[ZERO_FILL] This should resolve left-aligned row issues")
-            
-            total_files = final_df['Total_Files'].sum() if 'Total_Files' in final_df.columns else 0
-            print(f"[ZERO_FILL] Total files after zero-fill: {total_files}")
-            
-            return final_df
-            
-        except Exception as e:
-            print(f"[WARNING] Zero-fill failed, returning original data: {e}")
-            return df
-    
     def _add_sheet(self, df, sheet_name, position=None, include_total=True):
         """
         Creates a new sheet from a DataFrame, handling formatting, positioning, and data types.
@@ -329,7 +261,7 @@ class ReportGenerator:
                 ws.cell(row=row_idx, column=col_idx, value=cell_value)
         
         # Apply formatting
-        self.formatter.format_sheet(ws)
+        self.formatter.format_sheet(ws, frame_column_widths(df))
         
         # Add total row if requested
         if include_total:
@@ -387,6 +319,11 @@ class ReportGenerator:
             print("[INFO] Creating non-pipeline sheets using unified architecture...")
             from .sheet_creators import SheetCreator
             unified_sheet_creator = SheetCreator(self.db, self.formatter)
+            unified_sheet_creator.fact_table = self.fact_table
+            unified_sheet_creator.use_daily_rollups = self.use_daily_rollups
+            unified_sheet_creator.aggregation_cache = self.aggregation_cache
+            unified_sheet_creator.max_concurrent_pipelines = self.max_concurrent_pipelines
+            unified_sheet_creator.analysis_results = self.analysis_results
             
             # Create summary statistics sheet
             print("[INFO] Creating summary statistics sheet...")
@@ -427,7 +364,11 @@ class ReportGenerator:
             with open("MARKER_1_RAW_DATA.txt", "w") as f: f.write("Reached Raw Data section")
             print("[INFO] Creating Raw Data sheet...")
             try:
-                self.raw_data_creator.create_raw_data_sheet(self.workbook)
+                if self.stream_raw_data:
+                    raw_data_path = os.path.splitext(output_path)[0] + "_Raw_Data.xlsx"
+                    self.raw_data_creator.create_streaming_raw_data_sheet(self.workbook, raw_data_path)
+                else:
+                    self.raw_data_creator.create_raw_data_sheet(self.workbook)
                 print("[SUCCESS] Raw Data sheet created successfully")
             except Exception as e:
                 print(f"[ERROR] Could not create Raw Data sheet: {e}")
@@ -437,7 +378,7 @@ class ReportGenerator:
             print("[INFO] Creating ACF/PACF Dashboard...")
             try:
                 if create_dashboard_summary:
-                    create_dashboard_summary(self.workbook)
+                    create_dashboard_summary(self.workbook, results=self.analysis_results)
                     print("[SUCCESS] ACF/PACF Dashboard created successfully")
                 else:
                     print("[WARNING] Dashboard generator module not available")
@@ -452,7 +393,7 @@ class ReportGenerator:
                     # Only enhance dashboard and summary sheets that weren't created by PipelineSheetCreator
                     dashboard_sheets = [name for name in self.workbook.sheetnames if 'Dashboard' in name or 'Summary' in name]
                     if dashboard_sheets:
-                        enhance_acf_pacf_visualization(self.workbook)
+                        enhance_acf_pacf_visualization(self.workbook, results=self.analysis_results)
                         print("[SUCCESS] Dashboard charts enhanced successfully")
                 else:
                     print("[INFO] Chart enhancement module not available for dashboard")
@@ -463,7 +404,7 @@ class ReportGenerator:
             try:
                 if enhance_arima_forecast_visualization:
                     # This will add ARIMA charts to all sheets with forecast columns
-                    enhanced_sheets = enhance_arima_forecast_visualization(self.workbook)
+                    enhanced_sheets = enhance_arima_forecast_visualization(self.workbook, results=self.analysis_results)
                     if enhanced_sheets:
                         print(f"[SUCCESS] ARIMA forecast charts added to {len(enhanced_sheets)} sheets: {', '.join(enhanced_sheets)}")
                     else:
@@ -486,6 +427,16 @@ class ReportGenerator:
             print(f"\n--- Report Generation Complete ---")
             print(f"Successfully saved Excel report to: {output_path}")
             
+            try:
+                print_index_usage(self.db['media_records'])
+            except Exception as e:
+                print(f"[WARNING] Could not read index usage: {e}")
+            
+            self.aggregation_cache.print_summary()
+            self.arima_search.print_summary()
+            if self.fact_table is not None:
+                self.fact_table.print_summary()
+            
         except Exception as e:
             print(f"[ERROR] Report generation failed: {e}")
             import traceback
@@ -7,7 +7,10 @@ summary sheets with key metrics, insights, and visualizations.
 """
 
 import pandas as pd
-from pipelines import PIPELINES
+from pipelines import PIPELINES, TIME_AXIS_GRANULARITIES
+from .aggregation_cache import AggregationCache
+from .formatters import frame_column_widths
+from .time_axis import reindex_time_axis
 
 class DashboardCreator:
     """
@@ -25,81 +28,38 @@ class DashboardCreator:
         """
         self.db = db
         self.formatter = formatter
-        # Cache for pipeline results to prevent duplicate executions
-        self._pipeline_cache = {}
+        # Aggregation results keyed on pipeline content; ReportGenerator shares one across creators
+        self.aggregation_cache = AggregationCache()
+        # Optional ReportFactTable; set by ReportGenerator to answer aggregations in-process
+        self.fact_table = None
     
     def _run_aggregation_cached(self, pipeline_name, pipeline, use_base_filter=True, collection_name='media_records'):
         """
-        Runs a MongoDB aggregation pipeline with caching to prevent duplicates.
+        Runs a MongoDB aggregation pipeline through the shared aggregation cache.
         
         Args:
-            pipeline_name: Name/identifier for the pipeline (for caching)
+            pipeline_name: Name/identifier for the pipeline (for log messages)
             pipeline: MongoDB aggregation pipeline
             use_base_filter: Whether to apply base filtering
             collection_name: Name of the MongoDB collection
             
         Returns:
-            pandas.DataFrame: Results of the aggregation (cached if previously run)
-        """
-        # Create cache key
-        cache_key = f"{pipeline_name}_{use_base_filter}_{collection_name}"
-        
-        # Return cached result if available
-        if cache_key in self._pipeline_cache:
-            print(f"[CACHE HIT] Using cached result for {pipeline_name}")
-            return self._pipeline_cache[cache_key].copy()
-        
-        # Execute pipeline and cache result
-        print(f"[PIPELINE EXEC] Running {pipeline_name}")
-        result = self._run_aggregation(pipeline, use_base_filter, collection_name)
-        self._pipeline_cache[cache_key] = result.copy()
-        
-        return result
-    
-    def _run_aggregation(self, pipeline, use_base_filter=True, collection_name='media_records'):
-        """
-        Runs a MongoDB aggregation pipeline and returns a DataFrame.
-        
-        Args:
-            pipeline (list): MongoDB aggregation pipeline
-            use_base_filter (bool): Whether to apply base filtering
-            collection_name (str): Name of the MongoDB collection
-            
-        Returns:
-            pandas.DataFrame: Results of the aggregation
+            pandas.DataFrame: Results of the aggregation (a private copy if previously run),
+                zero-filled onto the calendar axis for time-series pipelines
         """
         try:
-            collection = self.db[collection_name]
-            
-            # Apply base filter if requested
-            if use_base_filter:
-                base_filter = {"$match": {"file_type": {"$in": ["JPG", "MP3"]}}}
-                full_pipeline = [base_filter] + pipeline
-            else:
-                full_pipeline = pipeline
-            
-            # Execute aggregation
-            cursor = collection.aggregate(full_pipeline, allowDiskUse=True)
-            results = list(cursor)
-            
-            if not results:
-                print(f"[WARNING] Aggregation returned no results for collection: {collection_name}")
-                return pd.DataFrame()
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(results)
-            
-            # Clean up MongoDB ObjectId columns if present
-            if '_id' in df.columns and hasattr(df['_id'].iloc[0], 'inserted_id'):
-                df = df.drop('_id', axis=1)
-            
-            return df
-            
+            df = self.aggregation_cache.fetch(
+                self._with_base_filter(pipeline, use_base_filter),
+                collection_name,
+                lambda: self._execute_aggregation(pipeline, use_base_filter, collection_name),
+                label=pipeline_name
+            )
         except Exception as e:
-            print(f"[ERROR] Aggregation failed for collection {collection_name}: {e}")
-            import traceback
-            traceback.print_exc()
+            # Not cached; a later request for the same pipeline runs it again
+            print(f"[ERROR] Aggregation failed: {e}")
             return pd.DataFrame()
+        granularity = TIME_AXIS_GRANULARITIES.get(pipeline_name)
+        return reindex_time_axis(df, granularity) if granularity else df
     
     def create_comprehensive_dashboard(self, workbook):
         """
@@ -159,9 +119,6 @@ class DashboardCreator:
                 expected_days_21_22 = 180  # Default reasonable values
                 expected_days_22_23 = 180
             
-            # Clear cache at start of dashboard creation
-            self._pipeline_cache = {}
-            
             # ========================================
             # SINGLE EXECUTION BLOCK - Load all data once
             # ========================================
@@ -175,11 +132,11 @@ class DashboardCreator:
                     use_base_filter=False
                 )
                 
+                # Already zero-filled server-side from the calendar_days collection
                 df_daily_counts = self._run_aggregation_cached(
                     "DAILY_COUNTS_ALL_WITH_ZEROES",
                     PIPELINES['DAILY_COUNTS_ALL_WITH_ZEROES']
                 )
-                df_daily_counts = self._zero_fill_daily_counts(df_daily_counts)
                 
                 df_quality = self._run_aggregation_cached(
                     "DASHBOARD_DATA_QUALITY",
@@ -430,9 +387,6 @@ class DashboardCreator:
             # Add the dashboard as the first sheet
             self._add_dashboard_sheet(workbook, df_dashboard)
             
-            # Clear cache after dashboard creation
-            self._pipeline_cache = {}
-            
             print("[SUCCESS] Comprehensive Dashboard created successfully (no duplicate pipelines)")
             
         except Exception as e:
@@ -623,77 +577,44 @@ class DashboardCreator:
         else:  # January to August
             return f"{year - 1}-{year}"
     
-    def _zero_fill_daily_counts(self, df):
-        """Apply zero-fill logic to daily counts DataFrame."""
-        if df.empty:
-            return df
-        
-        try:
-            # Get the school calendar and non-collection days
-            from ar_utils import get_school_calendar, get_non_collection_days, precompute_collection_days
-            
-            school_calendar = get_school_calendar()
-            non_collection_days = get_non_collection_days()
-            collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
-            
-            # Get all collection days as a list
-            all_collection_days = list(collection_day_map.keys())
-            
-            # Convert to DataFrame for merging
-            all_days_df = pd.DataFrame({'_id': all_collection_days})
-            all_days_df['_id'] = pd.to_datetime(all_days_df['_id']).dt.strftime('%Y-%m-%d')
-            
-            # Merge with existing data
-            df['_id'] = pd.to_datetime(df['_id']).dt.strftime('%Y-%m-%d')
-            merged_df = all_days_df.merge(df, on='_id', how='left')
-            
-            # Fill missing values with zeros
-            numeric_columns = ['Total_Files', 'MP3_Files', 'JPG_Files', 'Total_Size_MB']
-            for col in numeric_columns:
-                if col in merged_df.columns:
-                    merged_df[col] = merged_df[col].fillna(0)
-            
-            # Sort by date
-            merged_df = merged_df.sort_values('_id')
-            
-            return merged_df
-            
-        except Exception as e:
-            print(f"[WARNING] Zero-fill failed: {e}. Returning original DataFrame.")
-            return df
+    def _with_base_filter(self, pipeline, use_base_filter=True):
+        """Returns the pipeline with the dashboard base filter prepended if requested."""
+        if not use_base_filter:
+            return pipeline
+        return [{"$match": {"School_Year": {"$ne": "N/A"}}}] + pipeline
     
-    def _run_aggregation(self, pipeline, use_base_filter=True):
+    def _run_aggregation(self, pipeline, use_base_filter=True, collection_name='media_records'):
         """Run MongoDB aggregation pipeline."""
         try:
-            collection = self.db['media_records']
-            
-            # Apply base filter if requested
-            if use_base_filter:
-                base_filter = {"$match": {"School_Year": {"$ne": "N/A"}}}
-                full_pipeline = [base_filter] + pipeline
-            else:
-                full_pipeline = pipeline
-            
-            # Execute aggregation
-            cursor = collection.aggregate(full_pipeline, allowDiskUse=True)
-            results = list(cursor)
-            
-            if not results:
-                return pd.DataFrame()
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(results)
-            
-            # Clean up MongoDB ObjectId columns if present
-            if '_id' in df.columns and hasattr(df['_id'].iloc[0], 'inserted_id'):
-                df = df.drop('_id', axis=1)
-            
-            return df
-            
+            return self._execute_aggregation(pipeline, use_base_filter, collection_name)
         except Exception as e:
             print(f"[ERROR] Aggregation failed: {e}")
             return pd.DataFrame()
     
+    def _execute_aggregation(self, pipeline, use_base_filter=True, collection_name='media_records'):
+        """Runs the pipeline and returns a DataFrame; errors propagate to the caller."""
+        collection = self.db[collection_name]
+        full_pipeline = self._with_base_filter(pipeline, use_base_filter)
+        
+        # Execute aggregation (in-process from the fact table when possible)
+        results = None
+        if self.fact_table is not None:
+            results = self.fact_table.aggregate(full_pipeline, collection_name)
+        if results is None:
+            results = list(collection.aggregate(full_pipeline, allowDiskUse=True))
+        
+        if not results:
+            return pd.DataFrame()
+        
+        # Convert to DataFrame
+        df = pd.DataFrame(results)
+        
+        # Clean up MongoDB ObjectId columns if present
+        if '_id' in df.columns and hasattr(df['_id'].iloc[0], 'inserted_id'):
+            df = df.drop('_id', axis=1)
+        
+        return df
+    
     def _add_dashboard_sheet(self, workbook, df_dashboard):
         """Add the dashboard sheet as the first sheet in the workbook."""
         try:
@@ -718,7 +639,7 @@ class DashboardCreator:
                     ws.cell(row=row_idx, column=col_idx, value=cell_value)
             
             # Apply formatting
-            self.formatter.format_sheet(ws)
+            self.formatter.format_sheet(ws, frame_column_widths(df_dashboard))
             
             print(f"[SUCCESS] Dashboard sheet created at position 1 with {len(df_dashboard)} rows")
             
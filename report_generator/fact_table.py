@@ -0,0 +1,233 @@
+"""
+Report Fact Table
+=================
+
+Every registered pipeline re-scans media_records with nearly the same base
+filter. ReportFactTable reads the collection once per report run, keeping
+only the fields the pipelines use, into a columnar DataFrame (categorical
+dtypes for the string fields), and answers each aggregation in-process with
+the aggregation_engine module.
+
+Pipelines that read fields outside the fact table, or use stages the engine
+does not implement, return None so the caller runs them on MongoDB. With
+verify=True every in-process result is also compared against the MongoDB
+result, and the MongoDB result wins on any mismatch.
+
+Usage:
+    fact_table = ReportFactTable(db, verify=False)
+    documents = fact_table.aggregate(pipeline)   # None -> run on MongoDB
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from pipelines import PIPELINES
+from .aggregation_engine import (
+    aggregate, source_fields, UnsupportedPipelineError, AggregationEngineError
+)
+
+# Fields every sheet creator's base filter reads, on top of the pipelines' own
+BASE_FILTER_FIELDS = {'School_Year', 'file_type'}
+
+
+def default_fact_fields(pipelines=None):
+    """Returns the media_records fields read by the registered pipelines."""
+    pipelines = PIPELINES if pipelines is None else pipelines
+    fields = set(BASE_FILTER_FIELDS)
+    for pipeline in pipelines.values():
+        fields |= source_fields(pipeline)
+    fields.discard('_id')
+    return sorted(fields)
+
+
+def _compact_column(values):
+    """Builds a column with the narrowest dtype: categorical for strings."""
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred == 'string':
+        return pd.Categorical(values)
+    if inferred == 'boolean' and None not in values:
+        return np.array(values, dtype=bool)
+    if inferred in ('integer', 'floating', 'mixed-integer-float'):
+        if inferred == 'integer' and None not in values:
+            return pd.array(values, dtype='int64').to_numpy()
+        return pd.Series(values, dtype=float).to_numpy()
+    if inferred in ('datetime', 'datetime64', 'date'):
+        return pd.to_datetime(pd.Series(values, dtype=object)).to_numpy()
+    return pd.Series(values, dtype=object).to_numpy()
+
+
+def _values_match(actual, expected, tolerance):
+    if actual is None or expected is None or (isinstance(expected, float) and math.isnan(expected)):
+        missing = (lambda v: v is None or (isinstance(v, float) and math.isnan(v)))
+        return missing(actual) and missing(expected)
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return type(actual) is type(expected) and actual == expected
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(actual, expected, rel_tol=tolerance, abs_tol=tolerance)
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return list(actual) == list(expected) and all(
+            _values_match(actual[k], expected[k], tolerance) for k in expected
+        )
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(actual) != len(expected):
+            return False
+        # $push/$addToSet order is not defined by MongoDB
+        try:
+            actual, expected = sorted(actual, key=repr), sorted(expected, key=repr)
+        except TypeError:
+            pass
+        return all(_values_match(a, e, tolerance) for a, e in zip(actual, expected))
+    return actual == expected
+
+
+def compare_documents(actual, expected, tolerance=1e-9, max_differences=10):
+    """
+    Compares in-process aggregation results with MongoDB's.
+
+    Documents are matched after sorting both lists on their _id (the order of
+    unsorted $group output is not defined); field order within a document is
+    part of the comparison because it becomes the sheet column order.
+
+    Returns:
+        list: Human-readable differences; empty if the results match.
+    """
+    if len(actual) != len(expected):
+        return [f"{len(actual)} documents in-process vs {len(expected)} from MongoDB"]
+
+    def canonical(documents):
+        return sorted(documents, key=lambda doc: repr(doc.get('_id')))
+
+    differences = []
+    if [doc.get('_id') for doc in actual] != [doc.get('_id') for doc in expected]:
+        actual, expected = canonical(actual), canonical(expected)
+    for index, (a, e) in enumerate(zip(actual, expected)):
+        if list(a) != list(e):
+            differences.append(f"document {index}: fields {list(a)} vs {list(e)}")
+        for field in e:
+            if field in a and not _values_match(a[field], e[field], tolerance):
+                differences.append(f"document {index} '{field}': {a[field]!r} vs {e[field]!r}")
+        if len(differences) >= max_differences:
+            break
+    return differences[:max_differences]
+
+
+class ReportFactTable:
+    """
+    In-memory copy of the media_records fields the report pipelines read,
+    loaded on first use and shared by every sheet creator in a report run.
+    """
+
+    def __init__(self, db, collection_name='media_records', fields=None, verify=False):
+        """
+        Args:
+            db: MongoDB database connection
+            collection_name (str): Collection the fact table mirrors.
+            fields (list, optional): Fields to load; defaults to the fields
+                read by the registered pipelines.
+            verify (bool): Compare every in-process result with MongoDB.
+        """
+        self.db = db
+        self.collection_name = collection_name
+        self.fields = list(fields) if fields is not None else default_fact_fields()
+        self.verify = verify
+        self.stats = Counter()
+        self._frame = None
+        self._collections = {}
+        # Sheets may aggregate from several threads; load once and count safely
+        self._lock = threading.RLock()
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            with self._lock:
+                if self._frame is None:
+                    self.load()
+        return self._frame
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def load(self):
+        """Reads the collection once, projecting only the fact table fields."""
+        start = time.perf_counter()
+        projection = {field: 1 for field in self.fields}
+        projection['_id'] = 0
+
+        columns = {field: [] for field in self.fields}
+        cursor = self.db[self.collection_name].find({}, projection, batch_size=10000)
+        for document in cursor:
+            for field, values in columns.items():
+                values.append(document.get(field))
+
+        self._frame = pd.DataFrame({field: _compact_column(values) for field, values in columns.items()})
+        memory_mb = self._frame.memory_usage(deep=True).sum() / (1024 * 1024)
+        print(f"[FACT_TABLE] Loaded {len(self._frame):,} {self.collection_name} documents "
+              f"x {len(self.fields)} fields ({memory_mb:.1f} MB) in {time.perf_counter() - start:.2f}s")
+        return self._frame
+
+    def _load_collection(self, name):
+        """Frame of another (small) collection, for $unionWith stages."""
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = pd.DataFrame(list(self.db[name].find({})))
+            return self._collections[name]
+
+    def supports(self, pipeline, collection_name='media_records'):
+        """True if the pipeline reads only fields the fact table holds."""
+        return collection_name == self.collection_name and source_fields(pipeline) <= set(self.fields)
+
+    def aggregate(self, pipeline, collection_name='media_records'):
+        """
+        Runs an aggregation pipeline in-process.
+
+        Args:
+            pipeline (list): Full MongoDB pipeline, including any base filter.
+            collection_name (str): Collection the pipeline targets.
+
+        Returns:
+            list: Result documents, or None if the pipeline has to run on
+                  MongoDB instead.
+        """
+        if not self.supports(pipeline, collection_name):
+            self._count('mongodb')
+            return None
+
+        try:
+            documents = aggregate(self.frame, pipeline, self._load_collection)
+        except UnsupportedPipelineError as e:
+            print(f"[FACT_TABLE] Running on MongoDB instead: {e}")
+            self._count('mongodb')
+            return None
+        except AggregationEngineError:
+            # Let MongoDB raise its own error for the caller to handle
+            self._count('mongodb')
+            return None
+
+        self._count('in_process')
+        if self.verify:
+            expected = list(self.db[collection_name].aggregate(pipeline, allowDiskUse=True))
+            differences = compare_documents(documents, expected)
+            if differences:
+                self._count('mismatches')
+                print(f"[FACT_TABLE] [VERIFY] Mismatch with MongoDB; using the MongoDB result:")
+                for difference in differences:
+                    print(f"  - {difference}")
+                return expected
+            self._count('verified')
+        return documents
+
+    def print_summary(self):
+        """Prints how many aggregations ran in-process vs on MongoDB."""
+        if not self.stats:
+            return
+        summary = (f"[FACT_TABLE] {self.stats['in_process']} aggregation(s) in-process, "
+                   f"{self.stats['mongodb']} on MongoDB")
+        if self.verify:
+            summary += f"; verified {self.stats['verified']}, mismatches {self.stats['mismatches']}"
+        print(summary)
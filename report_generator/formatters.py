@@ -4,11 +4,142 @@ Excel Formatting and Styling Utilities
 
 This module contains all Excel formatting functions, styling utilities,
 and worksheet appearance management for the report generator.
+
+Cell styles are openpyxl NamedStyles kept in a StyleRegistry: each is added
+to a workbook once and applied to cells by name, instead of building Font,
+PatternFill and Alignment objects for every cell. Alternating row colors are
+one conditional formatting rule per range rather than a fill on every cell.
+
+Column widths for sheets written from a DataFrame come from the DataFrame
+(frame_column_widths) instead of a scan of the finished worksheet.
 """
 
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.formatting.rule import CellIsRule
+import weakref
+
+import pandas as pd
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.formatting.rule import CellIsRule, FormulaRule
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+
+# Style names registered in report workbooks
+HEADER_STYLE = 'Report Header'
+TITLE_STYLE = 'Report Title'
+SECTION_HEADER_STYLE = 'Report Section Header'
+DATA_STYLE = 'Report Data'
+TOTAL_ROW_STYLE = 'Report Total Row'
+
+# Widest column, in characters
+MAX_COLUMN_WIDTH = 50
+
+# Cell style ids set by each NamedStyle attribute
+_STYLE_ATTRIBUTE_IDS = {
+    'font': 'fontId',
+    'fill': 'fillId',
+    'border': 'borderId',
+    'number_format': 'numFmtId',
+    'protection': 'protectionId',
+    'alignment': 'alignmentId'
+}
+
+
+class StyleRegistry:
+    """
+    Named cell styles, added to each workbook on first use and applied by name.
+    """
+    
+    def __init__(self):
+        self._definitions = {}
+        # Style names already added, per workbook
+        self._registered = weakref.WeakKeyDictionary()
+    
+    def define(self, name, **attributes):
+        """
+        Defines a style.
+        
+        Args:
+            name: Style name shown in Excel
+            **attributes: NamedStyle attributes (font, fill, border, alignment,
+                number_format, protection)
+        """
+        self._definitions[name] = attributes
+    
+    def apply(self, cell, name):
+        """
+        Applies a defined style to a cell. Attributes the style does not define
+        (number format, borders, ...) keep their current values.
+        """
+        workbook = cell.parent.parent
+        registered = self._registered.setdefault(workbook, set())
+        if name not in registered:
+            if name not in workbook.named_styles:
+                workbook.add_named_style(NamedStyle(name=name, **self._definitions[name]))
+            registered.add(name)
+        
+        previous = cell._style if cell.has_style else None
+        cell.style = name
+        if previous is not None:
+            # Assigning a named style replaces every attribute; restore the others
+            for attribute, style_id in _STYLE_ATTRIBUTE_IDS.items():
+                if attribute not in self._definitions[name]:
+                    setattr(cell._style, style_id, getattr(previous, style_id))
+
+
+def frame_column_widths(df, extra_values=None, max_width=MAX_COLUMN_WIDTH):
+    """
+    Column widths for a DataFrame written to a sheet under a header row: the
+    longest header or cell text of each column plus 2, capped at max_width.
+    Missing values count as empty cells.
+    
+    Args:
+        df: pandas DataFrame, one sheet column per DataFrame column
+        extra_values (dict, optional): 1-based column -> other values written
+            in that column, such as a sheet title
+        max_width: Width cap in characters
+    
+    Returns:
+        list: Width per column, first column first
+    """
+    extra_values = extra_values or {}
+    widths = []
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position].dropna()
+        try:
+            # Report columns repeat values heavily; format each distinct value once
+            values = pd.Series(values.unique())
+        except TypeError:
+            pass  # unhashable cells such as lists
+        # Timestamps are written as str(Timestamp), not their astype(str) form
+        text = values.astype(object).astype(str) if values.dtype.kind in 'mM' else values.astype(str)
+        longest = max(
+            len(str(df.columns[position])),
+            int(text.str.len().max()) if len(text) else 0,
+            *(len(str(value)) for value in extra_values.get(position + 1, ()) if value is not None)
+        )
+        widths.append(min(longest + 2, max_width))
+    return widths
+
+
+def _subtract_range(cells, cut):
+    """Returns the parts of CellRange cells outside CellRange cut."""
+    if cells.isdisjoint(cut):
+        return [cells]
+    inner = cells.intersection(cut)
+    pieces = []
+    if cells.min_row < inner.min_row:
+        pieces.append(CellRange(min_col=cells.min_col, min_row=cells.min_row,
+                                max_col=cells.max_col, max_row=inner.min_row - 1))
+    if inner.max_row < cells.max_row:
+        pieces.append(CellRange(min_col=cells.min_col, min_row=inner.max_row + 1,
+                                max_col=cells.max_col, max_row=cells.max_row))
+    if cells.min_col < inner.min_col:
+        pieces.append(CellRange(min_col=cells.min_col, min_row=inner.min_row,
+                                max_col=inner.min_col - 1, max_row=inner.max_row))
+    if inner.max_col < cells.max_col:
+        pieces.append(CellRange(min_col=inner.max_col + 1, min_row=inner.min_row,
+                                max_col=cells.max_col, max_row=inner.max_row))
+    return pieces
+
 
 class ExcelFormatter:
     """
@@ -27,55 +158,85 @@ class ExcelFormatter:
             'chart_series1': '4F81BD',
             'chart_series2': 'C0504D'
         }
+        self.styles = StyleRegistry()
+        self._define_styles()
+        # Banded ranges per worksheet, as [rule, [CellRange, ...]]
+        self._bands = weakref.WeakKeyDictionary()
+    
+    def _solid_fill(self, color):
+        return PatternFill(start_color=color, end_color=color, fill_type='solid')
+    
+    def _define_styles(self):
+        """Defines the report's named styles from the color scheme."""
+        self.styles.define(HEADER_STYLE,
+                           font=Font(bold=True, color=self.color_scheme['header_font']),
+                           fill=self._solid_fill(self.color_scheme['header_bg']),
+                           alignment=Alignment(horizontal='center', vertical='center'))
+        self.styles.define(TITLE_STYLE,
+                           font=Font(bold=True, size=14, color='1F497D'),
+                           alignment=Alignment(horizontal='center', vertical='center'))
+        self.styles.define(SECTION_HEADER_STYLE,
+                           font=Font(bold=True, size=12, color='1F497D'),
+                           alignment=Alignment(horizontal='left', vertical='center'))
+        self.styles.define(DATA_STYLE,
+                           alignment=Alignment(horizontal='left', vertical='center'))
+        self.styles.define(TOTAL_ROW_STYLE,
+                           font=Font(bold=True, color=self.color_scheme['total_row_font']),
+                           fill=self._solid_fill(self.color_scheme['total_row_bg']))
+    
+    def _add_row_bands(self, ws, start_row, end_row, start_col, end_col, first_row_banded=False):
+        """Colors every second row of a range through a single conditional formatting rule."""
+        cells = CellRange(min_col=start_col, min_row=start_row, max_col=end_col, max_row=end_row)
+        rule = FormulaRule(formula=[f'MOD(ROW()-{start_row},2)={0 if first_row_banded else 1}'],
+                           fill=self._solid_fill(self.color_scheme['alt_row_bg']))
+        ws.conditional_formatting.add(cells.coord, rule)
+        self._bands.setdefault(ws, []).append([rule, [cells]])
+    
+    def clear_banding(self, ws, cell_range):
+        """
+        Removes alternating row colors from a range so that fills set on its
+        cells show: a conditional format is drawn over a cell's own fill.
+        
+        Args:
+            ws: openpyxl worksheet object
+            cell_range: Range such as 'A9:I9'
+        """
+        cut = CellRange(cell_range)
+        for band in self._bands.get(ws, []):
+            rule, ranges = band
+            if all(cells.isdisjoint(cut) for cells in ranges):
+                continue
+            old_ref = ' '.join(cells.coord for cells in ranges)
+            rules = ws.conditional_formatting[old_ref]
+            rules.remove(rule)
+            if not rules:
+                del ws.conditional_formatting[old_ref]
+            band[1] = [piece for cells in ranges for piece in _subtract_range(cells, cut)]
+            if band[1]:
+                # The rule keeps its priority
+                ws.conditional_formatting.add(' '.join(cells.coord for cells in band[1]), rule)
     
-    def format_sheet(self, ws):
+    def format_sheet(self, ws, column_widths=None):
         """
         Applies consistent formatting to a worksheet with alternating row colors 
         and proper column widths.
         
         Args:
             ws: openpyxl worksheet object
+            column_widths (list, optional): Widths from frame_column_widths();
+                without them the widths come from a scan of the sheet
         """
         if ws.max_row <= 1:
             return  # Skip empty sheets
         
-        # Header formatting
-        header_font = Font(bold=True, color=self.color_scheme['header_font'])
-        header_fill = PatternFill(start_color=self.color_scheme['header_bg'], 
-                                 end_color=self.color_scheme['header_bg'], 
-                                 fill_type='solid')
-        header_alignment = Alignment(horizontal='center', vertical='center')
-        
         for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Alternating row colors (skip header)
-        alt_fill = PatternFill(start_color=self.color_scheme['alt_row_bg'], 
-                              end_color=self.color_scheme['alt_row_bg'], 
-                              fill_type='solid')
+            self.styles.apply(cell, HEADER_STYLE)
         
-        for row_num in range(2, ws.max_row + 1):
-            if row_num % 2 == 0:  # Even rows get alternate color
-                for cell in ws[row_num]:
-                    if cell.fill.start_color.index == '00000000':  # Only if not already filled
-                        cell.fill = alt_fill
+        # Alternating row colors on even rows (skip header)
+        self._add_row_bands(ws, 2, ws.max_row, 1, ws.max_column, first_row_banded=True)
         
         # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
-            ws.column_dimensions[column_letter].width = adjusted_width
+        self.auto_adjust_columns(ws, column_widths)
     
     def add_total_row(self, ws, df):
         """
@@ -90,22 +251,14 @@ class ExcelFormatter:
         
         total_row_num = ws.max_row + 1
         
-        # Total row formatting
-        total_font = Font(bold=True, color=self.color_scheme['total_row_font'])
-        total_fill = PatternFill(start_color=self.color_scheme['total_row_bg'], 
-                                end_color=self.color_scheme['total_row_bg'], 
-                                fill_type='solid')
-        
         # Add "TOTAL" label in first column
         ws.cell(row=total_row_num, column=1, value="TOTAL")
-        ws.cell(row=total_row_num, column=1).font = total_font
-        ws.cell(row=total_row_num, column=1).fill = total_fill
+        self.styles.apply(ws.cell(row=total_row_num, column=1), TOTAL_ROW_STYLE)
         
         # Calculate totals for numeric columns
         for col_idx, column_name in enumerate(df.columns, start=2):
             cell = ws.cell(row=total_row_num, column=col_idx)
-            cell.font = total_font
-            cell.fill = total_fill
+            self.styles.apply(cell, TOTAL_ROW_STYLE)
             
             try:
                 # Check if column is numeric and can be summed
@@ -130,23 +283,19 @@ class ExcelFormatter:
             row_num: Row number to add the total row at
             values_dict: Dictionary of column index -> value pairs for the total row
         """
-        # Total row formatting
-        total_font = Font(bold=True, color=self.color_scheme['total_row_font'])
-        total_fill = PatternFill(start_color=self.color_scheme['total_row_bg'], 
-                                end_color=self.color_scheme['total_row_bg'], 
-                                fill_type='solid')
-        
         # Add "TOTAL" label in first column
         ws.cell(row=row_num, column=1, value="TOTAL")
-        ws.cell(row=row_num, column=1).font = total_font
-        ws.cell(row=row_num, column=1).fill = total_fill
+        self.styles.apply(ws.cell(row=row_num, column=1), TOTAL_ROW_STYLE)
         
         # Add values from the dictionary
         for col_idx, value in values_dict.items():
             cell = ws.cell(row=row_num, column=col_idx)
-            cell.font = total_font
-            cell.fill = total_fill
+            self.styles.apply(cell, TOTAL_ROW_STYLE)
             cell.value = value
+        
+        # The row may sit inside a banded table
+        last_col = max([1, *values_dict.keys()])
+        self.clear_banding(ws, f'A{row_num}:{get_column_letter(last_col)}{row_num}')
     
     def add_audio_characteristics_total_row(self, ws, df):
         """
@@ -167,22 +316,14 @@ class ExcelFormatter:
         
         total_row_num = ws.max_row + 1
         
-        # Total row formatting
-        total_font = Font(bold=True, color=self.color_scheme['total_row_font'])
-        total_fill = PatternFill(start_color=self.color_scheme['total_row_bg'], 
-                                end_color=self.color_scheme['total_row_bg'], 
-                                fill_type='solid')
-        
         # Add "TOTAL (Per Year Only)" label
         ws.cell(row=total_row_num, column=1, value="TOTAL (Per Year Only)")
-        ws.cell(row=total_row_num, column=1).font = total_font
-        ws.cell(row=total_row_num, column=1).fill = total_fill
+        self.styles.apply(ws.cell(row=total_row_num, column=1), TOTAL_ROW_STYLE)
         
         # Calculate totals for numeric columns from per_year rows only
         for col_idx, column_name in enumerate(df.columns, start=2):
             cell = ws.cell(row=total_row_num, column=col_idx)
-            cell.font = total_font
-            cell.fill = total_fill
+            self.styles.apply(cell, TOTAL_ROW_STYLE)
             
             if per_year_df[column_name].dtype in ['int64', 'float64']:
                 try:
@@ -237,126 +378,53 @@ class ExcelFormatter:
                 for col in range(1, 5):
                     ws.cell(row=row_idx, column=col).fill = alt_fill
     
-    def apply_title_style(self, ws, cell_range):
-        """Apply title styling to a cell or range."""
-        title_font = Font(bold=True, size=14, color='1F497D')
-        title_alignment = Alignment(horizontal='center', vertical='center')
-        
+    def _apply_named_style(self, ws, cell_range, name):
+        """Applies a named style to a cell or range."""
         if ':' in cell_range:
-            # Range of cells
             for row in ws[cell_range]:
                 for cell in row:
-                    cell.font = title_font
-                    cell.alignment = title_alignment
+                    self.styles.apply(cell, name)
         else:
-            # Single cell
-            cell = ws[cell_range]
-            cell.font = title_font
-            cell.alignment = title_alignment
+            self.styles.apply(ws[cell_range], name)
+    
+    def apply_title_style(self, ws, cell_range):
+        """Apply title styling to a cell or range."""
+        self._apply_named_style(ws, cell_range, TITLE_STYLE)
     
     def apply_header_style(self, ws, cell_range):
         """Apply header styling to a cell or range."""
-        header_font = Font(bold=True, color=self.color_scheme['header_font'])
-        header_fill = PatternFill(start_color=self.color_scheme['header_bg'], 
-                                 end_color=self.color_scheme['header_bg'], 
-                                 fill_type='solid')
-        header_alignment = Alignment(horizontal='center', vertical='center')
-        
-        if ':' in cell_range:
-            # Range of cells
-            for row in ws[cell_range]:
-                for cell in row:
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = header_alignment
-        else:
-            # Single cell
-            cell = ws[cell_range]
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
+        self._apply_named_style(ws, cell_range, HEADER_STYLE)
     
     def apply_data_style(self, ws, cell_range):
-        """Apply data styling to a cell or range with optimized performance for large datasets."""
-        data_alignment = Alignment(horizontal='left', vertical='center')
-        
+        """Apply data styling to a cell or range."""
         if ':' in cell_range:
-            # Parse the range to determine size
-            start_cell, end_cell = cell_range.split(':')
-            start_col_letter = ''.join(filter(str.isalpha, start_cell))
-            start_row = int(''.join(filter(str.isdigit, start_cell)))
-            end_col_letter = ''.join(filter(str.isalpha, end_cell))
-            end_row = int(''.join(filter(str.isdigit, end_cell)))
-            
-            # Convert column letters to indices for calculation
-            from openpyxl.utils import column_index_from_string
-            start_col_num = column_index_from_string(start_col_letter)
-            end_col_num = column_index_from_string(end_col_letter)
-            
-            # Calculate total cells in range
-            total_cells = (end_row - start_row + 1) * (end_col_num - start_col_num + 1)
-            
-            # Use optimized approach for large ranges (>1000 cells)
+            cells = CellRange(cell_range)
+            total_cells = cells.size['rows'] * cells.size['columns']
             if total_cells > 1000:
-                print(f"[INFO] Applying optimized styling to large range: {cell_range} ({total_cells} cells)")
-                self._apply_bulk_data_style(ws, start_row, end_row, start_col_num, end_col_num)
-            else:
-                # Use original approach for smaller ranges
-                for row in ws[cell_range]:
-                    for cell in row:
-                        cell.alignment = data_alignment
+                print(f"[INFO] Applying data style to large range: {cell_range} ({total_cells} cells)")
+            self._apply_bulk_data_style(ws, cells.min_row, cells.max_row, cells.min_col, cells.max_col)
         else:
             # Single cell
-            cell = ws[cell_range]
-            cell.alignment = data_alignment
+            self.styles.apply(ws[cell_range], DATA_STYLE)
     
     def _apply_bulk_data_style(self, ws, start_row, end_row, start_col, end_col):
-        """Apply data styling efficiently to large ranges using batch operations."""
-        data_alignment = Alignment(horizontal='left', vertical='center')
-        
-        # Apply alignment in batches to reduce openpyxl overhead
-        batch_size = 100  # Process 100 rows at a time
-        
-        for batch_start in range(start_row, end_row + 1, batch_size):
-            batch_end = min(batch_start + batch_size - 1, end_row)
-            
-            # Apply styling to this batch
-            for row_num in range(batch_start, batch_end + 1):
-                for col_num in range(start_col, end_col + 1):
-                    try:
-                        cell = ws.cell(row=row_num, column=col_num)
-                        if cell.alignment is None or cell.alignment.horizontal != 'left':
-                            cell.alignment = data_alignment
-                    except Exception:
-                        # Skip problematic cells to prevent crashes
-                        continue
-            
-            # Progress indicator for very large ranges
-            if end_row - start_row > 500:
-                progress = ((batch_end - start_row + 1) / (end_row - start_row + 1)) * 100
-                if progress % 25 == 0 or batch_end == end_row:  # Show progress every 25%
-                    print(f"[INFO] Styling progress: {progress:.0f}% complete")
+        """Applies the data style to every cell of a range, by name."""
+        for row in ws.iter_rows(min_row=start_row, max_row=end_row, min_col=start_col, max_col=end_col):
+            for cell in row:
+                self.styles.apply(cell, DATA_STYLE)
     
     def apply_section_header_style(self, ws, cell_range):
         """Apply section header styling."""
-        section_font = Font(bold=True, size=12, color='1F497D')
-        section_alignment = Alignment(horizontal='left', vertical='center')
-        
-        if ':' in cell_range:
-            # Range of cells
-            for row in ws[cell_range]:
-                for cell in row:
-                    cell.font = section_font
-                    cell.alignment = section_alignment
-        else:
-            # Single cell
-            cell = ws[cell_range]
-            cell.font = section_font
-            cell.alignment = section_alignment
+        self._apply_named_style(ws, cell_range, SECTION_HEADER_STYLE)
     
     def apply_alternating_row_colors(self, ws, start_row, end_row, start_col=1, end_col=None):
         """
-        Applies alternating row colors to a specific range with performance optimization.
+        Applies alternating row colors to a specific range: every second row,
+        starting with the row after start_row, through a single conditional
+        formatting rule for the range.
+        
+        The banding is drawn over fills set on the range's cells; call
+        clear_banding() for cells that get their own fill (totals, highlights).
         
         Args:
             ws: openpyxl worksheet object
@@ -372,62 +440,27 @@ class ExcelFormatter:
             if start_row > end_row or start_col > end_col:
                 return  # Invalid range
             
-            total_rows = end_row - start_row + 1
-            total_cells = total_rows * (end_col - start_col + 1)
-        
-            print(f"[INFO] Applying alternating row colors to range: {get_column_letter(start_col)}{start_row}:{get_column_letter(end_col)}{end_row}")
-            print(f"[INFO] Total rows: {total_rows}, Total cells: {total_cells}")
-        
-            # For very large datasets (>50,000 cells), use a more aggressive optimization
-            if total_cells > 50000:
-                print(f"[INFO] Very large dataset detected ({total_cells} cells), using aggressive optimization")
-                batch_size = 500  # Larger batches for very large datasets
-            else:
-                batch_size = 100  # Standard batch size
-        
-            # Use the same color scheme as format_sheet for consistency
-            alt_fill = PatternFill(start_color=self.color_scheme['alt_row_bg'], 
-                                  end_color=self.color_scheme['alt_row_bg'], 
-                                  fill_type='solid')
-            
-            for batch_start in range(start_row, end_row + 1, batch_size):
-                batch_end = min(batch_start + batch_size - 1, end_row)
-                
-                # Apply alternating colors to this batch
-                for row_num in range(batch_start, batch_end + 1):
-                    # Apply color to even rows (relative to data start)
-                    if (row_num - start_row) % 2 == 1:  # Odd index = even row (since we start at 0)
-                        # Apply fill to entire row within the specified column range
-                        for col_num in range(start_col, end_col + 1):
-                            cell = ws.cell(row=row_num, column=col_num)
-                            # Only apply if not already formatted (preserve existing formatting)
-                            if cell.fill.start_color.index == "00000000":
-                                cell.fill = alt_fill
-                
-                # Progress indicator for very large datasets
-                if total_rows > 500 and (batch_end - start_row + 1) % 500 == 0:
-                    progress = ((batch_end - start_row + 1) / total_rows) * 100
-                    print(f"[INFO] Alternating row colors: {progress:.0f}% complete")
-            
-            print(f"[INFO] Alternating row colors applied successfully to {total_rows} rows")
+            self._add_row_bands(ws, start_row, end_row, start_col, end_col)
+            print(f"[INFO] Applied alternating row colors to range: "
+                  f"{get_column_letter(start_col)}{start_row}:{get_column_letter(end_col)}{end_row} "
+                  f"({end_row - start_row + 1} rows)")
             
         except Exception as e:
             print(f"[WARNING] Could not apply alternating row colors: {e}")
-            # Fallback to no alternating colors rather than crash
-            pass
 
-    def auto_adjust_columns(self, ws):
-        """Auto-adjust column widths based on content."""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
-            ws.column_dimensions[column_letter].width = adjusted_width
+    def auto_adjust_columns(self, ws, column_widths=None):
+        """
+        Sets column widths, first column first.
+        
+        Args:
+            ws: openpyxl worksheet object
+            column_widths (list, optional): Widths from frame_column_widths();
+                without them each column is sized to its longest cell text
+        """
+        if column_widths is None:
+            column_widths = [
+                min(max((len(str(value)) for value in column), default=0) + 2, MAX_COLUMN_WIDTH)
+                for column in ws.iter_cols(values_only=True)
+            ]
+        for col_idx, width in enumerate(column_widths, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
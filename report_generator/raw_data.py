@@ -9,6 +9,13 @@ transparency.
 
 The implementation replicates the exact functionality from the original monolithic
 generator to ensure backward compatibility and consistency.
+
+For large archives the sheet can instead be streamed into a companion
+workbook through a write-once workbook writer (openpyxl write_only, or
+xlsxwriter constant_memory for speed): rows go straight from a projected,
+batched cursor to disk with pre-built styles, so memory stays flat however
+many records there are. The report then carries a short
+Raw Data sheet pointing at that file.
 """
 
 import pandas as pd
@@ -18,6 +25,13 @@ from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
 import os
 
+from .raw_data_writer import create_workbook_writer
+
+# Documents fetched per round trip when exporting raw data
+RAW_DATA_BATCH_SIZE = 1000
+# Rows sampled (after the header) to size columns
+COLUMN_WIDTH_SAMPLE_ROWS = 99
+
 
 class RawDataCreator:
     """
@@ -27,16 +41,19 @@ class RawDataCreator:
     raw dataset, formatted consistently with the original implementation.
     """
     
-    def __init__(self, db, formatter):
+    def __init__(self, db, formatter, raw_data_backend='openpyxl'):
         """
         Initialize the raw data creator.
         
         Args:
             db: MongoDB database connection
             formatter: ExcelFormatter instance for consistent formatting
+            raw_data_backend (str): Writer for the streamed raw data workbook,
+                'openpyxl' or 'xlsxwriter'
         """
         self.db = db
         self.formatter = formatter
+        self.raw_data_backend = raw_data_backend
     
     def create_raw_data_sheet(self, workbook: openpyxl.Workbook) -> bool:
         """
@@ -76,7 +93,7 @@ class RawDataCreator:
                 return True
             
             # Use efficient cursor iteration instead of loading all into memory
-            all_docs_cursor = collection.find({})
+            all_docs_cursor = self._raw_data_cursor()
             
             # Process first document to get column structure
             first_doc = next(all_docs_cursor, None)
@@ -87,17 +104,7 @@ class RawDataCreator:
                 self.formatter.format_sheet(ws)
                 return True
             
-            # Remove MongoDB _id from first document
-            if '_id' in first_doc:
-                del first_doc['_id']
-            
-            # Get column names from first document
-            column_names = list(first_doc.keys())
-            
-            # Ensure file_name is first if present
-            if 'file_name' in column_names:
-                column_names.remove('file_name')
-                column_names.insert(0, 'file_name')
+            column_names = self._column_names(first_doc)
             
             print(f"[RAW DATA] Schema: {len(column_names)} columns")
             
@@ -110,40 +117,14 @@ class RawDataCreator:
             print(f"[RAW DATA] Added header row with {len(column_names)} columns")
             
             # Process first document and add to sheet
-            first_row = []
-            for col in column_names:
-                value = first_doc.get(col, '')
-                # Handle ISO_Month conversion for Excel compatibility
-                if col == 'ISO_Month' and value is not None:
-                    try:
-                        value = int(value)
-                    except (ValueError, TypeError):
-                        pass
-                first_row.append(value)
-            ws.append(first_row)
+            ws.append(self._row_values(first_doc, column_names))
             
             # Process remaining documents efficiently
             print("[RAW DATA] Adding remaining data rows...")
             row_count = 1  # Already added first row
             
             for doc in all_docs_cursor:
-                # Remove MongoDB _id
-                if '_id' in doc:
-                    del doc['_id']
-                
-                # Create row in column order
-                row = []
-                for col in column_names:
-                    value = doc.get(col, '')
-                    # Handle ISO_Month conversion for Excel compatibility
-                    if col == 'ISO_Month' and value is not None:
-                        try:
-                            value = int(value)
-                        except (ValueError, TypeError):
-                            pass
-                    row.append(value)
-                
-                ws.append(row)
+                ws.append(self._row_values(doc, column_names))
                 row_count += 1
                 
                 # Progress indicator for large datasets
@@ -179,6 +160,173 @@ class RawDataCreator:
             
             return False
     
+    def create_streaming_raw_data_sheet(self, workbook: openpyxl.Workbook, stream_path: str) -> bool:
+        """
+        Streams the raw data into a separate write-only workbook at stream_path
+        and adds a Raw Data sheet to the report that points to it.
+        
+        Rows are written as they arrive from the cursor by the configured
+        workbook backend, with header, banding and hyperlink styles applied at
+        write time; nothing is
+        formatted afterwards. File names link to their files through HYPERLINK
+        formulas. Column widths come from the first rows, using the same rule
+        as the in-workbook sheet.
+        
+        Args:
+            workbook: Report workbook that gets the pointer sheet
+            stream_path: Path of the raw data workbook to write
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        print(f"[RAW DATA] Streaming Raw Data sheet to {stream_path}...")
+        
+        try:
+            cursor = self._raw_data_cursor()
+            # Column order and widths come from the first rows; keep only those in memory
+            sample = []
+            for doc in cursor:
+                sample.append(doc)
+                if len(sample) == COLUMN_WIDTH_SAMPLE_ROWS:
+                    break
+            if not sample:
+                print("[WARNING] No raw data found in database")
+                ws = workbook.create_sheet(title="Raw Data")
+                ws.append(["No data available", "The database appears to be empty"])
+                self.formatter.format_sheet(ws)
+                return True
+            
+            column_names = self._column_names(sample[0])
+            link_column = column_names.index('file_name') if 'file_path' in column_names and 'file_name' in column_names else None
+            path_column = column_names.index('file_path') if link_column is not None else None
+            
+            writer = create_workbook_writer(stream_path, self.raw_data_backend)
+            for name, spec in self._raw_data_styles().items():
+                writer.add_style(name, spec)
+            ws = writer.add_sheet("Raw Data")
+            sample_rows = [self._row_values(doc, column_names) for doc in sample]
+            writer.set_column_widths(ws, self._column_widths(column_names, sample_rows))
+            writer.freeze_header(ws)
+            writer.append_row(ws, column_names, 'header')
+            
+            def all_rows():
+                yield from sample_rows
+                for doc in cursor:
+                    yield self._row_values(doc, column_names)
+            
+            row_count = 0
+            for row_count, values in enumerate(all_rows(), start=1):
+                # Every second data row is banded, as in the in-workbook sheet
+                banded = row_count % 2 == 0
+                styles = 'band' if banded else None
+                if link_column is not None and values[path_column] and values[link_column]:
+                    # A HYPERLINK formula streams like any other cell; cell hyperlink
+                    # objects would be held until the sheet is closed
+                    values[link_column] = self._hyperlink_formula(
+                        self._file_url(values[path_column]), values[link_column]
+                    )
+                    styles = [styles] * len(values)
+                    styles[link_column] = 'link_band' if banded else 'link'
+                writer.append_row(ws, values, styles)
+                
+                # Progress indicator for large datasets
+                if row_count % 10000 == 0:
+                    print(f"[RAW DATA] Streamed {row_count} rows...")
+            
+            writer.close()
+            print(f"[RAW DATA] Streamed {row_count} data rows to {stream_path} ({writer.backend})")
+            
+            # Pointer sheet in the report itself
+            pointer = workbook.create_sheet(title="Raw Data")
+            pointer.append(["Raw data workbook", os.path.basename(stream_path)])
+            pointer.append(["Records", row_count])
+            pointer.append(["Columns", len(column_names)])
+            pointer['B1'].hyperlink = os.path.basename(stream_path)
+            self.formatter.format_sheet(pointer)
+            
+            print("[SUCCESS] Raw Data sheet streamed successfully")
+            return True
+            
+        except Exception as e:
+            print(f"[ERROR] Failed to stream Raw Data sheet: {e}")
+            import traceback
+            traceback.print_exc()
+            
+            # Create error sheet for transparency
+            try:
+                ws = workbook.create_sheet(title="Raw Data")
+                ws.append(["Error", "Failed to export raw data"])
+                ws.append(["Details", str(e)])
+                self.formatter.format_sheet(ws)
+            except:
+                pass
+            
+            return False
+    
+    def _raw_data_cursor(self):
+        """Cursor over all media records without _id, fetched in batches."""
+        return self.db['media_records'].find({}, {'_id': 0}, batch_size=RAW_DATA_BATCH_SIZE)
+    
+    @staticmethod
+    def _column_names(first_doc):
+        """Sheet columns: the first document's fields, with file_name first if present."""
+        column_names = [name for name in first_doc.keys() if name != '_id']
+        if 'file_name' in column_names:
+            column_names.remove('file_name')
+            column_names.insert(0, 'file_name')
+        return column_names
+    
+    @staticmethod
+    def _row_values(doc, column_names):
+        """Row values in column order."""
+        row = []
+        for col in column_names:
+            value = doc.get(col, '')
+            # Handle ISO_Month conversion for Excel compatibility
+            if col == 'ISO_Month' and value is not None:
+                try:
+                    value = int(value)
+                except (ValueError, TypeError):
+                    pass
+            row.append(value)
+        return row
+    
+    @staticmethod
+    def _file_url(file_path):
+        """file:/// link for a stored file path."""
+        return 'file:///' + str(file_path).replace('\\', '/')
+    
+    @staticmethod
+    def _hyperlink_formula(url, label):
+        """=HYPERLINK() formula showing label and opening url."""
+        def quoted(text):
+            return '"' + str(text).replace('"', '""') + '"'
+        return f'=HYPERLINK({quoted(url)}, {quoted(label)})'
+    
+    @staticmethod
+    def _column_widths(column_names, sample_rows):
+        """Width per column from the header and sampled rows: min 10, max 50, +2 padding."""
+        widths = []
+        for col_idx, name in enumerate(column_names):
+            max_length = len(str(name)) if name else 0
+            for row in sample_rows:
+                value = row[col_idx]
+                if value:
+                    max_length = max(max_length, len(str(value)))
+            widths.append(min(max(max_length + 2, 10), 50))
+        return widths
+    
+    def _raw_data_styles(self):
+        """Style specs of the streamed sheet by role (see raw_data_writer)."""
+        band = self.formatter.color_scheme['alt_row_bg']
+        return {
+            'header': {'bold': True, 'font_color': 'FFFFFF', 'bg_color': '1F497D',
+                       'align': 'center', 'valign': 'center'},
+            'band': {'bg_color': band},
+            'link': {'font_color': '0563C1', 'underline': True},
+            'link_band': {'font_color': '0563C1', 'underline': True, 'bg_color': band}
+        }
+    
     def get_raw_data_summary(self) -> dict:
         """
         Get summary statistics about the raw data for reporting.
@@ -249,14 +397,14 @@ class RawDataCreator:
                     file_name_cell = ws.cell(row=row_idx, column=file_name_col_idx)
                     
                     if file_path_cell.value and file_name_cell.value:
-                        file_path = str(file_path_cell.value)
+                        file_path = file_path_cell.value
                         
                         # PERFORMANCE OPTIMIZATION: Skip file existence check
                         # The database should only contain valid file paths
                         # Checking 10,000+ files with os.path.exists() is extremely slow
                         
                         # Create hyperlink (trust database integrity)
-                        file_name_cell.hyperlink = f'file:///{file_path.replace("\\", "/")}'
+                        file_name_cell.hyperlink = self._file_url(file_path)
                         file_name_cell.style = "Hyperlink"
                         hyperlink_count += 1
                     
@@ -0,0 +1,203 @@
+"""
+Raw Data Export Writers
+=======================
+
+Writers for the streamed Raw Data export (ReportGenerator(stream_raw_data=True)),
+the one workbook this project produces row by row. Two interchangeable
+backends:
+
+- "openpyxl": an openpyxl write_only workbook. Always available and matches
+  the styling of the Raw Data sheet built in the main report.
+- "xlsxwriter": xlsxwriter in constant_memory mode. Several times faster for
+  large exports; needs the optional xlsxwriter package.
+
+Both stream rows to disk, so memory does not grow with the row count. Styles
+are declared once as small dicts and turned into an openpyxl NamedStyle or an
+xlsxwriter Format by the backend:
+
+    {'bold': True, 'font_color': 'FFFFFF', 'bg_color': '1F497D',
+     'align': 'center', 'valign': 'center', 'underline': True}
+
+Strings starting with '=' are written as formulas by both backends.
+
+This is not a backend for the main report. That workbook stays on a regular
+openpyxl Workbook because the formatting passes, totals, charts, dashboard
+and sheet reordering read its sheets back after they are written, which
+neither write-only mode allows.
+
+Usage:
+    writer = create_workbook_writer('export.xlsx', backend='xlsxwriter')
+    writer.add_style('header', {'bold': True})
+    sheet = writer.add_sheet('Raw Data')
+    writer.set_column_widths(sheet, [20, 12])
+    writer.freeze_header(sheet)
+    writer.append_row(sheet, ['file_name', 'ISO_Date'], 'header')
+    writer.append_row(sheet, ['a.jpg', '2021-09-14'])
+    writer.close()
+"""
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+RAW_DATA_BACKENDS = ('openpyxl', 'xlsxwriter')
+
+
+class OpenpyxlWorkbookWriter:
+    """Write-once workbook on an openpyxl write_only Workbook."""
+
+    backend = 'openpyxl'
+
+    def __init__(self, path):
+        self.path = path
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._styles = {}
+
+    def add_style(self, name, spec):
+        """Registers a named style from a style dict (see module docstring)."""
+        alignment = None
+        if spec.get('align') or spec.get('valign'):
+            alignment = Alignment(horizontal=spec.get('align'), vertical=spec.get('valign'))
+        style = NamedStyle(name=name)
+        style.font = Font(bold=spec.get('bold', False), color=spec.get('font_color'),
+                          underline='single' if spec.get('underline') else None)
+        if spec.get('bg_color'):
+            style.fill = PatternFill(start_color=spec['bg_color'], end_color=spec['bg_color'], fill_type='solid')
+        if alignment is not None:
+            style.alignment = alignment
+        self._workbook.add_named_style(style)
+        self._styles[name] = name
+
+    def add_sheet(self, title):
+        return self._workbook.create_sheet(title=title)
+
+    def set_column_widths(self, sheet, widths):
+        """Sets column widths, first column first; must precede the first row."""
+        for col_idx, width in enumerate(widths, start=1):
+            sheet.column_dimensions[get_column_letter(col_idx)].width = width
+
+    def freeze_header(self, sheet):
+        sheet.freeze_panes = 'A2'
+
+    def append_row(self, sheet, values, styles=None):
+        """
+        Appends a row.
+
+        Args:
+            values (list): Cell values.
+            styles: None, one style name for the whole row, or a list with a
+                style name (or None) per cell.
+        """
+        if styles is None:
+            sheet.append(values)
+            return
+        if isinstance(styles, str):
+            styles = [styles] * len(values)
+        row = []
+        for value, style in zip(values, styles):
+            if style is None:
+                row.append(value)
+            else:
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.style = self._styles[style]
+                row.append(cell)
+        sheet.append(row)
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+class XlsxWriterWorkbookWriter:
+    """Write-once workbook on xlsxwriter in constant_memory mode."""
+
+    backend = 'xlsxwriter'
+
+    def __init__(self, path):
+        self.path = path
+        self._workbook = xlsxwriter.Workbook(path, {
+            'constant_memory': True,
+            # Match openpyxl: plain text stays text, datetimes get a date format
+            'strings_to_urls': False,
+            'default_date_format': 'yyyy-mm-dd h:mm:ss',
+            'remove_timezone': True,
+            'nan_inf_to_errors': True
+        })
+        self._formats = {}
+        self._next_row = {}
+
+    def add_style(self, name, spec):
+        """Registers a named style from a style dict (see module docstring)."""
+        properties = {}
+        if spec.get('bold'):
+            properties['bold'] = True
+        if spec.get('font_color'):
+            properties['font_color'] = '#' + spec['font_color']
+        if spec.get('bg_color'):
+            properties.update(bg_color='#' + spec['bg_color'], pattern=1)
+        if spec.get('align'):
+            properties['align'] = spec['align']
+        if spec.get('valign'):
+            properties['valign'] = 'vcenter' if spec['valign'] == 'center' else spec['valign']
+        if spec.get('underline'):
+            properties['underline'] = 1
+        self._formats[name] = self._workbook.add_format(properties)
+
+    def add_sheet(self, title):
+        sheet = self._workbook.add_worksheet(title)
+        self._next_row[sheet.name] = 0
+        return sheet
+
+    def set_column_widths(self, sheet, widths):
+        """Sets column widths, first column first; must precede the first row."""
+        for col_idx, width in enumerate(widths):
+            sheet.set_column(col_idx, col_idx, width)
+
+    def freeze_header(self, sheet):
+        sheet.freeze_panes(1, 0)
+
+    def append_row(self, sheet, values, styles=None):
+        """
+        Appends a row.
+
+        Args:
+            values (list): Cell values.
+            styles: None, one style name for the whole row, or a list with a
+                style name (or None) per cell.
+        """
+        row_idx = self._next_row[sheet.name]
+        self._next_row[sheet.name] = row_idx + 1
+        if isinstance(styles, str) or styles is None:
+            styles = [styles] * len(values)
+        for col_idx, (value, style) in enumerate(zip(values, styles)):
+            cell_format = self._formats[style] if style is not None else None
+            if value is None or value == '':
+                if cell_format is not None:
+                    sheet.write_blank(row_idx, col_idx, None, cell_format)
+                continue
+            sheet.write(row_idx, col_idx, value, cell_format)
+
+    def close(self):
+        self._workbook.close()
+
+
+def create_workbook_writer(path, backend='openpyxl'):
+    """
+    Returns a writer for a new workbook at path.
+
+    Falls back to openpyxl, with a warning, if xlsxwriter is requested but
+    not installed.
+    """
+    if backend not in RAW_DATA_BACKENDS:
+        raise ValueError(f"Unknown raw data backend '{backend}'; expected one of {RAW_DATA_BACKENDS}")
+    if backend == 'xlsxwriter':
+        if XLSXWRITER_AVAILABLE:
+            return XlsxWriterWorkbookWriter(path)
+        print("[WARNING] xlsxwriter is not installed; writing with openpyxl instead")
+    return OpenpyxlWorkbookWriter(path)
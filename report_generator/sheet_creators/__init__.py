@@ -839,7 +839,7 @@ class SheetCreator(SpecializedSheetCreator, PipelineSheetCreator):
                 'create_mp3_duration_analysis_sheet'
             ],
             'utility_methods': [
-                '_fill_missing_collection_days',
+                '_reindex_time_axis',
                 '_run_aggregation',
                 '_should_apply_forecasting',
                 '_apply_arima_forecasting'
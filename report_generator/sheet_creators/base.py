@@ -14,17 +14,11 @@ from datetime import datetime
 # Local imports
 # CRITICAL FIX: Import add_acf_pacf_analysis from ar_utils.py to avoid namespace collision
 from ar_utils import add_acf_pacf_analysis, reorder_with_acf_pacf, infer_sheet_type
-from utils import (
-    get_school_calendar, get_non_collection_days, precompute_collection_days
-)
-from pipelines import PIPELINES  # Now using modular pipelines/ package
+from utils import get_non_collection_days
+from pipelines import PIPELINES, TIME_AXIS_GRANULARITIES  # Now using modular pipelines/ package
 from ..totals_manager import TotalsManager  # Import totals system
-
-# Import db_utils conditionally to avoid import errors
-try:
-    from db_utils import get_db_connection
-except ImportError:
-    get_db_connection = None
+from ..aggregation_cache import AggregationCache
+from ..time_axis import reindex_time_axis
 
 # Import data cleaning utilities
 from utils.data_cleaning import DataCleaningUtils
@@ -45,178 +39,115 @@ class BaseSheetCreator:
         """
         self.db = db
         self.formatter = formatter
-        # Global pipeline cache to prevent duplicate executions
-        self._pipeline_cache = {}
+        # Aggregation results keyed on pipeline content; ReportGenerator shares one across creators
+        self.aggregation_cache = AggregationCache()
         self.totals_manager = TotalsManager()  # Initialize totals manager
+        # Optional ReportFactTable; set by ReportGenerator to answer aggregations in-process
+        self.fact_table = None
+        # Read time-series pipelines from daily_rollups; set by ReportGenerator once it is in sync
+        self.use_daily_rollups = False
+        # Concurrent aggregation limit; None uses report_config.json execution_options
+        self.max_concurrent_pipelines = None
+        # Optional AnalysisResultStore; pipeline sheets publish their ACF/PACF and forecast results to it
+        self.analysis_results = None
     
-    def _fill_missing_collection_days(self, df, pipeline_name):
+    def _reindex_time_axis(self, df, pipeline_name):
         """
-        Fills in missing collection days with zero counts for complete time series.
+        Adds zero rows for the calendar buckets a time-series result is missing.
         This is critical for ACF/PACF/ARIMA analysis which requires continuous time series.
         
-        FIXED: Now includes ALL collection days from the official school year start date
-        to resolve left-aligned row issues and ensure consistent totals.
-        
         Args:
-            df (pandas.DataFrame): DataFrame from daily aggregation
-            pipeline_name (str): Name of the pipeline to determine if zero-fill is needed
+            df (pandas.DataFrame): Aggregation result
+            pipeline_name (str): Pipeline that produced it; only pipelines in
+                TIME_AXIS_GRANULARITIES are reindexed
             
         Returns:
-            pandas.DataFrame: DataFrame with missing collection days filled with zeros
+            pandas.DataFrame: DataFrame covering every week, bi-week, month or period
         """
-        if not ('DAILY' in pipeline_name.upper() and 
-                ('WITH_ZEROES' in pipeline_name.upper() or 'COLLECTION_ONLY' in pipeline_name.upper())):
+        granularity = TIME_AXIS_GRANULARITIES.get(pipeline_name)
+        if granularity is None:
             return df
-        
         try:
-            school_calendar = get_school_calendar()
-            non_collection_days = get_non_collection_days()
-            collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
-            
-            # CRITICAL FIX: Ensure ALL collection days are included in zero-fill
-            # This resolves the left-aligned row issue by including early September dates
-            all_collection_days = []
-            for date_obj, info in collection_day_map.items():
-                all_collection_days.append({'_id': date_obj.strftime('%Y-%m-%d')})
-            
-            all_days_df = pd.DataFrame(all_collection_days)
-            
-            # DEBUG: Log the date range being used
-            if all_collection_days:
-                min_date = min(day['_id'] for day in all_collection_days)
-                max_date = max(day['_id'] for day in all_collection_days)
-                print(f"[ZERO_FILL] Including all collection days from {min_date} to {max_date}")
-                print(f"[ZERO_FILL] Total collection days: {len(all_collection_days)}")
-            
-            # Merge with existing data, keeping actual data and filling missing with zeros
-            merged_df = pd.merge(all_days_df, df, on='_id', how='left').fillna(0)
-            
-            # Ensure correct data types after merge
-            for col in ['Total_Files', 'MP3_Files', 'JPG_Files']:
-                if col in merged_df.columns:
-                    merged_df[col] = merged_df[col].astype(int)
-            if 'Total_Size_MB' in merged_df.columns:
-                 merged_df['Total_Size_MB'] = merged_df['Total_Size_MB'].astype(float)
-
-            # CRITICAL FIX: Sort by date to ensure proper chronological order
-            # This ensures early September dates appear in the correct position
-            final_df = merged_df.sort_values('_id').reset_index(drop=True)
-            
-            # DEBUG: Log early September inclusion
-            early_sept_dates = [
-                "2021-09-13", "2021-09-14", "2021-09-15", "2021-09-16", "2021-09-17",
-                "2021-09-20", "2021-09-21", "2021-09-22", "2021-09-23", "2021-09-24", "2021-09-27"
-            ]
-            
-            early_sept_count = 0
-            for date_str in early_sept_dates:
-                if date_str in final_df['_id'].values:
-                    row = final_df[final_df['_id'] == date_str]
-                    if not row.empty:
-                        count = row.iloc[0]['Total_Files'] if 'Total_Files' in row.columns else 0
-                        early_sept_count += count
-            
-            if early_sept_count > 0:
-                print(f"[ZERO_FILL] Early September files included: {early_sept_count}")
-                print(f"[ZERO_FILL] This should resolve left-aligned row issues")
-            
-            total_files = final_df['Total_Files'].sum() if 'Total_Files' in final_df.columns else 0
-            print(f"[ZERO_FILL] Total files after zero-fill: {total_files}")
-            
-            return final_df
-            
+            return reindex_time_axis(df, granularity)
         except Exception as e:
             print(f"[WARNING] Zero-fill failed, returning original data: {e}")
             return df
             
     def _run_aggregation_cached(self, cache_key, pipeline, use_base_filter=True, collection_name='media_records'):
         """
-        Runs a MongoDB aggregation pipeline with caching to prevent duplicate executions.
+        Runs a MongoDB aggregation pipeline through the shared aggregation cache.
+
+        cache_key labels the request in logs; the cache itself is keyed on the
+        pipeline content. Pipeline sheets reindex time-series results onto the
+        calendar axis themselves (_create_pipeline_sheet).
         """
-        # Check cache first
-        if cache_key in self._pipeline_cache:
-            print(f"[CACHE HIT] BaseSheetCreator: Reusing cached result for {cache_key}")
-            return self._pipeline_cache[cache_key].copy(deep=True)
-        
-        # Execute pipeline and cache result
-        print(f"[CACHE MISS] BaseSheetCreator: Executing and caching {cache_key}")
-        # COMPREHENSIVE DEBUG LOGGING FOR AGGREGATION
-        print(f"[AGGREGATION_DEBUG] ========================================")
-        print(f"[AGGREGATION_DEBUG] Cache key: {cache_key}")
-        print(f"[AGGREGATION_DEBUG] Pipeline type: {type(pipeline)}")
-        print(f"[AGGREGATION_DEBUG] Pipeline preview: {str(pipeline)[:200]}...")
-        print(f"[AGGREGATION_DEBUG] Use base filter: {use_base_filter}")
-        print(f"[AGGREGATION_DEBUG] Collection: {collection_name}")
-        print(f"[AGGREGATION_DEBUG] About to execute pipeline...")
-        print(f"[AGGREGATION_DEBUG] ========================================")
-        
-        result = self._run_aggregation_original(pipeline, use_base_filter, collection_name)
-        
-        # CRITICAL FIX: Apply zero-fill logic for ACF/PACF sheets
-        # This ensures all ACF/PACF sheets get the complete time series data
-        if self._should_apply_zero_fill(cache_key):
-            print(f"[ZERO_FILL_PATCH] Applying zero-fill to {cache_key}")
-            result = self._fill_missing_collection_days(result, cache_key)
-        
-        self._pipeline_cache[cache_key] = result.copy(deep=True)
-        return result
+        return self._fetch_aggregation(pipeline, use_base_filter, collection_name, label=cache_key)
     
-    def _should_apply_zero_fill(self, cache_key):
+    def _fetch_aggregation(self, pipeline, use_base_filter=True, collection_name='media_records', label=None,
+                           raise_errors=False):
         """
-        Determine if zero-fill logic should be applied based on the cache key (pipeline name).
-        
-        Args:
-            cache_key (str): The cache key, typically the pipeline name
-            
-        Returns:
-            bool: True if zero-fill should be applied, False otherwise
+        Returns the aggregation result from the shared cache, running it on a miss.
+        The DataFrame returned is the caller's own copy.
+
+        A failed aggregation is not cached, so the next request runs it again.
+        It is logged and returned as an empty DataFrame unless raise_errors is set.
         """
-        print(f"[ZERO_FILL_DEBUG] Checking cache_key: {cache_key}")
-        
-        # Apply zero-fill to daily pipelines with specific patterns
-        if 'DAILY' in cache_key.upper() and (
-            'WITH_ZEROES' in cache_key.upper() or 
-            'COLLECTION_ONLY' in cache_key.upper() or
-            'ALL_WITH_ZEROES' in cache_key.upper()  # NEW: Handle DAILY_COUNTS_ALL_WITH_ZEROES
-        ):
-            print(f"[ZERO_FILL_DEBUG] ✅ Daily pipeline match: {cache_key}")
-            return True
-        
-        # Also apply to weekly pipelines with WITH_ZEROES
-        if 'WEEKLY' in cache_key.upper() and 'WITH_ZEROES' in cache_key.upper():
-            print(f"[ZERO_FILL_DEBUG] ✅ Weekly pipeline match: {cache_key}")
-            return True
-        
-        print(f"[ZERO_FILL_DEBUG] ❌ No match for: {cache_key}")
-        return False
+        try:
+            return self.aggregation_cache.fetch(
+                self._with_base_filter(pipeline, use_base_filter),
+                collection_name,
+                lambda: self._execute_aggregation(pipeline, use_base_filter, collection_name),
+                label=label
+            )
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"[ERROR] Aggregation failed: {e}")
+            return pd.DataFrame()
     
     def _run_aggregation_original(self, pipeline, use_base_filter=True, collection_name='media_records'):
         """
         Original pipeline execution method (renamed to avoid conflicts).
+        Always runs the pipeline; use _fetch_aggregation for cached results.
         """
         try:
-            collection = self.db[collection_name]
-            full_pipeline = pipeline
-            if use_base_filter:
-                base_filter = {"$match": {
-                    "School_Year": {"$ne": "N/A"},
-                    "file_type": {"$in": ["JPG", "MP3"]}
-                }}
-                full_pipeline = [base_filter] + pipeline
-            
-            cursor = collection.aggregate(full_pipeline, allowDiskUse=True)
-            df = pd.DataFrame(list(cursor))
-            
-            if '_id' in df.columns and df.shape[0] > 0 and isinstance(df['_id'].iloc[0], dict):
-                # Flatten the _id dictionary into separate columns
-                id_df = pd.json_normalize(df['_id'])
-                df = pd.concat([df.drop('_id', axis=1), id_df], axis=1)
-            
-            return df
+            return self._execute_aggregation(pipeline, use_base_filter, collection_name)
         except Exception as e:
             print(f"[ERROR] Aggregation failed: {e}")
             return pd.DataFrame()
     
+    def _execute_aggregation(self, pipeline, use_base_filter=True, collection_name='media_records'):
+        """
+        Runs the pipeline and returns its result as a DataFrame with any _id
+        document flattened into columns. Errors propagate to the caller.
+        """
+        collection = self.db[collection_name]
+        full_pipeline = self._with_base_filter(pipeline, use_base_filter)
+
+        documents = None
+        if self.fact_table is not None:
+            documents = self.fact_table.aggregate(full_pipeline, collection_name)
+        if documents is None:
+            documents = list(collection.aggregate(full_pipeline, allowDiskUse=True))
+        df = pd.DataFrame(documents)
+        
+        if '_id' in df.columns and df.shape[0] > 0 and isinstance(df['_id'].iloc[0], dict):
+            # Flatten the _id dictionary into separate columns
+            id_df = pd.json_normalize(df['_id'])
+            df = pd.concat([df.drop('_id', axis=1), id_df], axis=1)
+        
+        return df
+    
+    def _with_base_filter(self, pipeline, use_base_filter=True):
+        """Returns the pipeline with the standard base filter prepended if requested."""
+        if not use_base_filter:
+            return pipeline
+        base_filter = {"$match": {
+            "School_Year": {"$ne": "N/A"},
+            "file_type": {"$in": ["JPG", "MP3"]}
+        }}
+        return [base_filter] + pipeline
+    
     def _run_aggregation(self, pipeline, use_base_filter=True, collection_name='media_records'):
         """
         Runs a MongoDB aggregation pipeline and returns a DataFrame.
@@ -468,17 +399,7 @@ class BaseSheetCreator:
             # Initialize DataCleaningUtils if not already done
             if not hasattr(self, 'data_cleaning_utils'):
                 try:
-                    # Use existing database connection or create a new one
-                    if hasattr(self, 'db'):
-                        db = self.db
-                    elif get_db_connection is not None:
-                        db = get_db_connection()
-                    else:
-                        from pymongo import MongoClient
-                        client = MongoClient('localhost', 27017)
-                        db = client.ARDataAnalysis
-                    
-                    self.data_cleaning_utils = DataCleaningUtils(db)
+                    self.data_cleaning_utils = DataCleaningUtils(self.db)
                 except Exception as e:
                     print(f"[WARNING] Failed to initialize DataCleaningUtils: {e}")
                     # Fallback to original implementation if initialization fails
@@ -8,7 +8,9 @@ sheets with ACF/PACF analysis and ARIMA forecasting capabilities.
 """
 
 import json
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from openpyxl.utils import get_column_letter
 
@@ -18,9 +20,15 @@ from openpyxl.utils import get_column_letter
 from ar_utils import add_acf_pacf_analysis, reorder_with_acf_pacf, infer_sheet_type
 from column_cleanup_utils import cleanup_duplicate_acf_pacf_columns
 from utils.formatting import reorder_with_forecast_columns  # Explicit submodule import
-from pipelines import PIPELINES  # Now using modular pipelines/ package
+from pipelines import PIPELINES, ROLLUP_PIPELINES  # Now using modular pipelines/ package
+from pipelines.utils import DAILY_ROLLUPS_COLLECTION
+from ..formatters import frame_column_widths
 from .base import BaseSheetCreator
 
+# Aggregations run concurrently before sheets are built, unless
+# report_config.json sets execution_options.max_concurrent_pipelines
+DEFAULT_MAX_CONCURRENT_PIPELINES = 4
+
 
 class PipelineSheetCreator(BaseSheetCreator):
     """
@@ -54,11 +62,15 @@ class PipelineSheetCreator(BaseSheetCreator):
                 order = sheet.get('order', 999)
                 print(f"[DEBUG] Sheet: {sheet_name}, Order: {order}, Specialized: {is_specialized}")
             
-            # Process each sheet configuration in order
+            # Phase 1: run every sheet's aggregation concurrently into the shared cache
+            max_workers = self.max_concurrent_pipelines or config.get('execution_options', {}).get(
+                'max_concurrent_pipelines', DEFAULT_MAX_CONCURRENT_PIPELINES
+            )
+            self._prefetch_pipeline_results(enabled_sheets, max_workers)
+            
+            # Phase 2: build each sheet in configured order from the cached results
+            # Results are shared across sheets; the cache hands every sheet its own copy
             for sheet_config in enabled_sheets:
-                # Clear pipeline cache before each sheet to prevent contamination
-                self._pipeline_cache.clear()
-                
                 sheet_name = sheet_config.get('name', sheet_config.get('sheet_name', 'Unknown'))
                 is_specialized = sheet_config.get('specialized', False)
                 print(f"[DEBUG] Processing sheet '{sheet_name}': specialized={is_specialized}")
@@ -75,6 +87,67 @@ class PipelineSheetCreator(BaseSheetCreator):
         except Exception as e:
             print(f"[ERROR] Failed to process pipeline configurations: {e}")
     
+    def _sheet_aggregation(self, pipeline_name):
+        """
+        Returns the (pipeline, collection_name) a pipeline sheet aggregates:
+        the daily_rollups variant when rollups are enabled and one exists.
+        """
+        if self.use_daily_rollups and pipeline_name in ROLLUP_PIPELINES:
+            return ROLLUP_PIPELINES[pipeline_name], DAILY_ROLLUPS_COLLECTION
+        return PIPELINES[pipeline_name], 'media_records'
+    
+    def _prefetch_pipeline_results(self, sheet_configs, max_workers):
+        """
+        Runs the aggregations of all pipeline sheets on a thread pool so the
+        report waits for the slowest query rather than the sum of all of them.
+        Results land in the shared aggregation cache, where the sheets built
+        afterwards pick them up. A failed aggregation is logged and not cached,
+        so its sheet runs it again when it is built.
+        
+        Args:
+            sheet_configs: Enabled sheet configurations
+            max_workers: Maximum number of aggregations running at once
+            
+        Returns:
+            dict: Seconds spent on each pipeline, by pipeline name
+        """
+        requests = {}
+        for sheet_config in sheet_configs:
+            pipeline_name = sheet_config.get('pipeline')
+            if not sheet_config.get('specialized', False) and pipeline_name in PIPELINES:
+                requests.setdefault(pipeline_name, self._sheet_aggregation(pipeline_name))
+        if not requests:
+            return {}
+        
+        def run(pipeline_name, pipeline, collection_name):
+            start = time.perf_counter()
+            self._fetch_aggregation(pipeline, collection_name=collection_name, label=pipeline_name,
+                                    raise_errors=True)
+            return time.perf_counter() - start
+        
+        max_workers = max(1, int(max_workers))
+        print(f"[PREFETCH] Running {len(requests)} aggregation(s) with up to {max_workers} at a time...")
+        timings = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='aggregation') as executor:
+            futures = {
+                executor.submit(run, pipeline_name, pipeline, collection_name): pipeline_name
+                for pipeline_name, (pipeline, collection_name) in requests.items()
+            }
+            for future in as_completed(futures):
+                pipeline_name = futures[future]
+                try:
+                    timings[pipeline_name] = future.result()
+                except Exception as e:
+                    print(f"[WARNING] Prefetch of {pipeline_name} failed (not cached; its sheet will run it again): {e}")
+        wall_clock = time.perf_counter() - start
+        
+        for pipeline_name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            print(f"[PREFETCH]   {seconds:8.3f}s  {pipeline_name}")
+        print(f"[PREFETCH] {len(timings)} aggregation(s) took {wall_clock:.2f}s wall clock "
+              f"({sum(timings.values()):.2f}s summed over pipelines)")
+        return timings
+    
     def _create_specialized_sheet(self, workbook, sheet_config):
         """
         Creates a specialized sheet that requires custom creation logic.
@@ -95,6 +168,10 @@ class PipelineSheetCreator(BaseSheetCreator):
                 print(f"    - Creating {sheet_name} sheet (specialized)")
                 from .specialized import SpecializedSheetCreator
                 specialized_creator = SpecializedSheetCreator(self.db, self.formatter)
+                specialized_creator.fact_table = self.fact_table
+                specialized_creator.aggregation_cache = self.aggregation_cache
+                specialized_creator.use_daily_rollups = self.use_daily_rollups
+                specialized_creator.max_concurrent_pipelines = self.max_concurrent_pipelines
                 
                 # Create the sheet
                 specialized_creator.create_mp3_duration_analysis_sheet(workbook)
@@ -189,24 +266,21 @@ class PipelineSheetCreator(BaseSheetCreator):
         print(f"    - Using pipeline: {pipeline_name}")
         
         # Get fresh data from the specific pipeline for this sheet
-        from pipelines import PIPELINES
         if pipeline_name not in PIPELINES:
             print(f"[ERROR] Pipeline '{pipeline_name}' not found")
             return
         
-        pipeline = PIPELINES[pipeline_name]
+        pipeline, collection_name = self._sheet_aggregation(pipeline_name)
         
-        # CRITICAL FIX: Use non-cached aggregation to prevent DataFrame contamination
-        # The caching mechanism was storing DataFrames that had been mutated with ACF/PACF columns
-        # This caused each subsequent sheet to inherit previously added columns
-        print(f"[DEBUG] Using fresh (non-cached) pipeline execution to prevent column contamination")
+        # The shared cache returns a private copy, so ACF/PACF columns added to this
+        # sheet's DataFrame can never leak into another sheet's data
         # COMPREHENSIVE DEBUG LOGGING
         print(f"[PIPELINE_EXEC_DEBUG] ========================================")
         print(f"[PIPELINE_EXEC_DEBUG] Sheet: {sheet_config['name']}")
         print(f"[PIPELINE_EXEC_DEBUG] Pipeline: {sheet_config['pipeline']}")
         print(f"[PIPELINE_EXEC_DEBUG] Module: {sheet_config.get('module', 'unknown')}")
         print(f"[PIPELINE_EXEC_DEBUG] Category: {sheet_config.get('category', 'unknown')}")
-        print(f"[PIPELINE_EXEC_DEBUG] About to call _run_aggregation_original...")
+        print(f"[PIPELINE_EXEC_DEBUG] About to call _fetch_aggregation...")
         print(f"[PIPELINE_EXEC_DEBUG] ========================================")
         
         # COMPREHENSIVE DEBUG LOGGING
@@ -215,10 +289,12 @@ class PipelineSheetCreator(BaseSheetCreator):
         print(f"[PIPELINE_EXEC_DEBUG] Pipeline: {sheet_config['pipeline']}")
         print(f"[PIPELINE_EXEC_DEBUG] Module: {sheet_config.get('module', 'unknown')}")
         print(f"[PIPELINE_EXEC_DEBUG] Category: {sheet_config.get('category', 'unknown')}")
-        print(f"[PIPELINE_EXEC_DEBUG] About to call _run_aggregation_original...")
+        print(f"[PIPELINE_EXEC_DEBUG] About to call _fetch_aggregation...")
         print(f"[PIPELINE_EXEC_DEBUG] ========================================")
         
-        df = self._run_aggregation_original(pipeline)
+        if collection_name == DAILY_ROLLUPS_COLLECTION:
+            print(f"    - Reading per-day totals from '{DAILY_ROLLUPS_COLLECTION}'")
+        df = self._fetch_aggregation(pipeline, collection_name=collection_name, label=pipeline_name)
         print(f"    - Fresh pipeline data: {len(df)} rows × {len(df.columns)} columns")
         
         # ADDITIONAL SAFETY: Verify no ACF/PACF columns exist in fresh data
@@ -240,11 +316,8 @@ class PipelineSheetCreator(BaseSheetCreator):
         # Fix complex data structures before Excel processing
         df = self._fix_complex_data_structures(df, sheet_name)
         
-        # Apply zero-fill for daily pipelines if needed
-        print(f"[DEBUG] About to call _fill_missing_collection_days for pipeline: {pipeline_name}")
-        print(f"[DEBUG] Input data shape: {df.shape}")
-        df = self._fill_missing_collection_days(df, pipeline_name)
-        print(f"[DEBUG] Output data shape: {df.shape}")
+        # Zero-fill time-series pipelines onto the full calendar axis
+        df = self._reindex_time_axis(df, pipeline_name)
         
         # Determine sheet type and apply appropriate analysis
         sheet_type = infer_sheet_type(sheet_name)
@@ -252,7 +325,8 @@ class PipelineSheetCreator(BaseSheetCreator):
         # Apply ACF/PACF analysis based on configuration (not just sheet type)
         from chart_config_helper import should_add_acf_pacf_columns
         
-        if should_add_acf_pacf_columns(sheet_name):
+        analyzed = should_add_acf_pacf_columns(sheet_name)
+        if analyzed:
             print(f"[INFO] Adding ACF/PACF analysis for {sheet_type} sheet")
             original_columns = df.columns.tolist()
             
@@ -407,11 +481,17 @@ class PipelineSheetCreator(BaseSheetCreator):
         else:
             print(f"    - [OK] No duplicate columns found before Excel export")
         
+        # Publish the ACF/PACF and forecast results for the charts and dashboards
+        analysis = None
+        if analyzed and self.analysis_results is not None:
+            analysis = self.analysis_results.publish(sheet_name, sheet_type, df, header_row=3)
+        
         # Create the worksheet
         ws = workbook.create_sheet(sheet_name)
         
         # Add title
-        ws['A1'] = f"AR Data Analysis - {sheet_name}"
+        title = f"AR Data Analysis - {sheet_name}"
+        ws['A1'] = title
         self.formatter.apply_title_style(ws, 'A1')
         
         # Add headers
@@ -465,8 +545,8 @@ class PipelineSheetCreator(BaseSheetCreator):
         # Apply special formatting for ACF/PACF data
         self._apply_acf_pacf_data_formatting(ws, df.columns, 4, len(df))
         
-        # Auto-adjust column widths
-        self.formatter.auto_adjust_columns(ws)
+        # Size columns from the data rather than rescanning the sheet
+        self.formatter.auto_adjust_columns(ws, frame_column_widths(df, extra_values={1: [title]}))
         
         # Add totals to pipeline sheets where appropriate
         try:
@@ -500,7 +580,7 @@ class PipelineSheetCreator(BaseSheetCreator):
         # Add ACF/PACF charts based on configuration
         from chart_config_helper import should_add_chart
         if sheet_type in ['daily', 'weekly', 'biweekly', 'monthly', 'period'] and should_add_chart(sheet_name, 'acf_pacf'):
-            chart_added = self._add_acf_pacf_charts(ws, 4, 3 + len(df), sheet_type)
+            chart_added = self._add_acf_pacf_charts(ws, 4, 3 + len(df), sheet_type, analysis)
             if chart_added:
                 print(f"[SUCCESS] Added ACF/PACF charts to sheet '{sheet_name}' (config-driven)")
         elif sheet_type in ['daily', 'weekly', 'biweekly', 'monthly', 'period']:
@@ -508,7 +588,7 @@ class PipelineSheetCreator(BaseSheetCreator):
         
         print(f"[SUCCESS] Created sheet '{sheet_name}' with {len(df)} rows")
     
-    def _add_acf_pacf_charts(self, worksheet, data_start_row, data_end_row, sheet_type):
+    def _add_acf_pacf_charts(self, worksheet, data_start_row, data_end_row, sheet_type, analysis=None):
         """
         Add ACF/PACF charts directly to the worksheet during sheet creation.
         
@@ -517,6 +597,7 @@ class PipelineSheetCreator(BaseSheetCreator):
             data_start_row: First row of data (after headers)
             data_end_row: Last row of data
             sheet_type: Type of sheet (daily, weekly, etc.)
+            analysis: The sheet's published SheetAnalysis; without it no chart is added
             
         Returns:
             bool: True if charts were added successfully, False otherwise
@@ -526,21 +607,13 @@ class PipelineSheetCreator(BaseSheetCreator):
             from acf_pacf_charts import add_acf_pacf_chart, add_chart_summary_info
             
             # Add ACF/PACF chart directly to the worksheet
-            chart = add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type)
+            chart = add_acf_pacf_chart(worksheet, data_start_row, data_end_row, sheet_type, analysis=analysis)
             
             if chart:
-                # Count ACF/PACF columns for summary - use more permissive column detection
-                headers = [str(cell.value) for cell in worksheet[1] if cell.value is not None]
-                
-                # More flexible detection of ACF/PACF columns
-                acf_cols = [h for h in headers if ('ACF' in h or 'Acf' in h or 'acf' in h) and ('Lag' in h or 'lag' in h) and not ('Significant' in h or 'significant' in h)]
-                pacf_cols = [h for h in headers if ('PACF' in h or 'Pacf' in h or 'pacf' in h) and ('Lag' in h or 'lag' in h) and not ('Significant' in h or 'significant' in h)]
-                total_lags = len(set([h.split('_Lag')[1].split('_')[0] for h in acf_cols + pacf_cols if '_Lag' in str(h)]))
-                computed_lags = len(acf_cols)
-                
-                # Add summary information
+                # Lags with a column, and lags the whole series is long enough for
+                total_lags = len(analysis.correlation.lags)
+                computed_lags = len(analysis.correlation.series_acf())
                 add_chart_summary_info(worksheet, data_end_row, sheet_type, total_lags, computed_lags)
-                
                 return True
             else:
                 print(f"[INFO] No ACF/PACF charts added to {worksheet.title} - no suitable data found")
@@ -650,7 +723,11 @@ class PipelineSheetCreator(BaseSheetCreator):
                         cell = ws.cell(row=row_idx, column=col_idx)
                         cell.fill = acf_pacf_fill
                         cell.font = acf_pacf_font
-                        
+                    if num_rows > 0:
+                        # Show the ACF/PACF fill on banded rows too
+                        col_letter = get_column_letter(col_idx)
+                        self.formatter.clear_banding(ws, f'{col_letter}{start_row}:{col_letter}{start_row + num_rows - 1}')
+
         except Exception as e:
             print(f"[WARNING] Could not apply ACF/PACF data formatting: {e}")
     
@@ -0,0 +1,146 @@
+"""
+Time Axis Reindexing
+====================
+
+Zero-fills time-series aggregation results so every bucket of the collection
+calendar has a row: each collection week, bi-week, month or collection
+period, whether or not any files were recorded in it. ACF/PACF and ARIMA
+need that continuous axis. Daily results are zero-filled inside MongoDB
+(pipelines.utils.create_calendar_zero_fill_stages), not here.
+
+The expected axis is built once per granularity from the CollectionCalendar
+and held on a typed index (PeriodIndex for months, MultiIndex of integers or
+names for the others). A result is reindexed onto
+the union of that axis and its own keys, so buckets outside the calendar that
+do have data are kept. Rows added this way get zero counts, False flags, and
+the bucket's label, School_Year and first/last collection day.
+
+Key columns per granularity follow the pipelines that produce them:
+
+    weekly     Year (calendar year of the date), Week (ISO week); _id 'YYYY-Wn'
+    biweekly   Year, Biweek_Number ((ISO week - 1) // 2); _id 'YYYY-Bn'
+    monthly    _id 'YYYY-MM'
+    period     School_Year, Period
+
+Usage:
+    from report_generator.time_axis import reindex_time_axis
+    df = reindex_time_axis(df, 'weekly')
+"""
+
+import numpy as np
+import pandas as pd
+
+from ar_utils import get_collection_calendar
+
+GRANULARITIES = ('weekly', 'biweekly', 'monthly', 'period')
+
+
+def _day_frame(calendar):
+    """One row per collection day with the bucket keys of every granularity."""
+    dates = pd.DatetimeIndex(calendar.dates.astype('datetime64[ns]'))
+    weeks = dates.isocalendar().week.to_numpy(dtype=np.int64)
+    return pd.DataFrame({
+        'Date': calendar.iso_dates,
+        'Year': dates.year.to_numpy(dtype=np.int64),
+        'Week': weeks,
+        'Biweek_Number': (weeks - 1) // 2,
+        'Month': dates.to_period('M'),
+        'School_Year': calendar.school_years,
+        'Period': calendar.periods
+    })
+
+
+def expected_axis(granularity, calendar=None):
+    """
+    Returns the calendar's buckets for a granularity.
+
+    Returns:
+        pandas.DataFrame: One row per bucket, on the granularity's typed index,
+            with the descriptive columns a zero row gets (_id, Year, Week,
+            School_Year, First_Date, Last_Date, ... as applicable).
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown time granularity '{granularity}'; expected one of {GRANULARITIES}")
+    days = _day_frame(calendar or get_collection_calendar())
+
+    keys = {
+        'weekly': ['Year', 'Week'],
+        'biweekly': ['Year', 'Biweek_Number'],
+        'monthly': ['Month'],
+        'period': ['School_Year', 'Period']
+    }[granularity]
+    columns = {'First_Date': ('Date', 'min'), 'Last_Date': ('Date', 'max')}
+    if 'School_Year' not in keys:
+        columns['School_Year'] = ('School_Year', 'first')
+    axis = days.groupby(keys, sort=True).agg(**columns)
+
+    if granularity == 'weekly':
+        axis['_id'] = [f"{year}-W{week}" for year, week in axis.index]
+    elif granularity == 'biweekly':
+        axis['_id'] = [f"{year}-B{biweek + 1}" for year, biweek in axis.index]
+    elif granularity == 'monthly':
+        axis['_id'] = axis.index.strftime('%Y-%m')
+    if isinstance(axis.index, pd.MultiIndex):
+        # Key columns double as descriptive columns of the zero rows
+        for level in axis.index.names:
+            axis[level] = axis.index.get_level_values(level)
+    return axis
+
+
+def _result_index(df, granularity):
+    """Builds the typed index of an aggregation result from its key columns."""
+    if granularity == 'monthly':
+        return pd.PeriodIndex(df['_id'], freq='M', name='Month')
+    if granularity == 'period':
+        return pd.MultiIndex.from_arrays([df['School_Year'], df['Period']], names=['School_Year', 'Period'])
+    second = 'Week' if granularity == 'weekly' else 'Biweek_Number'
+    return pd.MultiIndex.from_arrays(
+        [df['Year'].astype(np.int64), df[second].astype(np.int64)], names=['Year', second]
+    )
+
+
+def reindex_time_axis(df, granularity, calendar=None):
+    """
+    Reindexes a time-series aggregation result onto the full calendar axis.
+
+    Args:
+        df (pandas.DataFrame): Aggregation result with the granularity's key columns.
+        granularity (str): One of GRANULARITIES.
+        calendar (CollectionCalendar, optional): Defaults to the shared calendar.
+
+    Returns:
+        pandas.DataFrame: Rows for every bucket, in chronological order, with a
+            fresh RangeIndex. df is returned unchanged if it is empty or its
+            keys cannot be read.
+    """
+    if df.empty:
+        return df
+    axis = expected_axis(granularity, calendar)
+    try:
+        index = _result_index(df, granularity)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"[ZERO_FILL] Cannot read {granularity} keys, leaving result unchanged: {e}")
+        return df
+    if index.has_duplicates:
+        print(f"[ZERO_FILL] Duplicate {granularity} keys, leaving result unchanged")
+        return df
+
+    full_index = index.union(axis.index, sort=None)
+    if len(full_index) == len(index) and index.equals(full_index):
+        return df.reset_index(drop=True)
+    result = df.set_axis(index).reindex(full_index)
+    added = ~full_index.isin(index)
+
+    for column, dtype in df.dtypes.items():
+        if column in axis.columns:
+            values = result[column].astype(object)
+            values[added] = axis[column].reindex(full_index[added]).to_numpy(dtype=object)
+            result[column] = values if dtype == object else values.astype(dtype)
+        elif pd.api.types.is_bool_dtype(dtype):
+            result[column] = result[column].fillna(False).astype(dtype)
+        elif pd.api.types.is_numeric_dtype(dtype):
+            result[column] = result[column].fillna(0).astype(dtype)
+
+    print(f"[ZERO_FILL] Added {int(added.sum())} empty {granularity} bucket(s) "
+          f"({len(result)} total, {len(df)} with data)")
+    return result.reset_index(drop=True)
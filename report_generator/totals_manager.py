@@ -10,10 +10,15 @@ across different tables and provides both row and column totals where applicable
 import pandas as pd
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+from .formatters import StyleRegistry
 from typing import Dict, List, Tuple, Optional, Any, Union
 import json
 from pathlib import Path
 
+# Style names registered in report workbooks
+TOTALS_STYLE = 'Report Totals'
+GRAND_TOTALS_STYLE = 'Report Grand Totals'
+
 
 class TotalsManager:
     """
@@ -57,6 +62,11 @@ class TotalsManager:
                 bottom=Side(style='thick', color='000000')
             )
         }
+        
+        # Registered once per workbook and applied by name
+        self.styles = formatter.styles if formatter is not None else StyleRegistry()
+        self.styles.define(TOTALS_STYLE, **self.totals_style)
+        self.styles.define(GRAND_TOTALS_STYLE, **self.grand_totals_style)
     
     def _load_validation_rules(self) -> Dict:
         """Load validation rules for cross-table consistency checking."""
@@ -191,8 +201,7 @@ class TotalsManager:
         if self.formatter:
             self.formatter.apply_header_style(ws, header_cell.coordinate)
         else:
-            header_cell.font = self.totals_style['font']
-            header_cell.fill = self.totals_style['fill']
+            self.styles.apply(header_cell, TOTALS_STYLE)
         
         # Add row totals
         for i, total in enumerate(row_totals):
@@ -240,11 +249,7 @@ class TotalsManager:
             else:
                 cell.value = total if pd.notna(total) and total != "" else ""
             
-            # Apply totals styling
-            cell.font = self.totals_style['font']
-            cell.fill = self.totals_style['fill']
-            cell.alignment = self.totals_style['alignment']
-            cell.border = self.totals_style['border']
+            self._apply_totals_style(cell, is_grand_total=False)
         
         return totals_row
     
@@ -302,10 +307,7 @@ class TotalsManager:
             
             # Add grand total cell
             grand_cell = ws.cell(row=grand_total_row, column=grand_total_col, value=grand_total)
-            grand_cell.font = self.grand_totals_style['font']
-            grand_cell.fill = self.grand_totals_style['fill']
-            grand_cell.alignment = self.grand_totals_style['alignment']
-            grand_cell.border = self.grand_totals_style['border']
+            self._apply_totals_style(grand_cell, is_grand_total=True)
             
             positions['grand_total'] = (grand_total_row, grand_total_col)
         
@@ -440,16 +442,9 @@ class TotalsManager:
     def _apply_totals_style(self, cell, is_grand_total=False):
         """Apply styling to a totals cell."""
         try:
-            if is_grand_total:
-                cell.font = self.grand_totals_style['font']
-                cell.fill = self.grand_totals_style['fill']
-                cell.alignment = self.grand_totals_style['alignment']
-                cell.border = self.grand_totals_style['border']
-            else:
-                cell.font = self.totals_style['font']
-                cell.fill = self.totals_style['fill']
-                cell.alignment = self.totals_style['alignment']
-                cell.border = self.totals_style['border']
+            self.styles.apply(cell, GRAND_TOTALS_STYLE if is_grand_total else TOTALS_STYLE)
+            if self.formatter is not None:
+                self.formatter.clear_banding(cell.parent, cell.coordinate)
         except Exception as e:
             print(f"[WARNING] Could not apply totals styling: {e}")
 
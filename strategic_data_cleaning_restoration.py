@@ -26,16 +26,10 @@ def create_standalone_data_cleaning_sheet(workbook):
     
     try:
         # Import necessary components
-        from pymongo import MongoClient
-        import yaml
-        
-        # Load configuration
-        with open('config.yaml', 'r') as f:
-            config = yaml.safe_load(f)
+        from db_utils import get_db_connection
         
         # Connect to database
-        client = MongoClient(config['mongodb']['connection_string'])
-        db = client[config['mongodb']['database_name']]
+        db = get_db_connection()
         collection = db['media_records']
         
         print("✅ Database connection established")
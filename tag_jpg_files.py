@@ -5,14 +5,27 @@ from pathlib import Path
 import piexif
 from PIL import Image
 import json
+from collections import Counter
 
 # Import shared utilities
 from ar_utils import (
     get_school_calendar,
     get_non_collection_days,
     get_activity_schedule,
-    precompute_collection_days,
-    get_contextual_info
+    get_collection_calendar,
+    get_contextual_info_records
+)
+from media_scanner import scan_media_files, MEDIA_SUFFIXES
+from metadata_cache import MetadataCache, DEFAULT_CACHE_PATH, read_jpg_exif
+from tagging_engine import (
+    run_tagging_batches,
+    atomic_rewrite,
+    STATUS_TAGGED,
+    STATUS_WOULD_TAG,
+    STATUS_UNCHANGED,
+    STATUS_ERROR,
+    diff_tags,
+    format_tag_changes
 )
 
 
@@ -21,16 +34,16 @@ from ar_utils import (
 # HELPER FUNCTIONS
 # ==============================================================================
 
-def find_jpg_files(root_dir):
+def find_jpg_files(root_dir, scan_threads=1):
     """Recursively finds all JPG files in the given directory."""
-    return sorted(list(Path(root_dir).rglob('*.jpg'))) + sorted(list(Path(root_dir).rglob('*.jpeg')))
+    return scan_media_files(root_dir, {'JPG': MEDIA_SUFFIXES['JPG']}, threads=scan_threads)['JPG']
 
-def get_image_datetime(file_path):
+def get_image_datetime(file_path, cache=None):
     """
     Extracts the 'DateTimeOriginal' from EXIF data. Falls back to filename.
     """
     try:
-        exif_dict = piexif.load(str(file_path))
+        exif_dict = read_jpg_exif(file_path, cache)['exif']
         datetime_original_bytes = exif_dict.get('Exif', {}).get(piexif.ExifIFD.DateTimeOriginal)
         if datetime_original_bytes:
             datetime_str = datetime_original_bytes.decode('utf-8')
@@ -74,9 +87,9 @@ def write_tags_to_jpg(file_path, tags_to_write):
         # XPComment (and other XP tags) use UTF-16LE encoding
         exif_dict['0th'][piexif.ImageIFD.XPComment] = summary_str.encode('utf-16-le')
 
-        # Get the EXIF bytes and insert them into the file
+        # Get the EXIF bytes and insert them via a temporary copy + atomic rename
         exif_bytes = piexif.dump(exif_dict)
-        piexif.insert(exif_bytes, str(file_path))
+        atomic_rewrite(file_path, lambda tmp_path: piexif.insert(exif_bytes, str(tmp_path)))
         
         print(f"Successfully wrote tags to: {file_path.name}")
         return True
@@ -85,6 +98,71 @@ def write_tags_to_jpg(file_path, tags_to_write):
         print(f"Error writing tags to {file_path.name}: {e}")
         return False
 
+def tag_jpg_file(file, context):
+    """Runs the read-enrich-write cycle for a single JPG file (see tag_jpg_batch)."""
+    return tag_jpg_batch([file], context)[0]
+
+
+def tag_jpg_batch(files, context):
+    """
+    Runs the read-enrich-write cycle for a batch of JPG files.
+
+    Module-level so it can be dispatched to process pool workers. The
+    contextual information of the whole batch is derived in one
+    get_contextual_info_records call.
+
+    Returns:
+        list with one dict per file: the file, a status from tagging_engine,
+        the derived context_info, the changed fields (or an error message).
+    """
+    results = [
+        {'file': file, 'status': STATUS_ERROR, 'context_info': None, 'changes': {}, 'message': ''}
+        for file in files
+    ]
+
+    # 1. Get the primary timestamp from EXIF data
+    timestamps = [get_image_datetime(file, context['cache']) for file in files]
+
+    # 2. Check for outlier status
+    outlier_flags = ['outliers' in file.parts for file in files]
+
+    # 3. Get all contextual information
+    context_infos = get_contextual_info_records(
+        timestamps, context['school_calendar'],
+        context['non_collection_days'], context['activity_schedule'], context['collection_day_map'],
+        is_outlier=outlier_flags
+    )
+
+    for file, file_datetime, context_info, result in zip(files, timestamps, context_infos, results):
+        if not file_datetime:
+            result['message'] = f"Skipping file due to missing timestamp: {file.name}"
+            continue
+        if not context_info:
+            result['message'] = f"Skipping file due to missing context: {file.name}"
+            continue
+        result['context_info'] = context_info
+
+        # 4. Compare with the JSON payload already stored in UserComment
+        try:
+            existing_tags = read_jpg_exif(file, context['cache'])['user_comment']
+        except Exception:
+            existing_tags = None
+        # Round-trip through JSON so values compare in the form they are stored
+        result['changes'] = diff_tags(existing_tags, json.loads(json.dumps(context_info)))
+        if not result['changes'] and not context['force']:
+            result['status'] = STATUS_UNCHANGED
+            continue
+
+        # 5. Write all information as tags into the JPG file
+        if context['dry_run']:
+            result['status'] = STATUS_WOULD_TAG
+        elif write_tags_to_jpg(file, context_info):
+            result['status'] = STATUS_TAGGED
+        else:
+            result['message'] = f"Failed to write tags: {file.name}"
+    return results
+
+
 # ==============================================================================
 # MAIN EXECUTION
 # ==============================================================================
@@ -96,6 +174,28 @@ def main():
         formatter_class=argparse.RawTextHelpFormatter
     )
     parser.add_argument('root_dir', type=str, help='The root directory to scan for JPG files.')
+    parser.add_argument(
+        '--metadata_cache',
+        default=str(DEFAULT_CACHE_PATH),
+        help='SQLite file used to cache parsed EXIF headers between runs.'
+    )
+    parser.add_argument('--no_cache', action='store_true', help='Disable the metadata cache.')
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes for the read-enrich-write cycle.\nDefaults to 1 (serial).'
+    )
+    parser.add_argument(
+        '--dry_run',
+        action='store_true',
+        help='Show which files would be tagged without modifying them.'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rewrite tags even when the file already holds identical values.'
+    )
     args = parser.parse_args()
 
     if not os.path.isdir(args.root_dir):
@@ -109,7 +209,7 @@ def main():
 
     # --- Pre-computation Step for Efficiency ---
     print("Pre-computing collection day numbers...")
-    collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
+    collection_day_map = get_collection_calendar()
     print(f"Mapped {len(collection_day_map)} total collection days.")
 
     # --- Find and Process Files ---
@@ -117,38 +217,47 @@ def main():
     jpg_files = find_jpg_files(args.root_dir)
     print(f"Found {len(jpg_files)} JPG files to process.\n")
 
+    metadata_cache = None if args.no_cache else MetadataCache(args.metadata_cache)
+    context = {
+        'school_calendar': school_calendar,
+        'non_collection_days': non_collection_days,
+        'activity_schedule': activity_schedule,
+        'collection_day_map': collection_day_map,
+        'cache': metadata_cache,
+        'dry_run': args.dry_run,
+        'force': args.force
+    }
+    jobs = max(1, args.jobs)
+    if args.dry_run:
+        print("[DRY RUN] No files will be modified.\n")
+
     processed_count = 0
+    unchanged_count = 0
     error_count = 0
-    for file in jpg_files:
-        print(f"--- Processing: {file.name} ---")
-        
-        # 1. Get the primary timestamp from EXIF data
-        file_datetime = get_image_datetime(file)
-        if not file_datetime:
-            error_count += 1
-            print(f"Skipping file due to missing timestamp: {file.name}\n")
+    field_change_counts = Counter()
+    for result in run_tagging_batches(jpg_files, tag_jpg_batch, context, jobs=jobs):
+        file = result['file']
+
+        if result['status'] == STATUS_UNCHANGED:
+            unchanged_count += 1
             continue
 
-        # 2. Check for outlier status
-        is_outlier = 'outliers' in file.parts
+        print(f"--- Processing: {file.name} ---")
 
-        # 3. Get all contextual information
-        context_info = get_contextual_info(
-            file_datetime, school_calendar, 
-            non_collection_days, activity_schedule, collection_day_map,
-            is_outlier=is_outlier
-        )
-        if not context_info:
+        if result['status'] == STATUS_ERROR and result['context_info'] is None:
             error_count += 1
-            print(f"Skipping file due to missing context: {file.name}\n")
+            print(f"{result['message']}\n")
             continue
         
-        # Print the derived info for verification
-        for key, val in context_info.items():
-            print(f"  - {key}: {val}")
+        # Print the changed fields for verification
+        for line in format_tag_changes(result['changes']):
+            print(f"  - {line}")
+        field_change_counts.update(result['changes'].keys())
 
-        # 4. Write all information as tags into the JPG file
-        if write_tags_to_jpg(file, context_info):
+        if result['status'] == STATUS_WOULD_TAG:
+            print(f"[DRY RUN] Would write tags to: {file.name}")
+            processed_count += 1
+        elif result['status'] == STATUS_TAGGED:
             processed_count += 1
         else:
             error_count += 1
@@ -157,8 +266,21 @@ def main():
 
     print("\n==================== SUMMARY ====================")
     print(f"Total files found: {len(jpg_files)}")
-    print(f"Successfully processed and tagged: {processed_count}")
+    if args.dry_run:
+        print(f"Files that would be tagged: {processed_count}")
+    else:
+        print(f"Successfully processed and tagged: {processed_count}")
+    print(f"Files already up to date (skipped): {unchanged_count}")
     print(f"Files with errors (skipped): {error_count}")
+    if field_change_counts:
+        print("Changed fields (files affected):")
+        for field, count in field_change_counts.most_common():
+            print(f"  - {field}: {count}")
+    if metadata_cache is not None:
+        if jobs == 1:
+            cache_stats = metadata_cache.stats()
+            print(f"Metadata cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        metadata_cache.close()
     print("==============================================")
 
 
@@ -2,6 +2,7 @@ import os
 import argparse
 import datetime
 from pathlib import Path
+from collections import Counter
 import mutagen
 from mutagen.easyid3 import EasyID3
 from mutagen.id3 import ID3NoHeaderError
@@ -11,11 +12,23 @@ from ar_utils import (
     get_school_calendar,
     get_non_collection_days,
     get_activity_schedule,
-    precompute_collection_days,
-    get_contextual_info,
+    get_collection_calendar,
+    get_contextual_info_records,
     seconds_to_iso_duration,
     seconds_to_hms
 )
+from media_scanner import scan_media_files, MEDIA_SUFFIXES
+from metadata_cache import MetadataCache, DEFAULT_CACHE_PATH, read_mp3_header
+from tagging_engine import (
+    run_tagging_batches,
+    atomic_rewrite,
+    STATUS_TAGGED,
+    STATUS_WOULD_TAG,
+    STATUS_UNCHANGED,
+    STATUS_ERROR,
+    diff_tags,
+    format_tag_changes
+)
 
 
 
@@ -23,9 +36,9 @@ from ar_utils import (
 # HELPER FUNCTIONS
 # ==============================================================================
 
-def find_mp3_files(root_dir):
+def find_mp3_files(root_dir, scan_threads=1):
     """Recursively finds all MP3 files in the given directory."""
-    return sorted(list(Path(root_dir).rglob('*.mp3')))
+    return scan_media_files(root_dir, {'MP3': MEDIA_SUFFIXES['MP3']}, threads=scan_threads)['MP3']
 
 def parse_filename_to_datetime(file_path):
     """
@@ -50,27 +63,31 @@ def write_tags_to_mp3(file_path, tags_to_write):
     Writes a dictionary of tags to an MP3 file's metadata.
     """
     try:
-        audio = mutagen.File(file_path)
-        if audio is None:
-            print(f"Error: Could not load file {file_path.name}")
-            return False
+        dt_obj = parse_filename_to_datetime(file_path)
 
-        if not audio.tags:
-            audio.add_tags()
+        def _write(tmp_path):
+            audio = mutagen.File(tmp_path)
+            if audio is None:
+                raise ValueError(f"Could not load file {file_path.name}")
 
-        dt_obj = parse_filename_to_datetime(file_path)
-        if dt_obj:
-            audio.tags.add(mutagen.id3.TDRC(encoding=3, text=dt_obj.strftime('%Y-%m-%dT%H:%M:%S')))
+            if not audio.tags:
+                audio.add_tags()
 
-        duration_sec = tags_to_write.get('Duration_Seconds')
-        if duration_sec is not None:
-            duration_ms = str(int(float(duration_sec) * 1000))
-            audio.tags.add(mutagen.id3.TLEN(encoding=3, text=duration_ms))
+            if dt_obj:
+                audio.tags.add(mutagen.id3.TDRC(encoding=3, text=dt_obj.strftime('%Y-%m-%dT%H:%M:%S')))
 
-        for key, value in tags_to_write.items():
-            audio.tags.add(mutagen.id3.TXXX(encoding=3, desc=key, text=str(value)))
+            duration_sec = tags_to_write.get('Duration_Seconds')
+            if duration_sec is not None:
+                duration_ms = str(int(float(duration_sec) * 1000))
+                audio.tags.add(mutagen.id3.TLEN(encoding=3, text=duration_ms))
 
-        audio.save()
+            for key, value in tags_to_write.items():
+                audio.tags.add(mutagen.id3.TXXX(encoding=3, desc=key, text=str(value)))
+
+            audio.save()
+
+        # Tags are written into a temporary copy that atomically replaces the original
+        atomic_rewrite(file_path, _write)
         print(f"Successfully wrote tags to: {file_path.name}")
         return True
 
@@ -78,6 +95,89 @@ def write_tags_to_mp3(file_path, tags_to_write):
         print(f"Error writing tags to {file_path.name}: {e}")
         return False
 
+
+def tag_mp3_file(file, context):
+    """Runs the read-enrich-write cycle for a single MP3 file (see tag_mp3_batch)."""
+    return tag_mp3_batch([file], context)[0]
+
+
+def _read_audio_properties(file, context):
+    """Returns (audio_properties, existing TXXX tags) of an MP3 file."""
+    audio_properties = {
+        'duration': 0.0, 'file_size': 0, 'bitrate': 0, 'channels': 0, 'is_outlier': False
+    }
+    header = read_mp3_header(file, context['cache'])
+    info = header['info']
+    if header['loaded'] and info:
+        audio_properties['duration'] = info['length']
+        # Bitrate is in bps, convert to kbps
+        audio_properties['bitrate'] = int(info['bitrate'] / 1000)
+        audio_properties['channels'] = info['channels']
+    audio_properties['file_size'] = file.stat().st_size
+    # Check for outlier status based on path
+    audio_properties['is_outlier'] = 'outliers' in file.parts
+    return audio_properties, header['txxx']
+
+
+def tag_mp3_batch(files, context):
+    """
+    Runs the read-enrich-write cycle for a batch of MP3 files.
+
+    Module-level so it can be dispatched to process pool workers. The
+    contextual information of the whole batch is derived in one
+    get_contextual_info_records call.
+
+    Returns:
+        list with one dict per file: the file, a status from tagging_engine,
+        the derived context_info, the changed fields (or an error message).
+    """
+    results = [
+        {'file': file, 'status': STATUS_ERROR, 'context_info': None, 'changes': {}, 'message': ''}
+        for file in files
+    ]
+
+    # 1. Get all file system and audio info first, and
+    # 2. parse each filename to get the base datetime
+    audio_props, existing, timestamps = [], [], []
+    for file, result in zip(files, results):
+        try:
+            audio_properties, existing_tags = _read_audio_properties(file, context)
+        except Exception as e:
+            result['message'] = f"Warning: Could not read file info for {file.name}: {e}"
+            audio_props.append(None)
+            existing.append(None)
+            timestamps.append(None)
+            continue
+        audio_props.append(audio_properties)
+        existing.append(existing_tags)
+        timestamps.append(parse_filename_to_datetime(file))
+
+    # 3. Get all contextual information based on all file properties
+    context_infos = get_contextual_info_records(
+        timestamps, context['school_calendar'], context['non_collection_days'],
+        context['activity_schedule'], context['collection_day_map'], audio_props=audio_props
+    )
+
+    for file, existing_tags, context_info, result in zip(files, existing, context_infos, results):
+        if not context_info:
+            continue
+        result['context_info'] = context_info
+
+        # 4. Compare with the TXXX frames already in the file. Frames are stored as
+        #    text and only ever added, so extra existing frames are not a change.
+        new_tags = {key: str(value) for key, value in context_info.items()}
+        result['changes'] = diff_tags(existing_tags, new_tags, include_removed=False)
+        if not result['changes'] and not context['force']:
+            result['status'] = STATUS_UNCHANGED
+            continue
+
+        # 5. Write all information as tags into the MP3 file
+        if context['dry_run']:
+            result['status'] = STATUS_WOULD_TAG
+        elif write_tags_to_mp3(file, context_info):
+            result['status'] = STATUS_TAGGED
+    return results
+
 # ==============================================================================
 # MAIN EXECUTION
 # ==============================================================================
@@ -89,6 +189,28 @@ def main():
         formatter_class=argparse.RawTextHelpFormatter
     )
     parser.add_argument('root_dir', type=str, help='The root directory to scan for MP3 files.')
+    parser.add_argument(
+        '--metadata_cache',
+        default=str(DEFAULT_CACHE_PATH),
+        help='SQLite file used to cache parsed ID3 headers between runs.'
+    )
+    parser.add_argument('--no_cache', action='store_true', help='Disable the metadata cache.')
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes for the read-enrich-write cycle.\nDefaults to 1 (serial).'
+    )
+    parser.add_argument(
+        '--dry_run',
+        action='store_true',
+        help='Show which files would be tagged without modifying them.'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rewrite tags even when the file already holds identical values.'
+    )
     args = parser.parse_args()
 
     if not os.path.isdir(args.root_dir):
@@ -102,7 +224,7 @@ def main():
 
     # --- Pre-computation Step for Efficiency ---
     print("Pre-computing collection day numbers...")
-    collection_day_map = precompute_collection_days(school_calendar, non_collection_days)
+    collection_day_map = get_collection_calendar()
     print(f"Mapped {len(collection_day_map)} total collection days.")
 
     # --- Find and Process Files ---
@@ -110,51 +232,48 @@ def main():
     mp3_files = find_mp3_files(args.root_dir)
     print(f"Found {len(mp3_files)} MP3 files to process.\n")
 
+    metadata_cache = None if args.no_cache else MetadataCache(args.metadata_cache)
+    context = {
+        'school_calendar': school_calendar,
+        'non_collection_days': non_collection_days,
+        'activity_schedule': activity_schedule,
+        'collection_day_map': collection_day_map,
+        'cache': metadata_cache,
+        'dry_run': args.dry_run,
+        'force': args.force
+    }
+    jobs = max(1, args.jobs)
+    if args.dry_run:
+        print("[DRY RUN] No files will be modified.\n")
+
     processed_count = 0
+    unchanged_count = 0
     error_count = 0
-    for file in mp3_files:
-        print(f"--- Processing: {file.name} ---")
-        
-        # 1. Get all file system and audio info first
-        audio_properties = {
-            'duration': 0.0, 'file_size': 0, 'bitrate': 0, 'channels': 0, 'is_outlier': False
-        }
-        try:
-            audio_file = mutagen.File(file)
-            if audio_file and audio_file.info:
-                audio_properties['duration'] = audio_file.info.length
-                # Bitrate is in bps, convert to kbps
-                audio_properties['bitrate'] = int(audio_file.info.bitrate / 1000)
-                audio_properties['channels'] = audio_file.info.channels
-            audio_properties['file_size'] = file.stat().st_size
-            # Check for outlier status based on path
-            audio_properties['is_outlier'] = 'outliers' in file.parts
-        except Exception as e:
-            print(f"Warning: Could not read file info for {file.name}: {e}")
-            error_count += 1
-            continue
+    field_change_counts = Counter()
+    for result in run_tagging_batches(mp3_files, tag_mp3_batch, context, jobs=jobs):
+        file = result['file']
 
-        # 2. Parse filename to get the base datetime
-        file_datetime = parse_filename_to_datetime(file)
-        if not file_datetime:
-            error_count += 1
+        if result['status'] == STATUS_UNCHANGED:
+            unchanged_count += 1
             continue
 
-        # 3. Get all contextual information based on all file properties
-        context_info = get_contextual_info(
-            file_datetime, school_calendar, non_collection_days, 
-            activity_schedule, collection_day_map, audio_props=audio_properties
-        )
-        if not context_info:
+        print(f"--- Processing: {file.name} ---")
+
+        if result['status'] == STATUS_ERROR and result['context_info'] is None:
+            if result['message']:
+                print(result['message'])
             error_count += 1
             continue
         
-        # Print the derived info for verification
-        for key, val in context_info.items():
-            print(f"  - {key}: {val}")
+        # Print the changed fields for verification
+        for line in format_tag_changes(result['changes']):
+            print(f"  - {line}")
+        field_change_counts.update(result['changes'].keys())
 
-        # 4. Write all information as tags into the MP3 file
-        if write_tags_to_mp3(file, context_info):
+        if result['status'] == STATUS_WOULD_TAG:
+            print(f"[DRY RUN] Would write tags to: {file.name}")
+            processed_count += 1
+        elif result['status'] == STATUS_TAGGED:
             processed_count += 1
         else:
             error_count += 1
@@ -163,8 +282,21 @@ def main():
 
     print("\n==================== SUMMARY ====================")
     print(f"Total files found: {len(mp3_files)}")
-    print(f"Successfully processed and tagged: {processed_count}")
+    if args.dry_run:
+        print(f"Files that would be tagged: {processed_count}")
+    else:
+        print(f"Successfully processed and tagged: {processed_count}")
+    print(f"Files already up to date (skipped): {unchanged_count}")
     print(f"Files with errors (skipped): {error_count}")
+    if field_change_counts:
+        print("Changed fields (files affected):")
+        for field, count in field_change_counts.most_common():
+            print(f"  - {field}: {count}")
+    if metadata_cache is not None:
+        if jobs == 1:
+            cache_stats = metadata_cache.stats()
+            print(f"Metadata cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        metadata_cache.close()
     print("==============================================")
 
 
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Shared Tagging Engine for ARDataAnalysis Project
+
+This module holds the pieces shared by tag_jpg_files.py and tag_mp3_files.py:
+
+- run_tagging_jobs: runs the per-file read-enrich-write task serially or in a
+  process pool, yielding results in input order
+- run_tagging_batches: the same for tasks that take a batch of files, so the
+  calendar enrichment of a whole batch is one get_contextual_info_records call
+- atomic_rewrite: applies a tag write to a temporary copy of a media file and
+  swaps it into place with os.replace, so an interrupted run never leaves a
+  half-written file behind
+- diff_tags: compares the tags already stored in a file with the newly
+  computed ones, so unchanged files can be skipped instead of rewritten
+
+Usage:
+    from tagging_engine import run_tagging_jobs, atomic_rewrite
+
+    for result in run_tagging_jobs(files, tag_one_file, context, jobs=4):
+        ...
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+# Files handed to a batch tagging task at once
+DEFAULT_TAGGING_BATCH_SIZE = 256
+
+# Result statuses returned by the per-file tagging tasks
+STATUS_TAGGED = 'tagged'
+STATUS_WOULD_TAG = 'would_tag'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_ERROR = 'error'
+
+
+def atomic_rewrite(file_path, write_fn):
+    """
+    Rewrites a file via a temporary sibling copy and an atomic rename.
+
+    Args:
+        file_path: The media file to update.
+        write_fn: Callable taking the temporary copy's Path and writing the
+                  new tags into it. Any exception aborts the rewrite and
+                  leaves the original file untouched.
+    """
+    file_path = Path(file_path)
+    # Keep the real suffix so format detection (e.g. mutagen.File) still works
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{file_path.stem}.", suffix=f".tmp{file_path.suffix}", dir=file_path.parent
+    )
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        shutil.copy2(file_path, tmp_path)
+        write_fn(tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def diff_tags(existing_tags, new_tags, include_removed=True):
+    """
+    Compares the tags stored in a file with the newly computed tags.
+
+    Args:
+        existing_tags: Dict of tags read from the file, or None if untagged.
+        new_tags: Dict of tags about to be written, normalised to the form
+                  they take once stored (e.g. strings for ID3 TXXX frames).
+        include_removed: Whether keys present only in existing_tags count as
+                         changes. True when the whole payload is replaced
+                         (JPG UserComment), False when frames are only added.
+
+    Returns:
+        dict: {field: (old_value, new_value)} for every changed field; empty
+              when the file already holds exactly the new tags. Missing
+              values are reported as None.
+    """
+    existing_tags = existing_tags or {}
+    changes = {
+        key: (existing_tags.get(key), value)
+        for key, value in new_tags.items()
+        if key not in existing_tags or existing_tags[key] != value
+    }
+    if include_removed:
+        for key, value in existing_tags.items():
+            if key not in new_tags:
+                changes[key] = (value, None)
+    return changes
+
+
+def format_tag_changes(changes):
+    """Returns printable 'field: old -> new' lines for a diff_tags result."""
+    return [f"{key}: {old!r} -> {new!r}" for key, (old, new) in changes.items()]
+
+
+def run_tagging_jobs(files, task_fn, context, jobs=1):
+    """
+    Runs task_fn(file, context) for every file and yields the results in order.
+
+    Args:
+        files: List of media file paths.
+        task_fn: Module-level (picklable) function performing the
+                 read-enrich-write cycle for one file.
+        context: Picklable shared state (calendar, schedule, options).
+        jobs: Number of worker processes; 1 runs serially in-process.
+    """
+    if jobs <= 1:
+        for file in files:
+            yield task_fn(file, context)
+        return
+
+    chunksize = max(1, min(32, len(files) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(task_fn, files, repeat(context), chunksize=chunksize)
+
+
+def run_tagging_batches(files, batch_fn, context, jobs=1, batch_size=DEFAULT_TAGGING_BATCH_SIZE):
+    """
+    Runs batch_fn(batch, context) over consecutive batches of files and yields
+    the per-file results in input order.
+
+    Args:
+        files: List of media file paths.
+        batch_fn: Module-level (picklable) function taking a list of files and
+                  returning one result per file, in order.
+        context: Picklable shared state (calendar, schedule, options).
+        jobs: Number of worker processes; 1 runs serially in-process.
+        batch_size: Maximum number of files per batch. With several jobs,
+                    batches are made smaller so every worker gets some.
+    """
+    batch_size = max(1, batch_size)
+    if jobs > 1:
+        batch_size = max(1, min(batch_size, -(-len(files) // (jobs * 4))))
+    batches = [files[start:start + batch_size] for start in range(0, len(files), batch_size)]
+    if jobs <= 1:
+        for batch in batches:
+            yield from batch_fn(batch, context)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for results in executor.map(batch_fn, batches, repeat(context)):
+            yield from results
@@ -0,0 +1,138 @@
+"""
+Aggregation cache
+=================
+
+Cache keys must depend on exactly the pipeline content and collection, hits
+must be detached from the cached frame, and results written to the Parquet
+disk tier must read back unchanged until the data they were computed from
+changes. The disk tier tests need pyarrow and run against mongomock.
+"""
+
+import datetime
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_generator.aggregation_cache import (
+    AggregationCache,
+    DiskAggregationCache,
+    _detached_copy,
+    pipeline_cache_key,
+    referenced_collections,
+)
+
+PIPELINE = [
+    {'$match': {'School_Year': {'$ne': 'N/A'}, 'ISO_Date': {'$gte': datetime.datetime(2021, 9, 1)}}},
+    {'$group': {'_id': {'date': '$ISO_Date', 'type': '$file_type'}, 'n': {'$sum': 1}}},
+    {'$sort': {'_id.date': 1, '_id.type': 1}},
+]
+
+
+def test_key_is_deterministic_and_covers_the_collection():
+    assert pipeline_cache_key(PIPELINE) == pipeline_cache_key([dict(stage) for stage in PIPELINE])
+    assert pipeline_cache_key(PIPELINE) == pipeline_cache_key(PIPELINE, 'media_records')
+    assert pipeline_cache_key(PIPELINE) != pipeline_cache_key(PIPELINE, 'daily_rollups')
+
+
+def test_key_keeps_significant_key_order_and_values():
+    reordered = PIPELINE[:2] + [{'$sort': {'_id.type': 1, '_id.date': 1}}]
+    assert pipeline_cache_key(reordered) != pipeline_cache_key(PIPELINE)
+    later = [{'$match': {**PIPELINE[0]['$match'], 'ISO_Date': {'$gte': datetime.datetime(2021, 9, 2)}}}] + PIPELINE[1:]
+    assert pipeline_cache_key(later) != pipeline_cache_key(PIPELINE)
+
+
+def test_referenced_collections():
+    pipeline = [{'$unionWith': {'coll': 'calendar_days', 'pipeline': [{'$lookup': {'from': 'holidays'}}]}}]
+    assert referenced_collections(pipeline, 'media_records') == ['calendar_days', 'holidays', 'media_records']
+    assert referenced_collections(PIPELINE, 'media_records') == ['media_records']
+
+
+def test_detached_copy_copies_nested_cells():
+    frame = pd.DataFrame({'_id': [{'date': '2021-09-01'}], 'files': [['a.jpg']], 'n': [1]})
+    copied = _detached_copy(frame)
+    copied.at[0, '_id']['date'] = 'changed'
+    copied.at[0, 'files'].append('b.jpg')
+    copied.at[0, 'n'] = 2
+    assert frame.to_dict('records') == [{'_id': {'date': '2021-09-01'}, 'files': ['a.jpg'], 'n': 1}]
+
+
+def test_hits_do_not_share_cells_with_the_cache():
+    cache = AggregationCache()
+    calls = []
+
+    def run():
+        calls.append(1)
+        return pd.DataFrame({'_id': ['2021-09-01'], 'files': [['a.jpg']]})
+
+    first = cache.fetch(PIPELINE, 'media_records', run)
+    first.at[0, 'files'].append('b.jpg')
+    first['ACF'] = 1.0
+    second = cache.fetch(PIPELINE, 'media_records', run)
+    assert len(calls) == 1
+    assert second.to_dict('records') == [{'_id': '2021-09-01', 'files': ['a.jpg']}]
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+
+def result_frame():
+    return pd.DataFrame({
+        '_id': [{'date': '2021-09-01', 'type': 'JPG'}, {'date': '2021-09-02', 'type': 'MP3'}],
+        'Date': [datetime.datetime(2021, 9, 1), datetime.datetime(2021, 9, 2)],
+        'Total_Files': [3, 0],
+        'Total_Size_MB': [1.25, 0.0],
+        'has_files': [True, False],
+        'Period': ['P1', None],
+        'Days': [[1, 2], []],
+        'Mixed': [1, 'two'],
+    })
+
+
+@pytest.fixture
+def db():
+    pytest.importorskip('pyarrow')
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient().db
+    db.media_records.create_index('_creation_timestamp')
+    db.media_records.insert_one({'_creation_timestamp': datetime.datetime(2021, 9, 1)})
+    return db
+
+
+def test_parquet_round_trip(db, tmp_path):
+    disk = DiskAggregationCache(db, tmp_path)
+    key = pipeline_cache_key(PIPELINE)
+    assert disk.load(key, PIPELINE, 'media_records') is None
+    assert disk.store(key, PIPELINE, 'media_records', result_frame())
+    pd.testing.assert_frame_equal(disk.load(key, PIPELINE, 'media_records'), result_frame(), check_exact=True)
+
+
+def test_frames_that_would_not_round_trip_are_not_stored(db, tmp_path):
+    disk = DiskAggregationCache(db, tmp_path)
+    key = pipeline_cache_key(PIPELINE)
+    assert not disk.store(key, PIPELINE, 'media_records', pd.DataFrame())
+    assert not disk.store(key, PIPELINE, 'media_records', result_frame().set_index('Total_Files'))
+    assert not list(tmp_path.glob('*.parquet'))
+
+
+def test_new_data_invalidates_and_replaces_the_entry(db, tmp_path):
+    key = pipeline_cache_key(PIPELINE)
+    DiskAggregationCache(db, tmp_path).store(key, PIPELINE, 'media_records', result_frame())
+
+    db.media_records.insert_one({'_creation_timestamp': datetime.datetime(2021, 9, 2)})
+    disk = DiskAggregationCache(db, tmp_path)
+    assert disk.load(key, PIPELINE, 'media_records') is None
+    assert disk.store(key, PIPELINE, 'media_records', result_frame().head(1))
+    assert len(list(tmp_path.glob(f'{key}-*.parquet'))) == 1
+
+
+def test_second_run_reads_from_disk(db, tmp_path):
+    first = AggregationCache(disk_cache=DiskAggregationCache(db, tmp_path))
+    first.fetch(PIPELINE, 'media_records', result_frame)
+    assert first.stats['disk_writes'] == 1
+
+    second = AggregationCache(disk_cache=DiskAggregationCache(db, tmp_path))
+    result = second.fetch(PIPELINE, 'media_records', lambda: pytest.fail('pipeline ran again'))
+    pd.testing.assert_frame_equal(result, result_frame(), check_exact=True)
+    assert second.stats['disk_hits'] == 1
@@ -0,0 +1,173 @@
+"""
+Aggregation engine
+==================
+
+Runs the stages and operators report_generator.aggregation_engine supports
+against small fixed frames and compares the output with the documents
+MongoDB returns for the same pipeline, field order included (it becomes the
+sheet column order, and compare_documents treats it as significant).
+
+These tests need no database; tests/test_fact_table_engine.py compares the
+registered pipelines against a live mongod.
+"""
+
+import datetime
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_generator.aggregation_engine import UnsupportedPipelineError, aggregate
+from report_generator.fact_table import compare_documents
+
+
+def media_frame():
+    return pd.DataFrame({
+        'ISO_Date': ['2021-09-13', '2021-09-13', '2021-09-14', '2021-09-15', '2021-09-15'],
+        'file_type': pd.Categorical(['JPG', 'MP3', 'JPG', 'JPG', 'MP3']),
+        'School_Year': pd.Categorical(['2021-2022', '2021-2022', '2021-2022', 'N/A', '2021-2022']),
+        'File_Size_MB': [1.5, 2.0, 0.5, 4.0, 3.0],
+        'is_collection_day': [True, True, False, True, True],
+    })
+
+
+def calendar_frame():
+    return pd.DataFrame({'_id': ['2021-09-13', '2021-09-16'], 'is_collection_day': [True, True]})
+
+
+def assert_documents(actual, expected):
+    assert actual == expected
+    assert [list(doc) for doc in actual] == [list(doc) for doc in expected]
+
+
+def test_match_with_comparison_and_in():
+    documents = aggregate(media_frame(), [
+        {'$match': {'School_Year': {'$ne': 'N/A'}, 'file_type': {'$in': ['JPG']}}},
+        {'$project': {'_id': 0, 'ISO_Date': 1}}
+    ])
+    assert_documents(documents, [{'ISO_Date': '2021-09-13'}, {'ISO_Date': '2021-09-14'}])
+
+
+def test_group_sum_cond_and_sort_keep_mongodb_field_order():
+    documents = aggregate(media_frame(), [
+        {'$match': {'School_Year': {'$ne': 'N/A'}}},
+        {'$group': {
+            '_id': '$ISO_Date',
+            'Total_Files': {'$sum': 1},
+            'MP3_Files': {'$sum': {'$cond': [{'$eq': ['$file_type', 'MP3']}, 1, 0]}},
+            'Total_Size_MB': {'$sum': '$File_Size_MB'}
+        }},
+        {'$sort': {'_id': 1}}
+    ])
+    assert_documents(documents, [
+        {'_id': '2021-09-13', 'Total_Files': 2, 'MP3_Files': 1, 'Total_Size_MB': 3.5},
+        {'_id': '2021-09-14', 'Total_Files': 1, 'MP3_Files': 0, 'Total_Size_MB': 0.5},
+        {'_id': '2021-09-15', 'Total_Files': 1, 'MP3_Files': 1, 'Total_Size_MB': 3.0},
+    ])
+    # $sum of integer literals stays an int32/int64, as on the server
+    assert all(type(doc['Total_Files']) is int and type(doc['MP3_Files']) is int for doc in documents)
+
+
+def test_group_with_compound_id_returns_embedded_document():
+    documents = aggregate(media_frame(), [
+        {'$group': {'_id': {'year': '$School_Year', 'type': '$file_type'}, 'Count': {'$sum': 1}}},
+        {'$sort': {'_id.year': 1, '_id.type': 1}}
+    ])
+    assert_documents(documents, [
+        {'_id': {'year': '2021-2022', 'type': 'JPG'}, 'Count': 2},
+        {'_id': {'year': '2021-2022', 'type': 'MP3'}, 'Count': 2},
+        {'_id': {'year': 'N/A', 'type': 'JPG'}, 'Count': 1},
+    ])
+
+
+def test_group_avg_min_max():
+    documents = aggregate(media_frame(), [
+        {'$group': {'_id': '$file_type', 'Avg': {'$avg': '$File_Size_MB'},
+                    'Min': {'$min': '$File_Size_MB'}, 'Max': {'$max': '$File_Size_MB'}}},
+        {'$sort': {'_id': -1}}
+    ])
+    assert_documents(documents, [
+        {'_id': 'MP3', 'Avg': 2.5, 'Min': 2.0, 'Max': 3.0},
+        {'_id': 'JPG', 'Avg': 2.0, 'Min': 0.5, 'Max': 4.0},
+    ])
+
+
+def test_project_puts_id_first_then_included_then_computed_fields():
+    documents = aggregate(media_frame().head(1), [
+        {'$addFields': {'_id': 'a'}},
+        {'$project': {'Size_KB': {'$multiply': ['$File_Size_MB', 1024]}, 'file_type': 1, 'ISO_Date': 1}}
+    ])
+    assert_documents(documents, [
+        {'_id': 'a', 'ISO_Date': '2021-09-13', 'file_type': 'JPG', 'Size_KB': 1536.0}
+    ])
+
+
+def test_add_fields_appends_new_fields_and_replaces_existing_in_place():
+    documents = aggregate(media_frame().head(1), [
+        {'$project': {'_id': 0, 'ISO_Date': 1, 'File_Size_MB': 1}},
+        {'$addFields': {'ISO_Date': {'$literal': 'x'}, 'Large': {'$gt': ['$File_Size_MB', 1]}}}
+    ])
+    assert_documents(documents, [{'ISO_Date': 'x', 'File_Size_MB': 1.5, 'Large': True}])
+
+
+def test_date_from_string_and_date_parts():
+    documents = aggregate(media_frame().head(1), [
+        {'$project': {
+            '_id': 0,
+            'Date': {'$dateFromString': {'dateString': '$ISO_Date'}},
+            'Year': {'$year': {'$dateFromString': {'dateString': '$ISO_Date'}}},
+            'Month': {'$month': {'$dateFromString': {'dateString': '$ISO_Date'}}},
+            'Label': {'$dateToString': {'format': '%Y-%m',
+                                        'date': {'$dateFromString': {'dateString': '$ISO_Date'}}}}
+        }}
+    ])
+    assert_documents(documents, [
+        {'Date': datetime.datetime(2021, 9, 13), 'Year': 2021, 'Month': 9, 'Label': '2021-09'}
+    ])
+
+
+def test_round_is_half_to_even():
+    frame = pd.DataFrame({'value': [0.125, 0.135, 2.5, 3.5]})
+    documents = aggregate(frame, [{'$project': {'_id': 0, 'r2': {'$round': ['$value', 2]},
+                                                'r0': {'$round': ['$value', 0]}}}])
+    assert [doc['r2'] for doc in documents] == [0.12, 0.14, 2.5, 3.5]
+    assert [doc['r0'] for doc in documents] == [0.0, 0.0, 2.0, 4.0]
+
+
+def test_union_with_appends_other_collection_and_group_sums_across_both():
+    documents = aggregate(media_frame(), [
+        {'$match': {'is_collection_day': True, 'School_Year': {'$ne': 'N/A'}}},
+        {'$group': {'_id': '$ISO_Date', 'Total_Files': {'$sum': 1}}},
+        {'$unionWith': {'coll': 'calendar_days', 'pipeline': [
+            {'$project': {'_id': 1, 'Total_Files': {'$literal': 0}}}
+        ]}},
+        {'$group': {'_id': '$_id', 'Total_Files': {'$sum': '$Total_Files'}}},
+        {'$sort': {'_id': 1}}
+    ], collection_loader={'calendar_days': calendar_frame()}.__getitem__)
+    assert_documents(documents, [
+        {'_id': '2021-09-13', 'Total_Files': 2},
+        {'_id': '2021-09-15', 'Total_Files': 1},
+        {'_id': '2021-09-16', 'Total_Files': 0},
+    ])
+
+
+def test_missing_fields_are_left_out_not_null():
+    frame = pd.DataFrame({'a': [1.0, None]})
+    documents = aggregate(frame, [{'$project': {'_id': 0, 'a': 1}}])
+    assert documents == [{'a': 1.0}, {}]
+
+
+def test_unsupported_stage_is_reported():
+    with pytest.raises(UnsupportedPipelineError):
+        aggregate(media_frame(), [{'$lookup': {'from': 'x', 'as': 'y'}}])
+
+
+def test_compare_documents_flags_field_order_and_values():
+    expected = [{'_id': 1, 'a': 1, 'b': 2.0}]
+    assert compare_documents([{'_id': 1, 'a': 1, 'b': 2.0}], expected) == []
+    assert compare_documents([{'_id': 1, 'b': 2.0, 'a': 1}], expected)
+    assert compare_documents([{'_id': 1, 'a': 1, 'b': 2.5}], expected)
+    assert compare_documents([], expected)
@@ -0,0 +1,123 @@
+"""
+Collection calendar
+===================
+
+CollectionCalendar replaced the day-by-day loop that precompute_collection_days
+used to run. These tests keep that loop as the reference and require the
+calendar (and the precompute_collection_days wrapper around it) to return the
+same days, school years, periods and day numbers, for config.yaml and for
+calendars with overlapping periods, partial days and weekend-only periods.
+"""
+
+import datetime
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ar_utils import (
+    CollectionCalendar,
+    get_collection_calendar,
+    get_non_collection_days,
+    get_school_calendar,
+    precompute_collection_days,
+)
+
+d = datetime.date
+
+
+def reference_collection_days(school_calendar, non_collection_days):
+    """The original precompute_collection_days loop."""
+    collection_day_map = {}
+    for school_year, config in school_calendar.items():
+        for period_name, (start_date, end_date) in config["periods"].items():
+            current = start_date
+            while current <= end_date:
+                if current.weekday() < 5:
+                    ncd = non_collection_days.get(current)
+                    if not (ncd and ncd["type"] == "Non-Collection"):
+                        collection_day_map[current] = {"School_Year": school_year, "Period": period_name}
+                current += datetime.timedelta(days=1)
+
+    period_day_counters = {}
+    sy_day_counters = {}
+    for day in sorted(collection_day_map):
+        info = collection_day_map[day]
+        period_day_counters[info["Period"]] = period_day_counters.get(info["Period"], 0) + 1
+        sy_day_counters[info["School_Year"]] = sy_day_counters.get(info["School_Year"], 0) + 1
+        info["day_in_period"] = period_day_counters[info["Period"]]
+        info["day_in_sycollection"] = sy_day_counters[info["School_Year"]]
+    return collection_day_map
+
+
+SYNTHETIC_CALENDARS = {
+    'overlapping periods and partial days': (
+        {
+            '2021-2022': {'periods': {
+                'P1': (d(2021, 9, 1), d(2021, 9, 30)),
+                # Overlaps P1; later periods win the overlapping days
+                'P2': (d(2021, 9, 27), d(2021, 10, 15)),
+            }},
+            '2022-2023': {'periods': {
+                # Same period name in another year keeps counting, as the loop did
+                'P1': (d(2022, 9, 5), d(2022, 9, 16)),
+            }},
+        },
+        {
+            d(2021, 9, 6): {'type': 'Non-Collection', 'event': 'Holiday'},
+            d(2021, 9, 7): {'type': 'Partial', 'event': 'Early release'},
+            d(2021, 9, 28): {'type': 'Non-Collection', 'event': 'Break'},
+            d(2022, 9, 10): {'type': 'Non-Collection', 'event': 'Saturday'},
+        },
+    ),
+    'weekend-only period': (
+        {'2021-2022': {'periods': {'W': (d(2021, 9, 4), d(2021, 9, 5)), 'P1': (d(2021, 9, 6), d(2021, 9, 8))}}},
+        {},
+    ),
+    'empty': ({}, {}),
+}
+
+
+@pytest.mark.parametrize('name', sorted(SYNTHETIC_CALENDARS))
+def test_calendar_matches_reference_loop(name):
+    school_calendar, non_collection_days = SYNTHETIC_CALENDARS[name]
+    expected = reference_collection_days(school_calendar, non_collection_days)
+    calendar = CollectionCalendar.build(school_calendar, non_collection_days)
+    assert calendar.to_day_map() == expected
+    assert dict(calendar) == expected
+    assert precompute_collection_days(school_calendar, non_collection_days) == expected
+
+
+def test_calendar_matches_reference_loop_for_config():
+    school_calendar, non_collection_days = get_school_calendar(), get_non_collection_days()
+    expected = reference_collection_days(school_calendar, non_collection_days)
+    assert expected, "config.yaml defines no collection days"
+    calendar = get_collection_calendar()
+    assert calendar.to_day_map() == expected
+    assert list(calendar) == sorted(expected)
+
+
+def test_vectorized_lookups_match_single_date_lookups():
+    school_calendar, non_collection_days = SYNTHETIC_CALENDARS['overlapping periods and partial days']
+    calendar = CollectionCalendar.build(school_calendar, non_collection_days)
+    dates = [d(2021, 8, 31) + datetime.timedelta(days=i) for i in range(420)]
+
+    assert calendar.are_collection_days(dates).tolist() == [calendar.is_collection_day(day) for day in dates]
+    assert calendar.get_periods_for_dates(dates).tolist() == [calendar.get_period_for_date(day) for day in dates]
+    assert calendar.get_school_years_for_dates(dates).tolist() == \
+        [calendar.get_school_year_for_date(day) for day in dates]
+    assert calendar.iso_dates.tolist() == [day.isoformat() for day in calendar]
+
+
+def test_empty_calendar_lookups():
+    calendar = CollectionCalendar.build({}, {})
+    assert len(calendar) == 0
+    assert calendar.are_collection_days([d(2021, 9, 6)]).tolist() == [False]
+    assert calendar.get_periods_for_dates(np.array([], dtype='datetime64[D]')).tolist() == []
+
+
+def test_shared_calendar_is_built_once():
+    assert get_collection_calendar() is get_collection_calendar()
@@ -0,0 +1,61 @@
+"""
+Contextual info
+===============
+
+The taggers enrich each batch of files with one get_contextual_info_records
+call; the tags they write must stay identical to what get_contextual_info
+returns file by file. Uses the calendar and schedule from config.json.
+"""
+
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ar_utils import (
+    get_activity_schedule,
+    get_collection_calendar,
+    get_contextual_info,
+    get_contextual_info_records,
+    get_non_collection_days,
+    get_school_calendar,
+)
+
+
+def calendar_args():
+    return (get_school_calendar(), get_non_collection_days(),
+            get_activity_schedule(), get_collection_calendar())
+
+
+def test_records_match_scalar_values_key_order_and_types():
+    rng = random.Random(1)
+    start = datetime.datetime(2021, 8, 1)
+    timestamps = [start + datetime.timedelta(seconds=rng.randint(0, 86400 * 700)) for _ in range(500)]
+    timestamps.append(None)
+    audio = [
+        {'duration': rng.random() * 100, 'file_size': 123456, 'bitrate': 128,
+         'channels': 2, 'is_outlier': bool(i % 2)} if i % 3 else None
+        for i in range(len(timestamps))
+    ]
+    flags = [i % 5 == 0 for i in range(len(timestamps))]
+
+    records = get_contextual_info_records(timestamps, *calendar_args(), audio_props=audio, is_outlier=flags)
+
+    assert len(records) == len(timestamps)
+    for timestamp, audio_props, flag, record in zip(timestamps, audio, flags, records):
+        expected = get_contextual_info(timestamp, *calendar_args(), audio_props=audio_props, is_outlier=flag)
+        assert record == expected
+        if expected:
+            assert list(record) == list(expected)
+            assert [type(v) for v in record.values()] == [type(v) for v in expected.values()]
+
+
+def test_records_of_empty_batch():
+    assert get_contextual_info_records([], *calendar_args()) == []
+
+
+def test_schedule_is_parsed_when_the_config_loads():
+    for start, end, _activity in get_activity_schedule():
+        assert isinstance(start, datetime.time) and isinstance(end, datetime.time)
@@ -0,0 +1,136 @@
+"""
+Daily rollups
+=============
+
+The rollup variants of the time-series pipelines (pipelines.ROLLUP_PIPELINES)
+must return the same documents from daily_rollups as the original pipelines
+return from media_records. These tests build both collections in mongomock
+and compare DAILY_COUNTS_ALL and WEEKLY_COUNTS both ways, with the rollups
+built from accumulate_rollup_deltas (as populate_db.py keeps them) and by
+rebuild_daily_rollups.
+
+mongomock's bulk_write does not accept the UpdateOne operations of current
+pymongo releases, so the delta-built rollups are inserted as the documents
+apply_rollup_deltas would upsert.
+
+File sizes are multiples of 1/4 so the sums are exact in either order.
+"""
+
+import datetime
+import os
+import random
+import sys
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daily_rollups import accumulate_rollup_deltas, daily_rollups_in_sync, rebuild_daily_rollups
+from pipelines import PIPELINES, ROLLUP_PIPELINES
+from pipelines.utils import (
+    DAILY_ROLLUP_COUNT_FIELD,
+    DAILY_ROLLUP_SIZE_FIELD,
+    DAILY_ROLLUPS_COLLECTION,
+    create_rollup_pipeline,
+)
+
+COMPARED_PIPELINES = ['DAILY_COUNTS_ALL', 'WEEKLY_COUNTS']
+
+
+def media_records(count=400, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        day = datetime.date(2021, 9, 1) + datetime.timedelta(days=rng.randrange(60))
+        record = {
+            'file_path': f'/archive/{i}',
+            'ISO_Date': day.isoformat(),
+            'ISO_Week': day.isocalendar()[1],
+            'file_type': rng.choice(['JPG', 'MP3', 'MP3', 'PNG']),
+            'is_collection_day': day.weekday() < 5,
+            'Outlier_Status': rng.random() < 0.1,
+            'School_Year': rng.choice(['2021-2022', '2021-2022', 'N/A']),
+            'Collection_Period': 'SY 21-22 P1' if day.month == 9 else 'SY 21-22 P2',
+            'File_Size_MB': rng.randrange(1, 40) / 4
+        }
+        if i % 50 == 0:
+            # Records without a dimension get a rollup without it, as on the server
+            del record['Collection_Period']
+        records.append(record)
+    return records
+
+
+def rollup_documents(deltas):
+    """The daily_rollups documents apply_rollup_deltas leaves for fresh deltas."""
+    return [
+        {'_id': key_doc, **key_doc, DAILY_ROLLUP_COUNT_FIELD: count, DAILY_ROLLUP_SIZE_FIELD: size}
+        for key_doc, count, size in deltas.values()
+        if count > 0
+    ]
+
+
+def load(records, rollups='deltas'):
+    db = mongomock.MongoClient().db
+    db.media_records.insert_many([dict(record) for record in records])
+    if rollups == 'deltas':
+        db[DAILY_ROLLUPS_COLLECTION].insert_many(rollup_documents(accumulate_rollup_deltas({}, records)))
+    else:
+        rebuild_daily_rollups(db)
+    return db
+
+
+def assert_same_results(db, pipeline_name):
+    expected = list(db.media_records.aggregate(PIPELINES[pipeline_name]))
+    actual = list(db[DAILY_ROLLUPS_COLLECTION].aggregate(ROLLUP_PIPELINES[pipeline_name]))
+    assert expected, f"{pipeline_name} returned nothing"
+    assert actual == expected
+
+
+@pytest.mark.parametrize('rollups', ['deltas', 'rebuild'])
+@pytest.mark.parametrize('pipeline_name', COMPARED_PIPELINES)
+def test_rollup_pipeline_matches_media_records(pipeline_name, rollups):
+    db = load(media_records(), rollups)
+    assert daily_rollups_in_sync(db)
+    assert_same_results(db, pipeline_name)
+
+
+def test_deltas_match_server_rebuild():
+    records = media_records()
+    rebuilt = load(records, 'rebuild')[DAILY_ROLLUPS_COLLECTION].find()
+    key = lambda doc: repr(doc['_id'])
+    assert sorted(rollup_documents(accumulate_rollup_deltas({}, records)), key=key) == sorted(rebuilt, key=key)
+
+
+@pytest.mark.parametrize('pipeline_name', COMPARED_PIPELINES)
+def test_deltas_of_deleted_records_cancel_out(pipeline_name):
+    records = media_records()
+    removed = records[::3]
+    kept = [record for record in records if record not in removed]
+    deltas = accumulate_rollup_deltas({}, records)
+    accumulate_rollup_deltas(deltas, removed, sign=-1)
+
+    db = mongomock.MongoClient().db
+    db.media_records.insert_many([dict(record) for record in kept])
+    db[DAILY_ROLLUPS_COLLECTION].insert_many(rollup_documents(deltas))
+    assert daily_rollups_in_sync(db)
+    assert_same_results(db, pipeline_name)
+
+
+def test_deltas_keep_true_and_one_apart():
+    deltas = accumulate_rollup_deltas({}, [
+        {'ISO_Date': '2021-09-01', 'is_collection_day': True, 'File_Size_MB': 1.0},
+        {'ISO_Date': '2021-09-01', 'is_collection_day': 1, 'File_Size_MB': 2.0},
+        {'ISO_Date': '2021-09-01', 'is_collection_day': True, 'File_Size_MB': 'n/a'},
+    ])
+    assert sorted((count, size) for _key, count, size in deltas.values()) == [(1, 2.0), (2, 1.0)]
+
+
+def test_pipelines_rollups_cannot_answer_are_rejected():
+    with pytest.raises(ValueError):
+        create_rollup_pipeline([{'$group': {'_id': '$file_name', 'n': {'$sum': 1}}}])
+    with pytest.raises(ValueError):
+        create_rollup_pipeline([{'$group': {'_id': '$ISO_Date', 'd': {'$avg': '$Duration'}}}])
+    with pytest.raises(ValueError):
+        create_rollup_pipeline([{'$sort': {'ISO_Date': 1}}, {'$group': {'_id': '$ISO_Date'}}])
@@ -0,0 +1,68 @@
+"""
+Expanding ACF/PACF
+==================
+
+expanding_acf_pacf replaced one statsmodels acf/pacf call per row. Every row
+must still match statsmodels on the same expanding prefix: acf() with its
+biased autocovariances, and pacf(method='ywm'), which _durbin_levinson
+computes from those autocorrelations.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+stattools = pytest.importorskip('statsmodels.tsa.stattools')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ar_utils import _durbin_levinson, expanding_acf_pacf
+
+NLAGS = 7
+
+
+def series():
+    rng = np.random.default_rng(3)
+    counts = rng.poisson(40, 120).astype(float)
+    counts[::7] = 0  # weekends
+    counts[30:34] = 0
+    return {
+        'daily counts': counts,
+        'trend': np.arange(80) * 2.5 + rng.normal(0, 3, 80),
+        'large offset': 1e6 + rng.normal(0, 1, 60),
+    }
+
+
+@pytest.mark.parametrize('name', sorted(series()))
+def test_rows_match_statsmodels_on_each_prefix(name):
+    values = series()[name]
+    acf_vals, pacf_vals = expanding_acf_pacf(values, NLAGS)
+    assert acf_vals.shape == pacf_vals.shape == (len(values), NLAGS + 1)
+
+    for length in range(2, len(values) + 1):
+        prefix = values[:length]
+        lags = min(NLAGS, length - 1)
+        expected_acf = stattools.acf(prefix, nlags=lags, fft=False)
+        np.testing.assert_allclose(acf_vals[length - 1, :lags + 1], expected_acf, rtol=1e-7, atol=1e-9)
+        assert np.isnan(acf_vals[length - 1, lags + 1:]).all()
+        if length > 2 * NLAGS:
+            expected_pacf = stattools.pacf(prefix, nlags=NLAGS, method='ywm')
+            np.testing.assert_allclose(pacf_vals[length - 1], expected_pacf, rtol=1e-7, atol=1e-9)
+
+
+def test_durbin_levinson_matches_yule_walker_for_many_series():
+    rng = np.random.default_rng(5)
+    batch = [rng.normal(size=200).cumsum() for _ in range(4)]
+    autocorrelations = np.array([stattools.acf(x, nlags=NLAGS, fft=False) for x in batch])
+    expected = np.array([stattools.pacf(x, nlags=NLAGS, method='ywm') for x in batch])
+    np.testing.assert_allclose(_durbin_levinson(autocorrelations), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_constant_prefixes_and_empty_series_are_nan():
+    acf_vals, pacf_vals = expanding_acf_pacf([5, 5, 5, 1, 2], 2)
+    assert np.isnan(acf_vals[:3]).all() and np.isnan(pacf_vals[:3]).all()
+    assert not np.isnan(acf_vals[4]).any()
+    empty_acf, empty_pacf = expanding_acf_pacf([], 3)
+    assert empty_acf.shape == empty_pacf.shape == (0, 4)
@@ -0,0 +1,85 @@
+"""
+Fact table engine vs MongoDB
+============================
+
+Runs every registered pipeline both in-process (ReportFactTable and the
+aggregation_engine module) and on a live mongod, and requires the results to
+match. The fact table stays opt-in (generate_report.py --fact_table) until
+this suite passes against the report database.
+
+The pipelines run with the sheet creators' base filter prepended, against
+media_records for PIPELINES and daily_rollups for ROLLUP_PIPELINES. Tests are
+skipped when no server is reachable. Override the server with
+AR_TEST_MONGO_HOST, AR_TEST_MONGO_PORT and AR_TEST_MONGO_DB.
+
+Usage:
+    python -m pytest tests/test_fact_table_engine.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipelines import PIPELINES, ROLLUP_PIPELINES
+from pipelines.utils import DAILY_ROLLUPS_COLLECTION
+from db_utils import DEFAULT_DATABASE_NAME, DEFAULT_HOST, DEFAULT_PORT, get_db_connection
+from report_generator.fact_table import ReportFactTable, compare_documents, default_fact_fields
+
+BASE_FILTER = {"$match": {
+    "School_Year": {"$ne": "N/A"},
+    "file_type": {"$in": ["JPG", "MP3"]}
+}}
+
+
+@pytest.fixture(scope='module')
+def db():
+    try:
+        return get_db_connection(
+            host=os.environ.get('AR_TEST_MONGO_HOST', DEFAULT_HOST),
+            port=int(os.environ.get('AR_TEST_MONGO_PORT', DEFAULT_PORT)),
+            db_name=os.environ.get('AR_TEST_MONGO_DB', DEFAULT_DATABASE_NAME),
+            timeout_ms=2000
+        )
+    except ConnectionError as e:
+        pytest.skip(f"MongoDB is not reachable: {e}")
+
+
+@pytest.fixture(scope='module')
+def media_fact_table(db):
+    if db['media_records'].estimated_document_count() == 0:
+        pytest.skip("media_records is empty")
+    return ReportFactTable(db)
+
+
+@pytest.fixture(scope='module')
+def rollup_fact_table(db):
+    if db[DAILY_ROLLUPS_COLLECTION].estimated_document_count() == 0:
+        pytest.skip(f"{DAILY_ROLLUPS_COLLECTION} is empty; run populate_db.py or generate_report.py first")
+    return ReportFactTable(
+        db,
+        collection_name=DAILY_ROLLUPS_COLLECTION,
+        fields=default_fact_fields(ROLLUP_PIPELINES)
+    )
+
+
+def assert_matches_server(db, fact_table, pipeline):
+    full_pipeline = [BASE_FILTER] + pipeline
+    documents = fact_table.aggregate(full_pipeline, fact_table.collection_name)
+    if documents is None:
+        pytest.skip("pipeline is not supported in-process; it runs on MongoDB")
+    expected = list(db[fact_table.collection_name].aggregate(full_pipeline, allowDiskUse=True))
+    differences = compare_documents(documents, expected)
+    assert not differences, "\n".join(differences)
+
+
+@pytest.mark.parametrize('pipeline_name', sorted(PIPELINES))
+def test_pipeline_matches_server(db, media_fact_table, pipeline_name):
+    assert_matches_server(db, media_fact_table, PIPELINES[pipeline_name])
+
+
+@pytest.mark.parametrize('pipeline_name', sorted(ROLLUP_PIPELINES))
+def test_rollup_pipeline_matches_server(db, rollup_fact_table, pipeline_name):
+    assert_matches_server(db, rollup_fact_table, ROLLUP_PIPELINES[pipeline_name])
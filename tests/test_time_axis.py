@@ -0,0 +1,112 @@
+"""
+Time axis zero-fill
+===================
+
+Pins which rows the zero-filled time-series sheets end up with. Daily results
+are zero-filled once, inside MongoDB from calendar_days; weekly, bi-weekly,
+monthly and period results by reindex_time_axis. The daily pipeline runs
+through the in-process aggregation engine, so no database is needed.
+"""
+
+import datetime
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ar_utils import CollectionCalendar
+from pipelines import PIPELINES, TIME_AXIS_GRANULARITIES
+from pipelines.utils import CALENDAR_DAYS_COLLECTION
+from report_generator.aggregation_engine import aggregate
+from report_generator.time_axis import reindex_time_axis
+
+
+def calendar():
+    """Two periods over five ISO weeks (36-40), with 2021-09-15 not collected."""
+    return CollectionCalendar.build(
+        {'2021-2022': {'periods': {
+            'P1': (datetime.date(2021, 9, 6), datetime.date(2021, 9, 17)),
+            'P2': (datetime.date(2021, 9, 20), datetime.date(2021, 10, 8))
+        }}},
+        {datetime.date(2021, 9, 15): {'type': 'Non-Collection'}}
+    )
+
+
+@pytest.mark.parametrize('pipeline_name', ['DAILY_COUNTS_ALL_WITH_ZEROES', 'DAILY_COUNTS_COLLECTION_ONLY'])
+def test_daily_pipelines_are_zero_filled_only_on_the_server(pipeline_name):
+    assert pipeline_name not in TIME_AXIS_GRANULARITIES
+
+
+def test_daily_counts_with_zeroes_row_set():
+    media = pd.DataFrame({
+        'ISO_Date': ['2021-09-13', '2021-09-13', '2021-09-18'],
+        'file_type': ['JPG', 'MP3', 'JPG'],
+        'School_Year': ['2021-2022'] * 3,
+        'File_Size_MB': [1.0, 2.0, 3.0]
+    })
+    calendar_days = pd.DataFrame({
+        '_id': ['2021-09-13', '2021-09-14', '2021-09-18'],
+        'is_collection_day': [True, True, False]
+    })
+    documents = aggregate(
+        media, PIPELINES['DAILY_COUNTS_ALL_WITH_ZEROES'],
+        collection_loader={CALENDAR_DAYS_COLLECTION: calendar_days}.__getitem__
+    )
+    # One row per collection day; the Saturday with files is not a collection day
+    assert documents == [
+        {'_id': '2021-09-13', 'Total_Files': 2, 'MP3_Files': 1, 'JPG_Files': 1,
+         'Total_Size_MB': 3.0, 'has_files': True},
+        {'_id': '2021-09-14', 'Total_Files': 0, 'MP3_Files': 0, 'JPG_Files': 0,
+         'Total_Size_MB': 0.0, 'has_files': False},
+    ]
+
+
+def test_weekly_result_gets_a_zero_row_per_missing_week():
+    df = pd.DataFrame({'_id': ['2021-W37'], 'Year': [2021], 'Week': [37],
+                       'Total_Files': [5], 'Total_Size_MB': [1.5], 'has_files': [True]})
+    result = reindex_time_axis(df, 'weekly', calendar())
+    assert result['_id'].tolist() == ['2021-W36', '2021-W37', '2021-W38', '2021-W39', '2021-W40']
+    assert result['Week'].tolist() == [36, 37, 38, 39, 40]
+    assert result['Total_Files'].tolist() == [0, 5, 0, 0, 0]
+    assert result['has_files'].tolist() == [False, True, False, False, False]
+    assert result.dtypes.equals(df.dtypes)
+    assert list(result.index) == list(range(5))
+
+
+def test_biweekly_buckets_follow_iso_week_pairs():
+    df = pd.DataFrame({'_id': ['2021-B19'], 'Year': [2021], 'Biweek_Number': [18], 'Total_Files': [1]})
+    result = reindex_time_axis(df, 'biweekly', calendar())
+    assert result['_id'].tolist() == ['2021-B18', '2021-B19', '2021-B20']
+    assert result['Total_Files'].tolist() == [0, 1, 0]
+
+
+def test_buckets_outside_the_calendar_with_data_are_kept():
+    df = pd.DataFrame({'_id': ['2021-10', '2021-12'], 'Total_Files': [3, 4]})
+    result = reindex_time_axis(df, 'monthly', calendar())
+    assert result.to_dict('records') == [
+        {'_id': '2021-09', 'Total_Files': 0},
+        {'_id': '2021-10', 'Total_Files': 3},
+        {'_id': '2021-12', 'Total_Files': 4},
+    ]
+
+
+def test_period_result_gets_missing_periods():
+    df = pd.DataFrame({'School_Year': ['2021-2022'], 'Period': ['P2'], 'Total_Files': [3]})
+    result = reindex_time_axis(df, 'period', calendar())
+    assert result.to_dict('records') == [
+        {'School_Year': '2021-2022', 'Period': 'P1', 'Total_Files': 0},
+        {'School_Year': '2021-2022', 'Period': 'P2', 'Total_Files': 3},
+    ]
+
+
+def test_complete_and_unreadable_results_are_returned_unchanged():
+    complete = pd.DataFrame({'School_Year': ['2021-2022', '2021-2022'], 'Period': ['P1', 'P2'],
+                             'Total_Files': [1, 2]})
+    pd.testing.assert_frame_equal(reindex_time_axis(complete, 'period', calendar()), complete)
+    unreadable = pd.DataFrame({'Total_Files': [1]})
+    assert reindex_time_axis(unreadable, 'weekly', calendar()) is unreadable
+    with pytest.raises(ValueError):
+        reindex_time_axis(complete, 'daily', calendar())
@@ -123,7 +123,8 @@ def is_collection_day(date_obj: datetime.date, collection_day_map: dict) -> bool
     
     Args:
         date_obj: The date to check
-        collection_day_map: Precomputed map of collection days
+        collection_day_map: Precomputed map of collection days (or an
+            ar_utils.CollectionCalendar)
         
     Returns:
         True if the date is a valid collection day, False otherwise
@@ -142,6 +143,9 @@ def get_period_for_date(date_obj: datetime.date, collection_day_map: dict) -> Op
     Returns:
         Collection period name or None if not a collection day
     """
+    # ar_utils.CollectionCalendar answers directly from its arrays
+    if hasattr(collection_day_map, 'get_period_for_date'):
+        return collection_day_map.get_period_for_date(date_obj)
     day_info = collection_day_map.get(date_obj)
     return day_info.get('Collection_Period') if day_info else None
 
@@ -157,6 +161,8 @@ def get_school_year_for_date(date_obj: datetime.date, collection_day_map: dict)
     Returns:
         School year name or None if not a collection day
     """
+    if hasattr(collection_day_map, 'get_school_year_for_date'):
+        return collection_day_map.get_school_year_for_date(date_obj)
     day_info = collection_day_map.get(date_obj)
     return day_info.get('School_Year') if day_info else None
 